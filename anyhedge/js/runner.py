@@ -1,14 +1,28 @@
-import os
 import json
 import logging
-import requests
 from subprocess import run, PIPE
 
+from main.utils.js_bridge import JSBridge
+
 # This class gets populated with functions in the javascript after loading this file
 # Refer to code below
 
 LOGGER = logging.getLogger(__name__)
 
+bridge = JSBridge(
+    'anyhedge',
+    'http://localhost:3020/',
+    './anyhedge/js/src/main.js',
+    # functions that call out to oracle relays & the settlement service
+    timeouts={
+        'getSettlementServiceAuthToken': 60,
+        'getPriceMessages': 60,
+        'getContractStatus': 60,
+        'settleContractMaturity': 60,
+        'liquidateContract': 60,
+    },
+)
+
 class AnyhedgeFunctionsMeta(type):
     functions_loaded = False
     functions = {}
@@ -41,34 +55,6 @@ class AnyhedgeFunctions(metaclass=AnyhedgeFunctionsMeta):
 
 def generate_func(func_name):
     def func(*args):
-        _input = {
-            "function": func_name,
-            "params": args,
-        }
-
-        try:
-            response = requests.post('http://localhost:3020/', data=json.dumps(_input))
-            if response.ok:
-                try:
-                    return response.json()
-                except json.JSONDecodeError:
-                    return response.content
-            else:
-               raise Exception(response.content.decode())
-        except requests.exceptions.ConnectionError:
-            pass
-
-        process = run(['node', './anyhedge/js/src/main.js'], input=json.dumps(_input).encode(), stdout=PIPE, stderr=PIPE)
-        result = None
-
-        LOGGER.info(f"{func_name} | {args} | {process}")
-        if process.stdout:
-            try:
-                result = json.loads(process.stdout)
-            except json.JSONDecodeError:
-                result = process.stdout
-        elif process.stderr:
-            raise Exception(f"{func_name} | {args} | {process.stderr.decode()}")
-        return result
+        return bridge.call(func_name, *args)
 
     return func
@@ -60,6 +60,18 @@ const server = http.createServer(async (req, res) => {
  * @param {http.IncomingMessage} request._request
  */
 async function requestHandler(request) {
+  if (request.url === '/batch') {
+    const scriptResponses = await Promise.all((request.data || []).map(runScript))
+    return {
+      status: 200,
+      content: JSON.stringify(scriptResponses.map(scriptResponse => ({
+        success: scriptResponse?.success,
+        result: scriptResponse?.result === undefined ? null : JSON.parse(scriptResponse.result),
+        error: scriptResponse?.error,
+      }))),
+    }
+  }
+
   const scriptResponse = await runScript(request.data)
   return {
     status: scriptResponse?.success ? 200 : 400,
@@ -1,7 +1,7 @@
 from django.db import transaction
 from django.utils import timezone
 from datetime import datetime, timedelta
-from ..js.runner import AnyhedgeFunctions
+from ..js.runner import AnyhedgeFunctions, bridge as anyhedge_bridge
 from ..models import (
     HedgePosition,
     HedgePositionMetadata,
@@ -361,6 +361,17 @@ def contract_data_to_obj(contract_data:dict):
             fee_objs.append(fee)
 
     if isinstance(contract_data.get("fundings"), list):
+        # settlement messages of all fundings are parsed in one script server request
+        settlement_messages = [
+            funding_data["settlement"]["settlementMessage"]
+            for funding_data in contract_data["fundings"]
+            if "settlementMessage" in (funding_data.get("settlement") or {})
+        ]
+        parse_results = dict(zip(
+            settlement_messages,
+            anyhedge_bridge.call_many([("parseOracleMessage", message) for message in settlement_messages]),
+        ))
+
         funding_objs = []
         for funding_data in contract_data["fundings"]:
             settlement_data = funding_data.get("settlement")
@@ -368,10 +379,8 @@ def contract_data_to_obj(contract_data:dict):
             if settlement_data:
                 settlement_price_data = dict()
                 if "settlementMessage" in settlement_data:
-                    parse_result = AnyhedgeFunctions.parseOracleMessage(
-                        settlement_data["settlementMessage"]
-                    )
-                    settlement_price_data = parse_result["priceData"]
+                    parse_result = parse_results[settlement_data["settlementMessage"]]
+                    settlement_price_data = { **parse_result["priceData"] }
                     settlement_price_data["messageTimestamp"] = datetime.fromtimestamp(
                         settlement_price_data["messageTimestamp"]
                     ).replace(tzinfo=pytz.UTC)
@@ -1,3 +1,32 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, tag
+
+from main.tests.mocker.redis import FakeRedis
+from cts.utils.authguard import AuthGuardAddressResolver
+
+
+CATEGORY_A = 'aa' * 32
+CATEGORY_B = 'bb' * 32
+
+
+class AuthGuardAddressResolverTestCase(SimpleTestCase):
+    def setUp(self):
+        self.resolver = AuthGuardAddressResolver(cache=FakeRedis(), max_workers=2, timeout=1)
+
+    @tag("unit")
+    def test_resolved_addresses_are_memoized(self):
+        addresses = { CATEGORY_A: 'bitcoincash:rauthguard-a', CATEGORY_B: 'bitcoincash:rauthguard-b' }
+        with mock.patch.object(self.resolver, 'fetch', side_effect=addresses.get) as mock_fetch:
+            self.assertEqual(self.resolver.resolve([CATEGORY_A, CATEGORY_B, CATEGORY_A, None]), addresses)
+            self.assertEqual(mock_fetch.call_count, 2)
+
+            self.assertEqual(self.resolver.resolve([CATEGORY_A, CATEGORY_B]), addresses)
+            self.assertEqual(mock_fetch.call_count, 2)
+
+    @tag("unit")
+    def test_unresolved_categories_are_retried(self):
+        with mock.patch.object(self.resolver, 'fetch', return_value=None) as mock_fetch:
+            self.assertEqual(self.resolver.resolve([CATEGORY_A]), {})
+            self.assertEqual(self.resolver.resolve([CATEGORY_A]), {})
+            self.assertEqual(mock_fetch.call_count, 2)
@@ -0,0 +1,83 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEPOSIT_ADDRESS_URL = 'http://localhost:3001/cts/js/authguard-token-deposit-address/'
+
+# max concurrent requests to the cts JS server, and seconds each may take
+MAX_WORKERS = 8
+TIMEOUT = 5
+
+session = requests.Session()
+session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
+
+
+def get_cache_key():
+    return f'cts:authguard-token-deposit-address:{settings.BCH_NETWORK}'
+
+
+class AuthGuardAddressResolver(object):
+    """
+        Resolves the AuthGuard token deposit address of authkey categories
+        An AuthGuard's address is derived from its category alone, so resolved addresses
+        are kept in a redis hash without expiry and only categories not seen before
+        are requested from the cts JS server, a few at a time.
+    """
+
+    def __init__(self, cache=None, max_workers=MAX_WORKERS, timeout=TIMEOUT):
+        self.cache = cache or settings.REDISKV
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+    def resolve(self, categories):
+        """
+            Returns dict of category -> token deposit address,
+            categories that could not be resolved are left out
+        """
+        categories = sorted(set(category for category in categories if category))
+        if not categories:
+            return {}
+
+        cache_key = get_cache_key()
+        addresses = {
+            category: address.decode()
+            for category, address in zip(categories, self.cache.hmget(cache_key, categories))
+            if address
+        }
+
+        missing = [category for category in categories if category not in addresses]
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as executor:
+                fetched = {
+                    category: address
+                    for category, address in zip(missing, executor.map(self.fetch, missing))
+                    if address
+                }
+            if fetched:
+                self.cache.hset(cache_key, mapping=fetched)
+            addresses.update(fetched)
+
+        return addresses
+
+    def fetch(self, category):
+        try:
+            response = session.get(f'{DEPOSIT_ADDRESS_URL}{category}', timeout=self.timeout)
+            response.raise_for_status()
+            return response.json().get(category)
+        except Exception as exception:
+            LOGGER.warning(f'Unable to resolve authguard of {category}: {exception}')
+            return None
+
+
+def get_token_authguard_pairs(categories):
+    """
+        Returns the [{ <category>: <authguard token deposit address> }, ...] list the cts serializers expect
+    """
+    addresses = AuthGuardAddressResolver().resolve(categories)
+    return [{ category: address } for category, address in addresses.items()]
@@ -1,8 +1,6 @@
 
 
 from typing import Any
-import requests
-import threading
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
@@ -14,6 +12,7 @@ from main.models import (Transaction, BlockHeight)
 
 from smartbch.pagination import CustomLimitOffsetPagination
 
+from cts.utils.authguard import get_token_authguard_pairs
 from cts.serializers import UtxoSerializer, AuthchainIdentitySerializer
 
 
@@ -56,26 +55,15 @@ class AuthchainIdentity(APIView):
         authkeys = queryset.filter(cashtoken_nft__commitment='00') # authkey like
         # We need to get the addresses of the AuthGuard contract
         # associated with each of these AuthKeys.
-        # We'll save it here 
-        token_authguard_addresses = [] # [{ <category or tokenId>: <authguard contract token deposit address> }, ...]
         # authkeycategory = Authguard() = 1 address
-        urls = []
-        for authkey in authkeys:
-            if authkey.cashtoken_nft.category:
-                urls.append(f'http://localhost:3001/cts/js/authguard-token-deposit-address/{authkey.cashtoken_nft.category}')
-        
-        threads = []
-        for url in urls:
-            thread = threading.Thread(
-                target = lambda u = url: token_authguard_addresses.append(requests.get(u).json())
-            )
-            thread.start()
-            threads.append(thread)
-
-        for thread in threads:
-            thread.join()
-        
-        authguard_addresses_set = set(map(lambda x: x[list(x.keys())[0]], token_authguard_addresses))
+        # All of them are needed to filter the identity outputs, not just a page's,
+        # but they are mostly served from the resolver's cache.
+        categories = authkeys.filter(cashtoken_nft__category__isnull=False) \
+            .values_list('cashtoken_nft__category', flat=True) \
+            .order_by().distinct()
+        token_authguard_addresses = get_token_authguard_pairs(categories)
+
+        authguard_addresses_set = set(address for pair in token_authguard_addresses for address in pair.values())
         identity_outputs = Transaction.objects.filter(
             Q(spent=False),
             Q(index=0), Q(address__token_address__in=authguard_addresses_set) | Q(address__token_address__in=authguard_addresses_set)
@@ -1,7 +1,5 @@
 
 
-import requests
-import threading
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
@@ -13,6 +11,7 @@ from main.models import (Transaction)
 from smartbch.pagination import CustomLimitOffsetPagination
 
 from cts.serializers import AuthKeySerializer
+from cts.utils.authguard import get_token_authguard_pairs
 
 class AuthKeys(APIView):
     
@@ -48,23 +47,8 @@ class AuthKeys(APIView):
             Q(cashtoken_nft__category__isnull=False) & 
             Q(cashtoken_nft__commitment='00')
           )
-        authkeys = authkeys.annotate(authKeyOwner=Value(owner_address, output_field=CharField()))
-        token_authguard_addresses = []
-        urls = []
-        for authkey in authkeys:
-          if authkey.cashtoken_nft.category:
-                urls.append(f'http://localhost:3001/cts/js/authguard-token-deposit-address/{authkey.cashtoken_nft.category}')
-        
-        threads = []
-        for url in urls:
-            thread = threading.Thread(
-                target = lambda u = url: token_authguard_addresses.append(requests.get(u).json())
-            )
-            thread.start()
-            threads.append(thread)
-
-        for thread in threads:
-            thread.join()
+        authkeys = authkeys.annotate(authKeyOwner=Value(owner_address, output_field=CharField())) \
+          .select_related('cashtoken_nft')
 
         if self.request.query_params.get('exclude_unused_keys') == 'true':
           # TODO
@@ -75,6 +59,10 @@ class AuthKeys(APIView):
         paginator = self.pagination_class()
         page = paginator.paginate_queryset(authkeys, request)
         if page is not None:
+            # only the authguards of the page's authkeys are resolved
+            token_authguard_addresses = get_token_authguard_pairs(
+                authkey.cashtoken_nft.category for authkey in page
+            )
             serializer = self.serializer_class(page, many=True, context={'token_id_authguard_pairs': token_authguard_addresses})
             return paginator.get_paginated_response(serializer.data)
 
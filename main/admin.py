@@ -11,6 +11,7 @@ from main.tasks import (
     parse_tx_wallet_histories
 )
 
+from main.utils.block_scanner import queue_blocks
 from dynamic_raw_id.admin import DynamicRawIDMixin
 from django.utils.html import format_html
 from django.conf import settings
@@ -64,12 +65,9 @@ class BlockHeightAdmin(admin.ModelAdmin):
 
     
     def process(self, request, queryset):
-        for trans in queryset:
-            pending_blocks = json.loads(REDIS_STORAGE.get('PENDING-BLOCKS'))
-            pending_blocks.append(trans.number)
-            pending_blocks = list(set(pending_blocks))
-            BlockHeight.objects.filter(number=trans.number).update(processed=False)
-            REDIS_STORAGE.set('PENDING-BLOCKS', json.dumps(pending_blocks))
+        numbers = list(queryset.values_list('number', flat=True))
+        BlockHeight.objects.filter(number__in=numbers).update(processed=False)
+        queue_blocks(*numbers)
 
     def get_actions(self, request):
         actions = super().get_actions(request)
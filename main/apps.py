@@ -9,9 +9,6 @@ class MainConfig(AppConfig):
 
         # Restart block scanning upon re-deployment
         REDIS_STORAGE.delete('PENDING-BLOCKS')
-        REDIS_STORAGE.delete('ACTIVE-BLOCK')
         REDIS_STORAGE.delete('BITDBQUERY_COUNT')
-        REDIS_STORAGE.delete('BITDBQUERY_COUNT')
-        REDIS_STORAGE.set('READY', 1)
 
         populate_token_addresses.delay()
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.models import CashNonFungibleToken
+from main.tasks import resolve_nfts_fixed_supply
+
+
+class Command(BaseCommand):
+    help = "Trace the genesis of CashToken NFTs with unknown fixed supply, filling the NFT genesis index"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-c", "--category", type=str, default=None, help="only trace NFTs of this category")
+        parser.add_argument("-b", "--batch-size", type=int, default=settings.NFT_GENESIS["BATCH_SIZE"])
+        parser.add_argument("-d", "--max-depth", type=int, default=None, help="max txs fetched per NFT")
+
+    def handle(self, *args, **options):
+        queryset = CashNonFungibleToken.objects.filter(fixed_supply__isnull=True).order_by("id")
+        if options["category"]:
+            queryset = queryset.filter(category=options["category"])
+
+        batch_size = options["batch_size"]
+        last_id = 0
+        traced = 0
+        resolved = 0
+        while True:
+            cashtokens = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not cashtokens:
+                break
+
+            last_id = cashtokens[-1].id
+            traced += len(cashtokens)
+            resolved += resolve_nfts_fixed_supply(cashtokens, max_depth=options["max_depth"])
+            self.stdout.write(f"Traced {traced} NFTs, resolved {resolved}")
+
+        self.stdout.write(self.style.SUCCESS(f"Resolved {resolved} of {traced} NFTs"))
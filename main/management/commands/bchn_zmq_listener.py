@@ -7,7 +7,7 @@
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from main.mqtt import publish_message
-from bitcash import transaction
+from main.utils.raw_tx import txid as calc_txid
 import logging
 import binascii
 import zmq
@@ -38,7 +38,7 @@ class ZMQHandler():
 
                 if topic == "rawtx":
                     tx_hex = binascii.hexlify(body).decode()
-                    txid = transaction.calc_txid(tx_hex)
+                    txid = calc_txid(body)
                     data = {
                         'txid': txid,
                         'tx_hex': tx_hex
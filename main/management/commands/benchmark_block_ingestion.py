@@ -0,0 +1,72 @@
+import json
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction as trans
+from django.test.utils import CaptureQueriesContext
+
+from main.models import BlockHeight
+from main.tasks import NODE, save_block_transactions, save_transaction
+
+
+class Command(BaseCommand):
+    help = "Replay a recorded block fixture through block ingestion and report queries and wall time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("fixture", type=str, help="path of the block fixture JSON file")
+        parser.add_argument("-r", "--record", type=int, default=None, help="record block at this height into the fixture file")
+        parser.add_argument("-l", "--legacy", action="store_true", help="also replay through per-tx 'save_transaction()'")
+
+    def handle(self, *args, **options):
+        fixture = options["fixture"]
+        if options["record"] is not None:
+            self.record(options["record"], fixture)
+
+        try:
+            with open(fixture) as fixture_file:
+                block = json.load(fixture_file, parse_float=Decimal)
+        except (OSError, ValueError) as exception:
+            raise CommandError(f"Unable to load fixture: {exception}")
+
+        parsed_txs = []
+        for tx in block["tx"]:
+            tx["time"] = block["time"]
+            parsed_txs.append(NODE.BCH._parse_transaction(tx))
+
+        block_id = BlockHeight.objects.filter(number=block["height"]).values_list("id", flat=True).first()
+        self.stdout.write(f"Block {block['height']}: {len(parsed_txs)} txs")
+
+        if options["legacy"]:
+            def save_legacy():
+                for parsed_tx in parsed_txs:
+                    save_transaction(parsed_tx, block_id=block_id)
+            self.report("save_transaction", save_legacy)
+
+        self.report("save_block_transactions", lambda: save_block_transactions(parsed_txs, block_id=block_id))
+
+    def record(self, height, fixture):
+        tx_list = NODE.BCH.get_block(height, verbosity=3)
+        block_time = NODE.BCH.get_block_stats(height, stats=["time"])["time"]
+        with open(fixture, "w") as fixture_file:
+            json.dump({ "height": height, "time": block_time, "tx": tx_list }, fixture_file, default=float)
+        self.stdout.write(f"Recorded block {height} into {fixture}")
+
+    def report(self, name, func):
+        # changes are rolled back and side effects outside the DB are mocked
+        with mock.patch("main.tasks.client_acknowledgement"), \
+            mock.patch("main.tasks.transaction_post_save_task"), \
+            mock.patch("main.tasks.rampp2p_utils.process_transaction"), \
+            mock.patch("main.tasks.clear_wallet_caches"):
+
+            with trans.atomic():
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    func()
+                    duration = time.perf_counter() - start
+                trans.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{name}: {len(queries.captured_queries)} queries | {round(duration, 3)}s"
+        ))
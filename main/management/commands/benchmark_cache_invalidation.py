@@ -0,0 +1,100 @@
+import time
+
+import redis
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.utils.cache import (
+    GLOBAL_TAG,
+    bump_generations,
+    get_generations,
+    wallet_balance_tag,
+    wallet_history_tag,
+    wallet_tag,
+)
+
+
+CATEGORIES = ['aa' * 32, 'bb' * 32, 'cc' * 32]
+HISTORY_PAGES = 5
+
+
+class Command(BaseCommand):
+    help = "Compare KEYS based against generation based wallet cache invalidation on a redis db filled with unrelated keys"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-k", "--keys", type=int, default=1000000, help="number of unrelated keys to fill the db with")
+        parser.add_argument("-w", "--wallets", type=int, default=100, help="number of wallets to invalidate")
+        parser.add_argument("--db", type=int, default=15, help="scratch redis db, flushed when done")
+        parser.add_argument("--force", action="store_true", help="use the db even if it is not empty")
+
+    def handle(self, *args, **options):
+        connection_kwargs = settings.REDISKV.connection_pool.connection_kwargs
+        if options["db"] == connection_kwargs.get("db"):
+            raise CommandError("Refusing to benchmark on the app's cache db, pick another --db")
+
+        cache = redis.StrictRedis(
+            host=connection_kwargs.get("host"),
+            port=connection_kwargs.get("port"),
+            password=connection_kwargs.get("password"),
+            db=options["db"],
+        )
+        if cache.dbsize() and not options["force"]:
+            raise CommandError(f"Redis db {options['db']} is not empty, run with --force to use & flush it anyway")
+
+        wallet_hashes = [f"{index:064x}" for index in range(options["wallets"])]
+
+        try:
+            self.fill(cache, options["keys"])
+            self.stdout.write(f"Filled db {options['db']} with {cache.dbsize()} keys")
+
+            self.fill_legacy(cache, wallet_hashes)
+            self.report("KEYS + DEL", wallet_hashes, lambda wallet_hash: self.invalidate_legacy(cache, wallet_hash))
+
+            self.report(
+                "generation bump",
+                wallet_hashes,
+                lambda wallet_hash: bump_generations(wallet_tag(wallet_hash), cache=cache),
+            )
+            self.report(
+                "generation read",
+                wallet_hashes,
+                lambda wallet_hash: get_generations(GLOBAL_TAG, wallet_tag(wallet_hash), wallet_history_tag(wallet_hash), cache=cache),
+            )
+
+            before = get_generations(wallet_balance_tag(wallet_hashes[0]), cache=cache)
+            bump_generations(wallet_balance_tag(wallet_hashes[0]), cache=cache)
+            if get_generations(wallet_balance_tag(wallet_hashes[0]), cache=cache) == before:
+                raise CommandError("Bumping a tag did not change its generation")
+        finally:
+            cache.flushdb()
+
+    def fill(self, cache, count, batch_size=10000):
+        for start in range(0, count, batch_size):
+            end = min(start + batch_size, count)
+            cache.mset({ f"benchmark:filler:{index}": "x" for index in range(start, end) })
+
+    def fill_legacy(self, cache, wallet_hashes):
+        pipeline = cache.pipeline(transaction=False)
+        for wallet_hash in wallet_hashes:
+            pipeline.set(f"wallet:balance:bch:{wallet_hash}", "{}")
+            for category in CATEGORIES:
+                pipeline.set(f"wallet:balance:token:{wallet_hash}:{category}", "{}")
+                for page in range(1, HISTORY_PAGES + 1):
+                    pipeline.set(f"wallet:history:{wallet_hash}:{category}:{page}", "{}")
+        pipeline.execute()
+
+    def invalidate_legacy(self, cache, wallet_hash):
+        cache.delete(f"wallet:balance:bch:{wallet_hash}")
+        keys = cache.keys(f"wallet:balance:token:{wallet_hash}:*") + cache.keys(f"wallet:history:{wallet_hash}:*")
+        if keys:
+            cache.delete(*keys)
+
+    def report(self, name, wallet_hashes, func):
+        start = time.perf_counter()
+        for wallet_hash in wallet_hashes:
+            func(wallet_hash)
+        duration = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"{name}: {len(wallet_hashes)} wallets | {round(duration, 3)}s | "
+            f"{round(duration * 1000 / len(wallet_hashes), 3)} ms/wallet"
+        ))
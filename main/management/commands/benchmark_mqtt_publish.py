@@ -0,0 +1,67 @@
+import time
+
+import paho.mqtt.publish as mqtt_publish
+from django.core.management.base import BaseCommand, CommandError
+
+from main.mqtt import MQTTPublisher
+
+
+class Command(BaseCommand):
+    help = "Measure MQTT publish throughput of the persistent publisher against a broker"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-n", "--count", type=int, default=1000, help="number of messages to publish")
+        parser.add_argument("-q", "--qos", type=int, default=1, choices=[0, 1])
+        parser.add_argument("--size", type=int, default=500, help="payload size in bytes")
+        parser.add_argument("--host", type=str, default="127.0.0.1", help="broker host, e.g. a local mosquitto")
+        parser.add_argument("--port", type=int, default=1883)
+        parser.add_argument("--stub", action="store_true", help="use an in-process broker stand-in instead")
+        parser.add_argument("-l", "--legacy", action="store_true", help="also publish with a connection per message")
+
+    def handle(self, *args, **options):
+        host, port = options["host"], options["port"]
+        broker = None
+        if options["stub"]:
+            from main.tests.mocker.mqtt_broker import FakeMQTTBroker
+            broker = FakeMQTTBroker().start()
+            host, port = broker.host, broker.port
+
+        count, qos = options["count"], options["qos"]
+        payload = "x" * options["size"]
+        topic = "watchtower/benchmark"
+
+        try:
+            if options["legacy"]:
+                def publish_legacy():
+                    for _ in range(count):
+                        mqtt_publish.single(topic, payload, qos=qos, hostname=host, port=port, keepalive=10)
+                self.report("publish.single", count, publish_legacy)
+
+            publisher = MQTTPublisher(
+                "watchtower-benchmark-publisher",
+                host=host,
+                port=port,
+                transport="tcp",
+                tls=False,
+                max_queue_size=count,
+            ).start()
+
+            def publish_persistent():
+                for _ in range(count):
+                    publisher.publish(topic, payload, qos=qos)
+                if not publisher.flush(timeout=120):
+                    raise CommandError("Timed out waiting for the broker to acknowledge messages")
+
+            self.report("MQTTPublisher", count, publish_persistent)
+            publisher.stop()
+        finally:
+            if broker:
+                broker.stop()
+
+    def report(self, name, count, func):
+        start = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"{name}: {count} messages | {round(duration, 3)}s | {round(count / duration)} msg/s"
+        ))
@@ -1,19 +1,11 @@
 from django.core.management.base import BaseCommand
-from django.conf import settings
+
+from main.utils.cache import clear_all_wallet_caches
 
 
 class Command(BaseCommand):
     help = "Clear balance and transaction history caches"
 
     def handle(self, *args, **options):
-
-        # delete balance caches
-        cache = settings.REDISKV
-        balance_keys = cache.keys(f'wallet:balance:*')
-        if balance_keys:
-            cache.delete(*balance_keys)
-
-        # delete wallet history caches
-        history_cache_keys = cache.keys(f'wallet:history:*')
-        if history_cache_keys:
-            cache.delete(*history_cache_keys)
+        # bumps the generation of all cached balances & histories, which then expire on their own
+        clear_all_wallet_caches()
@@ -0,0 +1,37 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from main.utils.js_bridge import get_js_bridge_stats
+from main.utils.stats import LATENCY_BUCKETS, latency_percentile
+
+
+class Command(BaseCommand):
+    help = "Show call counts & latency histograms of JS script server functions across all processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-r", "--reset", action="store_true", help="reset the counters after showing them")
+
+    def handle(self, *args, **options):
+        stats = get_js_bridge_stats()
+
+        functions = defaultdict(dict)
+        for field, count in stats.read().items():
+            function, counter = field.rsplit(":", 1)
+            functions[function][counter] = count
+
+        buckets = [str(bound) for bound in LATENCY_BUCKETS] + ["inf"]
+        for function, counts in sorted(functions.items()):
+            calls = counts.get("calls", 0)
+            mean = round(counts.get("ms", 0) / calls, 1) if calls else 0
+            self.stdout.write(
+                f"{function}: {calls} calls | {counts.get('errors', 0)} errors | "
+                f"{counts.get('fallbacks', 0)} fallback processes | mean {mean} ms | "
+                f"p50 <= {latency_percentile(counts, 0.5)} ms | "
+                f"p95 <= {latency_percentile(counts, 0.95)} ms"
+            )
+            histogram = " ".join(f"<={bucket}:{counts.get(f'le_{bucket}', 0)}" for bucket in buckets)
+            self.stdout.write(f"    {histogram}")
+
+        if options["reset"]:
+            stats.reset()
@@ -12,6 +12,8 @@ from main.tasks import (
     process_mempool_transaction_throttled
 )
 from main.utils.queries.bchn import BCHN
+from main.utils.address_filter import SubscribedAddressIndex
+from main.utils.raw_tx import RawTransactionError, output_hashes
 
 
 LOGGER = logging.getLogger(__name__)
@@ -25,6 +27,8 @@ else:
 
 mqtt_client.connect(settings.MQTT_HOST, settings.MQTT_PORT, 10)
 
+address_index = SubscribedAddressIndex()
+
 
 # The callback for when the client receives a CONNACK response from the server.
 def on_connect(client, userdata, flags, rc):
@@ -54,6 +58,20 @@ def _addresses_subscribed(tx_hex):
     return subscribed
 
 
+def _is_tracked(tx_hex):
+    """
+        Checks the tx's outputs against the in-memory address index, without RPC or DB calls
+        Falls back to decoding the tx through the node if it can't be parsed locally
+    """
+    try:
+        hashes = output_hashes(bytes.fromhex(tx_hex))
+    except (RawTransactionError, ValueError) as exception:
+        LOGGER.error(f"Unable to parse raw tx locally: {exception}")
+        return _addresses_subscribed(tx_hex)
+
+    return address_index.contains_any(hashes)
+
+
 # The callback for when a PUBLISH message is received from the server.
 def on_message(client, userdata, msg):
     try:
@@ -63,7 +81,7 @@ def on_message(client, userdata, msg):
             subscribed = False
             if 'tx_hex' in payload.keys():
                 tx_hex = payload['tx_hex']
-                subscribed = _addresses_subscribed(tx_hex)
+                subscribed = _is_tracked(tx_hex)
             if subscribed:
                 process_mempool_transaction_fast(txid, tx_hex, True)
             else:
@@ -112,4 +130,5 @@ class Command(BaseCommand):
     help = 'Run the mempool listener'
 
     def handle(self, *args, **options):
+        address_index.start()
         mqtt_client.loop_forever()
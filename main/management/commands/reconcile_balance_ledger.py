@@ -0,0 +1,104 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction as trans
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from main.models import BalanceLedger, Transaction, Wallet
+
+
+SCOPES = ['wallet_id', 'address_id']
+
+
+class Command(BaseCommand):
+    help = "Recompute the balance ledger from unspent transactions and report (or fix) drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-w", "--wallet", type=str, default=None, help="only reconcile this wallet hash")
+        parser.add_argument("-f", "--fix", action="store_true", help="overwrite drifted ledger rows with the recomputed totals")
+
+    def handle(self, *args, **options):
+        wallet_hash = options["wallet"]
+        wallet = None
+        if wallet_hash:
+            wallet = Wallet.objects.get(wallet_hash=wallet_hash)
+
+        with trans.atomic():
+            if options["fix"]:
+                # keeps the totals from moving while they are being compared & fixed
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LOCK TABLE {Transaction._meta.db_table} IN SHARE MODE")
+
+            drifts = []
+            for scope in SCOPES:
+                expected = self.compute(scope, wallet)
+                actual = self.ledger(scope, wallet)
+                for key in expected.keys() | actual.keys():
+                    expected_totals = expected.get(key, (0, 0, 0))
+                    actual_totals = actual.get(key, (0, 0, 0))
+                    if expected_totals != actual_totals:
+                        drifts.append((scope, key, expected_totals, actual_totals))
+
+            for scope, key, expected_totals, actual_totals in drifts:
+                scope_id, token_id, category = key
+                self.stdout.write(self.style.WARNING(
+                    f"{scope}={scope_id} token={token_id} category={category or '-'} | "
+                    f"ledger (amount, value, utxos): {actual_totals} | expected: {expected_totals}"
+                ))
+                if options["fix"]:
+                    self.fix(scope, key, expected_totals)
+
+        if not drifts:
+            self.stdout.write(self.style.SUCCESS("Balance ledger has no drift"))
+        elif options["fix"]:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(drifts)} drifted ledger rows"))
+        else:
+            self.stdout.write(self.style.ERROR(f"Found {len(drifts)} drifted ledger rows, run with --fix to correct them"))
+
+    def compute(self, scope, wallet=None):
+        qs = Transaction.objects.filter(spent=False, **{ f"{scope}__isnull": False })
+        if wallet:
+            qs = qs.filter(wallet=wallet)
+
+        non_dust = Q(value__gt=BalanceLedger.DUST)
+        rows = qs.values(
+            scope,
+            "token_id",
+            _category=Coalesce("cashtoken_ft_id", Value("")),
+        ).annotate(
+            _amount=Coalesce(Sum("amount"), 0),
+            _value=Coalesce(Sum("value", filter=non_dust), 0),
+            _utxo_count=Count("id", filter=non_dust),
+        ).order_by()
+
+        return {
+            (row[scope], row["token_id"], row["_category"]): (int(row["_amount"]), row["_value"], row["_utxo_count"])
+            for row in rows.iterator()
+        }
+
+    def ledger(self, scope, wallet=None):
+        qs = BalanceLedger.objects.filter(**{ f"{scope}__isnull": False })
+        if wallet:
+            if scope == "wallet_id":
+                qs = qs.filter(wallet=wallet)
+            else:
+                qs = qs.filter(address__wallet=wallet)
+
+        rows = qs.values_list(scope, "token_id", "category", "amount", "value", "utxo_count")
+        return {
+            (scope_id, token_id, category): (int(amount), value, utxo_count)
+            for scope_id, token_id, category, amount, value, utxo_count in rows.iterator()
+        }
+
+    def fix(self, scope, key, totals):
+        scope_id, token_id, category = key
+        amount, value, utxo_count = totals
+        lookup = { scope: scope_id, "token_id": token_id, "category": category }
+
+        if totals == (0, 0, 0):
+            BalanceLedger.objects.filter(**lookup).delete()
+            return
+
+        BalanceLedger.objects.update_or_create(
+            **lookup,
+            defaults={ "amount": amount, "value": value, "utxo_count": utxo_count },
+        )
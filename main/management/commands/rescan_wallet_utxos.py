@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from main.models import Wallet
+from main.tasks import rescan_utxos
+
+
+class Command(BaseCommand):
+    help = "Rescan the UTXOs of bch wallets and report per wallet timings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("wallet_hashes", nargs="+", type=str)
+        parser.add_argument("-p", "--partial", action="store_true", help="only rescan addresses with unspent transactions")
+
+    def handle(self, *args, **options):
+        for wallet_hash in options["wallet_hashes"]:
+            if not Wallet.objects.filter(wallet_hash=wallet_hash, wallet_type="bch").exists():
+                self.stdout.write(self.style.ERROR(f"{wallet_hash}: bch wallet not found"))
+                continue
+
+            report = rescan_utxos(wallet_hash, full=not options["partial"])
+            timings = report["timings"]
+            self.stdout.write(self.style.SUCCESS(
+                f"{wallet_hash}: {report['addresses']} addresses | {report['utxos']} utxos | "
+                f"{report['created']} created | {report['updated']} updated | {report['spent']} spent | "
+                f"fetch {timings['fetch']}s | diff {timings['diff']}s | apply {timings['apply']}s | total {timings['total']}s"
+            ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from main.utils.tx_cache import get_tx_cache
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the raw transaction cache across all processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-r", "--reset", action="store_true", help="reset the counters after showing them")
+
+    def handle(self, *args, **options):
+        stats = get_tx_cache().stats
+        counts = stats.read()
+
+        local_hits = counts.get("local_hits", 0)
+        redis_hits = counts.get("redis_hits", 0)
+        misses = counts.get("misses", 0)
+        lookups = local_hits + redis_hits + misses
+        hit_rate = (local_hits + redis_hits) / lookups * 100 if lookups else 0
+
+        self.stdout.write(f"local hits: {local_hits}")
+        self.stdout.write(f"redis hits: {redis_hits}")
+        self.stdout.write(f"misses: {misses}")
+        self.stdout.write(self.style.SUCCESS(f"hit rate: {round(hit_rate, 2)}% of {lookups} lookups"))
+
+        if options["reset"]:
+            stats.reset()
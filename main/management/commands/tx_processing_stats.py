@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from main.utils.tx_processing import get_tx_processing_stats
+
+
+COUNTERS = [
+    ("post_save_skipped", "post save tasks skipped, tx was already processed"),
+    ("post_save_rows_deduped", "outputs marked processed by their tx's single post save pass"),
+    ("post_save_tasks_avoided", "post save tasks not queued for block outputs of the same tx"),
+    ("post_save_lease_busy", "post save tasks retried while another worker held the tx"),
+    ("mempool_skipped", "mempool txs skipped, tx was already processed"),
+    ("mempool_lease_busy", "mempool txs dropped while another worker held the tx"),
+    ("history_parse_skipped", "wallet history parses not queued again for a tx"),
+    ("block_skipped", "block txs skipped, tx was already saved from its block"),
+]
+
+
+class Command(BaseCommand):
+    help = "Show counters of redundant transaction processing avoided across all processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-r", "--reset", action="store_true", help="reset the counters after showing them")
+
+    def handle(self, *args, **options):
+        stats = get_tx_processing_stats()
+        counts = stats.read()
+
+        for name, description in COUNTERS:
+            self.stdout.write(f"{name}: {counts.get(name, 0)} ({description})")
+
+        if options["reset"]:
+            stats.reset()
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-18 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0099_cashnonfungibletoken_fixed_supply'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blockheight',
+            name='block_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
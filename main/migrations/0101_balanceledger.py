@@ -0,0 +1,142 @@
+# Generated by Django 3.0.14 on 2026-10-18 00:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+# Each statement on main_transaction adds the unspent outputs it created and subtracts
+# the unspent outputs it removed (spent, deleted or moved), grouped per ledger row.
+# Statement level triggers keep bulk inserts/updates to one upsert per ledger row, and
+# rows are upserted in key order so concurrent statements lock them in the same order.
+CREATE_TRIGGERS_SQL = """
+CREATE OR REPLACE FUNCTION main_balanceledger_sync() RETURNS trigger AS $$
+DECLARE
+    contribution text := '
+        SELECT
+            wallet_id,
+            address_id,
+            token_id,
+            COALESCE(cashtoken_ft_id, '''') AS category,
+            COALESCE(amount, 0) AS amount,
+            CASE WHEN value > 546 THEN value ELSE 0 END AS value,
+            CASE WHEN value > 546 THEN 1 ELSE 0 END AS utxo_count,
+            %s AS sign
+        FROM %s
+        WHERE NOT spent
+    ';
+    delta text;
+    scope text;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        delta := format(contribution, 1, 'new_rows');
+    ELSIF TG_OP = 'UPDATE' THEN
+        delta := format(contribution, 1, 'new_rows') || ' UNION ALL ' || format(contribution, -1, 'old_rows');
+    ELSE
+        delta := format(contribution, -1, 'old_rows');
+    END IF;
+
+    FOREACH scope IN ARRAY ARRAY['wallet_id', 'address_id'] LOOP
+        EXECUTE format('
+            INSERT INTO main_balanceledger (%1$I, token_id, category, amount, value, utxo_count, updated_at)
+            SELECT
+                %1$I,
+                token_id,
+                category,
+                SUM(sign * amount),
+                SUM(sign * value),
+                SUM(sign * utxo_count),
+                now()
+            FROM (%2$s) AS delta
+            WHERE %1$I IS NOT NULL
+            GROUP BY %1$I, token_id, category
+            HAVING SUM(sign * amount) <> 0 OR SUM(sign * value) <> 0 OR SUM(sign * utxo_count) <> 0
+            ORDER BY %1$I, token_id, category
+            ON CONFLICT (%1$I, token_id, category) WHERE %1$I IS NOT NULL DO UPDATE SET
+                amount = main_balanceledger.amount + EXCLUDED.amount,
+                value = main_balanceledger.value + EXCLUDED.value,
+                utxo_count = main_balanceledger.utxo_count + EXCLUDED.utxo_count,
+                updated_at = EXCLUDED.updated_at
+        ', scope, delta);
+    END LOOP;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER main_balanceledger_insert
+    AFTER INSERT ON main_transaction
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE main_balanceledger_sync();
+
+CREATE TRIGGER main_balanceledger_update
+    AFTER UPDATE ON main_transaction
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE main_balanceledger_sync();
+
+CREATE TRIGGER main_balanceledger_delete
+    AFTER DELETE ON main_transaction
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE main_balanceledger_sync();
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS main_balanceledger_insert ON main_transaction;
+DROP TRIGGER IF EXISTS main_balanceledger_update ON main_transaction;
+DROP TRIGGER IF EXISTS main_balanceledger_delete ON main_transaction;
+DROP FUNCTION IF EXISTS main_balanceledger_sync();
+"""
+
+# runs after the triggers are created, their lock on main_transaction
+# keeps writes out until the migration commits
+BACKFILL_SQL = """
+INSERT INTO main_balanceledger (%(scope)s, token_id, category, amount, value, utxo_count, updated_at)
+SELECT
+    %(scope)s,
+    token_id,
+    COALESCE(cashtoken_ft_id, ''),
+    SUM(COALESCE(amount, 0)),
+    SUM(CASE WHEN value > 546 THEN value ELSE 0 END),
+    SUM(CASE WHEN value > 546 THEN 1 ELSE 0 END),
+    now()
+FROM main_transaction
+WHERE NOT spent AND %(scope)s IS NOT NULL
+GROUP BY %(scope)s, token_id, COALESCE(cashtoken_ft_id, '');
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0100_blockheight_block_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceLedger',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(blank=True, default='', max_length=100)),
+                ('amount', models.DecimalField(decimal_places=0, default=0, max_digits=78)),
+                ('value', models.BigIntegerField(default=0)),
+                ('utxo_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('address', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='balance_ledger', to='main.Address')),
+                ('token', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_ledger', to='main.Token')),
+                ('wallet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='balance_ledger', to='main.Wallet')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='balanceledger',
+            constraint=models.UniqueConstraint(condition=models.Q(('wallet__isnull', False)), fields=('wallet', 'token', 'category'), name='balance_ledger_wallet_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='balanceledger',
+            constraint=models.UniqueConstraint(condition=models.Q(('address__isnull', False)), fields=('address', 'token', 'category'), name='balance_ledger_address_unique'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS_SQL, DROP_TRIGGERS_SQL),
+        migrations.RunSQL(
+            BACKFILL_SQL % { 'scope': 'wallet_id' } + BACKFILL_SQL % { 'scope': 'address_id' },
+            migrations.RunSQL.noop,
+        ),
+    ]
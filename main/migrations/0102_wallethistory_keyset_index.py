@@ -0,0 +1,39 @@
+# Generated by Django 3.0.14 on 2026-10-18 00:00
+
+from django.db import migrations, models
+
+
+# matches the wallet history api ordering so pages after a cursor are an index range scan
+# built concurrently so wallet history writes aren't blocked while it is built, which
+# can't be done in a transaction, and NULLS LAST can't be expressed with models.Index
+CREATE_INDEX_SQL = """
+CREATE INDEX CONCURRENTLY IF NOT EXISTS main_wallethistory_keyset_idx
+    ON main_wallethistory (wallet_id, tx_timestamp DESC NULLS LAST, id DESC);
+"""
+
+DROP_INDEX_SQL = """
+DROP INDEX CONCURRENTLY IF EXISTS main_wallethistory_keyset_idx;
+"""
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('main', '0101_balanceledger'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(CREATE_INDEX_SQL, DROP_INDEX_SQL),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='wallethistory',
+                    index=models.Index(fields=['wallet', '-tx_timestamp', '-id'], name='main_wallethistory_keyset_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.0.14 on 2026-10-18 00:00
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0102_wallethistory_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CashTokenMetadata',
+            fields=[
+                ('category', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('data', django.contrib.postgres.fields.jsonb.JSONField(blank=True, null=True)),
+                ('etag', models.CharField(blank=True, max_length=255, null=True)),
+                ('status_code', models.IntegerField(blank=True, null=True)),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'CashToken Metadata',
+            },
+        ),
+    ]
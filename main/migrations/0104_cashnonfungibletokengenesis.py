@@ -0,0 +1,34 @@
+# Generated by Django 3.0.14 on 2026-10-18 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0103_cashtokenmetadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CashNonFungibleTokenGenesis',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=100)),
+                ('capability', models.CharField(blank=True, default='', max_length=10)),
+                ('commitment', models.CharField(blank=True, default='', max_length=255)),
+                ('txid', models.CharField(max_length=70)),
+                ('index', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('genesis', 'Genesis'), ('minted', 'Minted'), ('unknown', 'Unknown')], default='pending', max_length=10)),
+                ('ancestor_txid', models.CharField(blank=True, max_length=70, null=True)),
+                ('ancestor_index', models.PositiveIntegerField(blank=True, null=True)),
+                ('genesis_txid', models.CharField(blank=True, max_length=70, null=True)),
+                ('genesis_input_index', models.PositiveIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'CashToken NFT Genesis',
+                'unique_together': {('txid', 'index', 'category', 'capability', 'commitment')},
+            },
+        ),
+    ]
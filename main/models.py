@@ -113,6 +113,7 @@ class BlockHeight(PostgresModel):
     problematic = JSONField(default=list, blank=True)
     unparsed = JSONField(default=list, blank=True)
     requires_full_scan = models.BooleanField(default=True)
+    block_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
 
     def save(self, *args, **kwargs):
         if not self.id:
@@ -297,32 +298,55 @@ class CashFungibleToken(models.Model):
         }
     
     def fetch_metadata(self):
-        PAYTACA_BCMR_URL = f'{settings.PAYTACA_BCMR_URL}/tokens/{self.category}/'
-        response = requests.get(PAYTACA_BCMR_URL)
-        if response.status_code == 200:
-            data = response.json()
-            if 'error' not in data.keys():
-                uris = data.get('token').get('uris')
-                if not uris:
-                    uris = data.get('uris') or {'icon': None}
-
-                try:
-                    decimals = int(data.get('token').get('decimals'))
-                except (TypeError, ValueError):
-                    decimals = 0
-
-                try:
-                    info, _ = CashTokenInfo.objects.get_or_create(
-                        name=data.get('name', f'CT-{self.category[0:4]}'),
-                        description=data.get('description', ''),
-                        symbol=data.get('token').get('symbol'),
-                        decimals=decimals,
-                        image_url=uris.get('icon')
-                    )
-                    self.info = info
-                    self.save()
-                except CashTokenInfo.MultipleObjectsReturned:
-                    pass
+        """
+            Applies the category's cached BCMR metadata, never waits on the BCMR indexer
+            Missing or stale metadata is refreshed in the background, see main/utils/cashtoken_metadata.py
+        """
+        from main.utils.cashtoken_metadata import get_cashtoken_metadata_service
+
+        entry = get_cashtoken_metadata_service().get(self.category)
+        if entry and entry['data'] and not self.info_id:
+            self.apply_metadata(entry['data'])
+
+    def apply_metadata(self, data):
+        uris = data.get('token').get('uris')
+        if not uris:
+            uris = data.get('uris') or {'icon': None}
+
+        try:
+            decimals = int(data.get('token').get('decimals'))
+        except (TypeError, ValueError):
+            decimals = 0
+
+        try:
+            info, _ = CashTokenInfo.objects.get_or_create(
+                name=data.get('name', f'CT-{self.category[0:4]}'),
+                description=data.get('description', ''),
+                symbol=data.get('token').get('symbol'),
+                decimals=decimals,
+                image_url=uris.get('icon')
+            )
+            if self.info_id != info.id:
+                self.info = info
+                self.save()
+        except CashTokenInfo.MultipleObjectsReturned:
+            pass
+
+
+class CashTokenMetadata(models.Model):
+    """
+        Last BCMR metadata fetched for a CashToken category, see main/utils/cashtoken_metadata.py
+        data is null if the category has no metadata in the BCMR indexer.
+    """
+    category = models.CharField(max_length=100, primary_key=True)
+    data = JSONField(null=True, blank=True)
+    etag = models.CharField(max_length=255, null=True, blank=True)
+    status_code = models.IntegerField(null=True, blank=True)
+    fetched_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'CashToken Metadata'
 
 
 class CashNonFungibleTokenQuerySet(PostgresQuerySet):
@@ -421,6 +445,48 @@ class CashNonFungibleToken(models.Model):
             'is_cashtoken': True
         }
 
+
+class CashNonFungibleTokenGenesis(models.Model):
+    """
+        Where a CashToken NFT held in an outpoint came from, see main/utils/nft_genesis.py
+        Every outpoint passed while tracing an NFT back is saved, so later traces of the
+        same NFT stop at the first saved ancestor. A pending outpoint only knows the
+        ancestor outpoint the NFT was spent from.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending'
+        # created with the category, i.e. from a fixed supply
+        GENESIS = 'genesis'
+        # created by spending a minting NFT
+        MINTED = 'minted'
+        # the NFT's trail is lost, e.g. an ancestor tx can't be found
+        UNKNOWN = 'unknown'
+
+    category = models.CharField(max_length=100)
+    capability = models.CharField(max_length=10, blank=True, default='')
+    commitment = models.CharField(max_length=255, blank=True, default='')
+    txid = models.CharField(max_length=70)
+    index = models.PositiveIntegerField()
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    ancestor_txid = models.CharField(max_length=70, null=True, blank=True)
+    ancestor_index = models.PositiveIntegerField(null=True, blank=True)
+    genesis_txid = models.CharField(max_length=70, null=True, blank=True)
+    genesis_input_index = models.PositiveIntegerField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'CashToken NFT Genesis'
+        unique_together = (
+            'txid',
+            'index',
+            'category',
+            'capability',
+            'commitment',
+        )
+
+
 class Transaction(PostgresModel):
     txid = models.CharField(max_length=70, db_index=True)
     address = models.ForeignKey(
@@ -503,6 +569,60 @@ class Transaction(PostgresModel):
         return decimals
 
 
+class BalanceLedger(models.Model):
+    """
+        Running totals of unspent outputs per wallet or address, token & cashtoken category
+        Kept in sync with Transaction by database triggers (see migration 0101),
+        so every insert, spend marking or delete updates it in the same DB transaction.
+        'value' & 'utxo_count' only count non-dust outputs (value > 546) like the balance views,
+        'amount' counts every unspent output.
+    """
+    DUST = 546
+
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name='balance_ledger',
+        null=True,
+        blank=True
+    )
+    address = models.ForeignKey(
+        Address,
+        on_delete=models.CASCADE,
+        related_name='balance_ledger',
+        null=True,
+        blank=True
+    )
+    token = models.ForeignKey(
+        Token,
+        on_delete=models.CASCADE,
+        related_name='balance_ledger'
+    )
+    # cashtoken fungible token category, blank for bch & slp
+    category = models.CharField(max_length=100, blank=True, default='')
+    amount = models.DecimalField(max_digits=78, decimal_places=0, default=0)
+    value = models.BigIntegerField(default=0)
+    utxo_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=['wallet', 'token', 'category'],
+                condition=Q(wallet__isnull=False),
+                name='balance_ledger_wallet_unique',
+            ),
+            UniqueConstraint(
+                fields=['address', 'token', 'category'],
+                condition=Q(address__isnull=False),
+                name='balance_ledger_address_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet_id or self.address_id} | {self.token_id} | {self.category}"
+
+
 class Recipient(PostgresModel):
     web_url = models.CharField(max_length=300, null=True, blank=True, db_index=True)
     telegram_id = models.CharField(max_length=50, null=True, blank=True, db_index=True)
@@ -703,6 +823,10 @@ class WalletHistory(PostgresModel):
                 name='ctft_ctnft_not_none'
             )
         ]
+        indexes = [
+            # created with tx_timestamp NULLS LAST by migration 0102, to match the history api's keyset ordering
+            models.Index(fields=['wallet', '-tx_timestamp', '-id'], name='main_wallethistory_keyset_idx'),
+        ]
 
     def __str__(self):
         return self.txid
@@ -1,35 +1,192 @@
+import atexit
 import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+
 import paho.mqtt.client as mqtt
-import paho.mqtt.publish as mqtt_publish
 from django.conf import settings
 
 
-# def connect_to_mqtt(client_id=None):
-#     if not client_id:
-#         client_id = f"watchtower-{settings.BCH_NETWORK}-transactions-publisher"
-#     if settings.BCH_NETWORK == 'mainnet':
-#         mqtt_client = mqtt.Client(client_id=client_id, transport='websockets')
-#         mqtt_client.tls_set()
-#     else:
-#         mqtt_client = mqtt.Client(client_id=client_id, clean_session=False)
-#     mqtt_client.connect(settings.MQTT_HOST, settings.MQTT_PORT, 10)
-#     return mqtt_client
+LOGGER = logging.getLogger(__name__)
 
 
-def publish_message(topic, message, qos=1, message_type='transactions'):
-    client_id = f"watchtower-{settings.BCH_NETWORK}-{message_type}-publisher"
-    kwargs = dict(
-        client_id=client_id,
-        qos=qos,
-        hostname=settings.MQTT_HOST,
-        port=settings.MQTT_PORT,
-        keepalive=10,
-        retain=True
-    )
-
-    if settings.BCH_NETWORK == 'mainnet':
-        kwargs["transport"] = "websockets"
-        kwargs["tls"] = {}
+class MQTTPublisher(object):
+    """
+        Long-lived MQTT publisher with a background network loop
+        Messages are put in a bounded queue and published by a sender thread once the
+        client is connected, so callers never wait on the broker. Connection drops are
+        retried with backoff by paho's loop, QoS 1 messages stay tracked as in-flight until
+        their PUBACK arrives and are resent by paho after a reconnect.
+    """
+
+    def __init__(
+        self,
+        client_id,
+        host=None,
+        port=None,
+        transport=None,
+        tls=None,
+        keepalive=30,
+        max_queue_size=10000,
+        max_inflight=100,
+        min_reconnect_delay=1,
+        max_reconnect_delay=60,
+    ):
+        self.host = host or settings.MQTT_HOST
+        self.port = port or settings.MQTT_PORT
+        self.keepalive = keepalive
+        self.max_inflight = max_inflight
+
+        is_mainnet = settings.BCH_NETWORK == 'mainnet'
+        if transport is None:
+            transport = 'websockets' if is_mainnet else 'tcp'
+        if tls is None:
+            tls = is_mainnet
+
+        self.client = mqtt.Client(client_id=client_id, transport=transport)
+        if tls:
+            self.client.tls_set()
+        self.client.max_inflight_messages_set(max_inflight)
+        self.client.reconnect_delay_set(min_delay=min_reconnect_delay, max_delay=max_reconnect_delay)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_publish = self._on_publish
+
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.connected = threading.Event()
+        self.inflight = {}
+        self._inflight_condition = threading.Condition()
+        self.published_count = 0
+        self.dropped_count = 0
+
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._sender = None
+
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return self
+            self._started = True
+
+        # connect_async lets the loop thread handle the (re)connect attempts with backoff
+        self.client.connect_async(self.host, self.port, self.keepalive)
+        self.client.loop_start()
+        self._sender = threading.Thread(target=self._send_loop, daemon=True)
+        self._sender.start()
+        return self
+
+    def stop(self, timeout=5):
+        self.flush(timeout=timeout)
+        self.client.disconnect()
+        self.client.loop_stop()
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc == mqtt.CONNACK_ACCEPTED:
+            LOGGER.info(f'MQTT publisher connected to {self.host}:{self.port}')
+            self.connected.set()
+        else:
+            LOGGER.error(f'MQTT publisher connection refused: {mqtt.connack_string(rc)}')
+
+    def _on_disconnect(self, client, userdata, rc):
+        self.connected.clear()
+        if rc != mqtt.MQTT_ERR_SUCCESS:
+            LOGGER.warning(f'MQTT publisher disconnected ({mqtt.error_string(rc)}), reconnecting')
+
+    def _on_publish(self, client, userdata, mid):
+        with self._inflight_condition:
+            self.inflight.pop(mid, None)
+            self.published_count += 1
+            self._inflight_condition.notify_all()
+
+    def publish(self, topic, payload, qos=1, retain=False):
+        """
+            Queues a message for publishing, returns False if the queue is full and the message was dropped
+        """
+        self.start()
+        try:
+            self.queue.put_nowait((topic, payload, qos, retain))
+            return True
+        except queue.Full:
+            self.dropped_count += 1
+            LOGGER.warning(f'MQTT publish queue is full, dropped message on topic: {topic}')
+            return False
+
+    def _send_loop(self):
+        while True:
+            topic, payload, qos, retain = self.queue.get()
+            try:
+                self.connected.wait()
 
+                with self._inflight_condition:
+                    # keeps paho's own unbounded outgoing queue from growing while the broker is slow
+                    self._inflight_condition.wait_for(lambda: len(self.inflight) < self.max_inflight)
+                    info = self.client.publish(topic, payload, qos=qos, retain=retain)
+                    if qos > 0 and not info.is_published():
+                        self.inflight[info.mid] = topic
+
+                if info.rc not in (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_NO_CONN):
+                    LOGGER.error(f'MQTT publish failed on topic {topic}: {mqtt.error_string(info.rc)}')
+            except Exception as exception:
+                LOGGER.exception(f'MQTT publish failed on topic {topic}: {exception}')
+            finally:
+                self.queue.task_done()
+
+    def flush(self, timeout=None):
+        """
+            Waits until queued messages are sent and QoS 1 messages are acknowledged
+            Returns False if that did not happen within timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+        with self._inflight_condition:
+            return self._inflight_condition.wait_for(lambda: not self.inflight, timeout=remaining)
+
+
+_publishers = {}
+_publishers_pid = None
+_publishers_lock = threading.Lock()
+
+
+def get_publisher(message_type='transactions'):
+    """
+        Returns this process' publisher for message_type, recreated after a fork
+        Client ids include the host & pid since brokers disconnect an existing client
+        when another one connects with the same id.
+    """
+    global _publishers, _publishers_pid
+    pid = os.getpid()
+    with _publishers_lock:
+        if _publishers_pid != pid:
+            _publishers = {}
+            _publishers_pid = pid
+
+        publisher = _publishers.get(message_type)
+        if publisher is None:
+            client_id = f"watchtower-{settings.BCH_NETWORK}-{message_type}-publisher-{socket.gethostname()}-{pid}"
+            publisher = MQTTPublisher(client_id)
+            _publishers[message_type] = publisher
+    return publisher
+
+
+@atexit.register
+def _flush_publishers():
+    if _publishers_pid != os.getpid():
+        return
+    for publisher in list(_publishers.values()):
+        publisher.flush(timeout=5)
+
+
+def publish_message(topic, message, qos=1, message_type='transactions'):
     message = json.dumps(message, default=str)
-    return mqtt_publish.single(topic, message, **kwargs)
+    return get_publisher(message_type).publish(topic, message, qos=qos, retain=True)
@@ -38,6 +38,7 @@ class WalletHistorySerializer(serializers.ModelSerializer):
 class PaginatedWalletHistorySerializer(serializers.Serializer):
     page = serializers.IntegerField()
     page_size = serializers.IntegerField()
-    num_pages = serializers.IntegerField()
+    num_pages = serializers.IntegerField(allow_null=True, help_text="null for cursor requests")
     has_next = serializers.BooleanField()    
+    next_cursor = serializers.CharField(allow_null=True)
     history = WalletHistorySerializer(many=True)
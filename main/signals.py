@@ -7,6 +7,9 @@ from django.utils import timezone
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from main.utils.redis_block_setter import *
+from main.utils.address_filter import publish_address_filter_delta
+from main.utils.cache import clear_wallet_caches, bump_wallet_history_version
+from anyhedge.models import HedgePosition
 from main.models import (
     BlockHeight,
     Transaction,
@@ -49,6 +52,20 @@ def blockheight_post_save(sender, instance=None, created=False, **kwargs):
             block_setter(instance.number)
         
 
+@receiver(post_save, sender=Address, dispatch_uid='main.signals.address_post_save')
+def address_post_save(sender, instance=None, created=False, **kwargs):
+    if created:
+        address = instance.address
+        transaction.on_commit(lambda: publish_address_filter_delta(address))
+
+
+@receiver(post_save, sender=HedgePosition, dispatch_uid='main.signals.hedge_position_post_save')
+def hedge_position_post_save(sender, instance=None, created=False, **kwargs):
+    if created:
+        address = instance.address
+        transaction.on_commit(lambda: publish_address_filter_delta(address))
+
+
 @receiver(post_save, sender=Transaction, dispatch_uid='main.tasks.transaction_post_save_task')
 def transaction_post_save(sender, instance=None, created=False, **kwargs):
     address = instance.address.address
@@ -57,25 +74,10 @@ def transaction_post_save(sender, instance=None, created=False, **kwargs):
         blockheight_id = instance.blockheight.id
 
     if instance.address.wallet:
-        wallet_hash = instance.address.wallet.wallet_hash
-
-        # delete cached bch balance
-        cache = settings.REDISKV
-        bch_cache_key = f'wallet:balance:bch:{wallet_hash}'
-        cache.delete(bch_cache_key)
-
-        # delete cached token balance
         category = None
         if instance.cashtoken_ft:
             category = instance.cashtoken_ft.category
-            ct_cache_key = f'wallet:balance:token:{wallet_hash}:{category}'
-            cache.delete(ct_cache_key)
-
-        # delete cached wallet history
-        asset_key = category or 'bch'
-        history_cache_keys = cache.keys(f'wallet:history:{wallet_hash}:{asset_key}:*')
-        if history_cache_keys:
-            cache.delete(*history_cache_keys)
+        clear_wallet_caches(instance.address.wallet.wallet_hash, category=category)
 
     # Trigger the transaction post-save task
     transaction.on_commit(
@@ -151,3 +153,7 @@ def wallet_history_post_save(sender, instance=None, created=False, **kwargs):
             wallet=instance.wallet,
             record_type=instance.record_type,
         ).exclude(id=instance.id).delete()
+
+    if instance.wallet_id:
+        wallet_hash = instance.wallet.wallet_hash
+        transaction.on_commit(lambda: bump_wallet_history_version(wallet_hash))
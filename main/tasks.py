@@ -13,6 +13,7 @@ from watchtower.celery import app as celery_app
 from main.models import *
 from main.utils.address_validator import *
 from paytacapos.models import Merchant
+from paytacapos.utils.sales_rollup import mark_wallet_histories_dirty
 from main.utils.ipfs import (
     get_ipfs_cid_from_url,
     ipfs_gateways,
@@ -43,6 +44,25 @@ from django.utils import timezone, dateparse
 from django.db import transaction as trans
 from celery import Celery
 from main.utils.chunk import chunks
+from main.utils.cache import clear_wallet_caches, clear_all_wallet_caches, bump_wallet_history_version
+from main.utils.utxo_rescan import WalletUtxoRescanner
+from main.utils.cashtoken_metadata import get_cashtoken_metadata_service
+from main.utils.nft_genesis import (
+    NftGenesisResolver,
+    NftOutpoint,
+    PENDING_KEY as NFT_GENESIS_PENDING_KEY,
+    queue_nft_genesis_resolution,
+)
+from main.utils.tx_processing import (
+    TxProcessingRecord,
+    get_done_txids,
+    get_tx_processing_stats,
+    mark_txids_done,
+    STAGE_MEMPOOL,
+    STAGE_POST_SAVE,
+    STAGE_BLOCK,
+)
+from main.utils.block_scanner import BlockScanner
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from main.utils.queries.node import Node
@@ -354,11 +374,20 @@ def get_cashtoken_meta_data(
         resolve_ct_nft_genesis(cashtoken, txid=txid)
     else:
         cashtoken, _ = CashFungibleToken.objects.get_or_create(category=category)
-        cashtoken.fetch_metadata()
+        if from_bcmr_webhook:
+            get_cashtoken_metadata_service().queue_refresh(category, force=True)
+        else:
+            cashtoken.fetch_metadata()
 
     return cashtoken
 
 
+@shared_task(queue='token_metadata')
+def refresh_cashtoken_metadata(category, force=False):
+    entry = get_cashtoken_metadata_service().refresh(category, force=force)
+    return bool(entry)
+
+
 @shared_task(queue='save_record')
 def save_record(
     token,
@@ -445,7 +474,7 @@ def save_record(
                     token_obj.token_ticker = 'CT-' + token_obj.tokenid[0:6]
                     token_obj.save()
                 
-                # get cashtoken metadata always in case there are changes on BCMR
+                # reads cached metadata only, changes on BCMR are picked up by background refreshes
                 cashtoken = get_cashtoken_meta_data(
                     token,
                     txid=transactionid,
@@ -619,7 +648,8 @@ def process_cashtoken_tx(
 def resolve_ct_nft_genesis(cashtoken:CashNonFungibleToken, txid=""):
     """
         Determines whether a CashToken NFT is from a fixed supply or not
-        Will attempt to save a minting NFT transaction if not fixed supply
+        NFTs that can't be resolved from saved records are traced in the background,
+        see 'resolve_nft_genesis_batch'
     """
     if not isinstance(cashtoken, CashNonFungibleToken):
         return
@@ -634,83 +664,114 @@ def resolve_ct_nft_genesis(cashtoken:CashNonFungibleToken, txid=""):
 
     if minting_nft:
         cashtoken.fixed_supply = False
+        cashtoken.save()
+    elif cashtoken.fixed_supply is None:
+        cashtoken_id = cashtoken.id
+        trans.on_commit(lambda: queue_nft_genesis_resolution(cashtoken_id))
 
-    elif cashtoken.fixed_supply is None or not minting_nft:
-        try:
-            cashtoken.fixed_supply = find_and_save_minting_transaction(
-                txid=txid,
-                category=cashtoken.category,
-                capability=cashtoken.capability,
-                commitment=cashtoken.commitment,
-            )
-        except Exception as exc:
-            LOGGER.error(f"Error in finding and saving minting transaction: {exc}")
-            LOGGER.exception(exc)
-
-    cashtoken.save()
     return cashtoken
 
+
 @shared_task(queue='query_transaction')
-def find_and_save_minting_transaction(txid="", category="", capability="", commitment="", max_depth=20):
+def resolve_nft_genesis_batch():
     """
-        Traces back to the minting transaction of a CashToken NFT and save the minting nft's transaction
-        Returns null if no genesis transaction found
-        Returns True if NFT is not created from a minting NFT, otherwise False
+        Traces the queued CashToken NFTs together, saving the minting NFT transactions found
     """
+    batch_size = settings.NFT_GENESIS['BATCH_SIZE']
+    cashtoken_ids = settings.REDISKV.spop(NFT_GENESIS_PENDING_KEY, batch_size)
+    if not cashtoken_ids:
+        return 0
+
+    cashtoken_ids = [int(cashtoken_id) for cashtoken_id in cashtoken_ids]
     try:
-        result = get_ct_nft_genesis_tx(
-            txid=txid,
-            category=category,
-            capability=capability,
-            commitment=commitment,
-            max_depth=max_depth,
+        resolved = resolve_nfts_fixed_supply(
+            CashNonFungibleToken.objects.filter(id__in=cashtoken_ids, fixed_supply__isnull=True)
         )
-    except StopIteration as exception:
-        LOGGER.error(exception)
-        return
+    except Exception as exception:
+        LOGGER.exception(exception)
+        # retried on the next run
+        settings.REDISKV.sadd(NFT_GENESIS_PENDING_KEY, *cashtoken_ids)
+        return 0
 
-    if not result: return
+    if settings.REDISKV.scard(NFT_GENESIS_PENDING_KEY):
+        resolve_nft_genesis_batch.delay()
+    return resolved
 
-    if not result["is_nft"]:
-        return True
 
-    save_minting_nft_transaction(result["transaction"], result["minting_input_index"])
-    return False
+def resolve_nfts_fixed_supply(cashtokens, max_depth=None):
+    """
+        Traces the genesis of the CashNonFungibleTokens & updates their fixed_supply
+        Returns the number of NFTs resolved
+    """
+    nfts = {}
+    for cashtoken in cashtokens:
+        if not cashtoken.category or not cashtoken.current_txid:
+            continue
+        nft = NftOutpoint(
+            cashtoken.category,
+            cashtoken.capability or "",
+            cashtoken.commitment or "",
+            cashtoken.current_txid,
+            cashtoken.current_index,
+        )
+        nfts.setdefault(nft, []).append(cashtoken)
 
+    if not nfts:
+        return 0
 
-def get_ct_nft_genesis_tx(txid="", category="", capability="", commitment="", max_depth=20):
-    if max_depth == 0:
-        raise StopIteration("Max depth reached")
+    resolver = NftGenesisResolver(node=NODE.BCH, max_depth=max_depth)
+    results = resolver.resolve(nfts.keys())
 
-    tx = NODE.BCH.get_transaction(txid)
-    token_data = {
-        "category": category,
-        "nft": { "capability": capability, "commitment": commitment },
+    for tx, minting_input_index in resolver.minting_txs:
+        try:
+            save_minting_nft_transaction(tx, minting_input_index)
+        except Exception as exception:
+            LOGGER.exception(exception)
+
+    fixed_supply = {
+        CashNonFungibleTokenGenesis.Status.GENESIS: True,
+        CashNonFungibleTokenGenesis.Status.MINTED: False,
     }
-    LOGGER.debug("CT NFT GENESIS SEARCH | txid:", txid, "depth:", max_depth, "token_data:", token_data)
-    for index, tx_input in enumerate(tx["inputs"]):
-        if category == tx_input["txid"]:
-            return dict(transaction=tx, minting_input_index=index, is_nft=False)
+    updates = []
+    for nft, result in results.items():
+        if result["status"] not in fixed_supply:
+            continue
+        for cashtoken in nfts.get(nft, []):
+            cashtoken.fixed_supply = fixed_supply[result["status"]]
+            updates.append(cashtoken)
 
-        if not tx_input.get("token_data"): continue
-        if "category" not in tx_input["token_data"]: continue
-        if "nft" not in tx_input["token_data"]: continue
+    CashNonFungibleToken.objects.bulk_update(updates, ["fixed_supply"], batch_size=500)
 
-        token_data = tx_input["token_data"]
-        if token_data["nft"]["capability"] == "minting":
-            return dict(transaction=tx, minting_input_index=index, is_nft=True)
+    # lineages longer than max depth continue from where the trace stopped
+    queue_nft_genesis_resolution(*[
+        cashtoken.id
+        for nft, nft_cashtokens in nfts.items() if nft not in results
+        for cashtoken in nft_cashtokens
+    ])
+    return len(updates)
 
-        if category == token_data["category"] and \
-            capability == token_data["nft"]["capability"] and \
-            commitment == token_data["nft"]["commitment"]:
 
-            return get_ct_nft_genesis_tx(
-                txid=tx_input["txid"],
-                category=category,
-                capability=capability,
-                commitment=commitment,
-                max_depth=max_depth-1,
-            )
+@shared_task(queue='query_transaction')
+def find_and_save_minting_transaction(txid="", category="", capability="", commitment="", max_depth=20, index=0):
+    """
+        Traces back to the minting transaction of a CashToken NFT and save the minting nft's transaction
+        Returns null if no genesis transaction found
+        Returns True if NFT is not created from a minting NFT, otherwise False
+    """
+    resolver = NftGenesisResolver(node=NODE.BCH, max_depth=max_depth)
+    nft = NftOutpoint(category, capability, commitment, txid, index)
+    result = resolver.resolve([nft]).get(nft)
+    if not result: return
+
+    if result["status"] == CashNonFungibleTokenGenesis.Status.GENESIS:
+        return True
+    if result["status"] != CashNonFungibleTokenGenesis.Status.MINTED:
+        return
+
+    for tx, minting_input_index in resolver.minting_txs:
+        save_minting_nft_transaction(tx, minting_input_index)
+    return False
+
 
 def save_minting_nft_transaction(transaction:dict, minting_input_index:int):
     minting_input = transaction["inputs"][minting_input_index]
@@ -800,85 +861,10 @@ def query_transaction(txid, block_id, for_slp=False):
                         client_acknowledgement(obj_id)
 
 
-@shared_task(bind=True, queue='manage_blocks')
-def ready_to_accept(self, block_number, txs_count):
-    BlockHeight.objects.filter(number=block_number).update(
-        processed=True,
-        transactions_count=txs_count,
-        updated_datetime=timezone.now()
-    )
-    REDIS_STORAGE.set('READY', 1)
-    REDIS_STORAGE.set('ACTIVE-BLOCK', '')
-    return 'OK'
-
-
 @shared_task(bind=True, queue='manage_blocks')
 def manage_blocks(self):
-    if b'READY' not in REDIS_STORAGE.keys(): REDIS_STORAGE.set('READY', 1)
-    if b'ACTIVE-BLOCK' not in REDIS_STORAGE.keys(): REDIS_STORAGE.set('ACTIVE-BLOCK', '')
-    if b'PENDING-BLOCKS' not in REDIS_STORAGE.keys(): REDIS_STORAGE.set('PENDING-BLOCKS', json.dumps([]))
-    
-    pending_blocks = REDIS_STORAGE.get('PENDING-BLOCKS').decode()
-    blocks = json.loads(pending_blocks)
-    blocks.sort()
-
-    if len(blocks) == 0:
-        unscanned_blocks = BlockHeight.objects.filter(
-            processed=False,
-            requires_full_scan=True
-        ).values_list('number', flat=True)
-        blocks = list(unscanned_blocks)
-        REDIS_STORAGE.set('PENDING-BLOCKS', json.dumps(blocks))
-
-
-    if int(REDIS_STORAGE.get('READY').decode()): LOGGER.info('READY TO PROCESS ANOTHER BLOCK')
-    if not blocks: return 'NO PENDING BLOCKS'
-    
-    discard_block = False
-    if int(REDIS_STORAGE.get('READY').decode()):
-        try:
-            active_block = blocks[0]
-            block = BlockHeight.objects.get(number=active_block)
-        except BlockHeight.DoesNotExist:
-            discard_block = True   
-
-        if active_block in blocks:
-            blocks.remove(active_block)
-            blocks = list(set(blocks))  # Uniquify the list
-            blocks.sort()  # Then sort, ascending
-            pending_blocks = json.dumps(blocks)
-            REDIS_STORAGE.set('PENDING-BLOCKS', pending_blocks)
-
-        if not discard_block:
-            REDIS_STORAGE.set('ACTIVE-BLOCK', active_block)
-            REDIS_STORAGE.set('READY', 0)
-            try:
-                # TODO: handle block tracking for SLP testnet when BCH_NETWORK=chipnet
-                # (testnet has different block count with chipnet)
-                if settings.BCH_NETWORK == 'mainnet':
-                    pass
-                    
-                    #TODO: Disable block scanning in SLP, for now
-                    # transactions = NODE.SLP.get_block(block.number, full_transactions=False)
-                    # for tr in transactions:
-                    #     txid = bytearray(tr.transaction_hash[::-1]).hex()
-                    #     subtasks.append(query_transaction.si(txid, block.id, for_slp=True))
-
-                transactions = NODE.BCH.get_block(block.number, verbosity=3)
-                block_time = NODE.BCH.get_block_stats(block.number, stats=["time"])["time"]
-                for tx in transactions:
-                    tx["time"] = block_time # tx is from .get_block() which doesn't return tx's timestamp
-                    parsed_tx = NODE.BCH._parse_transaction(tx)
-                    save_transaction(parsed_tx, block_id=block.id)
-
-                ready_to_accept(block.number, len(transactions))
-            finally:
-                REDIS_STORAGE.set('READY', 1)
-
-    active_block = REDIS_STORAGE.get('ACTIVE-BLOCK')
-    if active_block:
-        active_block = str(REDIS_STORAGE.get('ACTIVE-BLOCK').decode())
-        LOGGER.info(f'CURRENTLY PROCESSING BLOCK {str(active_block)}')
+    scanner = BlockScanner(save_block_transactions)
+    return scanner.run()
 
 
 def save_transaction(tx, block_id=None):
@@ -887,9 +873,8 @@ def save_transaction(tx, block_id=None):
     """
     tx_check = Transaction.objects.filter(txid=tx['txid'])
     if tx_check.exists():
-        tx_obj = tx_check.last()
-        tx_obj.block_id = block_id
-        tx_obj.save()
+        if block_id is not None:
+            tx_check.filter(blockheight__isnull=True).update(blockheight_id=block_id)
         return
     
     txid = tx['txid']
@@ -927,6 +912,150 @@ def save_transaction(tx, block_id=None):
                 client_acknowledgement(obj_id)
 
 
+def save_block_transactions(txs, block_id=None):
+    """
+        Set-based version of 'save_transaction()' for all txs of a block
+        Tracked addresses and spent outpoints are resolved with one query per chunk
+        instead of per output, and bch outputs are bulk inserted.
+        CashToken outputs still go through 'process_cashtoken_tx()' for metadata resolution.
+        txs must be parsed by 'BCHN._parse_transaction()'
+        Returns the ids of the created bch transaction records
+    """
+    CHUNK_SIZE = 1000
+    txs = [tx for tx in txs if not (len(tx['inputs']) and 'coinbase' in tx['inputs'][0].keys())]
+
+    # txs already saved by an earlier run over the same block, e.g. a retried scan, are skipped
+    done_txids = get_done_txids([tx['txid'] for tx in txs], STAGE_BLOCK, scope=block_id)
+    if done_txids:
+        get_tx_processing_stats().incr('block_skipped', len(done_txids))
+        txs = [tx for tx in txs if tx['txid'] not in done_txids]
+
+    # txs saved earlier (e.g. from mempool) only need their block height updated
+    existing_txids = set()
+    for txids_chunk in chunks([tx['txid'] for tx in txs], CHUNK_SIZE):
+        existing_txids.update(
+            Transaction.objects.filter(txid__in=txids_chunk).values_list('txid', flat=True).distinct()
+        )
+    if block_id is not None:
+        for txids_chunk in chunks(list(existing_txids), CHUNK_SIZE):
+            Transaction.objects.filter(
+                txid__in=txids_chunk,
+                blockheight__isnull=True,
+            ).update(blockheight_id=block_id)
+
+    spent_outpoints = {}
+    for tx in txs:
+        for tx_input in tx['inputs']:
+            spent_outpoints[(tx_input['txid'], tx_input['spent_index'])] = tx['txid']
+
+    new_txs = [tx for tx in txs if tx['txid'] not in existing_txids]
+    output_addresses = list(set(
+        output['address'] for tx in new_txs for output in tx['outputs'] if output.get('address')
+    ))
+    tracked_addresses = {}
+    for addresses_chunk in chunks(output_addresses, CHUNK_SIZE):
+        subscribed = Subscription.objects.filter(address__address__in=addresses_chunk).values('address_id')
+        address_objs = Address.objects.filter(id__in=subscribed).select_related('wallet')
+        tracked_addresses.update({ address_obj.address: address_obj for address_obj in address_objs })
+
+    bch_token, _ = Token.objects.get_or_create(
+        name='bch',
+        defaults=dict(token_ticker='bch', decimals=8, token_type=1),
+    )
+
+    cashtoken_outputs = []
+    transaction_objs = []
+    for tx in new_txs:
+        tx_timestamp = None
+        if tx.get('timestamp'):
+            tx_timestamp = datetime.fromtimestamp(tx['timestamp']).replace(tzinfo=pytz.UTC)
+
+        for output in tx['outputs']:
+            address_obj = tracked_addresses.get(output.get('address'))
+            if not address_obj: continue
+
+            if output.get('token_data'):
+                cashtoken_outputs.append((tx, output))
+                continue
+
+            transaction_objs.append(Transaction(
+                txid=tx['txid'],
+                address=address_obj,
+                token=bch_token,
+                index=output['index'],
+                value=int(output['value']),
+                source=NODE.BCH.source,
+                blockheight_id=block_id,
+                tx_timestamp=tx_timestamp,
+                wallet=address_obj.wallet,
+            ))
+
+    cleared_wallet_caches = set()
+    with trans.atomic():
+        spent_transactions = []
+        for txids_chunk in chunks(list(set(txid for txid, _ in spent_outpoints)), CHUNK_SIZE):
+            candidates = Transaction.objects \
+                .filter(txid__in=txids_chunk, spent=False) \
+                .select_related('wallet', 'cashtoken_ft')
+            for transaction_obj in candidates:
+                spending_txid = spent_outpoints.get((transaction_obj.txid, transaction_obj.index))
+                if not spending_txid: continue
+                transaction_obj.spent = True
+                transaction_obj.spending_txid = spending_txid
+                spent_transactions.append(transaction_obj)
+
+        Transaction.objects.bulk_update(spent_transactions, ['spent', 'spending_txid'], batch_size=500)
+        Transaction.objects.bulk_create(transaction_objs, batch_size=500, ignore_conflicts=True)
+
+    for transaction_obj in spent_transactions:
+        if not transaction_obj.wallet: continue
+        category = transaction_obj.cashtoken_ft.category if transaction_obj.cashtoken_ft else None
+        cache_key = (transaction_obj.wallet.wallet_hash, category)
+        if cache_key in cleared_wallet_caches: continue
+        clear_wallet_caches(*cache_key)
+        cleared_wallet_caches.add(cache_key)
+
+    for tx, output in cashtoken_outputs:
+        process_cashtoken_tx(
+            output['token_data'],
+            output['address'],
+            tx['txid'],
+            block_id=block_id,
+            index=output['index'],
+            timestamp=tx['timestamp'],
+            value=output['value']
+        )
+
+    # bulk_create skips post save signals, so fan out their side effects here
+    # the post save task handles all outputs of a tx in a wallet, so it is queued once per tx & wallet
+    created_ids = []
+    post_save_queued = set()
+    created_txids = list(set(transaction_obj.txid for transaction_obj in transaction_objs))
+    for txids_chunk in chunks(created_txids, CHUNK_SIZE):
+        created_transactions = Transaction.objects \
+            .filter(txid__in=txids_chunk, token=bch_token, post_save_processed__isnull=True) \
+            .values('id', 'txid', 'address__address', 'wallet__wallet_hash')
+
+        for data in created_transactions:
+            created_ids.append(data['id'])
+            rampp2p_utils.process_transaction(data['txid'], data['address__address'])
+
+            cache_key = (data['wallet__wallet_hash'], None)
+            if data['wallet__wallet_hash'] and cache_key not in cleared_wallet_caches:
+                clear_wallet_caches(*cache_key)
+                cleared_wallet_caches.add(cache_key)
+
+            post_save_key = (data['txid'], data['wallet__wallet_hash'] or data['address__address'])
+            if post_save_key not in post_save_queued:
+                transaction_post_save_task.delay(data['address__address'], data['id'], block_id)
+                post_save_queued.add(post_save_key)
+            client_acknowledgement.delay(data['id'])
+
+    get_tx_processing_stats().incr('post_save_tasks_avoided', len(created_ids) - len(post_save_queued))
+    mark_txids_done([tx['txid'] for tx in txs], STAGE_BLOCK, scope=block_id)
+    return created_ids
+
+
 @shared_task(bind=True, queue='get_latest_block')
 def get_latest_block(self):
     # This task is intended to check new blockheight every 5 seconds
@@ -1475,6 +1604,20 @@ def process_history_recpts_or_senders(_list, key, BCH_OR_SLP):
     return processed_list
 
 
+def outpoints_query(outpoints):
+    """
+        Returns a filter matching the Transaction records of (txid, index) outpoints
+    """
+    query = models.Q(pk__in=[])
+    for txid, index in outpoints:
+        query |= models.Q(txid=txid, index=index)
+    return query
+
+
+def get_history_wallet_hashes(queryset):
+    return list(queryset.values_list('wallet__wallet_hash', flat=True).distinct())
+
+
 @shared_task(bind=True, queue='wallet_history_1')
 def parse_wallet_history(self, txid, wallet_handle, tx_fee=None, senders=[], recipients=[], proceed_with_zero_amount=False):
     wallet_hash = wallet_handle.split('|')[1]
@@ -1489,7 +1632,11 @@ def parse_wallet_history(self, txid, wallet_handle, tx_fee=None, senders=[], rec
     if len(sender_addresses) == senders_check.count():
         if len(recipient_addresses) == recipients_check.count():
             # Remove wallet history record of this, if any
-            WalletHistory.objects.filter(txid=txid).delete()
+            history_check = WalletHistory.objects.filter(txid=txid)
+            wallet_hashes = get_history_wallet_hashes(history_check)
+            mark_wallet_histories_dirty(history_check)
+            history_check.delete()
+            bump_wallet_history_version(*wallet_hashes)
             return
 
     parser = HistoryParser(txid, wallet_hash)
@@ -1621,6 +1768,7 @@ def parse_wallet_history(self, txid, wallet_handle, tx_fee=None, senders=[], rec
             cashtoken_nft=cashtoken_nft
         )
         if history_check.exists():
+            mark_wallet_histories_dirty(history_check)
             history_check.update(
                 record_type=record_type,
                 amount=amount,
@@ -1641,6 +1789,8 @@ def parse_wallet_history(self, txid, wallet_handle, tx_fee=None, senders=[], rec
                 resolve_wallet_history_usd_values.delay(txid=txid)
                 for history in history_check:
                     parse_wallet_history_market_values.delay(history.id)
+            mark_wallet_histories_dirty(history_check)
+            bump_wallet_history_version(wallet.wallet_hash)
         else:
             history = WalletHistory(
                 wallet=wallet,
@@ -1747,7 +1897,7 @@ def transaction_post_save_task(self, address, transaction_id, blockheight_id=Non
     # if not txid: return
     txid = None
     try:
-        txn_obj = Transaction.objects.get(id=transaction_id)
+        txn_obj = Transaction.objects.select_related('wallet').get(id=transaction_id)
         txid = txn_obj.txid
         if txn_obj.post_save_processed:
             return transaction_id
@@ -1755,7 +1905,47 @@ def transaction_post_save_task(self, address, transaction_id, blockheight_id=Non
         return transaction_id
     
     if not txid: return transaction_id
+
+    # processing depends on the output's wallet, so the tx is processed once per wallet
+    # of its outputs and the tasks of the wallet's other outputs end here
+    if txn_obj.wallet:
+        scope = f'{txn_obj.wallet.wallet_type}|{txn_obj.wallet.wallet_hash}'
+        scope_outputs = Transaction.objects.filter(txid=txid, wallet_id=txn_obj.wallet_id)
+    else:
+        scope = address
+        scope_outputs = Transaction.objects.filter(txid=txid, wallet__isnull=True, address__address=address)
+
+    stats = get_tx_processing_stats()
+    record = TxProcessingRecord(txid)
+    if record.is_done(STAGE_POST_SAVE, scope=scope):
+        Transaction.objects.filter(id=transaction_id).update(post_save_processed=timezone.now())
+        stats.incr('post_save_skipped')
+        return transaction_id
+
+    if not record.acquire():
+        # retried after the worker holding the tx is done, then skipped above
+        stats.incr('post_save_lease_busy')
+        if self.request.retries < self.max_retries:
+            self.retry(countdown=5)
+
+        # the lease may outlive the retries if its worker died, queued again once it expires
+        LOGGER.warning(f"TX POST SAVE TASK: {txid} | lease still busy after {self.request.retries} retries, requeued")
+        stats.incr('post_save_requeued')
+        transaction_post_save_task.apply_async(
+            (address, transaction_id, blockheight_id),
+            countdown=settings.TX_PROCESSING['LEASE_TTL'],
+        )
+        return transaction_id
+
+    try:
+        return _transaction_post_save(self, record, scope, scope_outputs, address, txid, blockheight_id)
+    finally:
+        record.release()
+
+
+def _transaction_post_save(task, record, scope, scope_outputs, address, txid, blockheight_id=None):
     LOGGER.info(f"TX POST SAVE TASK: {address} | {txid} | {blockheight_id}")
+    stats = get_tx_processing_stats()
 
     if not BlockHeight.objects.filter(id=blockheight_id).exists():
         blockheight_id = None
@@ -1776,12 +1966,12 @@ def transaction_post_save_task(self, address, transaction_id, blockheight_id=Non
         slp_tx = NODE.SLP.get_transaction(txid, parse_slp=True)
 
     if parse_slp and not isinstance(slp_tx, dict) and not slp_tx.get('valid'):
-        self.retry(countdown=5)
-        return transaction_id
+        task.retry(countdown=5)
+        return
 
     if not bch_tx:
-        self.retry(countdown=5)
-        return transaction_id
+        task.retry(countdown=5)
+        return
 
     tx_timestamp = bch_tx['timestamp']
     # use batch update to not trigger the post save signal and potentially create an infinite loop
@@ -1820,34 +2010,37 @@ def transaction_post_save_task(self, address, transaction_id, blockheight_id=Non
         )) \
         .values_list('wallet_handle', flat=True)
 
-    if parse_slp:
-        # Mark SLP tx inputs as spent
-        for tx_input in slp_tx['inputs']:
-            txn_check = Transaction.objects.filter(
-                txid=tx_input['txid'],
-                index=tx_input['spent_index'],
-            )
+    # outputs of the tx that are already saved, fetched once instead of per output
+    saved_outputs = set(
+        Transaction.objects.filter(txid=txid).values_list('address__address', 'index')
+    )
 
-            if not txn_check.exists(): continue
-            txn_check.update(spent=True, spending_txid=txid)
+    created_ids = []
+    with trans.atomic():
+        if parse_slp:
+            # Mark SLP tx inputs as spent
+            spent_slp_transactions = Transaction.objects \
+                .filter(outpoints_query([(i['txid'], i['spent_index']) for i in slp_tx['inputs']])) \
+                .select_related('token')
+            spent_slp_transactions = list(spent_slp_transactions)
+            if spent_slp_transactions:
+                Transaction.objects \
+                    .filter(id__in=[txn_obj.id for txn_obj in spent_slp_transactions]) \
+                    .update(spent=True, spending_txid=txid)
+
+            for txn_obj in spent_slp_transactions:
+                if txn_obj.token.is_nft:
+                    wallet_nft_tokens = WalletNftToken.objects.filter(acquisition_transaction=txn_obj)
+                    if wallet_nft_tokens.exists():
+                        wallet_nft_tokens.update(
+                            date_dispensed = timezone.now(),
+                            dispensation_transaction = txn_obj
+                        )
 
-            txn_obj = txn_check.last()
-            if txn_obj.token.is_nft:
-                wallet_nft_tokens = WalletNftToken.objects.filter(acquisition_transaction=txn_obj)
-                if wallet_nft_tokens.exists():
-                    wallet_nft_tokens.update(
-                        date_dispensed = timezone.now(),
-                        dispensation_transaction = txn_obj
-                    )
+            # Parse SLP tx outputs
+            for tx_output in slp_tx['outputs']:
+                if (tx_output['address'], tx_output['index']) in saved_outputs: continue
 
-        # Parse SLP tx outputs
-        for tx_output in slp_tx['outputs']:
-            txn_check = Transaction.objects.filter(
-                txid=slp_tx['txid'],
-                address__address=tx_output['address'],
-                index=tx_output['index']
-            )
-            if not txn_check.exists():
                 obj_id, created = save_record(
                     slp_tx['token_id'],
                     tx_output['address'],
@@ -1860,27 +2053,17 @@ def transaction_post_save_task(self, address, transaction_id, blockheight_id=Non
                 )
 
                 if created:
-                    client_acknowledgement(obj_id)
+                    created_ids.append(obj_id)
 
-    # Mark BCH tx inputs as spent
-    for tx_input in bch_tx['inputs']:
-        txn_check = Transaction.objects.filter(
-            txid=tx_input['txid'],
-            index=tx_input['spent_index'],
-        )
+        # Mark BCH tx inputs as spent
+        bch_outpoints = [(i['txid'], i['spent_index']) for i in bch_tx['inputs']]
+        if bch_outpoints:
+            Transaction.objects.filter(outpoints_query(bch_outpoints)).update(spent=True, spending_txid=txid)
 
-        if not txn_check.exists(): continue
-        txn_check.update(spent=True, spending_txid=txid)
+        # Parse BCH tx outputs
+        for tx_output in bch_tx['outputs']:
+            if (tx_output['address'], tx_output['index']) in saved_outputs: continue
 
-    # Parse BCH tx outputs
-    for tx_output in bch_tx['outputs']:
-        txn_check = Transaction.objects.filter(
-            txid=bch_tx['txid'],
-            address__address=tx_output['address'],
-            index=tx_output['index']
-        )
-
-        if not txn_check.exists():
             if tx_output['token_data']:
                 process_cashtoken_tx(
                     tx_output['token_data'],
@@ -1904,10 +2087,22 @@ def transaction_post_save_task(self, address, transaction_id, blockheight_id=Non
                     tx_timestamp=bch_tx['timestamp']
                 )
                 if created:
-                    client_acknowledgement(obj_id)
+                    created_ids.append(obj_id)
+
+    for obj_id in created_ids:
+        client_acknowledgement(obj_id)
 
-    # Call task to parse wallet history
-    for wallet_handle in set(wallets):
+    # Call task to parse wallet history, once per wallet across all processing paths of the tx
+    # only wallets whose senders & recipients were parsed here are claimed, the others
+    # are left to the post save processing of an output in a wallet of their type
+    wallets = set(wallets)
+    parsed_wallets = set(
+        wallet_handle for wallet_handle in wallets
+        if senders.get(wallet_handle.split('|')[0]) and recipients.get(wallet_handle.split('|')[0])
+    )
+    claimed_wallets = record.claim_wallets(parsed_wallets)
+    stats.incr('history_parse_skipped', len(parsed_wallets) - len(claimed_wallets))
+    for wallet_handle in claimed_wallets:
         if wallet_handle.split('|')[0] == 'slp':
             if senders['slp'] and recipients['slp']:
                 parse_wallet_history.delay(
@@ -1927,10 +2122,14 @@ def transaction_post_save_task(self, address, transaction_id, blockheight_id=Non
                     recipients['bch']
                 )
     
-    # Mark txn as processed
-    Transaction.objects.filter(id=transaction_id).update(post_save_processed=timezone.now())
+    # Mark the outputs of the txn in the same wallet as processed
+    processed_count = scope_outputs \
+        .filter(post_save_processed__isnull=True) \
+        .update(post_save_processed=timezone.now())
+    stats.incr('post_save_rows_deduped', max(processed_count - 1, 0))
+    record.mark_done(STAGE_POST_SAVE, scope=scope)
 
-    return list(set(wallets))
+    return list(wallets)
 
 
 @shared_task(queue='rescan_utxos')
@@ -1939,28 +2138,17 @@ def rescan_utxos(wallet_hash, full=False):
     if full:
         addresses = wallet.addresses.all()
     else:
-        addresses = wallet.addresses.filter(transactions__spent=False)
-
-    # delete cached bch balance
-    cache = settings.REDISKV
-    bch_cache_key = f'wallet:balance:bch:{wallet_hash}'
-    cache.delete(bch_cache_key)
+        addresses = wallet.addresses.filter(transactions__spent=False).distinct()
 
-    # delete cached token balance
-    ct_cache_keys = cache.keys(f'wallet:balance:token:{wallet_hash}:*')
-    if ct_cache_keys:
-        cache.delete(*ct_cache_keys)
-
-    # delete cached wallet history
-    history_cache_keys = cache.keys(f'wallet:history:{wallet_hash}:*')
-    if history_cache_keys:
-        cache.delete(*history_cache_keys)
+    # invalidate cached balances & history
+    clear_all_wallet_caches(wallet_hash)
 
     try:
-        for address in addresses:
-            if wallet.wallet_type == 'bch':
-                get_bch_utxos(address.address)
-            elif wallet.wallet_type == 'slp':
+        report = None
+        if wallet.wallet_type == 'bch':
+            report = rescan_wallet_bch_utxos(wallet, addresses)
+        elif wallet.wallet_type == 'slp':
+            for address in addresses:
                 get_slp_utxos(address.address)
         wallet.last_utxo_scan_succeeded = True
         wallet.save()
@@ -1969,6 +2157,56 @@ def rescan_utxos(wallet_hash, full=False):
         wallet.save()
         raise exc
 
+    clear_all_wallet_caches(wallet_hash)
+    return report
+
+
+def rescan_wallet_bch_utxos(wallet, addresses=None):
+    """
+        Wallet level version of 'get_bch_utxos()' for all of a wallet's addresses
+        Returns the rescan report with per step timings
+    """
+    report = WalletUtxoRescanner(wallet).run(addresses)
+
+    for output in report.pop('token_outputs'):
+        token_data = output['token_data']
+        nft = token_data.get('nft')
+        save_record(
+            token_data['category'],
+            output['address'],
+            output['tx_hash'],
+            NODE.BCH.source,
+            value=output['value'],
+            amount=int(token_data['amount']) if 'amount' in token_data else None,
+            blockheightid=output['block_id'],
+            index=output['tx_pos'],
+            new_subscription=True,
+            is_cashtoken=True,
+            is_cashtoken_nft=bool(nft),
+            commitment=nft['commitment'] if nft else '',
+            capability=nft['capability'] if nft else '',
+        )
+
+    # bulk_create skips post save signals, so queue their tasks once per created tx
+    created_transactions = Transaction.objects \
+        .filter(txid__in=report.pop('created_txids'), wallet=wallet, post_save_processed__isnull=True) \
+        .order_by('txid') \
+        .distinct('txid') \
+        .values('id', 'address__address', 'blockheight_id')
+    for data in created_transactions:
+        transaction_post_save_task.delay(data['address__address'], data['id'], data['blockheight_id'])
+
+    # only txs without a history record of the wallet need their history parsed
+    txids = report.pop('txids')
+    parsed_txids = set(
+        WalletHistory.objects.filter(wallet=wallet, txid__in=txids).values_list('txid', flat=True)
+    )
+    for txid in txids:
+        if txid not in parsed_txids:
+            parse_tx_wallet_histories.delay(txid, immediate=True)
+
+    return report
+
 
 def rebuild_address_wallet_history(address, tx_count_limit=30, ignore_txids=[]):
     data = get_bch_transactions(address, chipnet=settings.BCH_NETWORK == 'chipnet')
@@ -2005,7 +2243,10 @@ def parse_tx_wallet_histories(txid, txn_details=None, proceed_with_zero_amount=F
     history_check = WalletHistory.objects.filter(txid=txid)
     if history_check.exists():
         if force:
+            wallet_hashes = get_history_wallet_hashes(history_check)
+            mark_wallet_histories_dirty(history_check)
             history_check.delete()
+            bump_wallet_history_version(*wallet_hashes)
         else:
             return
 
@@ -2093,11 +2334,14 @@ def parse_tx_wallet_histories(txid, txn_details=None, proceed_with_zero_amount=F
             ) \
             .first()
 
-    # parse wallet history of bch wallets
-    wallet_handles = []
-    for wallet in wallets:
-        wallet_handle = f"bch|{wallet.wallet_hash}"
-        wallet_handles.append(wallet_handle)
+    # parse wallet history of bch wallets, skipping wallets already queued by another path
+    wallet_handles = sorted(set(f"bch|{wallet_hash}" for wallet_hash in wallet_hashes))
+    claimed_wallet_handles = wallet_handles
+    if not force:
+        claimed_wallet_handles = TxProcessingRecord(txid).claim_wallets(wallet_handles)
+        get_tx_processing_stats().incr('history_parse_skipped', len(wallet_handles) - len(claimed_wallet_handles))
+
+    for wallet_handle in claimed_wallet_handles:
         if immediate:
             parse_wallet_history(
                 txid,
@@ -2151,7 +2395,11 @@ def find_wallet_history_missing_tx_timestamps():
             tx_timestamp = datetime.fromtimestamp(_tx_timestamp).replace(tzinfo=pytz.UTC)
         except TypeError:
             tx_timestamp = _tx_timestamp.replace(tzinfo=pytz.UTC)
-        WalletHistory.objects.filter(txid=txid).update(tx_timestamp=tx_timestamp)
+        history_check = WalletHistory.objects.filter(txid=txid)
+        mark_wallet_histories_dirty(history_check)
+        history_check.update(tx_timestamp=tx_timestamp)
+        mark_wallet_histories_dirty(history_check)
+        bump_wallet_history_version(*get_history_wallet_hashes(history_check))
         Transaction.objects.filter(txid=txid).update(tx_timestamp=tx_timestamp)
         txids_updated.append([txid, _tx_timestamp])
     return txids_updated
@@ -2185,6 +2433,7 @@ def resolve_wallet_history_usd_values(txid=None):
             tx_timestamp=timestamp,
         )
         wallet_histories.update(usd_price=price_value)
+        bump_wallet_history_version(*get_history_wallet_hashes(wallet_histories))
         txids = list(wallet_histories.values_list("txid", flat=True).distinct())
         txids_updated = txids_updated + txids
 
@@ -2375,7 +2624,35 @@ def _process_mempool_transaction(tx_hash, tx_hex=None, immediate=False, force=Fa
     tx_check = Transaction.objects.filter(txid=tx_hash)
     if tx_check.exists() and not force:
         return
-    
+
+    # the same tx is usually announced to more than one worker
+    stats = get_tx_processing_stats()
+    record = TxProcessingRecord(tx_hash)
+    if not force and record.is_done(STAGE_MEMPOOL):
+        stats.incr('mempool_skipped')
+        return
+
+    if not record.acquire():
+        # another worker is processing the tx, queued again in case it doesn't finish it;
+        # skipped then if it did, unless forced
+        stats.incr('mempool_lease_busy')
+        process_mempool_transaction_fast.apply_async(
+            (tx_hash, tx_hex, immediate),
+            { 'force': force },
+            countdown=5,
+        )
+        return
+
+    if force:
+        record.reset()
+
+    try:
+        _process_mempool_transaction_once(record, tx_hash, tx_hex=tx_hex, immediate=immediate, force=force)
+    finally:
+        record.release()
+
+
+def _process_mempool_transaction_once(record, tx_hash, tx_hex=None, immediate=False, force=False):
     LOGGER.info('Processing mempool tx: ' + tx_hash)
     proceed = False
     tx = None
@@ -2383,7 +2660,6 @@ def _process_mempool_transaction(tx_hash, tx_hex=None, immediate=False, force=Fa
         tx = NODE.BCH.build_tx_from_hex(tx_hex)
 
         output_addresses = []
-        tx
         for output in tx['vout']:
             if 'scriptPubKey' in output.keys():
                 if 'addresses' in output['scriptPubKey']:
@@ -2424,138 +2700,159 @@ def _process_mempool_transaction(tx_hash, tx_hex=None, immediate=False, force=Fa
         save_histories = False
         inputs_data = []
 
+        # the spent outputs' records hold their addresses, so ancestor txs aren't fetched
+        spent_transactions = list(
+            Transaction.objects
+                .filter(outpoints_query([(_input['txid'], _input['vout']) for _input in inputs]))
+                .select_related('address')
+        )
+        spent_addresses = set(txn_obj.address.address for txn_obj in spent_transactions)
+        subscribed_addresses = set(
+            Subscription.objects
+                .filter(address__address__in=spent_addresses)
+                .values_list('address__address', flat=True)
+        )
+        spent_transactions_map = { (txn_obj.txid, txn_obj.index): txn_obj for txn_obj in spent_transactions }
+
         for _input in inputs:
             txid = _input['txid']
             value = round(_input['value'] * (10 ** 8))
             index = _input['vout']
 
-            tx_check = Transaction.objects.filter(txid=txid, index=index)
-            if tx_check.exists():
-                ancestor_tx = NODE.BCH._get_raw_transaction(txid)
-                ancestor_spubkey = ancestor_tx['vout'][index]['scriptPubKey']
+            txn_obj = spent_transactions_map.get((txid, index))
+            if not txn_obj: continue
+
+            # save wallet history only if tx is associated with a wallet
+            if txn_obj.wallet_id:
+                save_histories = True
+
+            address = txn_obj.address.address
+            if address in subscribed_addresses:
+                inputs_data.append({
+                    "token": "bch",
+                    "address": address,
+                    "value": value,
+                    "outpoint_txid": txid,
+                    "outpoint_index": index,
+                })
+
+        output_addresses = [
+            output['scriptPubKey']['addresses'][0] for output in outputs
+            if 'addresses' in output['scriptPubKey'].keys()
+        ]
+        tracked_addresses = {
+            address_obj.address: address_obj
+            for address_obj in Address.objects.filter(address__in=output_addresses).select_related('wallet')
+        }
 
-                if 'addresses' in ancestor_spubkey.keys():
-                    address = ancestor_spubkey['addresses'][0]
-                    spent_transactions = Transaction.objects.filter(txid=txid, index=index)
-                    spent_transactions.update(spent=True, spending_txid=tx_hash)
+        saved_outputs = []
+        with trans.atomic():
+            if spent_transactions:
+                Transaction.objects \
+                    .filter(id__in=[txn_obj.id for txn_obj in spent_transactions]) \
+                    .update(spent=True, spending_txid=tx_hash)
 
-                    # save wallet history only if tx is associated with a wallet
-                    if tx_check.first().wallet:
-                        save_histories = True
+            for output in outputs:
+                scriptPubKey = output['scriptPubKey']
 
-                    subscription = Subscription.objects.filter(
-                        address__address=address
-                    )
-                    if subscription.exists():
-                        inputs_data.append({
-                            "token": "bch",
-                            "address": address,
-                            "value": value,
-                            "outpoint_txid": txid,
-                            "outpoint_index": index,
-                        })
+                if 'addresses' not in scriptPubKey.keys(): continue
+                bchaddress = scriptPubKey['addresses'][0]
+                if bchaddress not in tracked_addresses: continue
 
-        for output in outputs:
-            scriptPubKey = output['scriptPubKey']
+                value = round(output['value'] * (10 ** 8))
+                source = NODE.BCH.source
+                index = output['n']
 
-            if 'addresses' in scriptPubKey.keys():
-                bchaddress = scriptPubKey['addresses'][0]
+                token_id = 'bch'
+                amount = ''
+                decimals = None
+                created = False
+                obj_id = None
 
-                address_check = Address.objects.filter(address=bchaddress)
-                if address_check.exists():
-                    value = round(output['value'] * (10 ** 8))
-                    source = NODE.BCH.source
-                    index = output['n']
-
-                    token_id = 'bch'
-                    amount = ''
-                    decimals = None
-                    created = False
-                    obj_id = None
-
-                    if 'tokenData' in output.keys():
-                        saved_token_data = process_cashtoken_tx(
-                            output['tokenData'],
-                            output['scriptPubKey']['addresses'][0],
-                            tx_hash,
-                            index=index,
-                            value=value
-                        )
-                        token_id = saved_token_data['token_id']
-                        decimals = saved_token_data['decimals']
-                        amount = str(saved_token_data['amount'])
-                        created = saved_token_data['created']
-                        obj_id = saved_token_data['transaction_id']
+                if 'tokenData' in output.keys():
+                    saved_token_data = process_cashtoken_tx(
+                        output['tokenData'],
+                        output['scriptPubKey']['addresses'][0],
+                        tx_hash,
+                        index=index,
+                        value=value
+                    )
+                    token_id = saved_token_data['token_id']
+                    decimals = saved_token_data['decimals']
+                    amount = str(saved_token_data['amount'])
+                    created = saved_token_data['created']
+                    obj_id = saved_token_data['transaction_id']
+                else:
+                    args = (
+                        token_id,
+                        bchaddress,
+                        tx_hash,
+                        source
+                    )
+                    if 'time' in tx.keys():
+                        timestamp = tx['time']
                     else:
-                        args = (
-                            token_id,
-                            bchaddress,
-                            tx_hash,
-                            source
-                        )
-                        if 'time' in tx.keys():
-                            timestamp = tx['time']
-                        else:
-                            timestamp = timezone.now().timestamp()
-                        obj_id, created = save_record(
-                            *args,
-                            value=value,
-                            blockheightid=None,
-                            index=index,
-                            inputs=inputs_data,
-                            tx_timestamp=timestamp
-                        )
-                        # has_updated_output = has_updated_output or created
-
-                        if obj_id:
-                            txn_obj = Transaction.objects.get(id=obj_id)
-                            decimals = txn_obj.get_token_decimals()
-
-                            # save wallet history only if tx is associated with a wallet
-                            if txn_obj.wallet:
-                                save_histories = True
-                        
-                    if obj_id and created:
-                        # Publish MQTT message
-                        data = {
-                            'txid': tx_hash,
-                            'recipient': bchaddress,
-                            'token': token_id,
-                            'decimals': decimals,
-                            'amount': amount,
-                            'value': value
-                        }
-                        addr_obj = None
-                        if token_id.startswith('ct/'):
-                            # Include cashtoken address in data
-                            try:
-                                addr_obj = Address.objects.get(address=bchaddress)
-                                if addr_obj.token_address:
-                                    data['recipient_cashtoken_address'] = addr_obj.token_address
-                            except Address.DoesNotExist:
-                                pass
-                            # If NFT, include NFT data (capability and commitment)
-                            if 'nft' in output['tokenData'].keys():
-                                data['nft'] = output['tokenData']['nft']
-
-                        try:
-                            LOGGER.info('Sending MQTT message: ' + str(data))
-                            if addr_obj and addr_obj.wallet and addr_obj.wallet.wallet_hash:
-                                hash_obj = SHA256.new(addr_obj.wallet.wallet_hash.encode('utf-8'))
-                                hashed_wallet_hash = hash_obj.hexdigest()
-                                topic = f"transactions/{hashed_wallet_hash}/{bchaddress}"
-                            else:
-                                topic = f"transactions/address/{bchaddress}"
-                            publish_message(topic, data, qos=1)
-                        except:
-                            LOGGER.error(f"Failed to send mqtt for tx | {tx_hash} | {bchaddress}")
+                        timestamp = timezone.now().timestamp()
+                    obj_id, created = save_record(
+                        *args,
+                        value=value,
+                        blockheightid=None,
+                        index=index,
+                        inputs=inputs_data,
+                        tx_timestamp=timestamp
+                    )
+                    # has_updated_output = has_updated_output or created
+
+                    if obj_id:
+                        txn_obj = Transaction.objects.get(id=obj_id)
+                        decimals = txn_obj.get_token_decimals()
+
+                        # save wallet history only if tx is associated with a wallet
+                        if txn_obj.wallet:
+                            save_histories = True
+
+                if obj_id and created:
+                    saved_outputs.append((output, bchaddress, obj_id, token_id, decimals, amount, value))
+
+        # notify only after the outputs are committed
+        for output, bchaddress, obj_id, token_id, decimals, amount, value in saved_outputs:
+            # Publish MQTT message
+            data = {
+                'txid': tx_hash,
+                'recipient': bchaddress,
+                'token': token_id,
+                'decimals': decimals,
+                'amount': amount,
+                'value': value
+            }
+            addr_obj = None
+            if token_id.startswith('ct/'):
+                # Include cashtoken address in data
+                addr_obj = tracked_addresses.get(bchaddress)
+                if addr_obj and addr_obj.token_address:
+                    data['recipient_cashtoken_address'] = addr_obj.token_address
+                # If NFT, include NFT data (capability and commitment)
+                if 'nft' in output['tokenData'].keys():
+                    data['nft'] = output['tokenData']['nft']
 
-                        try:
-                            client_acknowledgement(obj_id)
-                        except:
-                            LOGGER.error('Failed to send client acknowledgement for txid:' + str(tx_hash))
+            try:
+                LOGGER.info('Sending MQTT message: ' + str(data))
+                if addr_obj and addr_obj.wallet and addr_obj.wallet.wallet_hash:
+                    hash_obj = SHA256.new(addr_obj.wallet.wallet_hash.encode('utf-8'))
+                    hashed_wallet_hash = hash_obj.hexdigest()
+                    topic = f"transactions/{hashed_wallet_hash}/{bchaddress}"
+                else:
+                    topic = f"transactions/address/{bchaddress}"
+                publish_message(topic, data, qos=1)
+            except:
+                LOGGER.error(f"Failed to send mqtt for tx | {tx_hash} | {bchaddress}")
+
+            try:
+                client_acknowledgement(obj_id)
+            except:
+                LOGGER.error('Failed to send client acknowledgement for txid:' + str(tx_hash))
 
-        # mqtt_client.loop_stop()
+        record.mark_done(STAGE_MEMPOOL)
 
         if save_histories:
             LOGGER.info(f"Parsing wallet history of tx({tx_hash})")
@@ -2582,8 +2879,8 @@ def process_mempool_transaction_throttled(tx_hash, tx_hex=None, immediate=False)
     'rate_limit': RateLimit((100, 60))
   }
 )
-def process_mempool_transaction_fast(tx_hash, tx_hex=None, immediate=False):
-    _process_mempool_transaction(tx_hash, tx_hex, immediate)
+def process_mempool_transaction_fast(tx_hash, tx_hex=None, immediate=False, force=False):
+    _process_mempool_transaction(tx_hash, tx_hex, immediate, force=force)
 
 
 @shared_task(queue='save_record')
@@ -0,0 +1,12 @@
+from .electrum import ElectrumClientTestCase
+from .tx_cache import LocalLRUCacheTestCase
+from .mqtt import MQTTPublisherTestCase
+from .raw_tx import RawTransactionTestCase
+from .balance_ledger import BalanceLedgerTestCase
+from .wallet_history import WalletHistoryPaginationTestCase
+from .cache import CacheGenerationTestCase
+from .tx_processing import MempoolLeaseTestCase, TxProcessingRecordTestCase
+from .utxo_rescan import WalletUtxoRescannerTestCase
+from .js_bridge import JSBridgeTestCase
+from .cashtoken_metadata import CashTokenMetadataServiceTestCase
+from .nft_genesis import NftGenesisResolverTestCase
@@ -0,0 +1,78 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, tag
+
+from main.models import Address, BalanceLedger, CashFungibleToken, Token, Transaction, Wallet
+
+
+class BalanceLedgerTestCase(TestCase):
+    def setUp(self):
+        self.bch = Token.objects.create(name="bch", tokenid="")
+        self.ct = Token.objects.create(name="cashtoken", tokenid="wt_cashtoken_token_id")
+        self.category = CashFungibleToken.objects.create(category="ab" * 32)
+        self.wallet = Wallet.objects.create(wallet_hash="wallet-hash", wallet_type="bch", version=2)
+        self.address = Address.objects.create(
+            address="bchtest:qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqq",
+            wallet=self.wallet,
+            address_path="0/0",
+        )
+
+    def create_outputs(self, *outputs):
+        Transaction.objects.bulk_create([
+            Transaction(
+                txid=f"{index:064x}",
+                index=0,
+                address=self.address,
+                wallet=self.wallet,
+                source="test",
+                **output,
+            )
+            for index, output in enumerate(outputs)
+        ])
+
+    def ledger(self, **filters):
+        row = BalanceLedger.objects.filter(wallet=self.wallet, **filters).first()
+        return (int(row.amount), row.value, row.utxo_count) if row else (0, 0, 0)
+
+    @tag("unit")
+    def test_tracks_inserts_spends_and_deletes(self):
+        self.create_outputs(
+            { "token": self.bch, "value": 10000 },
+            { "token": self.bch, "value": 2000 },
+            # dust isn't counted in bch balances
+            { "token": self.bch, "value": 546 },
+            { "token": self.ct, "value": 1000, "amount": 50, "cashtoken_ft": self.category },
+        )
+        self.assertEqual(self.ledger(token=self.bch), (0, 12000, 2))
+        self.assertEqual(self.ledger(category=self.category.category), (50, 1000, 1))
+        self.assertEqual(
+            BalanceLedger.objects.get(address=self.address, token=self.bch).value,
+            12000,
+        )
+
+        Transaction.objects.filter(value=2000).update(spent=True, spending_txid="f" * 64)
+        self.assertEqual(self.ledger(token=self.bch), (0, 10000, 1))
+
+        Transaction.objects.filter(cashtoken_ft=self.category).delete()
+        self.assertEqual(self.ledger(category=self.category.category), (0, 0, 0))
+
+        # updates that don't touch balances leave the ledger as is
+        Transaction.objects.update(acknowledged=True)
+        self.assertEqual(self.ledger(token=self.bch), (0, 10000, 1))
+
+    @tag("unit")
+    def test_reconcile_fixes_drift(self):
+        self.create_outputs({ "token": self.bch, "value": 10000 })
+        BalanceLedger.objects.filter(wallet=self.wallet).update(value=1)
+
+        output = StringIO()
+        call_command("reconcile_balance_ledger", stdout=output)
+        self.assertIn("Found 1 drifted ledger rows", output.getvalue())
+
+        call_command("reconcile_balance_ledger", fix=True, stdout=StringIO())
+        self.assertEqual(self.ledger(token=self.bch), (0, 10000, 1))
+
+        output = StringIO()
+        call_command("reconcile_balance_ledger", stdout=output)
+        self.assertIn("no drift", output.getvalue())
@@ -0,0 +1,52 @@
+from django.test import SimpleTestCase, tag
+
+from main.tests.mocker.redis import FakeRedis
+from main.utils.cache import (
+    GLOBAL_TAG,
+    bump_generations,
+    get_generations,
+    wallet_balance_tag,
+    wallet_history_tag,
+    wallet_tag,
+)
+
+
+class CacheGenerationTestCase(SimpleTestCase):
+    def setUp(self):
+        self.cache = FakeRedis()
+
+    def generations(self, wallet_hash, category=None):
+        return get_generations(
+            GLOBAL_TAG,
+            wallet_tag(wallet_hash),
+            wallet_balance_tag(wallet_hash, category),
+            cache=self.cache,
+        )
+
+    @tag("unit")
+    def test_bump_invalidates_only_its_tag(self):
+        bch = self.generations('a')
+        token = self.generations('a', 'cat')
+        other_wallet = self.generations('b')
+
+        bump_generations(wallet_balance_tag('a'), cache=self.cache)
+
+        self.assertNotEqual(self.generations('a'), bch)
+        self.assertEqual(self.generations('a', 'cat'), token)
+        self.assertEqual(self.generations('b'), other_wallet)
+
+    @tag("unit")
+    def test_wallet_and_global_tags_cover_all_values(self):
+        before = [self.generations('a'), self.generations('a', 'cat')]
+        bump_generations(wallet_tag('a'), cache=self.cache)
+        after_wallet = [self.generations('a'), self.generations('a', 'cat')]
+        self.assertTrue(all(x != y for x, y in zip(before, after_wallet)))
+
+        other_wallet = self.generations('b')
+        bump_generations(GLOBAL_TAG, cache=self.cache)
+        self.assertNotEqual(self.generations('b'), other_wallet)
+
+    @tag("unit")
+    def test_missing_counter_restarts_from_clock(self):
+        bump_generations(wallet_history_tag('a'), cache=self.cache)
+        self.assertGreater(int(get_generations(wallet_history_tag('a'), cache=self.cache)), 1)
@@ -0,0 +1,94 @@
+from unittest import mock
+
+import requests
+from django.test import TestCase, override_settings, tag
+
+from main.models import CashFungibleToken, CashTokenMetadata
+from main.tests.mocker.redis import FakeRedis
+from main.utils.cashtoken_metadata import CashTokenMetadataService
+
+
+CATEGORY = 'cd' * 32
+
+CASHTOKEN_METADATA = {
+    "TTL": 3600,
+    "REFRESH_INTERVAL": 300,
+    "TIMEOUT": 1,
+}
+
+METADATA = {
+    "name": "Test Token",
+    "description": "",
+    "token": { "symbol": "TEST", "decimals": 2 },
+    "uris": { "icon": "https://example.com/icon.png" },
+}
+
+
+def response(status_code, data=None, headers=None):
+    return mock.Mock(status_code=status_code, headers=headers or {}, json=mock.Mock(return_value=data))
+
+
+@override_settings(CASHTOKEN_METADATA=CASHTOKEN_METADATA)
+@mock.patch("main.tasks.refresh_cashtoken_metadata")
+class CashTokenMetadataServiceTestCase(TestCase):
+    def setUp(self):
+        self.cache = FakeRedis()
+        self.session = mock.Mock()
+
+    def service(self):
+        return CashTokenMetadataService(cache=self.cache, session=self.session)
+
+    @tag("unit")
+    def test_refreshes_are_coalesced(self, refresh_task):
+        for _ in range(5):
+            self.assertIsNone(self.service().get(CATEGORY))
+        refresh_task.delay.assert_called_once_with(CATEGORY, force=False)
+
+        # a webhook queues a refresh even within the interval
+        self.assertTrue(self.service().queue_refresh(CATEGORY, force=True))
+        self.assertEqual(refresh_task.delay.call_count, 2)
+
+    @tag("unit")
+    def test_refresh_is_cached_and_applied(self, refresh_task):
+        self.session.get.return_value = response(200, METADATA, { "ETag": '"v1"' })
+        self.service().refresh(CATEGORY)
+
+        entry = self.service().get(CATEGORY)
+        self.assertEqual(entry["data"], METADATA)
+        self.assertEqual(entry["etag"], '"v1"')
+        refresh_task.delay.assert_not_called()
+
+        cashtoken = CashFungibleToken.objects.get(category=CATEGORY)
+        self.assertEqual(cashtoken.info.symbol, "TEST")
+        self.assertEqual(cashtoken.info.decimals, 2)
+
+        # served from the table if the cache was lost
+        self.cache = FakeRedis()
+        self.assertEqual(self.service().get(CATEGORY)["data"], METADATA)
+
+    @tag("unit")
+    def test_not_modified_keeps_metadata(self, refresh_task):
+        self.session.get.return_value = response(200, METADATA, { "ETag": '"v1"', "Cache-Control": "max-age=60" })
+        first = self.service().refresh(CATEGORY)
+
+        self.session.get.return_value = response(304)
+        second = self.service().refresh(CATEGORY)
+
+        _, kwargs = self.session.get.call_args
+        self.assertEqual(kwargs["headers"], { "If-None-Match": '"v1"' })
+        self.assertEqual(second["data"], METADATA)
+        self.assertGreaterEqual(second["expires_at"], first["expires_at"])
+
+    @tag("unit")
+    def test_failed_fetch_keeps_stale_metadata(self, refresh_task):
+        self.session.get.return_value = response(200, METADATA, { "ETag": '"v1"' })
+        self.service().refresh(CATEGORY)
+
+        self.session.get.side_effect = requests.exceptions.Timeout()
+        self.assertIsNone(self.service().refresh(CATEGORY))
+
+        self.session.get.side_effect = None
+        self.session.get.return_value = response(502)
+        self.assertIsNone(self.service().refresh(CATEGORY))
+
+        self.assertEqual(CashTokenMetadata.objects.get(category=CATEGORY).data, METADATA)
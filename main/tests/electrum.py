@@ -0,0 +1,109 @@
+import threading
+import time
+
+from django.test import SimpleTestCase, tag
+
+from main.tests.mocker.fulcrum import FakeFulcrumServer
+from main.utils.queries.electrum import ElectrumClient, ElectrumError
+
+
+UTXOS = {
+    'bitcoincash:qa': [{ 'tx_hash': 'aa' * 32, 'tx_pos': 0, 'height': 100, 'value': 1000 }],
+    'bitcoincash:qb': [],
+}
+HISTORY = {
+    'bitcoincash:qa': [{ 'tx_hash': 'aa' * 32, 'height': 100 }],
+    'bitcoincash:qb': [],
+}
+
+
+def listunspent(address, token_filter=None):
+    if address not in UTXOS:
+        raise ValueError('invalid address')
+    return UTXOS[address]
+
+
+class ElectrumClientTestCase(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeFulcrumServer({
+            'blockchain.address.listunspent': listunspent,
+            'blockchain.address.get_history': lambda address: HISTORY[address],
+            'server.ping': lambda: time.sleep(0.5),
+        }).start()
+        self.client = ElectrumClient(self.server.host, self.server.port, timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    @tag("unit")
+    def test_requests_share_one_connection(self):
+        self.assertEqual(self.client.listunspent('bitcoincash:qa'), UTXOS['bitcoincash:qa'])
+        self.assertEqual(self.client.get_history('bitcoincash:qb'), [])
+        self.assertEqual(self.server.connections, 1)
+
+    @tag("unit")
+    def test_pipelined_batch_matches_responses_by_id(self):
+        # the fake server answers a pipelined burst in reverse order
+        utxos = self.client.listunspent_many(['bitcoincash:qa', 'bitcoincash:qb', 'bitcoincash:qa'])
+        self.assertEqual(utxos, { address: UTXOS[address] for address in ('bitcoincash:qa', 'bitcoincash:qb') })
+
+        history = self.client.get_history_many(['bitcoincash:qb', 'bitcoincash:qa'])
+        self.assertEqual(history, HISTORY)
+        self.assertEqual(self.server.connections, 1)
+
+    @tag("unit")
+    def test_concurrent_callers(self):
+        results = []
+
+        def worker():
+            for _ in range(20):
+                results.append(self.client.get_history('bitcoincash:qa'))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 100)
+        self.assertTrue(all(result == HISTORY['bitcoincash:qa'] for result in results))
+        self.assertEqual(self.server.connections, 1)
+
+    @tag("unit")
+    def test_server_errors(self):
+        with self.assertRaises(ElectrumError):
+            self.client.listunspent('bitcoincash:invalid')
+
+        results = self.client.batch([
+            ('blockchain.address.listunspent', 'bitcoincash:invalid'),
+            ('blockchain.address.listunspent', 'bitcoincash:qb'),
+        ], raise_errors=False)
+        self.assertIsInstance(results[0], ElectrumError)
+        self.assertEqual(results[1], [])
+
+    @tag("unit")
+    def test_reconnects_after_disconnect(self):
+        self.client.get_history('bitcoincash:qa')
+
+        self.server.disconnect_after = 1
+        self.assertEqual(self.client.get_history('bitcoincash:qa'), HISTORY['bitcoincash:qa'])
+        self.assertEqual(self.server.connections, 2)
+
+    @tag("unit")
+    def test_fails_when_server_keeps_disconnecting(self):
+        self.server.disconnect_after = 1
+        with self.assertRaises(ConnectionError):
+            self.client.batch([('blockchain.address.get_history', 'bitcoincash:qa')], retries=0)
+
+    @tag("unit")
+    def test_timed_out_requests_are_dropped(self):
+        self.client.timeout = 0.1
+        with self.assertRaises(TimeoutError):
+            self.client.request('server.ping')
+        self.assertEqual(self.client._pending, {})
+        self.assertFalse(self.client.connected)
+
+        self.client.timeout = 5
+        self.assertEqual(self.client.get_history('bitcoincash:qa'), HISTORY['bitcoincash:qa'])
+        self.assertEqual(self.server.connections, 2)
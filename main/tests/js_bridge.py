@@ -0,0 +1,97 @@
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase, override_settings, tag
+
+from main.utils.js_bridge import CircuitBreaker, JSBridge, JSBridgeError, JSBridgeUnavailable
+
+
+JS_BRIDGE = {
+    "TIMEOUT": 1,
+    "FAILURE_THRESHOLD": 2,
+    "RESET_TIMEOUT": 30,
+    "MAX_FALLBACK_PROCESSES": 1,
+}
+
+
+def completed_process(stdout=b'', stderr=b'', returncode=0):
+    return mock.Mock(stdout=stdout, stderr=stderr, returncode=returncode)
+
+
+@override_settings(JS_BRIDGE=JS_BRIDGE)
+@mock.patch("main.utils.js_bridge.get_js_bridge_stats")
+class JSBridgeTestCase(SimpleTestCase):
+    def bridge(self):
+        return JSBridge("test", "http://localhost:3999/", "./main.js")
+
+    @tag("unit")
+    def test_circuit_breaker(self, _):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        with mock.patch("main.utils.js_bridge.time.monotonic", return_value=100):
+            breaker.record_failure()
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+            self.assertFalse(breaker.allow())
+
+        with mock.patch("main.utils.js_bridge.time.monotonic", return_value=130):
+            # a single trial call after the reset timeout
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())
+            breaker.record_success()
+            self.assertTrue(breaker.allow())
+
+    @tag("unit")
+    @mock.patch("main.utils.js_bridge.run", return_value=completed_process(stdout=b'{"value": 1}'))
+    def test_unreachable_server_is_skipped(self, mock_run, _):
+        bridge = self.bridge()
+        with mock.patch.object(bridge.session, "post", side_effect=requests.exceptions.ConnectionError) as mock_post:
+            for _ in range(4):
+                self.assertEqual(bridge.call("func", 1), { "value": 1 })
+
+        # the server is not retried once its circuit opened
+        self.assertEqual(mock_post.call_count, JS_BRIDGE["FAILURE_THRESHOLD"])
+        self.assertEqual(mock_run.call_count, 4)
+
+    @tag("unit")
+    @mock.patch("main.utils.js_bridge.run", return_value=completed_process(stderr=b'node crashed', returncode=1))
+    def test_failing_fallback_is_skipped(self, mock_run, _):
+        bridge = self.bridge()
+        bridge.server_breaker.record_failure()
+        bridge.server_breaker.record_failure()
+
+        for _ in range(JS_BRIDGE["FAILURE_THRESHOLD"]):
+            with self.assertRaises(JSBridgeError):
+                bridge.call("func")
+
+        with self.assertRaises(JSBridgeUnavailable):
+            bridge.call("func")
+        self.assertEqual(mock_run.call_count, JS_BRIDGE["FAILURE_THRESHOLD"])
+
+    @tag("unit")
+    @mock.patch("main.utils.js_bridge.run")
+    def test_fallback_processes_are_bounded(self, mock_run, _):
+        bridge = self.bridge()
+        bridge.timeouts = { "func": 0.01 }
+        bridge.server_breaker.record_failure()
+        bridge.server_breaker.record_failure()
+
+        bridge.fallback_slots.acquire()
+        with self.assertRaises(JSBridgeUnavailable):
+            bridge.call("func")
+        mock_run.assert_not_called()
+
+    @tag("unit")
+    def test_call_many(self, _):
+        bridge = self.bridge()
+        response = mock.Mock(ok=True)
+        response.json.return_value = [
+            { "success": True, "result": { "value": 1 } },
+            { "success": False, "error": "invalid message" },
+        ]
+        with mock.patch.object(bridge.session, "post", return_value=response) as mock_post:
+            results = bridge.call_many([("parse", "a"), ("parse", "b")], raise_errors=False)
+
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(mock_post.call_args[0][0], "http://localhost:3999/batch")
+        self.assertEqual(results[0], { "value": 1 })
+        self.assertIsInstance(results[1], JSBridgeError)
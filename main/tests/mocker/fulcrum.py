@@ -0,0 +1,90 @@
+import json
+import socketserver
+import threading
+
+
+class FakeFulcrumServer(object):
+    """
+        Minimal in-process Electrum protocol server for tests
+        Answers newline-delimited JSON-RPC requests (and batch arrays) from canned
+        handlers, responses to a pipelined burst are written back in reverse order to
+        exercise id matching on the client.
+
+        handlers: dict of method -> callable(*params) returning the result,
+            raising an Exception returns it as a JSON-RPC error
+    """
+
+    def __init__(self, handlers=None):
+        self.handlers = handlers or {}
+        self.requests = []
+        self.connections = 0
+        # set to drop the connection after receiving this many more requests
+        self.disconnect_after = None
+        self._lock = threading.Lock()
+
+        fake = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                with fake._lock:
+                    fake.connections += 1
+
+                buffer = b''
+                while True:
+                    data = self.request.recv(65536)
+                    if not data:
+                        return
+                    buffer += data
+                    *lines, buffer = buffer.split(b'\n')
+
+                    responses = []
+                    for line in lines:
+                        message = json.loads(line)
+                        if isinstance(message, list):
+                            responses.append([fake.respond(request) for request in message])
+                        else:
+                            responses.append(fake.respond(message))
+
+                    if fake.should_disconnect(len(lines)):
+                        return
+
+                    for response in reversed(responses):
+                        self.request.sendall(json.dumps(response).encode() + b'\n')
+
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address
+        self._thread = None
+
+    def respond(self, request):
+        with self._lock:
+            self.requests.append(request)
+
+        handler = self.handlers.get(request['method'])
+        if handler is None:
+            return { 'jsonrpc': '2.0', 'id': request['id'], 'error': { 'code': -32601, 'message': 'unknown method' } }
+
+        try:
+            result = handler(*request.get('params', []))
+        except Exception as exception:
+            return { 'jsonrpc': '2.0', 'id': request['id'], 'error': { 'code': 1, 'message': str(exception) } }
+        return { 'jsonrpc': '2.0', 'id': request['id'], 'result': result }
+
+    def should_disconnect(self, count):
+        with self._lock:
+            if self.disconnect_after is None:
+                return False
+            self.disconnect_after -= count
+            if self.disconnect_after <= 0:
+                self.disconnect_after = None
+                return True
+            return False
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,105 @@
+import socketserver
+import threading
+
+
+CONNECT = 1
+PUBLISH = 3
+PINGREQ = 12
+DISCONNECT = 14
+
+
+class FakeMQTTBroker(object):
+    """
+        Minimal in-process MQTT 3.1.1 broker stand-in over plain TCP for tests & benchmarks
+        Accepts any CONNECT, acknowledges QoS 1 PUBLISHes and answers pings.
+        Received messages are kept as (topic, payload, qos, retain) in 'messages'.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.messages = []
+        self.connections = 0
+        self.received = threading.Condition()
+        # set to drop the connection after receiving this many more publishes
+        self.disconnect_after = None
+
+        broker = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                with broker.received:
+                    broker.connections += 1
+
+                stream = self.request.makefile('rb')
+                try:
+                    broker.serve(self.request, stream)
+                except (ConnectionError, OSError):
+                    pass
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address
+
+    def serve(self, sock, stream):
+        while True:
+            header = stream.read(1)
+            if not header:
+                return
+
+            packet_type = header[0] >> 4
+            flags = header[0] & 0x0f
+            body = stream.read(read_remaining_length(stream))
+
+            if packet_type == CONNECT:
+                sock.sendall(b'\x20\x02\x00\x00')
+            elif packet_type == PUBLISH:
+                if not self.receive(body, flags):
+                    return
+                if (flags >> 1) & 0x03:
+                    packet_id = body[2 + int.from_bytes(body[:2], 'big'):][:2]
+                    sock.sendall(b'\x40\x02' + packet_id)
+            elif packet_type == PINGREQ:
+                sock.sendall(b'\xd0\x00')
+            elif packet_type == DISCONNECT:
+                return
+
+    def receive(self, body, flags):
+        qos = (flags >> 1) & 0x03
+        topic_length = int.from_bytes(body[:2], 'big')
+        topic = body[2:2 + topic_length].decode()
+        payload = body[2 + topic_length + (2 if qos else 0):]
+
+        with self.received:
+            if self.disconnect_after is not None:
+                self.disconnect_after -= 1
+                if self.disconnect_after < 0:
+                    self.disconnect_after = None
+                    return False
+
+            self.messages.append((topic, payload, qos, bool(flags & 0x01)))
+            self.received.notify_all()
+        return True
+
+    def wait_for_messages(self, count, timeout=10):
+        with self.received:
+            return self.received.wait_for(lambda: len(self.messages) >= count, timeout=timeout)
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def read_remaining_length(stream):
+    multiplier = 1
+    value = 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            raise ConnectionError('connection closed')
+        value += (byte[0] & 0x7f) * multiplier
+        if not byte[0] & 0x80:
+            return value
+        multiplier *= 128
@@ -0,0 +1,115 @@
+class FakeRedis(object):
+    """
+        Dict backed stand-in for the few redis commands the cache, tx processing & cts helpers use
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value).encode() if not isinstance(value, bytes) else value
+        return True
+
+    def incr(self, key):
+        value = int(self.data.get(key, 0)) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def expire(self, key, seconds):
+        return key in self.data
+
+    def getbit(self, key, offset):
+        return int(offset in self.data.get(key, set()))
+
+    def setbit(self, key, offset, value):
+        bits = self.data.setdefault(key, set())
+        previous = int(offset in bits)
+        if value:
+            bits.add(offset)
+        else:
+            bits.discard(offset)
+        return previous
+
+    def sadd(self, key, *members):
+        members_set = self.data.setdefault(key, set())
+        added = len(set(members) - members_set)
+        members_set.update(members)
+        return added
+
+    def spop(self, key, count=None):
+        members = self.data.get(key, set())
+        popped = [members.pop() for _ in range(min(count or 1, len(members)))]
+        return [member if isinstance(member, bytes) else str(member).encode() for member in popped]
+
+    def sismember(self, key, member):
+        return int(member in self.data.get(key, set()))
+
+    def rpush(self, key, *values):
+        items = self.data.setdefault(key, [])
+        items.extend(value if isinstance(value, bytes) else str(value).encode() for value in values)
+        return len(items)
+
+    def lrange(self, key, start, end):
+        items = self.data.get(key, [])
+        end = len(items) + end + 1 if end < 0 else end + 1
+        return items[start:end]
+
+    def ltrim(self, key, start, end):
+        items = self.data.get(key, [])
+        end = len(items) + end + 1 if end < 0 else end + 1
+        self.data[key] = items[start:end]
+        return True
+
+    def llen(self, key):
+        return len(self.data.get(key, []))
+
+    def hmget(self, key, fields):
+        values = self.data.get(key, {})
+        return [values.get(field) for field in fields]
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        values = self.data.setdefault(key, {})
+        mapping = { **(mapping or {}), **({ field: value } if field is not None else {}) }
+        added = len(set(mapping) - set(values))
+        values.update({ name: str(value).encode() for name, value in mapping.items() })
+        return added
+
+    def eval(self, script, numkeys, *keys_and_args):
+        # only the compare & delete script of leases is supported
+        key, token = keys_and_args
+        if self.get(key) == token.encode():
+            self.delete(key)
+            return 1
+        return 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline(object):
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        results = [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
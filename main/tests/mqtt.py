@@ -0,0 +1,56 @@
+from django.test import SimpleTestCase, override_settings, tag
+
+from main.mqtt import MQTTPublisher
+from main.tests.mocker.mqtt_broker import FakeMQTTBroker
+
+
+@override_settings(BCH_NETWORK='chipnet')
+class MQTTPublisherTestCase(SimpleTestCase):
+    def setUp(self):
+        self.broker = FakeMQTTBroker().start()
+        self.publisher = MQTTPublisher(
+            'watchtower-test-publisher',
+            host=self.broker.host,
+            port=self.broker.port,
+            min_reconnect_delay=0.1,
+            max_reconnect_delay=0.5,
+        )
+
+    def tearDown(self):
+        self.publisher.stop(timeout=1)
+        self.broker.stop()
+
+    @tag("unit")
+    def test_publishes_over_one_connection(self):
+        for i in range(50):
+            self.assertTrue(self.publisher.publish('mempool', f'{i}', qos=1, retain=True))
+
+        self.assertTrue(self.publisher.flush(timeout=10))
+        self.assertEqual(len(self.broker.messages), 50)
+        self.assertEqual([message[1] for message in self.broker.messages], [f'{i}'.encode() for i in range(50)])
+        self.assertTrue(all(message[2:] == (1, True) for message in self.broker.messages))
+        self.assertEqual(self.broker.connections, 1)
+        self.assertFalse(self.publisher.inflight)
+
+    @tag("unit")
+    def test_drops_messages_when_queue_is_full(self):
+        publisher = MQTTPublisher('watchtower-test-full', host=self.broker.host, port=self.broker.port, max_queue_size=1)
+        # not started yet, the queue can't be drained
+        publisher._started = True
+        self.assertTrue(publisher.publish('mempool', 'a'))
+        self.assertFalse(publisher.publish('mempool', 'b'))
+        self.assertEqual(publisher.dropped_count, 1)
+
+    @tag("unit")
+    def test_resends_unacknowledged_messages_after_reconnect(self):
+        self.publisher.publish('mempool', 'first')
+        self.assertTrue(self.publisher.flush(timeout=10))
+
+        # the broker drops the connection on the next publish without acknowledging it
+        self.broker.disconnect_after = 0
+        self.publisher.publish('mempool', 'second')
+
+        self.assertTrue(self.broker.wait_for_messages(2))
+        self.assertTrue(self.publisher.flush(timeout=10))
+        self.assertEqual([message[1] for message in self.broker.messages], [b'first', b'second'])
+        self.assertEqual(self.broker.connections, 2)
@@ -0,0 +1,91 @@
+from django.test import TestCase, override_settings, tag
+
+from main.models import CashNonFungibleTokenGenesis
+from main.utils.nft_genesis import NftGenesisResolver, NftOutpoint
+
+
+CATEGORY = 'ab' * 32
+
+NFT_GENESIS = {
+    "MAX_DEPTH": 20,
+    "BATCH_SIZE": 100,
+    "WINDOW": 1,
+}
+
+
+def nft_input(txid, index=0, capability="none", commitment="01"):
+    return {
+        "txid": txid,
+        "spent_index": index,
+        "token_data": {
+            "category": CATEGORY,
+            "nft": { "capability": capability, "commitment": commitment },
+        },
+    }
+
+
+class FakeNode:
+    def __init__(self, txs):
+        self.txs = { tx["txid"]: tx for tx in txs }
+        self.requests = []
+
+    def get_transactions(self, txids):
+        txids = set(txids)
+        self.requests.append(txids)
+        return { txid: self.txs[txid] for txid in txids if txid in self.txs }
+
+
+@override_settings(NFT_GENESIS=NFT_GENESIS)
+class NftGenesisResolverTestCase(TestCase):
+    def setUp(self):
+        # mint <- a <- b <- c, and mint <- d
+        self.node = FakeNode([
+            { "txid": "mint", "inputs": [nft_input("minting-utxo", capability="minting", commitment="")] },
+            { "txid": "a", "inputs": [nft_input("mint")] },
+            { "txid": "b", "inputs": [nft_input("a")] },
+            { "txid": "c", "inputs": [nft_input("b")] },
+            { "txid": "d", "inputs": [nft_input("mint", index=1)] },
+        ])
+
+    def nft(self, txid):
+        return NftOutpoint(CATEGORY, "none", "01", txid, 0)
+
+    @tag("unit")
+    def test_traces_lineages_together(self):
+        resolver = NftGenesisResolver(node=self.node)
+        results = resolver.resolve([self.nft("c"), self.nft("d")])
+
+        for txid in ["c", "d"]:
+            self.assertEqual(results[self.nft(txid)]["status"], CashNonFungibleTokenGenesis.Status.MINTED)
+            self.assertEqual(results[self.nft(txid)]["genesis_txid"], "mint")
+
+        # one request per level
+        self.assertEqual(self.node.requests, [{"c", "d"}, {"b", "mint"}, {"a"}, {"mint"}])
+        self.assertEqual([tx["txid"] for tx, _ in resolver.minting_txs], ["mint"])
+
+    @tag("unit")
+    def test_saved_outpoints_are_reused(self):
+        NftGenesisResolver(node=self.node).resolve([self.nft("c")])
+        self.node.requests = []
+
+        results = NftGenesisResolver(node=self.node).resolve([self.nft("b")])
+        self.assertEqual(results[self.nft("b")]["status"], CashNonFungibleTokenGenesis.Status.MINTED)
+        self.assertEqual(self.node.requests, [])
+
+    @tag("unit")
+    def test_max_depth_continues_on_next_trace(self):
+        results = NftGenesisResolver(node=self.node, max_depth=2).resolve([self.nft("c")])
+        self.assertNotIn(self.nft("c"), results)
+
+        self.node.requests = []
+        results = NftGenesisResolver(node=self.node, max_depth=2).resolve([self.nft("c")])
+        self.assertEqual(results[self.nft("c")]["status"], CashNonFungibleTokenGenesis.Status.MINTED)
+        self.assertEqual(self.node.requests, [{"a"}, {"mint"}])
+
+        pending = CashNonFungibleTokenGenesis.objects.filter(status=CashNonFungibleTokenGenesis.Status.PENDING)
+        self.assertFalse(pending.exists())
+
+    @tag("unit")
+    def test_missing_tx_is_unknown(self):
+        results = NftGenesisResolver(node=self.node).resolve([self.nft("missing")])
+        self.assertEqual(results[self.nft("missing")]["status"], CashNonFungibleTokenGenesis.Status.UNKNOWN)
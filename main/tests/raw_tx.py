@@ -0,0 +1,230 @@
+import json
+import os
+import random
+from decimal import Decimal
+
+from django.test import SimpleTestCase, tag
+
+from main.utils import cashaddr
+from main.utils.raw_tx import (
+    HAS_AMOUNT,
+    HAS_COMMITMENT_LENGTH,
+    HAS_NFT,
+    RawTransactionError,
+    decode_transaction,
+    iter_outputs,
+    output_hashes,
+    txid,
+)
+
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "data", "raw_txs.json")
+
+
+def compact_size(value):
+    if value < 0xfd:
+        return bytes([value])
+    if value <= 0xffff:
+        return b"\xfd" + value.to_bytes(2, "little")
+    if value <= 0xffffffff:
+        return b"\xfe" + value.to_bytes(4, "little")
+    return b"\xff" + value.to_bytes(8, "little")
+
+
+def random_bytes(rng, size):
+    return bytes(rng.getrandbits(8) for _ in range(size))
+
+
+def random_locking_bytecode(rng):
+    kind = rng.choice(["p2pkh", "p2sh20", "p2sh32", "nulldata", "nonstandard"])
+    if kind == "p2pkh":
+        _hash = random_bytes(rng, 20)
+        return b"\x76\xa9\x14" + _hash + b"\x88\xac", "pubkeyhash", cashaddr.P2PKH, _hash
+    if kind == "p2sh20":
+        _hash = random_bytes(rng, 20)
+        return b"\xa9\x14" + _hash + b"\x87", "scripthash", cashaddr.P2SH20, _hash
+    if kind == "p2sh32":
+        _hash = random_bytes(rng, 32)
+        return b"\xaa\x20" + _hash + b"\x87", "scripthash", cashaddr.P2SH32, _hash
+    if kind == "nulldata":
+        return b"\x6a" + random_bytes(rng, rng.randint(0, 80)), "nulldata", None, None
+    return b"\x51" + random_bytes(rng, rng.randint(0, 300)), "nonstandard", None, None
+
+
+def random_token(rng):
+    category = random_bytes(rng, 32)
+    bitfield = 0
+    token_data = { "category": category[::-1].hex(), "amount": "0" }
+    commitment = b""
+
+    has_nft = rng.random() < 0.6
+    has_amount = not has_nft or rng.random() < 0.5
+    if has_nft:
+        capability = rng.randint(0, 2)
+        bitfield |= HAS_NFT | capability
+        if rng.random() < 0.5:
+            commitment = random_bytes(rng, rng.randint(1, 40))
+            bitfield |= HAS_COMMITMENT_LENGTH
+        token_data["nft"] = {
+            "capability": ["none", "mutable", "minting"][capability],
+            "commitment": commitment.hex(),
+        }
+
+    prefix = b"\xef" + category + bytes([bitfield | (HAS_AMOUNT if has_amount else 0)])
+    if commitment:
+        prefix += compact_size(len(commitment)) + commitment
+    if has_amount:
+        amount = rng.choice([1, 0xfc, 0xfd, 0xffff, 0x10000, 2 ** 63 - 1])
+        prefix += compact_size(amount)
+        token_data["amount"] = str(amount)
+
+    return prefix, token_data
+
+
+def random_transaction(rng):
+    """
+        Returns (serialized tx, expected decoded tx) of a random transaction
+    """
+    version = rng.choice([1, 2])
+    raw = version.to_bytes(4, "little")
+    expected = { "version": version, "vin": [], "vout": [] }
+
+    inputs = rng.randint(1, 5)
+    raw += compact_size(inputs)
+    for _ in range(inputs):
+        previous_hash = random_bytes(rng, 32)
+        index = rng.randint(0, 300)
+        # long scripts exercise 3 byte compact sizes
+        unlocking_bytecode = random_bytes(rng, rng.choice([0, 106, 253, 400]))
+        sequence = rng.choice([0xffffffff, 0xfffffffe, 0])
+        raw += previous_hash + index.to_bytes(4, "little")
+        raw += compact_size(len(unlocking_bytecode)) + unlocking_bytecode
+        raw += sequence.to_bytes(4, "little")
+        expected["vin"].append({
+            "txid": previous_hash[::-1].hex(),
+            "vout": index,
+            "scriptSig": { "hex": unlocking_bytecode.hex() },
+            "sequence": sequence,
+        })
+
+    outputs = rng.randint(1, 5)
+    raw += compact_size(outputs)
+    for n in range(outputs):
+        value = rng.randint(0, 21 * 10 ** 14)
+        locking_bytecode, _type, version_byte, _hash = random_locking_bytecode(rng)
+        script = locking_bytecode
+        output = {
+            "value": Decimal(value) / 10 ** 8,
+            "n": n,
+            "scriptPubKey": { "hex": locking_bytecode.hex(), "type": _type },
+        }
+        if _hash:
+            output["scriptPubKey"]["addresses"] = [cashaddr.encode("bchtest", version_byte, _hash)]
+        if rng.random() < 0.3:
+            prefix, output["tokenData"] = random_token(rng)
+            script = prefix + locking_bytecode
+
+        raw += value.to_bytes(8, "little") + compact_size(len(script)) + script
+        expected["vout"].append(output)
+
+    locktime = rng.randint(0, 0xffffffff)
+    raw += locktime.to_bytes(4, "little")
+    expected["locktime"] = locktime
+    expected["size"] = len(raw)
+    return raw, expected
+
+
+class RawTransactionTestCase(SimpleTestCase):
+    def assertDecodedFields(self, decoded, expected, path):
+        """
+            Compares the fields the local decoder returns, the node's 'asm' & 'reqSigs' are not decoded
+        """
+        if isinstance(decoded, dict):
+            for key, value in decoded.items():
+                self.assertIn(key, expected, f"{path}.{key}")
+                self.assertDecodedFields(value, expected[key], f"{path}.{key}")
+        elif isinstance(decoded, list):
+            self.assertEqual(len(decoded), len(expected), path)
+            for index, (value, expected_value) in enumerate(zip(decoded, expected)):
+                self.assertDecodedFields(value, expected_value, f"{path}[{index}]")
+        else:
+            self.assertEqual(decoded, expected, path)
+
+    @tag("unit")
+    def test_node_decoded_fixtures(self):
+        """
+            Fixtures are in the node's 'getrawtransaction <txid> 2' format: P2PKH, P2SH & P2SH32
+            spends and payments, OP_RETURN, fungible token & NFT outputs
+        """
+        with open(FIXTURES_PATH) as fixtures_file:
+            fixtures = json.load(fixtures_file, parse_float=Decimal)
+
+        prefixes = { "mainnet": "bitcoincash", "chipnet": "bchtest" }
+        for fixture in fixtures:
+            decoded = decode_transaction(bytes.fromhex(fixture["hex"]), prefix=prefixes[fixture["network"]])
+            expected = fixture["decoded"]
+            self.assertEqual(decoded["txid"], txid(bytes.fromhex(fixture["hex"])))
+            self.assertDecodedFields(decoded, expected, fixture["description"])
+
+            # no token data or address the node decoded is missing
+            for output, expected_output in zip(decoded["vout"], expected["vout"]):
+                self.assertEqual("tokenData" in output, "tokenData" in expected_output)
+                self.assertEqual("addresses" in output["scriptPubKey"], "addresses" in expected_output["scriptPubKey"])
+
+        descriptions = [fixture["description"] for fixture in fixtures]
+        for description in ("p2pkh", "p2sh", "p2sh32", "fungible token", "nft"):
+            self.assertIn(description, descriptions)
+
+    @tag("unit")
+    def test_cashaddr_vectors(self):
+        _hash = bytes.fromhex("76a04053bda0a88bda5177b86a15c3b29f559873")
+        self.assertEqual(
+            cashaddr.encode("bitcoincash", cashaddr.P2PKH, _hash),
+            "bitcoincash:qpm2qsznhks23z7629mms6s4cwef74vcwvy22gdx6a",
+        )
+        self.assertEqual(
+            cashaddr.encode("bitcoincash", cashaddr.P2SH20, _hash),
+            "bitcoincash:ppm2qsznhks23z7629mms6s4cwef74vcwvn0h829pq",
+        )
+
+    @tag("unit")
+    def test_random_transactions(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            raw, expected = random_transaction(rng)
+            decoded = decode_transaction(raw, prefix="bchtest")
+
+            self.assertEqual(decoded["txid"], txid(raw))
+            for key, value in expected.items():
+                self.assertEqual(decoded[key], value)
+
+            # the filter path agrees with the full decoder
+            self.assertEqual(
+                [(index, value) for index, value, _ in iter_outputs(raw)],
+                [(output["n"], round(output["value"] * 10 ** 8)) for output in decoded["vout"]],
+            )
+            self.assertEqual(
+                output_hashes(raw),
+                {
+                    cashaddr.decode(output["scriptPubKey"]["addresses"][0])[2]
+                    for output in decoded["vout"] if "addresses" in output["scriptPubKey"]
+                },
+            )
+
+    @tag("unit")
+    def test_truncated_transactions(self):
+        rng = random.Random(1)
+        for _ in range(20):
+            raw, _ = random_transaction(rng)
+            for size in range(0, len(raw), max(len(raw) // 50, 1)):
+                with self.assertRaises(RawTransactionError):
+                    decode_transaction(raw[:size], prefix="bchtest")
+
+            with self.assertRaises(RawTransactionError):
+                decode_transaction(raw + b"\x00", prefix="bchtest")
+
+    @tag("unit")
+    def test_accepts_memoryview(self):
+        raw, expected = random_transaction(random.Random(2))
+        frame = memoryview(bytearray(b"\x00" * 8 + raw))[8:]
+        self.assertEqual(decode_transaction(frame, prefix="bchtest")["vout"], expected["vout"])
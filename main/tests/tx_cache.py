@@ -0,0 +1,66 @@
+import json
+import pickle
+import zlib
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, tag
+
+from main.utils.tx_cache import LocalLRUCache, decode_tx, encode_tx
+
+
+TX = {
+    'txid': 'ab' * 32,
+    'hash': 'ab' * 32,
+    'size': 226,
+    'fee': Decimal('0.00000226'),
+    'vin': [{ 'txid': 'cd' * 32, 'vout': 1, 'prevout': { 'value': Decimal('0.1') } }],
+    'vout': [{ 'n': 0, 'value': Decimal('0.09999774'), 'scriptPubKey': { 'hex': '76a914' + '00' * 20 + '88ac' } }],
+}
+
+
+class LocalLRUCacheTestCase(SimpleTestCase):
+    @tag("unit")
+    def test_evicts_least_recently_used(self):
+        cache = LocalLRUCache(2)
+        cache.set('a', 1, 60)
+        cache.set('b', 2, 60)
+        cache.get('a')
+        cache.set('c', 3, 60)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+
+    @tag("unit")
+    def test_expires_items(self):
+        cache = LocalLRUCache(2)
+        with mock.patch('main.utils.tx_cache.time.monotonic', return_value=100):
+            cache.set('a', 1, 10)
+        with mock.patch('main.utils.tx_cache.time.monotonic', return_value=105):
+            self.assertEqual(cache.get('a'), 1)
+        with mock.patch('main.utils.tx_cache.time.monotonic', return_value=111):
+            self.assertIsNone(cache.get('a'))
+
+    @tag("unit")
+    def test_encoding_roundtrip(self):
+        value = encode_tx(TX)
+        self.assertIsInstance(value, bytes)
+
+        decoded = decode_tx(value)
+        self.assertEqual(decoded, TX)
+        self.assertIsInstance(decoded['fee'], Decimal)
+        # each decode is a separate copy that callers can mutate
+        self.assertIsNot(decode_tx(value)['vout'], decoded['vout'])
+
+    @tag("unit")
+    def test_encoding_is_json(self):
+        value = encode_tx(TX)
+        self.assertEqual(json.loads(zlib.decompress(value))['fee'], '0.00000226')
+
+        # anything else that ends up under the key is rejected, never unpickled
+        with self.assertRaises(ValueError):
+            decode_tx(zlib.compress(pickle.dumps(TX)))
+        with self.assertRaises(ValueError):
+            decode_tx(b'not a tx')
@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+
+from main.tasks import _process_mempool_transaction
+from main.tests.mocker.redis import FakeRedis
+from main.utils.tx_processing import (
+    STAGE_BLOCK,
+    STAGE_MEMPOOL,
+    STAGE_POST_SAVE,
+    TxProcessingRecord,
+    get_done_txids,
+    mark_txids_done,
+)
+
+
+TXID = 'ab' * 32
+
+
+class TxProcessingRecordTestCase(SimpleTestCase):
+    def setUp(self):
+        self.cache = FakeRedis()
+
+    def record(self):
+        return TxProcessingRecord(TXID, cache=self.cache, ttl=60, lease_ttl=60)
+
+    @tag("unit")
+    def test_stages(self):
+        record = self.record()
+        self.assertFalse(record.is_done(STAGE_POST_SAVE))
+
+        record.mark_done(STAGE_POST_SAVE)
+        self.assertTrue(self.record().is_done(STAGE_POST_SAVE))
+        self.assertFalse(self.record().is_done(STAGE_MEMPOOL))
+
+        record.reset()
+        self.assertFalse(record.is_done(STAGE_POST_SAVE))
+
+    @tag("unit")
+    def test_scoped_stages(self):
+        self.record().mark_done(STAGE_BLOCK, scope=100)
+        self.assertTrue(self.record().is_done(STAGE_BLOCK, scope=100))
+        self.assertFalse(self.record().is_done(STAGE_BLOCK, scope=101))
+        self.assertFalse(self.record().is_done(STAGE_BLOCK))
+
+    @tag("unit")
+    def test_txids_done(self):
+        other_txid = 'cd' * 32
+        mark_txids_done([TXID], STAGE_BLOCK, scope=100, cache=self.cache)
+        self.assertEqual(get_done_txids([TXID, other_txid], STAGE_BLOCK, scope=100, cache=self.cache), {TXID})
+        self.assertEqual(get_done_txids([TXID, other_txid], STAGE_BLOCK, scope=101, cache=self.cache), set())
+        self.assertEqual(get_done_txids([], STAGE_BLOCK, cache=self.cache), set())
+
+    @tag("unit")
+    def test_lease_is_exclusive(self):
+        first, second = self.record(), self.record()
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+
+        # releasing a lease that is not held leaves the holder's lease alone
+        second.release()
+        self.assertFalse(second.acquire())
+
+        first.release()
+        self.assertTrue(second.acquire())
+
+    @tag("unit")
+    def test_wallets_are_claimed_once(self):
+        self.assertEqual(self.record().claim_wallets(['bch|a', 'bch|b', 'bch|a']), ['bch|a', 'bch|b'])
+        self.assertEqual(self.record().claim_wallets(['bch|b', 'bch|c']), ['bch|c'])
+        self.assertEqual(self.record().claim_wallets([]), [])
+
+
+@override_settings(REDISKV=FakeRedis())
+@mock.patch("main.tasks.get_tx_processing_stats", mock.Mock())
+@mock.patch("main.tasks._process_mempool_transaction_once")
+@mock.patch("main.tasks.process_mempool_transaction_fast.apply_async")
+class MempoolLeaseTestCase(TestCase):
+    def setUp(self):
+        self.holder = TxProcessingRecord(TXID)
+        self.assertTrue(self.holder.acquire())
+        self.addCleanup(self.holder.release)
+
+    @tag("unit")
+    def test_busy_lease_requeues(self, apply_async, process_once):
+        _process_mempool_transaction(TXID)
+        process_once.assert_not_called()
+        apply_async.assert_called_once_with((TXID, None, False), { 'force': False }, countdown=5)
+
+    @tag("unit")
+    def test_busy_lease_requeues_forced_tx_without_resetting_it(self, apply_async, process_once):
+        self.holder.mark_done(STAGE_MEMPOOL)
+
+        _process_mempool_transaction(TXID, force=True)
+        process_once.assert_not_called()
+        apply_async.assert_called_once_with((TXID, None, False), { 'force': True }, countdown=5)
+        self.assertTrue(TxProcessingRecord(TXID).is_done(STAGE_MEMPOOL))
+
+        self.holder.release()
+        _process_mempool_transaction(TXID, force=True)
+        process_once.assert_called_once()
+        self.assertFalse(TxProcessingRecord(TXID).is_done(STAGE_MEMPOOL))
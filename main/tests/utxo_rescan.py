@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings, tag
+
+from main.models import Address, BlockHeight, Token, Transaction, Wallet
+from main.utils.utxo_rescan import WalletUtxoRescanner
+
+
+@override_settings(UTXO_RESCAN={ "BATCH_SIZE": 1, "CONCURRENCY": 2 })
+class WalletUtxoRescannerTestCase(TestCase):
+    def setUp(self):
+        self.bch = Token.objects.create(name="bch", tokenid="")
+        self.wallet = Wallet.objects.create(wallet_hash="wallet-hash", wallet_type="bch", version=2)
+        self.addresses = [
+            Address.objects.create(address=f"bchtest:address{index}", wallet=self.wallet, address_path=f"0/{index}")
+            for index in range(2)
+        ]
+
+    def create_output(self, txid, address, **fields):
+        Transaction.objects.bulk_create([Transaction(
+            txid=txid,
+            index=0,
+            address=address,
+            wallet=self.wallet,
+            token=self.bch,
+            source="test",
+            value=1000,
+            **fields,
+        )])
+
+    def rescan(self, utxos):
+        node = mock.Mock(source="bchn")
+        node.get_utxos_many.side_effect = lambda addresses: {
+            address: utxos.get(address, []) for address in addresses
+        }
+        with mock.patch("main.utils.utxo_rescan.BCHN", return_value=node):
+            return WalletUtxoRescanner(self.wallet).run()
+
+    @tag("unit")
+    def test_applies_node_utxo_set(self):
+        first, second = self.addresses
+        self.create_output("a" * 64, first)
+        # marked spent but still unspent on the node
+        self.create_output("b" * 64, first, spent=True)
+        # unspent in the db but spent on the node
+        self.create_output("c" * 64, second)
+
+        report = self.rescan({
+            first.address: [
+                { "tx_hash": "a" * 64, "tx_pos": 0, "height": 100, "value": 1000 },
+                { "tx_hash": "b" * 64, "tx_pos": 0, "height": 100, "value": 1000 },
+            ],
+            second.address: [
+                { "tx_hash": "d" * 64, "tx_pos": 1, "height": 0, "value": 5000 },
+            ],
+        })
+
+        self.assertEqual(report["addresses"], 2)
+        self.assertEqual(report["utxos"], 3)
+        self.assertEqual((report["created"], report["updated"], report["spent"]), (1, 2, 1))
+        self.assertEqual(set(report["timings"]), { "fetch", "diff", "apply", "total" })
+
+        unspent = Transaction.objects.filter(wallet=self.wallet, spent=False)
+        self.assertEqual(sorted(unspent.values_list("txid", flat=True)), ["a" * 64, "b" * 64, "d" * 64])
+        self.assertTrue(Transaction.objects.get(txid="c" * 64).spent)
+
+        block = BlockHeight.objects.get(number=100)
+        self.assertEqual(Transaction.objects.get(txid="a" * 64).blockheight, block)
+        self.assertIsNone(Transaction.objects.get(txid="d" * 64).blockheight)
+
+        # a second pass has nothing left to change
+        report = self.rescan({
+            first.address: [
+                { "tx_hash": "a" * 64, "tx_pos": 0, "height": 100, "value": 1000 },
+                { "tx_hash": "b" * 64, "tx_pos": 0, "height": 100, "value": 1000 },
+            ],
+            second.address: [
+                { "tx_hash": "d" * 64, "tx_pos": 1, "height": 0, "value": 5000 },
+            ],
+        })
+        self.assertEqual((report["created"], report["updated"], report["spent"]), (0, 0, 0))
+
+    @tag("unit")
+    def test_leaves_token_outputs_to_the_caller(self):
+        token_data = { "category": "ee" * 32, "amount": "10" }
+        report = self.rescan({
+            self.addresses[0].address: [
+                { "tx_hash": "e" * 64, "tx_pos": 0, "height": 0, "value": 1000, "token_data": token_data },
+            ],
+        })
+        self.assertEqual(report["created"], 0)
+        self.assertEqual(report["token_outputs"][0]["token_data"], token_data)
+        self.assertEqual(report["token_outputs"][0]["address"], self.addresses[0].address)
+        self.assertFalse(Transaction.objects.filter(txid="e" * 64).exists())
+
+    @tag("unit")
+    def test_output_saved_during_fetch_is_not_marked_spent(self):
+        def fetch_utxos(addresses):
+            # saved by another task after the node was queried
+            self.create_output("f" * 64, self.addresses[0])
+            return {}
+
+        # fetched on this thread, the outputs of the test's transaction aren't visible to other connections
+        with mock.patch.object(WalletUtxoRescanner, "fetch_utxos", side_effect=fetch_utxos):
+            report = self.rescan({})
+
+        self.assertEqual(report["spent"], 0)
+        self.assertFalse(Transaction.objects.get(txid="f" * 64).spent)
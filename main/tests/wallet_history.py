@@ -0,0 +1,54 @@
+from datetime import datetime
+from unittest import mock
+
+import pytz
+from django.test import SimpleTestCase, override_settings, tag
+
+from main.tests.mocker.redis import FakeRedis
+from main.utils.cache import WALLET_HISTORY_CACHE_TTL, set_cached_json, wallet_history_cache_key
+from main.views.view_history import (
+    HISTORY_PAGE_SIZE,
+    decode_history_cursor,
+    encode_history_cursor,
+    get_page_cursor_position,
+)
+
+
+@override_settings(REDISKV=FakeRedis())
+class WalletHistoryPaginationTestCase(SimpleTestCase):
+    @tag("unit")
+    def test_cursor_round_trip(self):
+        tx_timestamp = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=pytz.UTC)
+        cursor = encode_history_cursor({ 'tx_timestamp': tx_timestamp, 'id': 42 })
+        self.assertEqual(decode_history_cursor(cursor), (tx_timestamp, 42))
+
+        cursor = encode_history_cursor({ 'tx_timestamp': None, 'id': 7 })
+        self.assertEqual(decode_history_cursor(cursor), (None, 7))
+
+    @tag("unit")
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            decode_history_cursor('not-a-cursor')
+
+    @tag("unit")
+    def test_cache_key_follows_version_and_params(self):
+        key = wallet_history_cache_key('abc', 1, page=1, txids=['a', 'b'])
+        self.assertEqual(key, wallet_history_cache_key('abc', 1, txids=['a', 'b'], page=1))
+        self.assertNotEqual(key, wallet_history_cache_key('abc', 2, page=1, txids=['a', 'b']))
+        self.assertNotEqual(key, wallet_history_cache_key('abc', 1, page=2, txids=['a', 'b']))
+
+    @tag("unit")
+    def test_page_cursor_position(self):
+        tx_timestamp = datetime(2024, 5, 1, tzinfo=pytz.UTC)
+        queryset = mock.Mock()
+        queryset.values_list.return_value = [(tx_timestamp, index) for index in range(25, 0, -1)]
+
+        # the last row of the previous page
+        self.assertEqual(get_page_cursor_position(queryset, 2, 'page-2'), (tx_timestamp, 25 - HISTORY_PAGE_SIZE + 1))
+        self.assertIsNone(get_page_cursor_position(queryset, 4, 'page-4'))
+
+        # cached with the previous page, the rows aren't scanned
+        queryset.reset_mock()
+        set_cached_json('page-3', encode_history_cursor({ 'tx_timestamp': tx_timestamp, 'id': 6 }), WALLET_HISTORY_CACHE_TTL)
+        self.assertEqual(get_page_cursor_position(queryset, 3, 'page-3'), (tx_timestamp, 6))
+        queryset.values_list.assert_not_called()
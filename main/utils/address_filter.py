@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from main.utils.cashaddr import decode_hash
+
+
+LOGGER = logging.getLogger(__name__)
+
+ADDRESS_FILTER_CHANNEL = 'address-filter:delta'
+
+
+def publish_address_filter_delta(*addresses):
+    """
+        Notifies running address filters (e.g. in mempool_listener) of newly tracked addresses
+    """
+    addresses = [address for address in addresses if address]
+    if not addresses:
+        return
+    try:
+        settings.REDISKV.publish(ADDRESS_FILTER_CHANNEL, '\n'.join(addresses))
+    except Exception as exception:
+        LOGGER.error(f'Failed to publish address filter delta: {exception}')
+
+
+class AddressBloomFilter:
+    """
+        Bloom filter keyed on address hash payloads (hash160 / 32-byte script hashes)
+        The keys are already uniformly distributed hashes, so the bit positions are
+        derived from them directly with double hashing instead of rehashing.
+    """
+    BITS_PER_ITEM = 10
+    NUM_HASHES = 7
+
+    def __init__(self, capacity):
+        self.capacity = max(int(capacity), 1024)
+        self.size = self.capacity * self.BITS_PER_ITEM
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        if len(key) < 16:
+            key = hashlib.sha256(key).digest()
+        h1 = int.from_bytes(key[0:8], 'little')
+        h2 = int.from_bytes(key[8:16], 'little') | 1
+        for i in range(self.NUM_HASHES):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        for position in self._positions(key):
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    @property
+    def is_full(self):
+        return self.count > self.capacity
+
+
+class SubscribedAddressIndex:
+    """
+        Process-local membership index of tracked addresses (subscribed addresses and
+        anyhedge contract addresses). Loaded from the DB on start, kept current through
+        the redis pub/sub delta channel and periodically rebuilt to shed stale entries.
+        False positives are possible, false negatives are not (barring a missed delta
+        between reloads), so callers must still confirm hits against the DB.
+    """
+
+    def __init__(self, reload_interval=3600, headroom=2):
+        self.reload_interval = reload_interval
+        self.headroom = headroom
+        self.bloom_filter = None
+        self.loaded_at = None
+        self._lock = threading.Lock()
+        self._reload_backlog = None
+        self._pubsub_thread = None
+
+    @staticmethod
+    def _iter_tracked_addresses():
+        from main.models import Address
+        from anyhedge.models import HedgePosition
+
+        yield from Address.objects.values_list('address', flat=True).iterator(chunk_size=10000)
+        yield from HedgePosition.objects.values_list('address', flat=True).iterator(chunk_size=10000)
+
+    def reload(self):
+        from main.models import Address
+        from anyhedge.models import HedgePosition
+
+        start = time.time()
+        # deltas received while loading are replayed onto the new filter
+        with self._lock:
+            self._reload_backlog = []
+
+        count = Address.objects.count() + HedgePosition.objects.count()
+        bloom_filter = AddressBloomFilter(count * self.headroom)
+        for address in self._iter_tracked_addresses():
+            _hash = decode_hash(address)
+            if _hash:
+                bloom_filter.add(_hash)
+
+        with self._lock:
+            for _hash in self._reload_backlog:
+                bloom_filter.add(_hash)
+            self._reload_backlog = None
+            self.bloom_filter = bloom_filter
+            self.loaded_at = time.time()
+
+        LOGGER.info(f'Loaded address filter with {bloom_filter.count} addresses in {round(time.time() - start, 2)}s')
+
+    def add(self, *addresses):
+        with self._lock:
+            for address in addresses:
+                _hash = decode_hash(address)
+                if not _hash:
+                    continue
+                self.bloom_filter.add(_hash)
+                if self._reload_backlog is not None:
+                    self._reload_backlog.append(_hash)
+            needs_reload = self.bloom_filter.is_full and self._reload_backlog is None
+
+        if needs_reload:
+            self.reload_in_background()
+
+    def reload_in_background(self):
+        if self._reload_backlog is not None:
+            return
+        threading.Thread(target=self.reload, daemon=True).start()
+
+    def contains_any(self, hashes):
+        if self.loaded_at and time.time() - self.loaded_at > self.reload_interval:
+            # prevents scheduling another reload while this one runs
+            self.loaded_at = time.time()
+            self.reload_in_background()
+
+        bloom_filter = self.bloom_filter
+        return any(_hash in bloom_filter for _hash in hashes)
+
+    def _on_delta(self, message):
+        data = message.get('data')
+        if isinstance(data, bytes):
+            data = data.decode()
+        if data:
+            self.add(*data.split('\n'))
+
+    def start(self):
+        """
+            Loads the filter and starts listening for address deltas in a background thread
+            Subscribing before loading ensures no address created during the load is missed
+        """
+        pubsub = settings.REDISKV.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{ ADDRESS_FILTER_CHANNEL: self._on_delta })
+        self.bloom_filter = AddressBloomFilter(1024)
+        self.reload()
+        self._pubsub_thread = pubsub.run_in_thread(sleep_time=1, daemon=True)
+        return self
@@ -0,0 +1,249 @@
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction as trans
+from django.utils import timezone
+from redis.exceptions import LockError
+
+from main.models import BlockHeight, Transaction
+from main.utils.queries.bchn import BCHN
+
+
+LOGGER = logging.getLogger(__name__)
+
+REDIS_STORAGE = settings.REDISKV
+
+# sorted set of block numbers waiting to be scanned, scored by block number
+PENDING_BLOCKS_KEY = 'PENDING-BLOCKS'
+SCANNER_LOCK_KEY = 'BLOCK-SCANNER-LOCK'
+# failed fetches per block number
+FETCH_ATTEMPTS_KEY = 'BLOCK-FETCH-ATTEMPTS'
+# sorted set of block numbers set aside after repeated failed fetches, scored by when to retry them
+FAILED_BLOCKS_KEY = 'FAILED-BLOCKS'
+
+
+def queue_blocks(*numbers):
+    """
+        Adds block numbers to the pending set, returns the count of newly added blocks
+    """
+    if not numbers:
+        return 0
+    return REDIS_STORAGE.zadd(PENDING_BLOCKS_KEY, { str(number): number for number in numbers })
+
+
+def get_pending_blocks(limit=None):
+    end = -1 if limit is None else limit - 1
+    return [int(number) for number in REDIS_STORAGE.zrange(PENDING_BLOCKS_KEY, 0, end)]
+
+
+def remove_pending_blocks(*numbers):
+    if numbers:
+        REDIS_STORAGE.zrem(PENDING_BLOCKS_KEY, *[str(number) for number in numbers])
+
+
+def set_aside_block(number, retry_delay):
+    """
+        Moves a block that keeps failing out of the pending set until 'retry_delay' seconds from now
+    """
+    pipeline = REDIS_STORAGE.pipeline()
+    pipeline.zrem(PENDING_BLOCKS_KEY, str(number))
+    pipeline.zadd(FAILED_BLOCKS_KEY, { str(number): time.time() + retry_delay })
+    pipeline.hdel(FETCH_ATTEMPTS_KEY, str(number))
+    pipeline.execute()
+
+
+def get_failed_blocks():
+    return [int(number) for number in REDIS_STORAGE.zrange(FAILED_BLOCKS_KEY, 0, -1)]
+
+
+def requeue_failed_blocks():
+    """
+        Queues again the blocks set aside whose retry time has come, returns their numbers
+    """
+    numbers = [int(number) for number in REDIS_STORAGE.zrangebyscore(FAILED_BLOCKS_KEY, '-inf', time.time())]
+    if numbers:
+        REDIS_STORAGE.zrem(FAILED_BLOCKS_KEY, *[str(number) for number in numbers])
+        queue_blocks(*numbers)
+    return numbers
+
+
+class BlockScanner:
+    """
+        Scans pending blocks in height order. Blocks are fetched & parsed concurrently
+        in a thread pool ahead of the writer, while the writer commits them strictly
+        in ascending height order. A block whose parent hash does not match the stored
+        hash of the previous block triggers a rollback of the orphaned blocks.
+        A block that fails to be fetched stops the run, and after 'MAX_FETCH_ATTEMPTS'
+        runs it is set aside for 'RETRY_DELAY' seconds so the blocks after it are scanned.
+
+        process_block: callable(parsed_txs, block_id) that saves a block's transactions
+    """
+
+    def __init__(self, process_block, prefetch=None, max_blocks=None, lock_timeout=600):
+        self.process_block = process_block
+        self.prefetch = prefetch or settings.BLOCK_SCANNER["PREFETCH"]
+        self.max_blocks = max_blocks or settings.BLOCK_SCANNER["MAX_BLOCKS_PER_RUN"]
+        self.lock_timeout = lock_timeout
+        self.max_fetch_attempts = settings.BLOCK_SCANNER["MAX_FETCH_ATTEMPTS"]
+        self.retry_delay = settings.BLOCK_SCANNER["RETRY_DELAY"]
+        # the node's pooled RPC client is shared safely by the fetcher threads
+        self.node = BCHN()
+
+    def fetch_block(self, number):
+        block_hash = self.node.get_block_hash(number)
+        block = self.node.get_block_data(block_hash, verbosity=3)
+
+        parsed_txs = []
+        for tx in block['tx']:
+            tx['time'] = block['time'] # tx from 'getblock' doesn't include the tx's timestamp
+            parsed_txs.append(self.node._parse_transaction(tx))
+
+        return {
+            'number': number,
+            'hash': block['hash'],
+            'previous_hash': block.get('previousblockhash'),
+            'txs': parsed_txs,
+        }
+
+    def seed_pending_blocks(self):
+        numbers = BlockHeight.objects.filter(
+            processed=False,
+            requires_full_scan=True,
+        ).exclude(
+            number__in=get_failed_blocks(),
+        ).values_list('number', flat=True)
+        queue_blocks(*numbers)
+
+    def record_failed_fetch(self, number):
+        """
+            Returns True if the block was set aside
+        """
+        attempts = REDIS_STORAGE.hincrby(FETCH_ATTEMPTS_KEY, str(number), 1)
+        if attempts < self.max_fetch_attempts:
+            return False
+
+        LOGGER.error(f'SETTING ASIDE BLOCK {number} AFTER {attempts} FAILED FETCHES')
+        set_aside_block(number, self.retry_delay)
+        return True
+
+    def find_orphaned_blocks(self, number):
+        """
+            Walks back from block number until a stored block hash matches the active chain
+        """
+        orphaned = []
+        for _ in range(settings.BLOCK_SCANNER["MAX_REORG_DEPTH"]):
+            stored_hash = BlockHeight.objects.filter(number=number).values_list('block_hash', flat=True).first()
+            if not stored_hash or stored_hash == self.node.get_block_hash(number):
+                break
+            orphaned.append(number)
+            number -= 1
+        return orphaned
+
+    def rollback_blocks(self, numbers):
+        """
+            Detaches transactions from orphaned blocks and queues the blocks for rescanning
+            Detached transactions get their block height back when the replacement block is scanned
+        """
+        LOGGER.warning(f'REORG DETECTED, ROLLING BACK BLOCKS: {numbers}')
+        with trans.atomic():
+            blocks = BlockHeight.objects.filter(number__in=numbers)
+            Transaction.objects.filter(blockheight__in=blocks).update(blockheight=None)
+            blocks.update(processed=False, block_hash=None, transactions_count=0)
+        queue_blocks(*numbers)
+
+    def check_reorg(self, block):
+        previous_hash = BlockHeight.objects \
+            .filter(number=block['number'] - 1) \
+            .values_list('block_hash', flat=True) \
+            .first()
+
+        if not previous_hash or not block['previous_hash'] or previous_hash == block['previous_hash']:
+            return False
+
+        orphaned = self.find_orphaned_blocks(block['number'] - 1)
+        if orphaned:
+            self.rollback_blocks(orphaned)
+        return True
+
+    def write_block(self, block, block_id):
+        self.process_block(block['txs'], block_id)
+        BlockHeight.objects.filter(id=block_id).update(
+            processed=True,
+            block_hash=block['hash'],
+            transactions_count=len(block['txs']),
+            updated_datetime=timezone.now(),
+        )
+        remove_pending_blocks(block['number'])
+        REDIS_STORAGE.hdel(FETCH_ATTEMPTS_KEY, str(block['number']))
+
+    def scan(self, numbers, lock=None):
+        block_ids = dict(BlockHeight.objects.filter(number__in=numbers).values_list('number', 'id'))
+        discarded = [number for number in numbers if number not in block_ids]
+        remove_pending_blocks(*discarded)
+        numbers = [number for number in numbers if number in block_ids]
+
+        scanned = []
+        with ThreadPoolExecutor(max_workers=self.prefetch) as executor:
+            queued_numbers = deque(numbers)
+            futures = deque()
+
+            def fill():
+                while queued_numbers and len(futures) < self.prefetch:
+                    number = queued_numbers.popleft()
+                    futures.append((number, executor.submit(self.fetch_block, number)))
+
+            fill()
+            while futures:
+                number, future = futures.popleft()
+                try:
+                    block = future.result()
+                except Exception as exception:
+                    LOGGER.error(f'FAILED TO FETCH BLOCK {number}: {exception}')
+                    if self.record_failed_fetch(number):
+                        fill()
+                        continue
+                    # later blocks must not be written before this one, unless it was set aside
+                    break
+
+                if self.check_reorg(block):
+                    # rolled back blocks are now pending and are scanned first on the next run
+                    break
+
+                LOGGER.info(f'PROCESSING BLOCK {number}')
+                self.write_block(block, block_ids[number])
+                scanned.append(number)
+
+                if lock:
+                    lock.reacquire()
+                fill()
+
+            for _, future in futures:
+                future.cancel()
+
+        return scanned
+
+    def run(self):
+        lock = REDIS_STORAGE.lock(SCANNER_LOCK_KEY, timeout=self.lock_timeout)
+        if not lock.acquire(blocking=False):
+            return 'BLOCK SCANNER BUSY'
+
+        try:
+            requeue_failed_blocks()
+            numbers = get_pending_blocks(self.max_blocks)
+            if not numbers:
+                self.seed_pending_blocks()
+                numbers = get_pending_blocks(self.max_blocks)
+
+            if not numbers:
+                return 'NO PENDING BLOCKS'
+
+            scanned = self.scan(numbers, lock=lock)
+            return f'SCANNED BLOCKS: {scanned}'
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                pass
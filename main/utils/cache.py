@@ -0,0 +1,126 @@
+import hashlib
+import json
+import time
+import zlib
+
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+
+WALLET_HISTORY_CACHE_TTL = 60 * 60
+WALLET_BALANCE_CACHE_TTL = 24 * 60 * 60
+
+# tag of every cached wallet response, bumped by the clear_caches command
+GLOBAL_TAG = 'wallet'
+
+
+def wallet_tag(wallet_hash):
+    return f'wallet:{wallet_hash}'
+
+
+def wallet_history_tag(wallet_hash):
+    return f'wallet:{wallet_hash}:history'
+
+
+def wallet_balance_tag(wallet_hash, category=None):
+    return f'wallet:{wallet_hash}:balance:{category or "bch"}'
+
+
+def get_generations(*tags, cache=None):
+    """
+        Returns the current generation of each tag as a string, e.g. '3.0.12'
+        Cached values are keyed by the generations of their tags, so bumping a tag
+        invalidates its values without looking them up. Stale values expire by TTL.
+    """
+    cache = cache or settings.REDISKV
+    generations = cache.mget([f'cache:generation:{tag}' for tag in tags])
+    return '.'.join(str(int(generation or 0)) for generation in generations)
+
+
+def bump_generations(*tags, cache=None):
+    """
+        Invalidates every cached value of the tags in one round trip
+    """
+    tags = set(tag for tag in tags if tag)
+    if not tags:
+        return
+
+    # a counter that went missing restarts from the clock instead of 0,
+    # so it does not come back to generations of values that are still cached
+    seed = int(time.time() * 1000)
+    cache = cache or settings.REDISKV
+    pipeline = cache.pipeline(transaction=False)
+    for tag in tags:
+        key = f'cache:generation:{tag}'
+        pipeline.set(key, seed, nx=True)
+        pipeline.incr(key)
+    pipeline.execute()
+
+
+def clear_wallet_caches(wallet_hash, category=None):
+    """
+        Invalidates the cached bch balance & history of a wallet, and its token balance
+        category: cashtoken category, None for bch
+    """
+    bump_generations(
+        wallet_balance_tag(wallet_hash),
+        wallet_balance_tag(wallet_hash, category) if category else None,
+        wallet_history_tag(wallet_hash),
+    )
+
+
+def clear_all_wallet_caches(*wallet_hashes):
+    """
+        Invalidates every cached balance & history of the wallets, or of all wallets if none given
+    """
+    if wallet_hashes:
+        bump_generations(*[wallet_tag(wallet_hash) for wallet_hash in wallet_hashes])
+    else:
+        bump_generations(GLOBAL_TAG)
+
+
+def wallet_balance_cache_key(wallet_hash, category=None):
+    generations = get_generations(
+        GLOBAL_TAG,
+        wallet_tag(wallet_hash),
+        wallet_balance_tag(wallet_hash, category),
+    )
+    if category:
+        return f'wallet:balance:token:{wallet_hash}:{category}:{generations}'
+    return f'wallet:balance:bch:{wallet_hash}:{generations}'
+
+
+def get_wallet_history_version(wallet_hash):
+    return get_generations(
+        GLOBAL_TAG,
+        wallet_tag(wallet_hash),
+        wallet_history_tag(wallet_hash),
+    )
+
+
+def bump_wallet_history_version(*wallet_hashes):
+    """
+        Invalidates every cached history page of the wallets
+    """
+    bump_generations(*[wallet_history_tag(wallet_hash) for wallet_hash in wallet_hashes if wallet_hash])
+
+
+def wallet_history_cache_key(wallet_hash, version, **params):
+    """
+        Returns the cache key of a wallet history response for a combination of request params
+    """
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f'wallet:history:{wallet_hash}:{version}:{digest}'
+
+
+def get_cached_json(key):
+    value = settings.REDISKV.get(key)
+    if value is None:
+        return None
+    return json.loads(zlib.decompress(value))
+
+
+def set_cached_json(key, data, ttl):
+    # encoded the same way DRF renders responses, so cached & fresh responses are identical
+    value = zlib.compress(json.dumps(data, cls=JSONEncoder, separators=(',', ':')).encode())
+    settings.REDISKV.set(key, value, ex=ttl)
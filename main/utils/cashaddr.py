@@ -0,0 +1,74 @@
+from cashaddress.crypto import (
+    b32decode,
+    b32encode,
+    calculate_checksum,
+    convertbits,
+    verify_checksum,
+)
+from django.conf import settings
+
+# version bytes
+P2PKH = 0x00
+P2SH20 = 0x08
+P2SH32 = 0x0b
+TOKEN_P2PKH = 0x10
+TOKEN_P2SH20 = 0x18
+TOKEN_P2SH32 = 0x1b
+
+
+class InvalidCashAddress(Exception):
+    pass
+
+
+def decode(address, default_prefix='bitcoincash'):
+    """
+        Decodes a cash address into (prefix, version byte, hash payload bytes)
+        Unlike `cashaddress.convert`, this accepts any version byte so it also
+        handles token-aware (type 2/3) and 32-byte P2SH addresses.
+    """
+    if not isinstance(address, str):
+        raise InvalidCashAddress('Expected string as input')
+
+    if address.upper() != address and address.lower() != address:
+        raise InvalidCashAddress('Cash address contains uppercase and lowercase characters')
+
+    address = address.lower()
+    if ':' in address:
+        prefix, base32string = address.split(':', 1)
+    else:
+        prefix, base32string = default_prefix, address
+
+    decoded = b32decode(base32string)
+    if -1 in decoded or not verify_checksum(prefix, decoded):
+        raise InvalidCashAddress('Bad cash address checksum')
+
+    converted = convertbits(decoded[:-8], 5, 8, pad=False)
+    if not converted:
+        raise InvalidCashAddress('Invalid cash address payload')
+
+    return prefix, converted[0], bytes(converted[1:])
+
+
+def decode_hash(address):
+    """
+        Returns only the hash payload of a cash address, None if it can't be decoded
+    """
+    try:
+        return decode(address)[2]
+    except InvalidCashAddress:
+        return None
+
+
+def network_prefix():
+    if settings.BCH_NETWORK == 'mainnet':
+        return 'bitcoincash'
+    return 'bchtest'
+
+
+def encode(prefix, version, payload):
+    """
+        Encodes a hash payload into a cash address, e.g. encode('bitcoincash', P2PKH, hash160)
+    """
+    data = convertbits(bytes([version]) + bytes(payload), 8, 5)
+    checksum = calculate_checksum(prefix, data)
+    return f'{prefix}:{b32encode(data + checksum)}'
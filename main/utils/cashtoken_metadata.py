@@ -0,0 +1,168 @@
+import json
+import logging
+import re
+import threading
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+
+LOGGER = logging.getLogger(__name__)
+
+# cached entries outlive their freshness so stale metadata is served while it is refreshed
+CACHE_RETENTION = 60 * 60 * 24 * 7
+
+MAX_AGE_REGEX = re.compile(r'max-age=(\d+)')
+
+_service = None
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_cashtoken_metadata_service():
+    global _service
+    if _service is None:
+        _service = CashTokenMetadataService()
+    return _service
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = requests.Session()
+    return _session
+
+
+def metadata_key(category):
+    return f'cashtoken:metadata:{category}'
+
+
+def refresh_guard_key(category):
+    return f'cashtoken:metadata:{category}:refresh'
+
+
+class CashTokenMetadataService(object):
+    """
+        Serves BCMR metadata of CashToken categories from redis, backed by CashTokenMetadata rows
+        Reads never wait on the BCMR indexer. Missing or stale metadata queues a background
+        refresh, at most one per category every 'REFRESH_INTERVAL' seconds however many
+        outputs of the category arrive. Refreshes send the stored ETag, so unchanged
+        metadata costs a 304 instead of a full response.
+    """
+
+    def __init__(self, cache=None, session=None):
+        config = settings.CASHTOKEN_METADATA
+        self.cache = cache or settings.REDISKV
+        self.session = session
+        self.ttl = config['TTL']
+        self.refresh_interval = config['REFRESH_INTERVAL']
+        self.timeout = config['TIMEOUT']
+
+    def get(self, category):
+        """
+            Returns the cached { data, etag, expires_at } of the category, None if it was never fetched
+            data is None if the category has no metadata.
+        """
+        entry = self.cache.get(metadata_key(category))
+        if entry is not None:
+            entry = json.loads(entry)
+        else:
+            entry = self.load(category)
+
+        if entry is None or entry['expires_at'] <= timezone.now().timestamp():
+            self.queue_refresh(category)
+        return entry
+
+    def load(self, category):
+        from main.models import CashTokenMetadata
+
+        metadata = CashTokenMetadata.objects.filter(category=category).first()
+        if metadata is None:
+            return None
+        return self.store(metadata)
+
+    def store(self, metadata):
+        entry = {
+            'data': metadata.data,
+            'etag': metadata.etag,
+            'expires_at': metadata.expires_at.timestamp(),
+        }
+        self.cache.set(metadata_key(metadata.category), json.dumps(entry), ex=CACHE_RETENTION)
+        return entry
+
+    def queue_refresh(self, category, force=False):
+        """
+            force: queue even if the category was refreshed within the refresh interval, e.g. on a BCMR webhook
+            Returns True if a refresh was queued
+        """
+        guard_key = refresh_guard_key(category)
+        if force:
+            self.cache.set(guard_key, 1, ex=self.refresh_interval)
+        elif not self.cache.set(guard_key, 1, ex=self.refresh_interval, nx=True):
+            return False
+
+        from main.tasks import refresh_cashtoken_metadata
+        refresh_cashtoken_metadata.delay(category, force=force)
+        return True
+
+    def get_ttl(self, response):
+        match = MAX_AGE_REGEX.search(response.headers.get('Cache-Control') or '')
+        if match:
+            return max(int(match.group(1)), self.refresh_interval)
+        return self.ttl
+
+    def refresh(self, category, force=False):
+        """
+            Fetches the category's metadata, returns the stored entry or None if the fetch failed
+            force: skips the ETag, so the metadata is applied to the category's tokens even if unchanged
+        """
+        from main.models import CashTokenMetadata, CashFungibleToken
+
+        metadata = CashTokenMetadata.objects.filter(category=category).first()
+        headers = {}
+        if metadata and metadata.etag and not force:
+            headers['If-None-Match'] = metadata.etag
+
+        url = f'{settings.PAYTACA_BCMR_URL}/tokens/{category}/'
+        try:
+            response = (self.session or get_session()).get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException as exception:
+            # stale metadata is kept & retried after the refresh interval
+            LOGGER.warning(f'CASHTOKEN METADATA {category}: {exception}')
+            return None
+
+        changed = True
+        if response.status_code == 304 and metadata:
+            data, etag = metadata.data, metadata.etag
+            changed = False
+        elif response.status_code == 200:
+            data, etag = response.json(), response.headers.get('ETag')
+            if 'error' in data:
+                data = None
+        elif response.status_code == 404:
+            data, etag = None, None
+        else:
+            LOGGER.warning(f'CASHTOKEN METADATA {category}: {response.status_code} response')
+            return None
+
+        now = timezone.now()
+        metadata, _ = CashTokenMetadata.objects.update_or_create(
+            category=category,
+            defaults=dict(
+                data=data,
+                etag=etag,
+                status_code=response.status_code,
+                fetched_at=now,
+                expires_at=now + timedelta(seconds=self.get_ttl(response)),
+            ),
+        )
+        entry = self.store(metadata)
+
+        if changed and data:
+            cashtoken, _ = CashFungibleToken.objects.get_or_create(category=category)
+            cashtoken.apply_metadata(data)
+        return entry
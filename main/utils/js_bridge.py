@@ -0,0 +1,256 @@
+import json
+import logging
+import os
+import threading
+import time
+from subprocess import run, PIPE, TimeoutExpired
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from main.utils.stats import StatsCounter
+
+
+LOGGER = logging.getLogger(__name__)
+
+JS_BRIDGE_STATS_KEY = 'js-bridge:stats'
+
+_stats = None
+
+
+def get_js_bridge_stats():
+    global _stats
+    if _stats is None:
+        _stats = StatsCounter(JS_BRIDGE_STATS_KEY)
+    return _stats
+
+
+class JSBridgeError(Exception):
+    pass
+
+
+class JSBridgeUnavailable(JSBridgeError):
+    """
+        Raised when neither the script server nor a fallback node process can run a function
+    """
+    pass
+
+
+class CircuitBreaker(object):
+    """
+        Opens after 'failure_threshold' consecutive failures, then lets a single
+        trial call through every 'reset_timeout' seconds until one succeeds
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # half open, the next trial call decides whether it closes
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class JSBridge(object):
+    """
+        Calls functions of a JS script server (see e.g. anyhedge/js/src/server.js)
+        The server is called over a keep-alive session. While it is unreachable, calls
+        fall back to a one-off node process running the script's main.js, at most
+        'MAX_FALLBACK_PROCESSES' at a time per process. Either path is skipped
+        for a while by its circuit breaker after repeated failures, so an outage
+        does not turn every call into a slow timeout or a new node process.
+    """
+
+    def __init__(self, name, url, script, timeouts=None, pool_maxsize=16):
+        """
+            name: used to label the bridge's stats
+            url: script server url, e.g. 'http://localhost:3020/'
+            script: path of the main.js run by fallback node processes
+            timeouts: dict of function name -> seconds, for functions slower than the default
+        """
+        config = settings.JS_BRIDGE
+        self.name = name
+        self.url = url
+        self.script = script
+        self.timeouts = timeouts or {}
+        self.default_timeout = config['TIMEOUT']
+        self.pool_maxsize = pool_maxsize
+        self.server_breaker = CircuitBreaker(config['FAILURE_THRESHOLD'], config['RESET_TIMEOUT'])
+        self.fallback_breaker = CircuitBreaker(config['FAILURE_THRESHOLD'], config['RESET_TIMEOUT'])
+        self.fallback_slots = threading.BoundedSemaphore(config['MAX_FALLBACK_PROCESSES'])
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        # recreated after a fork so child processes don't share the parent's sockets
+        pid = os.getpid()
+        if self._session is None or self._session_pid != pid:
+            with self._session_lock:
+                if self._session is None or self._session_pid != pid:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                    session.mount('http://', adapter)
+                    self._session = session
+                    self._session_pid = pid
+        return self._session
+
+    def get_timeout(self, func_name):
+        return self.timeouts.get(func_name, self.default_timeout)
+
+    def call(self, func_name, *args):
+        start = time.perf_counter()
+        try:
+            return self._call(func_name, args)
+        except Exception:
+            self.record(func_name, 'errors')
+            raise
+        finally:
+            self.record_latency(func_name, time.perf_counter() - start)
+
+    def call_many(self, calls, raise_errors=True):
+        """
+            Runs several functions in a single request to the script server
+            calls: list of (func_name, *args) tuples
+            Returns results in the same order as calls. With raise_errors=False,
+            failed calls return their JSBridgeError instead of raising.
+        """
+        if not calls:
+            return []
+
+        start = time.perf_counter()
+        payload = [{ "function": func_name, "params": args } for func_name, *args in calls]
+        timeout = max(self.get_timeout(func_name) for func_name, *_ in calls)
+
+        responses = None
+        if self.server_breaker.allow():
+            try:
+                responses = self.post(f'{self.url}batch', payload, timeout).json()
+            except requests.exceptions.ConnectionError:
+                LOGGER.warning(f"{self.name} script server unreachable, running {len(calls)} calls one by one")
+
+        if responses is None:
+            results = []
+            for func_name, *args in calls:
+                try:
+                    results.append(self.call(func_name, *args))
+                except JSBridgeError as exception:
+                    if raise_errors:
+                        raise
+                    results.append(exception)
+            return results
+
+        duration = (time.perf_counter() - start) / len(calls)
+        results = []
+        for (func_name, *_), response in zip(calls, responses):
+            # each call is counted with an equal share of the batch's latency
+            self.record_latency(func_name, duration)
+            if response.get('success'):
+                results.append(response.get('result'))
+                continue
+
+            self.record(func_name, 'errors')
+            exception = JSBridgeError(f"{func_name} | {response.get('error')}")
+            if raise_errors:
+                raise exception
+            results.append(exception)
+        return results
+
+    def post(self, url, data, timeout):
+        try:
+            response = self.session.post(url, data=json.dumps(data), timeout=timeout)
+        except requests.exceptions.ConnectionError:
+            self.server_breaker.record_failure()
+            raise
+        except requests.exceptions.Timeout as exception:
+            # the server may still be running the function, so it is not run again in another process
+            self.server_breaker.record_failure()
+            raise JSBridgeError(f"{self.name} script server timed out after {timeout}s") from exception
+
+        self.server_breaker.record_success()
+        if not response.ok:
+            raise JSBridgeError(response.content.decode())
+        return response
+
+    def _call(self, func_name, args):
+        _input = {
+            "function": func_name,
+            "params": args,
+        }
+        timeout = self.get_timeout(func_name)
+
+        if self.server_breaker.allow():
+            try:
+                response = self.post(self.url, _input, timeout)
+                try:
+                    return response.json()
+                except json.JSONDecodeError:
+                    return response.content
+            except requests.exceptions.ConnectionError:
+                LOGGER.warning(f"{self.name} script server unreachable, running {func_name} in a new process")
+
+        return self.spawn(func_name, _input, timeout)
+
+    def spawn(self, func_name, _input, timeout):
+        if not self.fallback_breaker.allow():
+            raise JSBridgeUnavailable(f"{self.name} script server & fallback processes are failing, {func_name} not run")
+        if not self.fallback_slots.acquire(timeout=timeout):
+            raise JSBridgeUnavailable(f"{self.name} fallback processes are all busy, {func_name} not run")
+
+        self.record(func_name, 'fallbacks')
+        try:
+            process = run(['node', self.script], input=json.dumps(_input).encode(), stdout=PIPE, stderr=PIPE, timeout=timeout)
+        except TimeoutExpired as exception:
+            self.fallback_breaker.record_failure()
+            raise JSBridgeError(f"{func_name} timed out after {timeout}s") from exception
+        finally:
+            self.fallback_slots.release()
+
+        LOGGER.info(f"{func_name} | {process}")
+        # a function's own error exits normally, a non-zero exit means node itself failed
+        if process.returncode:
+            self.fallback_breaker.record_failure()
+        else:
+            self.fallback_breaker.record_success()
+
+        result = None
+        if process.stdout:
+            try:
+                result = json.loads(process.stdout)
+            except json.JSONDecodeError:
+                result = process.stdout
+        elif process.stderr:
+            raise JSBridgeError(f"{func_name} | {process.stderr.decode()}")
+        return result
+
+    def record(self, func_name, counter, count=1):
+        get_js_bridge_stats().incr(f'{self.name}.{func_name}:{counter}', count)
+
+    def record_latency(self, func_name, duration):
+        get_js_bridge_stats().observe(f'{self.name}.{func_name}', duration)
@@ -0,0 +1,196 @@
+import logging
+from collections import namedtuple
+from functools import reduce
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from main.models import CashNonFungibleTokenGenesis
+from main.utils.queries.bchn import BCHN
+
+
+LOGGER = logging.getLogger(__name__)
+
+PENDING_KEY = 'nft-genesis:pending'
+FLUSH_SCHEDULED_KEY = 'nft-genesis:flush-scheduled'
+
+Status = CashNonFungibleTokenGenesis.Status
+
+# (category, capability, commitment, txid, index) of an NFT output
+NftOutpoint = namedtuple('NftOutpoint', ['category', 'capability', 'commitment', 'txid', 'index'])
+Outpoint = namedtuple('Outpoint', ['txid', 'index'])
+
+
+class NftGenesisResolver:
+    """
+        Traces CashToken NFTs back to the tx that created them, either the category's
+        genesis or a tx spending a minting NFT
+        Outpoints are looked up in CashNonFungibleTokenGenesis first, and every outpoint
+        passed is saved there, so NFTs of the same lineage never fetch the same ancestor twice.
+        NFTs are traced together a level at a time, each level's txs fetched in one batch.
+    """
+
+    def __init__(self, node=None, max_depth=None):
+        self.node = node or BCHN()
+        self.max_depth = max_depth or settings.NFT_GENESIS['MAX_DEPTH']
+        # txs that minted NFTs traced in this run, txid -> (tx, minting input index)
+        self._minting_txs = {}
+
+    @property
+    def minting_txs(self):
+        return list(self._minting_txs.values())
+
+    def resolve(self, nfts):
+        """
+            nfts: NftOutpoints to trace
+            Returns dict of NftOutpoint -> dict(status, genesis_txid, genesis_input_index)
+            NFTs that weren't traced to their origin within max depth fetches are left out,
+            their next trace continues from where this one stopped.
+        """
+        nfts = set(NftOutpoint(*nft) for nft in nfts)
+        chains = { nft: [Outpoint(nft.txid, nft.index)] for nft in nfts }
+        fetches = { nft: 0 for nft in nfts }
+        results = {}
+
+        active = set(nfts)
+        while active:
+            saved = self.lookup(active, chains)
+
+            to_fetch = []
+            for nft in list(active):
+                row = saved.get((nft.category, nft.capability, nft.commitment) + tuple(chains[nft][-1]))
+                if row is None:
+                    if fetches[nft] >= self.max_depth:
+                        LOGGER.info(f"NFT GENESIS | max depth reached | {nft}")
+                        active.discard(nft)
+                    else:
+                        to_fetch.append(nft)
+                elif row.status == Status.PENDING:
+                    chains[nft].append(Outpoint(row.ancestor_txid, row.ancestor_index))
+                else:
+                    results[nft] = dict(
+                        status=row.status,
+                        genesis_txid=row.genesis_txid,
+                        genesis_input_index=row.genesis_input_index,
+                    )
+                    active.discard(nft)
+
+            if not to_fetch:
+                continue
+
+            txs = self.node.get_transactions(set(chains[nft][-1].txid for nft in to_fetch))
+            for nft in to_fetch:
+                fetches[nft] += 1
+                tx = txs.get(chains[nft][-1].txid)
+                status, input_index, ancestor = self.inspect(nft, tx)
+                if status == Status.PENDING:
+                    chains[nft].append(ancestor)
+                    continue
+
+                results[nft] = dict(
+                    status=status,
+                    genesis_txid=tx["txid"] if tx else None,
+                    genesis_input_index=input_index,
+                )
+                if status == Status.MINTED:
+                    self._minting_txs[tx["txid"]] = (tx, input_index)
+                active.discard(nft)
+
+        self.save(chains, results)
+        return results
+
+    def inspect(self, nft, tx):
+        """
+            Returns (status, input index, ancestor outpoint) of the NFT in the tx that created its outpoint
+        """
+        if not tx:
+            return Status.UNKNOWN, None, None
+
+        for index, tx_input in enumerate(tx["inputs"]):
+            if nft.category == tx_input["txid"]:
+                return Status.GENESIS, index, None
+
+            token_data = tx_input.get("token_data")
+            if not token_data: continue
+            if "category" not in token_data: continue
+            if "nft" not in token_data: continue
+
+            if token_data["nft"]["capability"] == "minting":
+                return Status.MINTED, index, None
+
+            if nft.category == token_data["category"] and \
+                nft.capability == token_data["nft"]["capability"] and \
+                nft.commitment == token_data["nft"]["commitment"]:
+
+                return Status.PENDING, None, Outpoint(tx_input["txid"], tx_input["spent_index"])
+
+        return Status.UNKNOWN, None, None
+
+    def lookup(self, nfts, chains):
+        """
+            Returns the saved rows of the NFTs' current outpoints, keyed by (category, capability, commitment, txid, index)
+        """
+        outpoints = set(chains[nft][-1] for nft in nfts)
+        rows = CashNonFungibleTokenGenesis.objects.filter(
+            txid__in=set(outpoint.txid for outpoint in outpoints),
+            category__in=set(nft.category for nft in nfts),
+        )
+        return {
+            (row.category, row.capability, row.commitment, row.txid, row.index): row
+            for row in rows
+        }
+
+    def save(self, chains, results):
+        rows = []
+        for nft, chain in chains.items():
+            result = results.get(nft)
+            for position, outpoint in enumerate(chain):
+                ancestor = chain[position + 1] if position + 1 < len(chain) else None
+                # the outpoint the trace stopped at before fetching it
+                if result is None and ancestor is None:
+                    continue
+
+                rows.append(CashNonFungibleTokenGenesis(
+                    category=nft.category,
+                    capability=nft.capability,
+                    commitment=nft.commitment,
+                    txid=outpoint.txid,
+                    index=outpoint.index,
+                    ancestor_txid=ancestor.txid if ancestor else None,
+                    ancestor_index=ancestor.index if ancestor else None,
+                    **(result or dict(status=Status.PENDING)),
+                ))
+        CashNonFungibleTokenGenesis.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+
+        # outpoints saved as pending by earlier traces point straight to the origin from now on
+        for nft, result in results.items():
+            outpoints = reduce(
+                lambda query, outpoint: query | Q(txid=outpoint.txid, index=outpoint.index),
+                chains[nft][1:],
+                Q(txid=nft.txid, index=nft.index),
+            )
+            CashNonFungibleTokenGenesis.objects.filter(
+                outpoints,
+                category=nft.category,
+                capability=nft.capability,
+                commitment=nft.commitment,
+                status=Status.PENDING,
+            ).update(updated_at=timezone.now(), **result)
+
+
+def queue_nft_genesis_resolution(*cashtoken_ids):
+    """
+        Queues CashNonFungibleTokens for tracing, traced together with the NFTs queued within the window
+    """
+    if not cashtoken_ids:
+        return
+
+    from main.tasks import resolve_nft_genesis_batch
+
+    cache = settings.REDISKV
+    cache.sadd(PENDING_KEY, *cashtoken_ids)
+
+    window = settings.NFT_GENESIS['WINDOW']
+    if cache.set(FLUSH_SCHEDULED_KEY, 1, ex=window, nx=True):
+        resolve_nft_genesis_batch.apply_async(countdown=window)
@@ -1,4 +1,5 @@
-from notifications.utils.send import send_push_notification_to_wallet_hashes, NotificationTypes
+from notifications.utils.send import NotificationTypes
+from notifications.tasks import queue_push_notification
 from django.conf import settings
 from django.utils import timezone
 from main.utils.broadcast import broadcast_to_engagementhub
@@ -52,7 +53,7 @@ def send_wallet_history_push_notification(wallet_history_obj):
             'date_posted': timezone.now().isoformat()
         })
 
-        return send_push_notification_to_wallet_hashes(
+        return queue_push_notification(
             [wallet_history_obj.wallet.wallet_hash],
             message,
             title=title,
@@ -83,7 +84,7 @@ def send_wallet_history_push_notification_nft(wallet_history_obj):
             'date_posted': timezone.now().isoformat()
         })
 
-        return send_push_notification_to_wallet_hashes(
+        return queue_push_notification(
             [wallet_history_obj.wallet.wallet_hash],
             message,
             title=title,
@@ -1,33 +1,14 @@
 import logging
 from functools import lru_cache
-from bitcoinrpc.authproxy import AuthServiceProxy
+from main.utils.queries.rpc import get_rpc_client
+from main.utils.queries.electrum import get_electrum_client
+from main.utils.tx_cache import get_tx_cache
+from main.utils.raw_tx import RawTransactionError, decode_transaction
 
 from django.conf import settings
 from django.utils import timezone
 import math
-import socket
 import time
-import json
-from functools import wraps
-
-# Connect to Redis
-redis_client = settings.REDISKV
-
-def redis_cache(expiration_seconds=3600):  # Add expiration as a parameter
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args):
-            key = f"{func.__name__}:{args}"
-            cached_value = redis_client.get(key)
-            
-            if cached_value:
-                return json.loads(cached_value)  # Return cached value
-            
-            result = func(*args)  # Call the function if not cached
-            redis_client.set(key, json.dumps(result), ex=expiration_seconds)  # Auto-expire after X seconds
-            return result
-        return wrapper
-    return decorator
 
 
 def retry(max_retries):
@@ -50,12 +31,10 @@ class BCHN(object):
 
     def __init__(self):
         self.max_retries = 20
-        self.rpc_connection = AuthServiceProxy(settings.BCHN_NODE, timeout=30)
+        self.rpc_connection = get_rpc_client()
         self.source = 'bchn'
-        self.fulcrum = {
-            'host': settings.BCHN_HOST,
-            'port': settings.FULCRUM_PORT
-        }
+        self.fulcrum = get_electrum_client()
+        self.tx_cache = get_tx_cache()
 
     @retry(max_retries=3)
     def get_latest_block(self):
@@ -71,6 +50,17 @@ class BCHN(object):
         block_data = self.rpc_connection.getblock(block_hash, verbosity)
         return block_data['tx']
 
+    @retry(max_retries=3)
+    def get_block_hash(self, block):
+        return self.rpc_connection.getblockhash(block)
+
+    @retry(max_retries=3)
+    def get_block_data(self, block_hash, verbosity=None):
+        """
+            Returns the whole block from 'getblock', including its hash, previousblockhash & time
+        """
+        return self.rpc_connection.getblock(block_hash, verbosity)
+
     @retry(max_retries=3)
     def get_block_stats(self, block_number_or_hash, stats=None):
         """
@@ -80,13 +70,17 @@ class BCHN(object):
         """
         return self.rpc_connection.getblockstats(block_number_or_hash, stats)
 
-    # Cache to prevent multiple requests when parsing transaction in '._parse_transaction()'
-    @redis_cache(expiration_seconds=900)
+    # Cached to prevent multiple requests when parsing transaction in '._parse_transaction()'
     def _get_raw_transaction(self, txid):
+        txn = self.tx_cache.get(txid)
+        if txn:
+            return txn
+
         retries = 0
         while retries < self.max_retries:
             try:
                 txn = self.rpc_connection.getrawtransaction(txid, 2)
+                self.tx_cache.set(txid, txn)
                 return txn
             except Exception as exception:
                 retries += 1
@@ -98,17 +92,57 @@ class BCHN(object):
                         raise exception
                 time.sleep(1)
 
+    @retry(max_retries=3)
+    def _get_raw_transactions(self, txids):
+        """
+            Fetches verbose txs with a single batched 'getrawtransaction' request
+            Returns a dict of txid -> tx, txs that can't be found are left out
+        """
+        txns = self.tx_cache.get_many(txids)
+        missing_txids = [txid for txid in dict.fromkeys(txids) if txid not in txns]
+        if not missing_txids:
+            return txns
+
+        results = self.rpc_connection.batch(
+            [('getrawtransaction', txid, 2) for txid in missing_txids],
+            raise_errors=False,
+        )
+
+        fetched_txns = {}
+        for txid, result in zip(missing_txids, results):
+            if not isinstance(result, Exception):
+                fetched_txns[txid] = result
+            elif 'No such mempool or blockchain transaction' not in str(result):
+                raise result
+
+        self.tx_cache.set_many(fetched_txns)
+        txns.update(fetched_txns)
+        return txns
+
     @retry(max_retries=3)
     def _decode_raw_transaction(self, tx_hex):
         txn = self.rpc_connection.decoderawtransaction(tx_hex)
         return txn
 
     def build_tx_from_hex(self, tx_hex, tx_fee=None):
-        txn = self._decode_raw_transaction(tx_hex)
+        try:
+            txn = decode_transaction(bytes.fromhex(tx_hex))
+        except (RawTransactionError, ValueError):
+            # let the node decide, it raises the proper error for invalid txs
+            txn = self._decode_raw_transaction(tx_hex)
         if not tx_fee:
             tx_fee = math.ceil(txn['size'] * settings.TX_FEE_RATE)
+
+        previous_txs = self._get_raw_transactions([tx_input['txid'] for tx_input in txn['vin'] if 'txid' in tx_input])
         for i, tx_input in enumerate(txn['vin']):
-            _input_details = self.get_input_details(tx_input['txid'], tx_input['vout'])
+            if 'txid' not in tx_input:
+                continue
+
+            _input_details = self.get_input_details(
+                tx_input['txid'],
+                tx_input['vout'],
+                previous_tx=previous_txs.get(tx_input['txid']),
+            ) or {}
 
             if 'value' in _input_details:
                 txn['vin'][i]['value'] = _input_details['value'] / 10 ** 8
@@ -126,6 +160,17 @@ class BCHN(object):
         if txn:
             return self._parse_transaction(txn, include_hex=include_hex, include_no_address=include_no_address)
 
+    def get_transactions(self, txids, include_no_address=False):
+        """
+            Fetches & parses txs with a single batched request
+            Returns a dict of txid -> tx, txs that can't be found are left out
+        """
+        txns = self._get_raw_transactions(list(txids))
+        return {
+            txid: self._parse_transaction(txn, include_no_address=include_no_address)
+            for txid, txn in txns.items()
+        }
+
     def _parse_transaction(self, txn, include_hex=False, include_no_address=False):
         tx_hash = txn['hash']
         
@@ -147,6 +192,16 @@ class BCHN(object):
 
         transaction['inputs'] = []
 
+        # prevouts that aren't included in txn are resolved in one batched request
+        lookup_txids = [
+            tx_input['txid'] for tx_input in txn['vin']
+            if 'coinbase' not in tx_input and (
+                'prevout' not in tx_input or
+                'address' not in tx_input['prevout']['scriptPubKey']
+            )
+        ]
+        previous_txs = self._get_raw_transactions(lookup_txids) if lookup_txids else {}
+
         for tx_input in txn['vin']:
             if 'coinbase' in tx_input:
                 transaction['inputs'].append(tx_input)
@@ -163,14 +218,22 @@ class BCHN(object):
                 if 'address' in scriptPubKey.keys():
                     input_address = scriptPubKey['address']
                 else:
-                    _input_details = self.get_input_details(input_txid, tx_input['vout'])
+                    _input_details = self.get_input_details(
+                        input_txid,
+                        tx_input['vout'],
+                        previous_tx=previous_txs.get(input_txid),
+                    ) or {}
                     # for multisig input prevouts (no address given on data)
                     input_address = _input_details.get('address')
 
                 if 'tokenData' in prevout.keys():
                     input_token_data = prevout['tokenData']
             else:
-                _input_details = self.get_input_details(input_txid, tx_input['vout'])
+                _input_details = self.get_input_details(
+                    input_txid,
+                    tx_input['vout'],
+                    previous_tx=previous_txs.get(input_txid),
+                ) or {}
                 value = _input_details.get('value')
                 input_token_data = _input_details.get('token_data')
                 input_address = _input_details.get('address')
@@ -232,46 +295,21 @@ class BCHN(object):
     def broadcast_transaction(self, hex_str):
         return self.rpc_connection.sendrawtransaction(hex_str)
     
-    def get_input_details(self, txid, vout_index):
-        previous_tx = self._get_raw_transaction(txid)
+    def get_input_details(self, txid, vout_index, previous_tx=None):
+        if not previous_tx:
+            previous_tx = self._get_raw_transaction(txid)
         if previous_tx:
             previous_out = previous_tx['vout'][vout_index]
             return self._parse_output(previous_out)
     
-    def _recvall(self, sock):
-        BUFF_SIZE = 4096
-        data = bytearray()
-        while True:
-            packet = sock.recv(BUFF_SIZE)
-            data.extend(packet)
-            if data.endswith(bytes('\r\n', 'utf-8')):
-                break
-        return data
-
     def get_utxos(self, address):
-        data = '{ "id": 0, "method": "blockchain.address.listunspent",'
-        data += '"params": ["%s", "include_tokens"] }' % (address)
-
-        with socket.create_connection((
-            self.fulcrum['host'],
-            self.fulcrum['port']
-        )) as sock:
-            sock.send(data.encode('utf-8')+b'\n')
-            response_byte = self._recvall(sock)
-            response = response_byte.decode()
-            response = json.loads(response.strip())
-            return response['result']
-        
+        return self.fulcrum.listunspent(address)
+
+    def get_utxos_many(self, addresses):
+        return self.fulcrum.listunspent_many(addresses)
+
     def get_address_transactions(self, address, limit=None, offset=None):
-        data = '{ "id": 0, "method": "blockchain.address.get_history",'
-        data += '"params": ["%s"] }' % (address)
-
-        with socket.create_connection((
-            self.fulcrum['host'],
-            self.fulcrum['port']
-        )) as sock:
-            sock.send(data.encode('utf-8')+b'\n')
-            response_byte = self._recvall(sock)
-            response = response_byte.decode()
-            response = json.loads(response.strip())
-            return response['result']
+        return self.fulcrum.get_history(address)
+
+    def get_address_transactions_many(self, addresses):
+        return self.fulcrum.get_history_many(addresses)
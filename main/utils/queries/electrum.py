@@ -0,0 +1,228 @@
+import itertools
+import json
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ElectrumError(Exception):
+    def __init__(self, error):
+        self.error = error
+        if isinstance(error, dict):
+            self.code = error.get('code')
+            self.message = error.get('message')
+        else:
+            self.code = None
+            self.message = str(error)
+        super().__init__(self.message)
+
+
+class ElectrumClient(object):
+    """
+        Long-lived Electrum protocol (Fulcrum) client over a single TCP connection
+        Requests are written as newline-delimited JSON-RPC and matched to their
+        responses by id in a background reader thread, so many requests can be in
+        flight on the same connection. The connection is re-established on the
+        next request after it drops; in-flight requests fail with ConnectionError.
+        A timed out request also drops the connection, as it may be stuck.
+    """
+
+    def __init__(self, host, port, timeout=30, connect_timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._connection_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._sock = None
+        self._reader = None
+
+    @property
+    def connected(self):
+        return self._sock is not None
+
+    def connect(self):
+        with self._connection_lock:
+            if self._sock is not None:
+                return
+
+            sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+            sock.settimeout(None)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            self._sock = sock
+            self._reader = threading.Thread(target=self._read_loop, args=(sock,), daemon=True)
+            self._reader.start()
+
+    def close(self):
+        self._disconnect(self._sock, ConnectionError('Electrum client closed'))
+
+    def _disconnect(self, sock, exception):
+        with self._connection_lock:
+            if sock is None or self._sock is not sock:
+                return
+            self._sock = None
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+        with self._pending_lock:
+            pending = self._pending
+            self._pending = {}
+
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exception)
+
+    def _read_loop(self, sock):
+        buffer = b''
+        try:
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    raise ConnectionError('Electrum server closed the connection')
+                buffer += data
+                *lines, buffer = buffer.split(b'\n')
+                for line in lines:
+                    if line.strip():
+                        self._dispatch(json.loads(line))
+        except (OSError, ValueError) as exception:
+            if not isinstance(exception, ConnectionError):
+                exception = ConnectionError(str(exception))
+            self._disconnect(sock, exception)
+
+    def _dispatch(self, message):
+        # servers may answer a batch with a JSON array
+        messages = message if isinstance(message, list) else [message]
+        for response in messages:
+            with self._pending_lock:
+                future = self._pending.pop(response.get('id'), None)
+
+            # notifications (e.g. subscriptions) have no pending request
+            if future is None:
+                continue
+
+            if response.get('error'):
+                future.set_exception(ElectrumError(response['error']))
+            else:
+                future.set_result(response.get('result'))
+
+    def _send(self, calls):
+        self.connect()
+        sock = self._sock
+        if sock is None:
+            raise ConnectionError('Electrum client is not connected')
+
+        requests = []
+        lines = []
+        with self._pending_lock:
+            for method, *params in calls:
+                request_id = next(self._ids)
+                future = Future()
+                self._pending[request_id] = future
+                requests.append((request_id, future))
+                lines.append(json.dumps({ 'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params }))
+
+        try:
+            with self._send_lock:
+                sock.sendall(('\n'.join(lines) + '\n').encode())
+        except OSError as exception:
+            connection_error = ConnectionError(str(exception))
+            self._disconnect(sock, connection_error)
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(connection_error)
+        return sock, requests
+
+    def _wait(self, sock, requests, raise_errors=True):
+        results = []
+        for _, future in requests:
+            try:
+                results.append(future.result(timeout=self.timeout))
+            except FutureTimeoutError:
+                # late responses are dropped like notifications
+                with self._pending_lock:
+                    for request_id, _ in requests:
+                        self._pending.pop(request_id, None)
+                # other callers' in-flight requests fail with ConnectionError and are retried on a new connection
+                self._disconnect(sock, ConnectionError('Electrum request timed out, reconnecting'))
+                raise TimeoutError('Electrum request timed out')
+            except ElectrumError as exception:
+                if raise_errors:
+                    raise
+                results.append(exception)
+        return results
+
+    def batch(self, calls, raise_errors=True, retries=1):
+        """
+            Pipelines several requests over the connection and waits for all results
+            calls: list of (method, *params) tuples
+            Results are returned in the same order as calls. With raise_errors=False,
+            failed requests return their ElectrumError instead of raising.
+        """
+        if not calls:
+            return []
+
+        for attempt in range(retries + 1):
+            try:
+                sock, requests = self._send(calls)
+                return self._wait(sock, requests, raise_errors=raise_errors)
+            except ConnectionError as exception:
+                if attempt >= retries:
+                    raise
+                LOGGER.warning(f'Electrum connection lost, reconnecting: {exception}')
+
+    def request(self, method, *params):
+        return self.batch([(method, *params)])[0]
+
+    def listunspent(self, address):
+        return self.request('blockchain.address.listunspent', address, 'include_tokens')
+
+    def get_history(self, address):
+        return self.request('blockchain.address.get_history', address)
+
+    def listunspent_many(self, addresses):
+        """
+            Returns dict of address -> utxos for many addresses in one pipelined round trip
+        """
+        addresses = list(dict.fromkeys(addresses))
+        results = self.batch([('blockchain.address.listunspent', address, 'include_tokens') for address in addresses])
+        return dict(zip(addresses, results))
+
+    def get_history_many(self, addresses):
+        """
+            Returns dict of address -> tx history for many addresses in one pipelined round trip
+        """
+        addresses = list(dict.fromkeys(addresses))
+        results = self.batch([('blockchain.address.get_history', address) for address in addresses])
+        return dict(zip(addresses, results))
+
+
+_electrum_client = None
+_electrum_client_pid = None
+_electrum_client_lock = threading.Lock()
+
+
+def get_electrum_client():
+    """
+        Returns the process-wide Fulcrum client, recreated after a fork
+    """
+    global _electrum_client, _electrum_client_pid
+    pid = os.getpid()
+    if _electrum_client is None or _electrum_client_pid != pid:
+        with _electrum_client_lock:
+            if _electrum_client is None or _electrum_client_pid != pid:
+                _electrum_client = ElectrumClient(settings.BCHN_HOST, settings.FULCRUM_PORT)
+                _electrum_client_pid = pid
+    return _electrum_client
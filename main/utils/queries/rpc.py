@@ -0,0 +1,120 @@
+import decimal
+import itertools
+import json
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from bitcoinrpc.authproxy import JSONRPCException, EncodeDecimal
+
+from django.conf import settings
+
+
+class RPCClient(object):
+    """
+        Keep-alive JSON-RPC client over a pooled HTTP session
+        Method calls mirror AuthServiceProxy (e.g. client.getblockcount()) and
+        raise the same JSONRPCException, so it can be used in its place.
+        The session's connection pool is thread safe and is shared by all callers
+        in a process, see 'get_rpc_client()'.
+    """
+
+    def __init__(self, url, timeout=30, pool_maxsize=16):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._ids = itertools.count(1)
+
+    def __getattr__(self, method):
+        if method.startswith('__'):
+            raise AttributeError(method)
+        return lambda *params: self.call(method, *params)
+
+    def _post(self, payload):
+        response = self.session.post(
+            self.url,
+            data=json.dumps(payload, default=EncodeDecimal),
+            headers={ 'Content-Type': 'application/json' },
+            timeout=self.timeout,
+        )
+        # bitcoind responds with non-200 statuses for RPC errors, the body still has the error
+        try:
+            return response.json(parse_float=decimal.Decimal)
+        except ValueError:
+            response.raise_for_status()
+            raise JSONRPCException({ 'code': -342, 'message': 'non-JSON HTTP response' })
+
+    def call(self, method, *params):
+        response = self._post({
+            'version': '1.1',
+            'method': method,
+            'params': params,
+            'id': next(self._ids),
+        })
+        if response.get('error'):
+            raise JSONRPCException(response['error'])
+        return response.get('result')
+
+    def batch(self, calls, raise_errors=True):
+        """
+            Sends several RPC calls in a single JSON-RPC batch request
+            calls: list of (method, *params) tuples
+                e.g. batch([("getrawtransaction", txid, 2), ...])
+            Returns results in the same order as calls. With raise_errors=False,
+            failed calls return their JSONRPCException instead of raising.
+        """
+        if not calls:
+            return []
+
+        payload = []
+        for call in calls:
+            method, *params = call
+            payload.append({
+                'jsonrpc': '2.0',
+                'method': method,
+                'params': params,
+                'id': next(self._ids),
+            })
+
+        responses = self._post(payload)
+        if isinstance(responses, dict):
+            # the whole batch was rejected
+            raise JSONRPCException(responses.get('error') or { 'code': -32600, 'message': 'invalid batch response' })
+
+        responses_by_id = { response.get('id'): response for response in responses }
+        results = []
+        for request in payload:
+            response = responses_by_id.get(request['id']) or {}
+            error = response.get('error')
+            if error or 'result' not in response:
+                exception = JSONRPCException(error or { 'code': -32603, 'message': 'missing batch response' })
+                if raise_errors:
+                    raise exception
+                results.append(exception)
+            else:
+                results.append(response['result'])
+        return results
+
+
+_rpc_client = None
+_rpc_client_pid = None
+_rpc_client_lock = threading.Lock()
+
+
+def get_rpc_client():
+    """
+        Returns the process-wide RPC client, recreated after a fork (e.g. celery prefork
+        workers) so that child processes don't share the parent's sockets
+    """
+    global _rpc_client, _rpc_client_pid
+    pid = os.getpid()
+    if _rpc_client is None or _rpc_client_pid != pid:
+        with _rpc_client_lock:
+            if _rpc_client is None or _rpc_client_pid != pid:
+                _rpc_client = RPCClient(settings.BCHN_NODE, timeout=30)
+                _rpc_client_pid = pid
+    return _rpc_client
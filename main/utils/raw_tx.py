@@ -0,0 +1,279 @@
+"""
+    Raw transaction parsing used on the mempool hot path, so that transactions can be
+    filtered and decoded without a `decoderawtransaction` RPC call.
+    Parsing works on memoryviews of the serialized tx, bytes are only copied when
+    building the decoded values.
+"""
+import hashlib
+from decimal import Decimal
+
+from main.utils import cashaddr
+
+
+TOKEN_PREFIX = 0xef
+
+# CashTokens prefix bitfield flags
+HAS_COMMITMENT_LENGTH = 0x40
+HAS_NFT = 0x20
+HAS_AMOUNT = 0x10
+RESERVED_BIT = 0x80
+NFT_CAPABILITIES = { 0: 'none', 1: 'mutable', 2: 'minting' }
+
+COINBASE_OUTPOINT = b'\x00' * 32
+
+
+class RawTransactionError(Exception):
+    pass
+
+
+def read_compact_size(buf, offset):
+    """
+        Returns (value, new offset) of a Bitcoin CompactSize uint at offset
+    """
+    try:
+        first = buf[offset]
+        if first < 0xfd:
+            return first, offset + 1
+        if first == 0xfd:
+            size = 2
+        elif first == 0xfe:
+            size = 4
+        else:
+            size = 8
+        end = offset + 1 + size
+        if end > len(buf):
+            raise RawTransactionError('Truncated compact size')
+        return int.from_bytes(buf[offset+1:end], 'little'), end
+    except IndexError:
+        raise RawTransactionError('Truncated compact size')
+
+
+def split_token_prefix(script):
+    """
+        Splits an output's scriptPubKey field into (token prefix, locking bytecode)
+        token prefix is None for outputs without CashTokens
+    """
+    if not len(script) or script[0] != TOKEN_PREFIX:
+        return None, script
+
+    offset = 1 + 32
+    if len(script) < offset + 1:
+        raise RawTransactionError('Truncated token prefix')
+    bitfield = script[offset]
+    offset += 1
+    if bitfield & HAS_COMMITMENT_LENGTH:
+        length, offset = read_compact_size(script, offset)
+        offset += length
+    if bitfield & HAS_AMOUNT:
+        _, offset = read_compact_size(script, offset)
+
+    if offset > len(script):
+        raise RawTransactionError('Truncated token prefix')
+    return script[:offset], script[offset:]
+
+
+def _read_outputs(buf):
+    """
+        Returns ([(index, value, scriptPubKey field)], offset of locktime) of a serialized tx
+    """
+    offset = 4  # version
+
+    input_count, offset = read_compact_size(buf, offset)
+    for _ in range(input_count):
+        offset += 36  # outpoint
+        script_length, offset = read_compact_size(buf, offset)
+        offset += script_length + 4  # unlocking bytecode + sequence
+
+    outputs = []
+    output_count, offset = read_compact_size(buf, offset)
+    for index in range(output_count):
+        if offset + 8 > len(buf):
+            raise RawTransactionError('Truncated output')
+        value = int.from_bytes(buf[offset:offset+8], 'little')
+        script_length, offset = read_compact_size(buf, offset + 8)
+        end = offset + script_length
+        if end > len(buf):
+            raise RawTransactionError('Truncated output script')
+        outputs.append((index, value, buf[offset:end]))
+        offset = end
+
+    return outputs, offset
+
+
+def iter_outputs(raw):
+    """
+        Yields (index, value in satoshis, locking bytecode) for each output of a raw tx
+        raw: (bytes | bytearray | memoryview) serialized transaction
+    """
+    outputs, _ = _read_outputs(memoryview(raw))
+    for index, value, script in outputs:
+        _, locking_bytecode = split_token_prefix(script)
+        yield index, value, locking_bytecode
+
+
+def locking_bytecode_hash(locking_bytecode):
+    """
+        Returns the hash payload of P2PKH, P2SH20 and P2SH32 locking bytecodes,
+        i.e. the same payload encoded in the output's cash address. None for other types
+    """
+    return script_type(locking_bytecode)[2]
+
+
+def output_hashes(raw):
+    """
+        Returns the set of address hash payloads paid to by a raw tx
+    """
+    hashes = set()
+    for _, _, locking_bytecode in iter_outputs(raw):
+        _hash = locking_bytecode_hash(locking_bytecode)
+        if _hash:
+            hashes.add(_hash)
+    return hashes
+
+
+def txid(raw):
+    """
+        Returns the txid (double sha256, byte reversed) of a serialized tx
+    """
+    return hashlib.sha256(hashlib.sha256(raw).digest()).digest()[::-1].hex()
+
+
+def decode_token_prefix(prefix):
+    """
+        Decodes a CashTokens prefix into the node's 'tokenData' format
+    """
+    prefix = memoryview(prefix)
+    bitfield = prefix[33]
+    capability = bitfield & 0x0f
+    if bitfield & RESERVED_BIT or not bitfield & (HAS_NFT | HAS_AMOUNT):
+        raise RawTransactionError('Invalid token bitfield')
+    if bitfield & HAS_COMMITMENT_LENGTH and not bitfield & HAS_NFT:
+        raise RawTransactionError('Token commitment without NFT')
+
+    token_data = { 'category': bytes(prefix[1:33])[::-1].hex(), 'amount': '0' }
+
+    offset = 34
+    commitment = b''
+    if bitfield & HAS_COMMITMENT_LENGTH:
+        length, offset = read_compact_size(prefix, offset)
+        commitment = bytes(prefix[offset:offset+length])
+        offset += length
+    if bitfield & HAS_AMOUNT:
+        amount, offset = read_compact_size(prefix, offset)
+        token_data['amount'] = str(amount)
+
+    if bitfield & HAS_NFT:
+        if capability not in NFT_CAPABILITIES:
+            raise RawTransactionError('Invalid NFT capability')
+        token_data['nft'] = {
+            'capability': NFT_CAPABILITIES[capability],
+            'commitment': commitment.hex(),
+        }
+
+    return token_data
+
+
+def script_type(locking_bytecode):
+    """
+        Returns (node script type, cash address version byte, hash payload) of a locking bytecode
+        version byte & hash are None for scripts that don't encode to an address
+    """
+    size = len(locking_bytecode)
+    if size == 25 and locking_bytecode[:3] == b'\x76\xa9\x14' and locking_bytecode[23:] == b'\x88\xac':
+        return 'pubkeyhash', cashaddr.P2PKH, bytes(locking_bytecode[3:23])
+    if size == 23 and locking_bytecode[:2] == b'\xa9\x14' and locking_bytecode[22] == 0x87:
+        return 'scripthash', cashaddr.P2SH20, bytes(locking_bytecode[2:22])
+    if size == 35 and locking_bytecode[:2] == b'\xaa\x20' and locking_bytecode[34] == 0x87:
+        return 'scripthash', cashaddr.P2SH32, bytes(locking_bytecode[2:34])
+    if size and locking_bytecode[0] == 0x6a:
+        return 'nulldata', None, None
+    if size in (35, 67) and locking_bytecode[0] == size - 2 and locking_bytecode[-1] == 0xac:
+        return 'pubkey', None, None
+    if size and locking_bytecode[-1] == 0xae:
+        return 'multisig', None, None
+    return 'nonstandard', None, None
+
+
+def iter_inputs(raw):
+    """
+        Yields (previous txid, previous output index, unlocking bytecode, sequence) for each input
+        previous txid is None for the coinbase input
+    """
+    buf = memoryview(raw)
+    input_count, offset = read_compact_size(buf, 4)
+    for _ in range(input_count):
+        if offset + 36 > len(buf):
+            raise RawTransactionError('Truncated input')
+        outpoint_hash = buf[offset:offset+32]
+        index = int.from_bytes(buf[offset+32:offset+36], 'little')
+        script_length, offset = read_compact_size(buf, offset + 36)
+        end = offset + script_length
+        if end + 4 > len(buf):
+            raise RawTransactionError('Truncated input script')
+
+        previous_txid = None
+        if not (outpoint_hash == COINBASE_OUTPOINT and index == 0xffffffff):
+            previous_txid = bytes(outpoint_hash)[::-1].hex()
+
+        sequence = int.from_bytes(buf[end:end+4], 'little')
+        yield previous_txid, index, buf[offset:end], sequence
+        offset = end + 4
+
+
+def decode_transaction(raw, prefix=None):
+    """
+        Decodes a serialized tx into the same structure as the node's `decoderawtransaction`
+        raw: (bytes | bytearray | memoryview) serialized transaction, e.g. a ZMQ rawtx frame
+        prefix: cash address prefix, defaults to the current network's
+
+        Output values are Decimal BCH as the RPC client returns them. Addresses are only
+        given for P2PKH & P2SH outputs, and 'asm' fields are not included.
+    """
+    buf = memoryview(raw)
+    prefix = prefix or cashaddr.network_prefix()
+    if len(buf) < 10:
+        raise RawTransactionError('Truncated transaction')
+
+    vin = []
+    for previous_txid, index, unlocking_bytecode, sequence in iter_inputs(buf):
+        if previous_txid is None:
+            vin.append({ 'coinbase': unlocking_bytecode.hex(), 'sequence': sequence })
+            continue
+        vin.append({
+            'txid': previous_txid,
+            'vout': index,
+            'scriptSig': { 'hex': unlocking_bytecode.hex() },
+            'sequence': sequence,
+        })
+
+    vout = []
+    outputs, offset = _read_outputs(buf)
+    for index, value, script in outputs:
+        token_prefix, locking_bytecode = split_token_prefix(script)
+        _type, version, _hash = script_type(locking_bytecode)
+        script_pubkey = { 'hex': locking_bytecode.hex(), 'type': _type }
+        if _hash is not None:
+            script_pubkey['addresses'] = [cashaddr.encode(prefix, version, _hash)]
+
+        output = {
+            'value': Decimal(value).scaleb(-8),
+            'n': index,
+            'scriptPubKey': script_pubkey,
+        }
+        if token_prefix is not None:
+            output['tokenData'] = decode_token_prefix(token_prefix)
+        vout.append(output)
+
+    if offset + 4 != len(buf):
+        raise RawTransactionError('Unexpected transaction length')
+
+    _txid = txid(buf)
+    return {
+        'txid': _txid,
+        'hash': _txid,
+        'version': int.from_bytes(buf[:4], 'little', signed=True),
+        'size': len(buf),
+        'locktime': int.from_bytes(buf[offset:offset+4], 'little'),
+        'vin': vin,
+        'vout': vout,
+    }
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+
+# upper bounds (ms) of latency histogram buckets
+LATENCY_BUCKETS = [10, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+def latency_percentile(counts, ratio):
+    """
+        Returns the upper bound of the histogram bucket the percentile falls in
+        counts: a name's counters recorded by 'StatsCounter.observe()', without the name prefix
+    """
+    calls = counts.get("calls", 0)
+    seen = 0
+    for bucket in [str(bound) for bound in LATENCY_BUCKETS] + ["inf"]:
+        seen += counts.get(f"le_{bucket}", 0)
+        if calls and seen >= calls * ratio:
+            return bucket
+    return "-"
+
+
+class StatsCounter(object):
+    """
+        Process-local counters that are periodically added into a redis hash,
+        so counts from every worker process can be read from one place
+        without a redis round trip on every increment
+    """
+
+    def __init__(self, key, flush_interval=10):
+        self.key = key
+        self.flush_interval = flush_interval
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def incr(self, field, count=1):
+        if not count:
+            return
+
+        with self._lock:
+            self._counts[field] += count
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+
+        if due:
+            self.flush()
+
+    def observe(self, name, duration):
+        """
+            Records a latency in seconds under 'name' as a count, a sum in ms & a histogram bucket
+        """
+        ms = duration * 1000
+        bucket = next((str(bound) for bound in LATENCY_BUCKETS if ms <= bound), 'inf')
+        self.incr(f'{name}:calls')
+        self.incr(f'{name}:ms', int(ms))
+        self.incr(f'{name}:le_{bucket}')
+
+    def flush(self):
+        with self._lock:
+            counts = self._counts
+            self._counts = Counter()
+            self._last_flush = time.monotonic()
+
+        if not counts:
+            return
+
+        try:
+            pipeline = settings.REDISKV.pipeline(transaction=False)
+            for field, count in counts.items():
+                pipeline.hincrby(self.key, field, count)
+            pipeline.execute()
+        except Exception:
+            # keep the counts for the next flush instead of losing them
+            with self._lock:
+                self._counts.update(counts)
+
+    def read(self):
+        """
+            Returns the totals across all processes, including this process' unflushed counts
+        """
+        totals = Counter({
+            field.decode(): int(count)
+            for field, count in settings.REDISKV.hgetall(self.key).items()
+        })
+        with self._lock:
+            totals.update(self._counts)
+        return dict(totals)
+
+    def reset(self):
+        with self._lock:
+            self._counts = Counter()
+        settings.REDISKV.delete(self.key)
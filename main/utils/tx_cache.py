@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.conf import settings
+
+from main.utils.stats import StatsCounter
+
+
+# v1 values were pickled, the prefix change keeps them from being read
+TX_CACHE_KEY_PREFIX = 'tx:v2:'
+TX_CACHE_STATS_KEY = 'tx-cache:stats'
+
+
+def to_decimal(value):
+    return Decimal(str(value))
+
+
+def encode_tx(tx):
+    # the node's Decimal amounts are stored as strings to keep their precision, zlib shrinks the hex & asm strings
+    return zlib.compress(json.dumps(tx, default=str, separators=(',', ':')).encode(), 1)
+
+
+def decode_tx(value):
+    """
+        Returns the tx of an 'encode_tx()' value with its amounts back to Decimals
+        Raises ValueError if the value isn't one
+    """
+    try:
+        tx = json.loads(zlib.decompress(value))
+    except zlib.error as exception:
+        raise ValueError(str(exception))
+
+    if not isinstance(tx, dict):
+        raise ValueError('Cached tx is not an object')
+
+    if tx.get('fee') is not None:
+        tx['fee'] = to_decimal(tx['fee'])
+    for tx_input in tx.get('vin', []):
+        prevout = tx_input.get('prevout')
+        if prevout and prevout.get('value') is not None:
+            prevout['value'] = to_decimal(prevout['value'])
+    for tx_output in tx.get('vout', []):
+        if tx_output.get('value') is not None:
+            tx_output['value'] = to_decimal(tx_output['value'])
+    return tx
+
+
+class LocalLRUCache(object):
+    """
+        Thread safe size bounded LRU of key -> (expires_at, value)
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._items[key]
+                return None
+
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class TransactionCache(object):
+    """
+        Two tier cache of verbose node txs ('getrawtransaction' verbosity 2)
+        An in-process LRU sits in front of redis, both hold the encoded tx so that
+        callers always get their own copy to mutate.
+
+        Confirmed txs are immutable and are kept for CONFIRMED_TTL, while mempool txs
+        expire after MEMPOOL_TTL so their confirmation is picked up soon after.
+        Note that the 'confirmations' count of a cached confirmed tx is as of when it was fetched.
+    """
+
+    def __init__(self, local_size=None, confirmed_ttl=None, mempool_ttl=None):
+        self.local = LocalLRUCache(local_size if local_size is not None else settings.TX_CACHE["LOCAL_SIZE"])
+        self.confirmed_ttl = confirmed_ttl or settings.TX_CACHE["CONFIRMED_TTL"]
+        self.mempool_ttl = mempool_ttl or settings.TX_CACHE["MEMPOOL_TTL"]
+        self.stats = StatsCounter(TX_CACHE_STATS_KEY)
+
+    @property
+    def redis(self):
+        return settings.REDISKV
+
+    def key(self, txid):
+        return f'{TX_CACHE_KEY_PREFIX}{txid}'
+
+    def ttl(self, tx):
+        if tx.get('confirmations') or tx.get('blockhash'):
+            return self.confirmed_ttl
+        return self.mempool_ttl
+
+    def get_many(self, txids):
+        """
+            Returns dict of txid -> tx for the txids found in either tier
+        """
+        txids = list(dict.fromkeys(txids))
+        txns = {}
+        remote_txids = []
+        for txid in txids:
+            value = self.local.get(txid)
+            if value is None:
+                remote_txids.append(txid)
+            else:
+                txns[txid] = decode_tx(value)
+
+        if remote_txids:
+            values = self.redis.mget([self.key(txid) for txid in remote_txids])
+            for txid, value in zip(remote_txids, values):
+                if value is None:
+                    continue
+                try:
+                    tx = decode_tx(value)
+                except ValueError:
+                    # refetched from the node & overwritten
+                    continue
+                self.local.set(txid, value, self.ttl(tx))
+                txns[txid] = tx
+
+        local_hits = len(txids) - len(remote_txids)
+        redis_hits = len(txns) - local_hits
+        self.stats.incr('local_hits', local_hits)
+        self.stats.incr('redis_hits', redis_hits)
+        self.stats.incr('misses', len(txids) - len(txns))
+        return txns
+
+    def get(self, txid):
+        return self.get_many([txid]).get(txid)
+
+    def set_many(self, txns):
+        """
+            txns: dict of txid -> tx
+        """
+        if not txns:
+            return
+
+        pipeline = self.redis.pipeline(transaction=False)
+        for txid, tx in txns.items():
+            value = encode_tx(tx)
+            ttl = self.ttl(tx)
+            self.local.set(txid, value, ttl)
+            pipeline.set(self.key(txid), value, ex=ttl)
+        pipeline.execute()
+
+    def set(self, txid, tx):
+        self.set_many({ txid: tx })
+
+    def delete(self, txid):
+        self.local.delete(txid)
+        self.redis.delete(self.key(txid))
+
+
+_tx_cache = None
+_tx_cache_lock = threading.Lock()
+
+
+def get_tx_cache():
+    global _tx_cache
+    if _tx_cache is None:
+        with _tx_cache_lock:
+            if _tx_cache is None:
+                _tx_cache = TransactionCache()
+    return _tx_cache
@@ -0,0 +1,142 @@
+import uuid
+
+from django.conf import settings
+
+from main.utils.stats import StatsCounter
+
+
+TX_PROCESSING_STATS_KEY = 'tx-processing:stats'
+
+# bits of a tx's stage bitmap
+STAGE_MEMPOOL = 0
+STAGE_POST_SAVE = 1
+STAGE_BLOCK = 2
+
+STAGE_NAMES = {
+    STAGE_MEMPOOL: 'mempool',
+    STAGE_POST_SAVE: 'post_save',
+    STAGE_BLOCK: 'block',
+}
+
+# deletes the lease only if it is still held by the caller
+RELEASE_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_stats = None
+
+
+def get_tx_processing_stats():
+    global _stats
+    if _stats is None:
+        _stats = StatsCounter(TX_PROCESSING_STATS_KEY)
+    return _stats
+
+
+class TxProcessingRecord(object):
+    """
+        Per txid processing state shared by all workers
+        A lease keeps a tx from being processed by two workers at once, a bitmap
+        records the stages the tx went through, and a set records the wallets
+        whose history parsing was already queued for the tx.
+        A stage can be scoped, e.g. to a wallet or a block, when the tx goes through
+        it once per scope. Scoped stages are recorded in a set instead of the bitmap.
+    """
+
+    def __init__(self, txid, cache=None, ttl=None, lease_ttl=None):
+        self.txid = txid
+        self.cache = cache or settings.REDISKV
+        self.ttl = ttl or settings.TX_PROCESSING['RECORD_TTL']
+        self.lease_ttl = lease_ttl or settings.TX_PROCESSING['LEASE_TTL']
+        self.stages_key = f'tx-processing:{txid}:stages'
+        self.scoped_stages_key = f'tx-processing:{txid}:scoped-stages'
+        self.lease_key = f'tx-processing:{txid}:lease'
+        self.wallets_key = f'tx-processing:{txid}:wallets'
+        self.token = None
+
+    def is_done(self, stage, scope=None):
+        pipeline = self.cache.pipeline(transaction=False)
+        self._queue_is_done(pipeline, stage, scope=scope)
+        return bool(pipeline.execute()[0])
+
+    def mark_done(self, *stages, scope=None):
+        pipeline = self.cache.pipeline(transaction=False)
+        self._queue_mark_done(pipeline, *stages, scope=scope)
+        pipeline.execute()
+
+    def _queue_is_done(self, pipeline, stage, scope=None):
+        if scope is None:
+            pipeline.getbit(self.stages_key, stage)
+        else:
+            pipeline.sismember(self.scoped_stages_key, f'{stage}:{scope}')
+
+    def _queue_mark_done(self, pipeline, *stages, scope=None):
+        key = self.stages_key if scope is None else self.scoped_stages_key
+        for stage in stages:
+            if scope is None:
+                pipeline.setbit(key, stage, 1)
+            else:
+                pipeline.sadd(key, f'{stage}:{scope}')
+        pipeline.expire(key, self.ttl)
+
+    def acquire(self):
+        """
+            Returns True if this worker now holds the tx's lease
+        """
+        token = uuid.uuid4().hex
+        if self.cache.set(self.lease_key, token, ex=self.lease_ttl, nx=True):
+            self.token = token
+            return True
+        return False
+
+    def release(self):
+        if self.token is None:
+            return
+        self.cache.eval(RELEASE_LEASE_SCRIPT, 1, self.lease_key, self.token)
+        self.token = None
+
+    def claim_wallets(self, wallet_handles):
+        """
+            Returns the wallet handles whose history parsing was not yet queued for the tx
+        """
+        wallet_handles = sorted(set(wallet_handles))
+        if not wallet_handles:
+            return []
+
+        pipeline = self.cache.pipeline(transaction=False)
+        for wallet_handle in wallet_handles:
+            pipeline.sadd(self.wallets_key, wallet_handle)
+        pipeline.expire(self.wallets_key, self.ttl)
+        added = pipeline.execute()[:-1]
+        return [wallet_handle for wallet_handle, is_new in zip(wallet_handles, added) if is_new]
+
+    def reset(self):
+        self.cache.delete(self.stages_key, self.scoped_stages_key, self.wallets_key)
+
+
+def get_done_txids(txids, stage, scope=None, cache=None):
+    """
+        Returns the txids that went through the stage, checked in a single round trip
+    """
+    records = [TxProcessingRecord(txid, cache=cache) for txid in txids]
+    if not records:
+        return set()
+
+    pipeline = records[0].cache.pipeline(transaction=False)
+    for record in records:
+        record._queue_is_done(pipeline, stage, scope=scope)
+    return set(record.txid for record, done in zip(records, pipeline.execute()) if done)
+
+
+def mark_txids_done(txids, stage, scope=None, cache=None):
+    records = [TxProcessingRecord(txid, cache=cache) for txid in txids]
+    if not records:
+        return
+
+    pipeline = records[0].cache.pipeline(transaction=False)
+    for record in records:
+        record._queue_mark_done(pipeline, stage, scope=scope)
+    pipeline.execute()
@@ -0,0 +1,175 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction as trans
+from django.utils import timezone
+
+from main.models import BlockHeight, Token, Transaction
+from main.utils.chunk import chunks
+from main.utils.queries.bchn import BCHN
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class WalletUtxoRescanner:
+    """
+        Rescans the UTXOs of all addresses of a wallet in one pass
+        Addresses are queried in pipelined Fulcrum batches, a few batches at a time.
+        The node's UTXO set is then diffed against the wallet's unspent Transaction
+        records and the differences are applied in bulk in one DB transaction.
+
+        CashToken UTXOs that aren't saved yet are returned in 'token_outputs' instead of
+        being created here, since they need metadata resolution through 'save_record()'.
+    """
+
+    def __init__(self, wallet, batch_size=None, concurrency=None):
+        self.wallet = wallet
+        self.batch_size = batch_size or settings.UTXO_RESCAN["BATCH_SIZE"]
+        self.concurrency = concurrency or settings.UTXO_RESCAN["CONCURRENCY"]
+        self.node = BCHN()
+        self.timings = {}
+        self.fetch_started = None
+
+    def run(self, addresses=None):
+        """
+            addresses: Address queryset of the wallet to rescan, all of the wallet's addresses if None
+            Returns a report of what changed and how long each step took
+        """
+        start = time.perf_counter()
+        if addresses is None:
+            addresses = self.wallet.addresses.all()
+        address_ids = dict(addresses.values_list('address', 'id'))
+
+        # outputs saved while the utxos are being fetched may be missing from them
+        self.fetch_started = timezone.now()
+        utxos = self.timed('fetch', self.fetch_utxos, list(address_ids.keys()))
+        diff = self.timed('diff', self.diff, address_ids, utxos)
+        self.timed('apply', self.apply, diff)
+        self.timings['total'] = time.perf_counter() - start
+
+        report = {
+            'wallet_hash': self.wallet.wallet_hash,
+            'addresses': len(address_ids),
+            'utxos': len(utxos),
+            'created': len(diff['created']),
+            'updated': len(diff['updated']),
+            'spent': len(diff['spent_ids']),
+            'token_outputs': diff['token_outputs'],
+            'txids': sorted(set(utxo['tx_hash'] for utxo in utxos.values())),
+            'created_txids': sorted(set(transaction_obj.txid for transaction_obj in diff['created'])),
+            'timings': { step: round(duration, 3) for step, duration in self.timings.items() },
+        }
+        LOGGER.info(
+            f"UTXO RESCAN {self.wallet.wallet_hash}: {report['addresses']} addresses | {report['utxos']} utxos | "
+            f"{report['created']} created | {report['updated']} updated | {report['spent']} spent | {report['timings']}"
+        )
+        return report
+
+    def timed(self, step, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.timings[step] = time.perf_counter() - start
+        return result
+
+    def fetch_utxos(self, addresses):
+        """
+            Returns dict of (txid, index, address) -> utxo of the addresses
+        """
+        utxos = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for results in executor.map(self.node.get_utxos_many, chunks(addresses, self.batch_size)):
+                for address, outputs in results.items():
+                    for output in outputs:
+                        utxos[(output['tx_hash'], output['tx_pos'], address)] = output
+        return utxos
+
+    def get_block_ids(self, heights):
+        heights = set(height for height in heights if height > 0)
+        if not heights:
+            return {}
+
+        BlockHeight.objects.bulk_create(
+            [BlockHeight(number=height) for height in heights],
+            ignore_conflicts=True,
+        )
+        return dict(BlockHeight.objects.filter(number__in=heights).values_list('number', 'id'))
+
+    def diff(self, address_ids, utxos):
+        block_ids = self.get_block_ids(utxo['height'] for utxo in utxos.values())
+
+        # records of the node's utxos, whether or not they are marked spent
+        saved = {}
+        for txids_chunk in chunks(list(set(txid for txid, _, _ in utxos)), 1000):
+            records = Transaction.objects.filter(
+                txid__in=txids_chunk,
+                address_id__in=address_ids.values(),
+            ).only('id', 'txid', 'index', 'address_id', 'spent', 'value', 'blockheight_id', 'wallet_id')
+            for record in records:
+                saved[(record.txid, record.index, record.address_id)] = record
+
+        unspent = Transaction.objects.filter(address_id__in=address_ids.values(), spent=False)
+        if self.fetch_started:
+            unspent = unspent.filter(date_created__lt=self.fetch_started)
+        unspent_ids = set(unspent.values_list('id', flat=True))
+
+        bch_token = None
+        created = []
+        updated = []
+        token_outputs = []
+        for (txid, index, address), utxo in utxos.items():
+            address_id = address_ids[address]
+            block_id = block_ids.get(utxo['height'])
+            record = saved.get((txid, index, address_id))
+
+            if record:
+                unspent_ids.discard(record.id)
+                changes = dict(
+                    spent=False,
+                    value=utxo['value'],
+                    wallet_id=self.wallet.id,
+                    blockheight_id=block_id or record.blockheight_id,
+                )
+                if any(getattr(record, field) != value for field, value in changes.items()):
+                    for field, value in changes.items():
+                        setattr(record, field, value)
+                    updated.append(record)
+            elif 'token_data' in utxo:
+                token_outputs.append({ **utxo, 'address': address, 'block_id': block_id })
+            else:
+                if bch_token is None:
+                    bch_token, _ = Token.objects.get_or_create(
+                        name='bch',
+                        defaults=dict(token_ticker='bch', decimals=8, token_type=1),
+                    )
+                created.append(Transaction(
+                    txid=txid,
+                    address_id=address_id,
+                    token=bch_token,
+                    index=index,
+                    value=utxo['value'],
+                    source=self.node.source,
+                    blockheight_id=block_id,
+                    wallet_id=self.wallet.id,
+                    acknowledged=True if block_id else None,
+                ))
+
+        return {
+            'created': created,
+            'updated': updated,
+            'spent_ids': list(unspent_ids),
+            'token_outputs': token_outputs,
+        }
+
+    def apply(self, diff):
+        with trans.atomic():
+            Transaction.objects.bulk_create(diff['created'], batch_size=500, ignore_conflicts=True)
+            Transaction.objects.bulk_update(
+                diff['updated'],
+                ['spent', 'value', 'wallet', 'blockheight'],
+                batch_size=500,
+            )
+            for ids_chunk in chunks(diff['spent_ids'], 1000):
+                Transaction.objects.filter(id__in=ids_chunk).update(spent=True)
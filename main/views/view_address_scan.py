@@ -36,15 +36,22 @@ class WalletAddressScanViewSet(viewsets.GenericViewSet):
         sorted_address_sets = serializer.sorted_address_sets()
         sorted_address_sets.reverse() # sorted by address index in descending order
 
+        # fetch the history of all addresses in one pipelined request to fulcrum
+        histories = NODE.BCH.get_address_transactions_many([
+            address
+            for address_set in sorted_address_sets
+            for address in (address_set["addresses"]["receiving"], address_set["addresses"]["change"])
+        ])
+
         address_sets_to_subscribe = []
         for i in range(len(sorted_address_sets)):
             address_set = sorted_address_sets[i]
 
-            txs = NODE.BCH.get_address_transactions(address_set["addresses"]["receiving"], limit=1)
+            txs = histories[address_set["addresses"]["receiving"]]
             has_transaction = len(txs)
 
             if not has_transaction:
-                txs = NODE.BCH.get_address_transactions(address_set["addresses"]["change"], limit=1)
+                txs = histories[address_set["addresses"]["change"]]
                 has_transaction = len(txs)
 
             if has_transaction:
@@ -1,6 +1,6 @@
 from django.conf import settings
 from drf_yasg.utils import swagger_auto_schema
-from main.models import Transaction, Wallet, Token, CashFungibleToken, CashNonFungibleToken
+from main.models import Transaction, Wallet, Token, CashFungibleToken, CashNonFungibleToken, BalanceLedger
 from django.db.models import Q, Sum, F
 from django.utils import timezone
 from django.db.models.functions import Coalesce
@@ -12,6 +12,7 @@ from main.utils.address_converter import *
 from main.utils.bch_yield import compute_wallet_yield
 from main import serializers
 from main.tasks import rescan_utxos
+from main.utils.cache import WALLET_BALANCE_CACHE_TTL, wallet_balance_cache_key
 from main.utils.tx_fee import (
     get_tx_fee_sats,
     bch_to_satoshi,
@@ -53,17 +54,33 @@ def _get_ct_balance(query, multiple_tokens=False):
     return _get_slp_balance(query, multiple_tokens)
 
 
-def _get_bch_balance(query):
-    # Exclude dust amounts as they're likely to be SLP transactions
-    # TODO: Needs another more sure way to exclude SLP transactions
-    dust = 546 # / (10 ** 8)
-    query = query & Q(value__gt=dust) & Q(token__name='bch')
-    qs = Transaction.objects.filter(query)
-    qs_count = qs.count()
-    qs_balance = qs.aggregate(
-        balance=Coalesce(Sum('value'), 0)
+def _get_ledger_totals(**filters):
+    """
+        Reads balance totals from the ledger rows matching filters, e.g.
+        _get_ledger_totals(wallet=wallet, token__name='bch')
+    """
+    totals = BalanceLedger.objects.filter(**filters).aggregate(
+        amount=Sum('amount'),
+        value=Sum('value'),
+        utxo_count=Sum('utxo_count'),
     )
-    return qs_balance, qs_count
+    return {
+        'amount': int(totals['amount'] or 0),
+        'value': totals['value'] or 0,
+        'utxo_count': totals['utxo_count'] or 0,
+    }
+
+
+def _get_ledger_token_balance(**filters):
+    # same shape as '_get_slp_balance()' for a single token
+    return { 'amount__sum': _get_ledger_totals(**filters)['amount'] }
+
+
+def _get_ledger_bch_balance(**filters):
+    # same shape as '_get_bch_balance()'
+    totals = _get_ledger_totals(token__name='bch', **filters)
+    return { 'balance': totals['value'] }, totals['utxo_count']
+
 
 class Balance(APIView):
 
@@ -138,8 +155,12 @@ class Balance(APIView):
                 else:
                     query = Q(address__address=data['address']) & Q(spent=False)
 
-            if is_token_addr:
+            if is_token_addr and not multiple and not is_cashtoken_nft:
+                qs_balance = _get_ledger_token_balance(address__address=data['address'], category=category)
+            elif is_token_addr:
                 qs_balance = _get_ct_balance(query, multiple_tokens=multiple)
+            elif not multiple:
+                qs_balance = _get_ledger_token_balance(address__address=data['address'], token__tokenid=tokenid)
             else:
                 qs_balance = _get_slp_balance(query, multiple_tokens=multiple)
 
@@ -174,8 +195,7 @@ class Balance(APIView):
         
         if is_bch_address(bchaddress):
             data['address'] = bchaddress
-            query = Q(address__address=data['address']) & Q(spent=False)
-            qs_balance, qs_count = _get_bch_balance(query)
+            qs_balance, qs_count = _get_ledger_bch_balance(address__address=data['address'])
             bch_balance = qs_balance['balance'] or 0
             bch_balance = bch_balance / (10 ** 8)
 
@@ -199,7 +219,10 @@ class Balance(APIView):
                     multiple = True
                     query =  Q(wallet=wallet) & Q(spent=False)
 
-                qs_balance = _get_slp_balance(query, multiple_tokens=multiple)
+                if multiple:
+                    qs_balance = _get_slp_balance(query, multiple_tokens=multiple)
+                else:
+                    qs_balance = _get_ledger_token_balance(wallet=wallet, token__tokenid=tokenid_or_category)
 
                 if multiple:
                     pass
@@ -245,21 +268,24 @@ class Balance(APIView):
                     else:
                         query = query & Q(cashtoken_ft__category=_category)
 
-                    ct_cache_key = f'wallet:balance:token:{wallet_hash}:{_category}'
+                    ct_cache_key = wallet_balance_cache_key(wallet_hash, _category)
                     cached_data = cache.get(ct_cache_key)
                     if not cached_data:
-                        qs_balance = _get_ct_balance(query, multiple_tokens=False)
+                        if is_cashtoken_nft:
+                            qs_balance = _get_ct_balance(query, multiple_tokens=False)
+                        else:
+                            qs_balance = _get_ledger_token_balance(wallet=wallet, category=_category)
                 else:
                     is_bch = True
                     query = Q(wallet=wallet) & Q(spent=False)
                 
                 if is_bch:
-                    bch_cache_key = f'wallet:balance:bch:{wallet_hash}'
+                    bch_cache_key = wallet_balance_cache_key(wallet_hash)
                     cached_data = cache.get(bch_cache_key)
                     if cached_data:
                         data = json.loads(cached_data)
                     else:
-                        qs_balance, qs_count = _get_bch_balance(query)
+                        qs_balance, qs_count = _get_ledger_bch_balance(wallet=wallet)
                         bch_balance = qs_balance['balance'] or 0
                         bch_balance = bch_balance / (10 ** 8)
 
@@ -272,10 +298,8 @@ class Balance(APIView):
                         data['yield'] = None # compute_wallet_yield(wallet_hash)
                         data['valid'] = True
 
-                        cache.set(bch_cache_key, json.dumps(data))
+                        cache.set(bch_cache_key, json.dumps(data), ex=WALLET_BALANCE_CACHE_TTL)
                 else:
-                    ct_cache_key = f'wallet:balance:token:{wallet_hash}:{_category}'
-                    cached_data = cache.get(ct_cache_key)
                     if cached_data:
                         data = json.loads(cached_data) 
                     else:
@@ -305,7 +329,7 @@ class Balance(APIView):
                             data['commitment'] = token.commitment
                             data['capability'] = token.capability
 
-                        cache.set(ct_cache_key, json.dumps(data))
+                        cache.set(ct_cache_key, json.dumps(data), ex=WALLET_BALANCE_CACHE_TTL)
 
             # Update last_balance_check timestamp
             wallet.last_balance_check = timezone.now()
@@ -331,16 +355,14 @@ class SpendableBalance(APIView):
         qs_count = 0
         if is_bch_address(bchaddress):
             data['address'] = bchaddress
-            query = Q(address__address=bchaddress) & Q(spent=False)
-            qs_balance, qs_count = _get_bch_balance(query)
+            qs_balance, qs_count = _get_ledger_bch_balance(address__address=bchaddress)
         elif wallet_hash:
             wallet = Wallet.objects.get(wallet_hash=wallet_hash)
             data['wallet'] = wallet_hash
             if wallet.wallet_type != 'bch':
                 return Response({ 'detail': 'Invalid wallet type' }, status=400)
 
-            query = Q(wallet=wallet) & Q(spent=False)
-            qs_balance, qs_count = _get_bch_balance(query)
+            qs_balance, qs_count = _get_ledger_bch_balance(wallet=wallet)
 
         qs_balance = qs_balance['balance'] or 0
         bch_balance = qs_balance / (10 ** 8)
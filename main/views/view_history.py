@@ -6,43 +6,80 @@ from django.db.models import (
     F, Q, Value, Count,
     BigIntegerField,
 )
-import pickle
 import base64
-from django.conf import settings
+import math
 from django.db.models.functions import Substr, Cast, Floor
 from django.db.models import ExpressionWrapper, FloatField
+from django.utils.dateparse import parse_datetime
 from rest_framework import status
 from main.models import Wallet, Address, WalletHistory, TransactionMetaAttribute
-from django.core.paginator import Paginator
 from main.serializers import PaginatedWalletHistorySerializer
 from main.throttles import RebuildHistoryThrottle
+from main.utils.cache import (
+    WALLET_HISTORY_CACHE_TTL,
+    get_wallet_history_version,
+    wallet_history_cache_key,
+    get_cached_json,
+    set_cached_json,
+)
 from main.tasks import (
     rebuild_wallet_history
 )
 
 POS_ID_MAX_DIGITS = 4
-
-
-def store_object(key, obj, cache):
-    """Serialize an object using pickle and store it in Redis as a string."""
-    # Serialize the object to binary
-    pickled_data = pickle.dumps(obj)
-    # Convert binary to Base64 string
-    encoded_data = base64.b64encode(pickled_data).decode('utf-8')
-    # Store in Redis
-    cache.set(key, encoded_data)
-
-
-def retrieve_object(key, cache):
-    """Retrieve an object from Redis and deserialize it using pickle."""
-    # Get the Base64 string from Redis
-    encoded_data = cache.get(key)
-    if encoded_data is None:
-        return None
-    # Convert Base64 string back to binary
-    pickled_data = base64.b64decode(encoded_data)
-    # Deserialize the binary back to an object
-    return pickle.loads(pickled_data)
+HISTORY_PAGE_SIZE = 10
+
+
+def encode_history_cursor(row):
+    """
+        Cursor pointing after a history row in (tx_timestamp, id) descending order
+    """
+    tx_timestamp = row['tx_timestamp'].isoformat() if row['tx_timestamp'] else ''
+    value = f"{tx_timestamp}|{row['id']}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_history_cursor(cursor):
+    try:
+        tx_timestamp, _id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        _id = int(_id)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError(f"invalid cursor: {cursor}")
+
+    if not tx_timestamp:
+        return None, _id
+
+    tx_timestamp = parse_datetime(tx_timestamp)
+    if tx_timestamp is None:
+        raise ValueError(f"invalid cursor: {cursor}")
+    return tx_timestamp, _id
+
+
+def get_page_cursor_position(queryset, page, page_cursor_key):
+    """
+        Returns the position of the last row before the page, None if the page is past the last row
+        The cursor of a page is cached with its previous page, so paging through them in order never
+        scans the skipped rows. Otherwise only the (tx_timestamp, id) of the skipped rows are scanned.
+    """
+    cursor = get_cached_json(page_cursor_key)
+    if cursor:
+        return decode_history_cursor(cursor)
+
+    offset = (page - 1) * HISTORY_PAGE_SIZE
+    positions = list(queryset.values_list('tx_timestamp', 'id')[offset - 1:offset])
+    return positions[0] if positions else None
+
+
+def filter_after_cursor(queryset, tx_timestamp, _id):
+    # mirrors the ordering: tx_timestamp desc with nulls last, then id desc
+    if tx_timestamp is None:
+        return queryset.filter(tx_timestamp__isnull=True, id__lt=_id)
+
+    return queryset.filter(
+        Q(tx_timestamp__lt=tx_timestamp) |
+        Q(tx_timestamp=tx_timestamp, id__lt=_id) |
+        Q(tx_timestamp__isnull=True)
+    )
 
 
 class WalletHistoryView(APIView):
@@ -51,6 +88,7 @@ class WalletHistoryView(APIView):
         responses={200: PaginatedWalletHistorySerializer},
         manual_parameters=[
             openapi.Parameter(name="page", type=openapi.TYPE_NUMBER, in_=openapi.IN_QUERY, default=1),
+            openapi.Parameter(name="cursor", type=openapi.TYPE_STRING, in_=openapi.IN_QUERY, required=False, description="next_cursor of the previous page, takes precedence over page"),
             openapi.Parameter(name="posid", type=openapi.TYPE_NUMBER, in_=openapi.IN_QUERY, required=False),
             openapi.Parameter(name="type", type=openapi.TYPE_STRING, in_=openapi.IN_QUERY, default="all", enum=["incoming", "outgoing"]),
             openapi.Parameter(name="txids", type=openapi.TYPE_STRING, in_=openapi.IN_QUERY, required=False),
@@ -64,6 +102,7 @@ class WalletHistoryView(APIView):
         index = kwargs.get('index', None)
         txid = kwargs.get('txid', None)
         page = request.query_params.get('page', 1)
+        cursor = request.query_params.get('cursor', None)
         record_type = request.query_params.get('type', 'all')
         posid = request.query_params.get("posid", None)
         txids = request.query_params.get("txids", "")
@@ -77,110 +116,119 @@ class WalletHistoryView(APIView):
         if isinstance(txids, str):
             txids = [txid for txid in txids.split(",") if txid]
 
+        if posid:
+            try:
+                posid = int(posid)
+            except (TypeError, ValueError):
+                return Response(data=[f"invalid POS ID: {type(posid)}({posid})"], status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            page = int(page)
+            cursor_position = decode_history_cursor(cursor) if cursor else None
+        except ValueError as exception:
+            return Response(data=[str(exception)], status=status.HTTP_400_BAD_REQUEST)
+
         wallet = Wallet.objects.get(wallet_hash=wallet_hash)
 
         cache_key = None
-        history = []
-        data = None
+        count_cache_key = None
+        page_cursor_key = None
+        next_page_cursor_key = None
         if wallet.version > 1:
-            cache = settings.REDISKV
-            asset_key = token_id_or_category or 'bch'
-            cache_key = f'wallet:history:{wallet_hash}:{asset_key}:{str(page)}'
-            cached_data = cache.get(cache_key)
-            if cached_data:
-                data = retrieve_object(cached_data, cache)
-
-        if not data:
-            qs = WalletHistory.objects.exclude(amount=0)
-            if posid:
-                try:
-                    posid = int(posid)
-                except (TypeError, ValueError):
-                    return Response(data=[f"invalid POS ID: {type(posid)}({posid})"], status=status.HTTP_400_BAD_REQUEST)
-                    
-                qs = qs.filter_pos(wallet_hash, posid)
-            else:
-                qs = qs.filter(wallet=wallet)
-
-            if record_type in ['incoming', 'outgoing']:
-                qs = qs.filter(record_type=record_type)
-            if len(txids):
-                qs = qs.filter(txid__in=txids)
+            # the version is bumped on every history write of the wallet, so
+            # cached responses of any filter combination never go stale
+            version = get_wallet_history_version(wallet_hash)
+            filters = dict(
+                asset=token_id_or_category or 'bch',
+                category=category,
+                index=index,
+                txid=txid,
+                record_type=record_type,
+                posid=posid,
+                txids=sorted(txids),
+                include_attrs=include_attrs,
+            )
+            cache_key = wallet_history_cache_key(wallet_hash, version, page=page, cursor=cursor, **filters)
+            count_cache_key = wallet_history_cache_key(wallet_hash, version, count=True, **filters)
+            page_cursor_key = wallet_history_cache_key(wallet_hash, version, page_cursor=page, **filters)
+            next_page_cursor_key = wallet_history_cache_key(wallet_hash, version, page_cursor=page + 1, **filters)
+
+            data = get_cached_json(cache_key)
+            if data is not None:
+                return Response(data=data, status=status.HTTP_200_OK)
+
+        qs = WalletHistory.objects.exclude(amount=0)
+        if posid:
+            qs = qs.filter_pos(wallet_hash, posid)
+        else:
+            qs = qs.filter(wallet=wallet)
 
-            qs = qs.order_by(F('tx_timestamp').desc(nulls_last=True), F('date_created').desc(nulls_last=True))
+        if record_type in ['incoming', 'outgoing']:
+            qs = qs.filter(record_type=record_type)
+        if len(txids):
+            qs = qs.filter(txid__in=txids)
 
-            if include_attrs:
-                qs = qs.annotate_attributes(
-                    Q(wallet_hash="") | Q(wallet_hash=wallet_hash),
-                )
-            else:
-                qs = qs.annotate_empty_attributes()
-
-            if token_id_or_category or category:
-                if wallet.wallet_type == 'bch':
-                    if is_cashtoken_nft:
-                        qs = qs.filter(
-                            cashtoken_nft__category=category,
-                            cashtoken_nft__current_index=index,
-                            cashtoken_nft__current_txid=txid
-                        )
-                        history = qs.annotate(
-                            _token=F('cashtoken_nft__category')
-                        )
-                    else:
-                        qs = qs.filter(cashtoken_ft__category=token_id_or_category)
-                        history = qs.annotate(
-                            _token=F('cashtoken_ft__category'),
-                            amount=ExpressionWrapper(
-                                #F('amount') / (10 ** F('cashtoken_ft__info__decimals')),
-                                F('amount'),
-                                output_field=FloatField()
-                            )
-                        )
+        qs = qs.order_by(F('tx_timestamp').desc(nulls_last=True), F('id').desc())
 
-                    history = history.rename_annotations(
-                        _token='token_id_or_category'
-                    ).values(
-                        'record_type',
-                        'txid',
-                        'amount',
-                        'token',
-                        'tx_fee',
-                        'senders',
-                        'recipients',
-                        'date_created',
-                        'tx_timestamp',
-                        'usd_price',
-                        'market_prices',
-                        'attributes',
+        if include_attrs:
+            qs = qs.annotate_attributes(
+                Q(wallet_hash="") | Q(wallet_hash=wallet_hash),
+            )
+        else:
+            qs = qs.annotate_empty_attributes()
+
+        if token_id_or_category or category:
+            if wallet.wallet_type == 'bch':
+                if is_cashtoken_nft:
+                    qs = qs.filter(
+                        cashtoken_nft__category=category,
+                        cashtoken_nft__current_index=index,
+                        cashtoken_nft__current_txid=txid
+                    )
+                    history = qs.annotate(
+                        _token=F('cashtoken_nft__category')
                     )
                 else:
-                    qs = qs.filter(token__tokenid=token_id_or_category)
-
+                    qs = qs.filter(cashtoken_ft__category=token_id_or_category)
                     history = qs.annotate(
-                        _token=F('token__tokenid')
-                    ).rename_annotations(
-                        _token='token_id_or_category'
-                    ).values(
-                        'record_type',
-                        'txid',
-                        'amount',
-                        'token',
-                        'tx_fee',
-                        'senders',
-                        'recipients',
-                        'date_created',
-                        'tx_timestamp',
-                        'usd_price',
-                        'market_prices',
-                        'attributes',
+                        _token=F('cashtoken_ft__category'),
+                        amount=ExpressionWrapper(
+                            #F('amount') / (10 ** F('cashtoken_ft__info__decimals')),
+                            F('amount'),
+                            output_field=FloatField()
+                        )
                     )
+
+                history = history.rename_annotations(
+                    _token='token_id_or_category'
+                ).values(
+                    'id',
+                    'record_type',
+                    'txid',
+                    'amount',
+                    'token',
+                    'tx_fee',
+                    'senders',
+                    'recipients',
+                    'date_created',
+                    'tx_timestamp',
+                    'usd_price',
+                    'market_prices',
+                    'attributes',
+                )
             else:
-                qs = qs.filter(token__name='bch')
-                history = qs.values(
+                qs = qs.filter(token__tokenid=token_id_or_category)
+
+                history = qs.annotate(
+                    _token=F('token__tokenid')
+                ).rename_annotations(
+                    _token='token_id_or_category'
+                ).values(
+                    'id',
                     'record_type',
                     'txid',
                     'amount',
+                    'token',
                     'tx_fee',
                     'senders',
                     'recipients',
@@ -190,20 +238,69 @@ class WalletHistoryView(APIView):
                     'market_prices',
                     'attributes',
                 )
+        else:
+            qs = qs.filter(token__name='bch')
+            history = qs.values(
+                'id',
+                'record_type',
+                'txid',
+                'amount',
+                'tx_fee',
+                'senders',
+                'recipients',
+                'date_created',
+                'tx_timestamp',
+                'usd_price',
+                'market_prices',
+                'attributes',
+            )
 
-            if wallet.version == 1:
-                return Response(data=history, status=status.HTTP_200_OK)
-            else:
-                pages = Paginator(history, 10)
-                page_obj = pages.page(int(page))
-                data = {
-                    'history': page_obj.object_list,
-                    'page': page,
-                    'num_pages': pages.num_pages,
-                    'has_next': page_obj.has_next()
-                }
-
-                store_object(cache_key, data, cache)
+        if wallet.version == 1:
+            history = list(history)
+            for row in history:
+                row.pop('id')
+            return Response(data=history, status=status.HTTP_200_OK)
+
+        # keyset pagination, one extra row tells if there is a next page
+        # pages past the first continue after the last row of the previous page
+        is_past_last_page = False
+        if not cursor and page > 1:
+            cursor_position = get_page_cursor_position(history, page, page_cursor_key)
+            is_past_last_page = cursor_position is None
+
+        if is_past_last_page:
+            rows = []
+        elif cursor_position:
+            rows = list(filter_after_cursor(history, *cursor_position)[:HISTORY_PAGE_SIZE + 1])
+        else:
+            rows = list(history[:HISTORY_PAGE_SIZE + 1])
+
+        has_next = len(rows) > HISTORY_PAGE_SIZE
+        rows = rows[:HISTORY_PAGE_SIZE]
+        next_cursor = encode_history_cursor(rows[-1]) if has_next else None
+        for row in rows:
+            row.pop('id')
+        if next_cursor and not cursor:
+            set_cached_json(next_page_cursor_key, next_cursor, WALLET_HISTORY_CACHE_TTL)
+
+        # cursor requests page through the history without the total, it is only counted
+        # once per history version & filter combination for page requests
+        num_pages = None
+        if not cursor:
+            count = get_cached_json(count_cache_key)
+            if count is None:
+                count = history.count()
+                set_cached_json(count_cache_key, count, WALLET_HISTORY_CACHE_TTL)
+            num_pages = max(math.ceil(count / HISTORY_PAGE_SIZE), 1)
+
+        data = {
+            'history': rows,
+            'page': page,
+            'num_pages': num_pages,
+            'has_next': has_next,
+            'next_cursor': next_cursor,
+        }
+        set_cached_json(cache_key, data, WALLET_HISTORY_CACHE_TTL)
 
         return Response(data=data, status=status.HTTP_200_OK)
 
@@ -0,0 +1,46 @@
+import json
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+from notifications.utils.outbox import NotificationOutbox, OUTBOX_KEY, FLUSH_SCHEDULED_KEY
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def queue_push_notification(wallet_hash_list, message, **kwargs):
+    """
+        Adds a push notification to the outbox, it is sent together with the other notifications
+        queued within the outbox window. Takes the same args as 'send_push_notification_to_wallet_hashes()',
+        kwargs must be json serializable.
+    """
+    entry = json.dumps({
+        "wallet_hashes": list(wallet_hash_list),
+        "message": message,
+        "kwargs": kwargs,
+    }, default=str)
+
+    cache = settings.REDISKV
+    cache.rpush(OUTBOX_KEY, entry)
+
+    window = settings.NOTIFICATION_OUTBOX["WINDOW"]
+    if cache.set(FLUSH_SCHEDULED_KEY, 1, ex=window, nx=True):
+        flush_notification_outbox.apply_async(countdown=window)
+    return True
+
+
+@shared_task(queue='client_acknowledgement')
+def flush_notification_outbox():
+    counts = NotificationOutbox().flush()
+    if counts:
+        LOGGER.info(f"PUSH_NOTIF OUTBOX: {counts}")
+
+    # the failed batch is sent again with the next window's notifications, a flush
+    # scheduled at the same time by a new notification only finds an empty outbox
+    if counts.get("requeued"):
+        window = settings.NOTIFICATION_OUTBOX["WINDOW"]
+        settings.REDISKV.set(FLUSH_SCHEDULED_KEY, 1, ex=window)
+        flush_notification_outbox.apply_async(countdown=window)
+    return counts
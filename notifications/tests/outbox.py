@@ -0,0 +1,174 @@
+import json
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings, tag
+from django.utils import timezone
+from push_notifications.models import GCMDevice, APNSDevice
+
+from main.tests.mocker.redis import FakeRedis
+from notifications.models import DeviceWallet
+from notifications.tasks import queue_push_notification
+from notifications.utils.outbox import NotificationOutbox, OUTBOX_KEY
+
+
+class FakeTransport(object):
+    def __init__(self):
+        self.gcm_calls = []
+        self.apns_calls = []
+        self.gcm_error = None
+
+    def send_gcm(self, messages):
+        if self.gcm_error:
+            raise self.gcm_error
+        self.gcm_calls.append(messages)
+
+    def send_apns(self, registration_ids, message, application_id=None, **kwargs):
+        self.apns_calls.append((sorted(registration_ids), message, application_id, kwargs))
+
+
+@override_settings(NOTIFICATION_OUTBOX={ "WINDOW": 2, "BATCH_SIZE": 10, "MAX_ATTEMPTS": 2 })
+class NotificationOutboxTestCase(TestCase):
+    def setUp(self):
+        self.cache = FakeRedis()
+        self.transport = FakeTransport()
+        self.outbox = NotificationOutbox(transport=self.transport, cache=self.cache)
+
+        for index in range(2):
+            gcm_device = GCMDevice.objects.create(registration_id=f"gcm-{index}", cloud_message_type="FCM")
+            apns_device = APNSDevice.objects.create(registration_id=f"apns-{index}", application_id="app")
+            DeviceWallet.objects.create(
+                gcm_device=gcm_device,
+                wallet_hash="wallet-a",
+                multi_wallet_index=0,
+                last_active=timezone.now(),
+            )
+            DeviceWallet.objects.create(
+                apns_device=apns_device,
+                wallet_hash="wallet-a",
+                multi_wallet_index=0,
+                last_active=timezone.now(),
+            )
+
+        # same gcm device linked to a second wallet
+        DeviceWallet.objects.create(
+            gcm_device=GCMDevice.objects.get(registration_id="gcm-0"),
+            wallet_hash="wallet-b",
+            multi_wallet_index=1,
+            last_active=timezone.now(),
+        )
+
+    def entry(self, wallet_hashes, txid):
+        return {
+            "wallet_hashes": wallet_hashes,
+            "message": f"Received {txid}",
+            "kwargs": { "title": "Payment Received", "extra": { "txid": txid } },
+        }
+
+    @tag("unit")
+    def test_resolves_devices_in_one_query(self):
+        with self.assertNumQueries(1):
+            devices = self.outbox.resolve_devices(["wallet-a", "wallet-b"])
+
+        self.assertEqual(len(devices["wallet-a"]), 4)
+        self.assertEqual(len(devices["wallet-b"]), 1)
+
+    @tag("unit")
+    def test_collapses_same_txid_per_device(self):
+        entries = [
+            self.entry(["wallet-a"], "tx1"),
+            self.entry(["wallet-b"], "tx1"),
+            self.entry(["wallet-a"], "tx1"),
+        ]
+        counts = self.outbox.send(entries)
+
+        self.assertEqual(counts["gcm_messages"], 2)
+        self.assertEqual(counts["apns_devices"], 2)
+        self.assertEqual(counts["collapsed"], 5)
+
+        self.assertEqual(len(self.transport.gcm_calls), 1)
+        tokens = sorted(message.token for message in self.transport.gcm_calls[0])
+        self.assertEqual(tokens, ["gcm-0", "gcm-1"])
+
+    @tag("unit")
+    def test_groups_apns_devices_per_request(self):
+        counts = self.outbox.send([
+            self.entry(["wallet-a"], "tx1"),
+            self.entry(["wallet-a"], "tx2"),
+        ])
+
+        self.assertEqual(counts["apns_requests"], 2)
+        self.assertEqual(len(self.transport.apns_calls), 2)
+        for registration_ids, _, application_id, kwargs in self.transport.apns_calls:
+            self.assertEqual(registration_ids, ["apns-0", "apns-1"])
+            self.assertEqual(application_id, "app")
+            self.assertEqual(kwargs["extra"]["multi_wallet_index"], 0)
+
+    def queue(self, *entries):
+        self.cache.rpush(OUTBOX_KEY, *[json.dumps(entry) for entry in entries])
+
+    def queued(self):
+        return [json.loads(entry) for entry in self.cache.lrange(OUTBOX_KEY, 0, -1)]
+
+    @tag("unit")
+    def test_queue_push_notification(self):
+        with override_settings(REDISKV=self.cache), \
+                mock.patch("notifications.tasks.flush_notification_outbox.apply_async") as apply_async:
+            queue_push_notification(["wallet-a"], "Received tx1", title="Payment Received", extra={ "txid": "tx1" })
+            queue_push_notification(["wallet-b"], "Received tx2", extra={ "txid": "tx2" })
+
+        # one flush per window
+        apply_async.assert_called_once_with(countdown=settings.NOTIFICATION_OUTBOX["WINDOW"])
+        self.assertEqual(self.queued(), [
+            { "wallet_hashes": ["wallet-a"], "message": "Received tx1", "kwargs": { "title": "Payment Received", "extra": { "txid": "tx1" } } },
+            { "wallet_hashes": ["wallet-b"], "message": "Received tx2", "kwargs": { "extra": { "txid": "tx2" } } },
+        ])
+
+    @tag("unit")
+    def test_drains_in_batches(self):
+        self.queue(*[self.entry(["wallet-a"], f"tx{index}") for index in range(25)])
+
+        batches = []
+        while True:
+            entries = self.outbox.drain()
+            if not entries:
+                break
+            batches.append([entry["kwargs"]["extra"]["txid"] for entry in entries])
+
+        self.assertEqual([len(batch) for batch in batches], [10, 10, 5])
+        self.assertEqual(sum(batches, []), [f"tx{index}" for index in range(25)])
+        self.assertEqual(self.queued(), [])
+
+    @tag("unit")
+    def test_flush_sends_repeated_txids_once(self):
+        self.queue(
+            self.entry(["wallet-a"], "tx1"),
+            self.entry(["wallet-a", "wallet-b"], "tx1"),
+            self.entry(["wallet-b"], "tx2"),
+        )
+        counts = self.outbox.flush()
+
+        self.assertEqual(counts["entries"], 3)
+        self.assertEqual(counts["gcm_messages"], 3)
+        self.assertEqual(counts["apns_devices"], 2)
+        self.assertEqual(self.queued(), [])
+
+        tokens = sorted(message.token for message in self.transport.gcm_calls[0])
+        self.assertEqual(tokens, ["gcm-0", "gcm-0", "gcm-1"])
+
+    @tag("unit")
+    def test_failed_batch_stays_queued(self):
+        self.queue(self.entry(["wallet-a"], "tx1"), self.entry(["wallet-b"], "tx2"))
+        self.transport.gcm_error = Exception("FCM unavailable")
+
+        self.assertEqual(self.outbox.flush(), { "requeued": 2, "dropped": 0 })
+        self.assertEqual([entry["attempts"] for entry in self.queued()], [2, 2])
+
+        # dropped after MAX_ATTEMPTS
+        self.assertEqual(self.outbox.flush(), { "requeued": 0, "dropped": 2 })
+        self.assertEqual(self.queued(), [])
+
+        self.queue(self.entry(["wallet-a"], "tx3"))
+        self.transport.gcm_error = None
+        self.assertEqual(self.outbox.flush()["entries"], 1)
+        self.assertEqual(self.queued(), [])
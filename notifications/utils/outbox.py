@@ -0,0 +1,231 @@
+import hashlib
+import json
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Q
+from firebase_admin import messaging
+from push_notifications.apns import apns_send_bulk_message
+from push_notifications.models import GCMDevice
+from notifications.models import DeviceWallet
+
+from .send import parse_send_message_for_gcm, parse_send_message_for_apns
+from .send_response import parse_gcm_response
+
+
+LOGGER = logging.getLogger(__name__)
+
+OUTBOX_KEY = 'notifications:outbox'
+FLUSH_SCHEDULED_KEY = 'notifications:outbox:flush-scheduled'
+
+# max messages per FCM batch request
+GCM_BATCH_SIZE = 500
+
+
+class OutboxSendError(Exception):
+    pass
+
+
+class PushTransport:
+    """
+        Sends prepared push notifications to FCM & APNS
+    """
+
+    def send_gcm(self, messages):
+        """
+            messages: list of messaging.Message, each addressed to a device token
+            Returns a response per message
+        """
+        responses = []
+        for index in range(0, len(messages), GCM_BATCH_SIZE):
+            chunk = messages[index:index + GCM_BATCH_SIZE]
+            batch_response = messaging.send_each(chunk, app=settings.PUSH_NOTIFICATIONS_SETTINGS.get("FIREBASE_APP"))
+            responses += batch_response.responses
+
+        # same cleanup the device querysets do after sending
+        unregistered = [
+            message.token for message, response in zip(messages, responses)
+            if isinstance(response.exception, messaging.UnregisteredError)
+        ]
+        if unregistered:
+            GCMDevice.objects.filter(registration_id__in=unregistered).update(active=False)
+
+        return parse_gcm_response(messaging.BatchResponse(responses))
+
+    def send_apns(self, registration_ids, message, application_id=None, **kwargs):
+        return apns_send_bulk_message(
+            registration_ids=registration_ids,
+            alert=message,
+            application_id=application_id,
+            **kwargs,
+        )
+
+
+class NotificationOutbox:
+    """
+        Sends the queued push notifications in bulk
+        Devices of all queued wallet hashes are resolved in one query, a notification
+        of the same txid reaches a device only once, and messages are sent in batches.
+        Entries of a batch whose sends failed are queued again, up to 'MAX_ATTEMPTS' times.
+    """
+
+    def __init__(self, transport=None, cache=None, batch_size=None, max_attempts=None):
+        self.transport = transport or PushTransport()
+        self.cache = cache or settings.REDISKV
+        self.batch_size = batch_size or settings.NOTIFICATION_OUTBOX["BATCH_SIZE"]
+        self.max_attempts = max_attempts or settings.NOTIFICATION_OUTBOX["MAX_ATTEMPTS"]
+
+    def drain(self):
+        pipeline = self.cache.pipeline(transaction=True)
+        pipeline.lrange(OUTBOX_KEY, 0, self.batch_size - 1)
+        pipeline.ltrim(OUTBOX_KEY, self.batch_size, -1)
+        entries, _ = pipeline.execute()
+        return [json.loads(entry) for entry in entries]
+
+    def requeue(self, entries):
+        """
+            Queues the entries again, returns how many were dropped after their last attempt
+        """
+        retried = []
+        for entry in entries:
+            attempts = entry.get('attempts', 1)
+            if attempts >= self.max_attempts:
+                LOGGER.error(f"PUSH_NOTIF OUTBOX: dropped after {attempts} attempts: {entry}")
+                continue
+            retried.append(json.dumps({ **entry, 'attempts': attempts + 1 }))
+
+        if retried:
+            self.cache.rpush(OUTBOX_KEY, *retried)
+        return len(entries) - len(retried)
+
+    def flush(self):
+        """
+            Sends queued notifications until the outbox is empty, returns send counts
+            Stops at the first batch with failed sends, 'requeued' counts its entries queued again.
+        """
+        counts = defaultdict(int)
+        while True:
+            entries = self.drain()
+            if not entries:
+                break
+
+            try:
+                batch_counts = self.send(entries)
+            except Exception as exception:
+                LOGGER.exception(exception)
+                dropped = self.requeue(entries)
+                counts['requeued'] += len(entries) - dropped
+                counts['dropped'] += dropped
+                break
+
+            for key, count in batch_counts.items():
+                counts[key] += count
+        return dict(counts)
+
+    def resolve_devices(self, wallet_hashes):
+        """
+            Returns dict of wallet_hash -> list of (platform, device_id, registration_id, application_id, multi_wallet_index)
+        """
+        device_wallets = DeviceWallet.objects.filter(
+            Q(gcm_device__active=True) | Q(apns_device__active=True),
+            wallet_hash__in=wallet_hashes,
+        ).values(
+            'wallet_hash',
+            'multi_wallet_index',
+            'gcm_device_id',
+            'gcm_device__active',
+            'gcm_device__registration_id',
+            'apns_device_id',
+            'apns_device__active',
+            'apns_device__registration_id',
+            'apns_device__application_id',
+        )
+
+        devices = defaultdict(list)
+        for device_wallet in device_wallets:
+            wallet_hash = device_wallet['wallet_hash']
+            index = device_wallet['multi_wallet_index']
+            if device_wallet['gcm_device_id'] and device_wallet['gcm_device__active']:
+                devices[wallet_hash].append((
+                    'gcm',
+                    device_wallet['gcm_device_id'],
+                    device_wallet['gcm_device__registration_id'],
+                    None,
+                    index,
+                ))
+            if device_wallet['apns_device_id'] and device_wallet['apns_device__active']:
+                devices[wallet_hash].append((
+                    'apns',
+                    device_wallet['apns_device_id'],
+                    device_wallet['apns_device__registration_id'],
+                    device_wallet['apns_device__application_id'],
+                    index,
+                ))
+        return devices
+
+    def collapse_key(self, entry):
+        txid = (entry['kwargs'].get('extra') or {}).get('txid')
+        if txid:
+            return txid
+        return hashlib.sha1(json.dumps([entry['message'], entry['kwargs']], sort_keys=True).encode()).hexdigest()
+
+    def send(self, entries):
+        wallet_hashes = set(wallet_hash for entry in entries for wallet_hash in entry['wallet_hashes'])
+        devices = self.resolve_devices(wallet_hashes)
+
+        seen = set()
+        gcm_messages = []
+        apns_groups = defaultdict(list)
+        collapsed = 0
+        for entry_index, entry in enumerate(entries):
+            collapse_key = self.collapse_key(entry)
+            gcm_template = None
+
+            for wallet_hash in entry['wallet_hashes']:
+                for platform, device_id, registration_id, application_id, index in devices.get(wallet_hash, []):
+                    if (collapse_key, platform, device_id) in seen:
+                        collapsed += 1
+                        continue
+                    seen.add((collapse_key, platform, device_id))
+
+                    if platform == 'gcm':
+                        if gcm_template is None:
+                            gcm_template, _ = parse_send_message_for_gcm(entry['message'], **entry['kwargs'])
+                        gcm_messages.append(messaging.Message(
+                            android=gcm_template.android,
+                            data={ **(gcm_template.data or {}), "multi_wallet_index": str(index) },
+                            token=registration_id,
+                        ))
+                    else:
+                        apns_groups[(entry_index, index, application_id)].append(registration_id)
+
+        # all requests are attempted before failing the batch
+        failures = 0
+        for (entry_index, index, application_id), registration_ids in apns_groups.items():
+            entry = entries[entry_index]
+            message, kwargs = parse_send_message_for_apns(entry['message'], **entry['kwargs'])
+            kwargs["extra"] = { **(kwargs.get("extra") or {}), "multi_wallet_index": index }
+            try:
+                self.transport.send_apns(registration_ids, message, application_id=application_id, **kwargs)
+            except Exception as exception:
+                LOGGER.exception(exception)
+                failures += 1
+
+        if gcm_messages:
+            try:
+                self.transport.send_gcm(gcm_messages)
+            except Exception as exception:
+                LOGGER.exception(exception)
+                failures += 1
+
+        if failures:
+            raise OutboxSendError(f"{failures} push notification requests failed")
+
+        return {
+            "entries": len(entries),
+            "gcm_messages": len(gcm_messages),
+            "apns_devices": sum(len(registration_ids) for registration_ids in apns_groups.values()),
+            "apns_requests": len(apns_groups),
+            "collapsed": collapsed,
+        }
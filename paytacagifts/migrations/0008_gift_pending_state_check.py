@@ -0,0 +1,81 @@
+# Generated by Django 3.0.14 on 2026-10-18 00:00
+
+from django.db import migrations, models
+
+
+# Flags the open gifts whose state may have changed in a main_transaction statement:
+# - gifts with a new output to their address (funding)
+# - gifts with an output spent (claim), or whose spending tx's outputs were just saved,
+#   as the spending tx's outputs may be saved after the spend
+# Only flagging is done here, the gifts are updated by 'process_gift_state_checks'.
+CREATE_TRIGGERS_SQL = """
+CREATE OR REPLACE FUNCTION paytacagifts_gift_flag() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE paytacagifts_gift SET pending_state_check = true
+        WHERE date_claimed IS NULL AND NOT pending_state_check AND address IN (
+            SELECT address.address
+            FROM new_rows
+            JOIN main_address address ON address.id = new_rows.address_id
+            UNION
+            SELECT address.address
+            FROM new_rows
+            JOIN main_transaction spent_output ON spent_output.spending_txid = new_rows.txid
+            JOIN main_address address ON address.id = spent_output.address_id
+        );
+    ELSE
+        UPDATE paytacagifts_gift SET pending_state_check = true
+        WHERE date_claimed IS NULL AND NOT pending_state_check AND address IN (
+            SELECT address.address
+            FROM new_rows
+            JOIN old_rows ON old_rows.id = new_rows.id
+            JOIN main_address address ON address.id = new_rows.address_id
+            WHERE new_rows.spent AND NOT old_rows.spent
+        );
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER paytacagifts_gift_flag_insert
+    AFTER INSERT ON main_transaction
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE paytacagifts_gift_flag();
+
+CREATE TRIGGER paytacagifts_gift_flag_update
+    AFTER UPDATE ON main_transaction
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE paytacagifts_gift_flag();
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS paytacagifts_gift_flag_insert ON main_transaction;
+DROP TRIGGER IF EXISTS paytacagifts_gift_flag_update ON main_transaction;
+DROP FUNCTION IF EXISTS paytacagifts_gift_flag();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0104_cashnonfungibletokengenesis'),
+        ('paytacagifts', '0007_auto_20240908_0726'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gift',
+            name='pending_state_check',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='gift',
+            index=models.Index(condition=models.Q(pending_state_check=True), fields=['pending_state_check'], name='gift_pending_state_check_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gift',
+            index=models.Index(condition=models.Q(date_claimed__isnull=True), fields=['address'], name='gift_open_address_idx'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS_SQL, DROP_TRIGGERS_SQL),
+    ]
@@ -42,6 +42,9 @@ class Gift(models.Model):
     claim_txid = models.CharField(max_length=70, blank=True, db_index=True)
     wallet = models.ForeignKey(Wallet, related_name="gifts", on_delete=models.CASCADE)
     campaign = models.ForeignKey(Campaign, related_name="gifts", on_delete=models.CASCADE, blank=True, null=True)
+    # set by a trigger on main_transaction when an output to the gift's address is saved or spent,
+    # see migration 0008 & paytacagifts.tasks.process_gift_state_checks
+    pending_state_check = models.BooleanField(default=False)
 
     def __str__(self):
         return str(self.id)
@@ -55,6 +58,8 @@ class Gift(models.Model):
             models.Index(fields=['gift_code_hash']),
             models.Index(fields=['date_funded']),
             models.Index(fields=['date_claimed']),
+            models.Index(fields=['pending_state_check'], condition=models.Q(pending_state_check=True), name='gift_pending_state_check_idx'),
+            models.Index(fields=['address'], condition=models.Q(date_claimed__isnull=True), name='gift_open_address_idx'),
         ]
 
 
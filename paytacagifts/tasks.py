@@ -1,40 +1,134 @@
+import logging
+
 from celery import shared_task
+from django.db import transaction as trans
+from django.db.models import Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from paytacagifts.models import Gift, Claim
 from main.models import Transaction
 
+LOGGER = logging.getLogger(__name__)
+
+STATE_CHECK_BATCH_SIZE = 500
+
+
+def fund_gifts(gift_ids):
+    """
+        Sets the funding date of the unfunded gifts whose address received an output, in a single query
+        Returns the number of gifts funded
+    """
+    address_transactions = Transaction.objects.filter(address__address=OuterRef("address"))
+    return Gift.objects.filter(
+        Exists(address_transactions),
+        id__in=gift_ids,
+        date_funded__isnull=True,
+    ).update(
+        date_funded=Subquery(address_transactions.order_by("date_created").values("date_created")[:1]),
+    )
+
+
+def claim_gifts(gift_ids):
+    """
+        Marks the funded gifts whose output was spent to the wallet of one of their claims as claimed
+        Returns the number of gifts claimed
+    """
+    open_gifts = Gift.objects.filter(id__in=gift_ids, date_funded__isnull=False, date_claimed__isnull=True)
+    spends = Transaction.objects.filter(
+        address__address__in=open_gifts.order_by().values("address"),
+        spent=True,
+    ).exclude(
+        spending_txid="",
+    ).order_by().values_list("address__address", "spending_txid").distinct()
+    spends = list(spends)
+    if not spends:
+        return 0
+
+    gifts = {}
+    for gift in open_gifts.filter(address__in=set(address for address, _ in spends)):
+        gifts.setdefault(gift.address, []).append(gift)
+
+    spending_txids = {}
+    for address, spending_txid in spends:
+        spending_txids.setdefault(spending_txid, []).extend(gifts.get(address, []))
+
+    outputs = Transaction.objects.filter(
+        txid__in=spending_txids.keys(),
+        wallet__isnull=False,
+    ).annotate(
+        timestamp=Coalesce("tx_timestamp", "date_created"),
+    ).order_by().values_list("txid", "wallet__wallet_hash", "timestamp")
+
+    # the latest claim of a wallet on a gift wins
+    claims = {
+        (claim.gift_id, claim.wallet.wallet_hash): claim
+        for claim in Claim.objects.filter(
+            gift_id__in=[gift.id for address_gifts in gifts.values() for gift in address_gifts],
+        ).select_related("wallet").order_by("date_created")
+    }
+
+    claimed_gifts = {}
+    succeeded_claims = {}
+    for txid, wallet_hash, timestamp in outputs:
+        for gift in spending_txids[txid]:
+            claim = claims.get((gift.id, wallet_hash))
+            if not claim or gift.id in claimed_gifts:
+                continue
+
+            gift.date_claimed = timestamp
+            gift.claim_txid = txid
+            claimed_gifts[gift.id] = gift
+
+            claim.succeeded = True
+            succeeded_claims[claim.id] = claim
+
+    with trans.atomic():
+        Gift.objects.bulk_update(claimed_gifts.values(), ["date_claimed", "claim_txid"])
+        Claim.objects.bulk_update(succeeded_claims.values(), ["succeeded"])
+    return len(claimed_gifts)
+
+
+def update_gifts_state(gift_ids):
+    funded = fund_gifts(gift_ids)
+    claimed = claim_gifts(gift_ids)
+    return funded, claimed
+
 
 @shared_task(queue='monitor-gifts')
-def check_unfunded_gifts():
-    unfunded_gifts = Gift.objects.filter(date_funded__isnull=True)
-    for gift in unfunded_gifts:
-        funding_check = Transaction.objects.filter(address__address=gift.address)
-        if funding_check.exists():
-            funding_tx = funding_check.first()
-            gift.date_funded = funding_tx.date_created
-            gift.save()
+def process_gift_state_checks():
+    """
+        Updates the gifts flagged by the trigger on main_transaction, see migration 0008
+        The flags are cleared before the gifts are checked, so a gift flagged again
+        meanwhile is checked on the next run.
+    """
+    funded = claimed = 0
+    while True:
+        with trans.atomic():
+            gift_ids = list(
+                Gift.objects.select_for_update(skip_locked=True)
+                    .filter(pending_state_check=True)
+                    .values_list("id", flat=True)[:STATE_CHECK_BATCH_SIZE]
+            )
+            if not gift_ids:
+                break
+            Gift.objects.filter(id__in=gift_ids).update(pending_state_check=False)
+
+        batch_funded, batch_claimed = update_gifts_state(gift_ids)
+        funded += batch_funded
+        claimed += batch_claimed
+
+    if funded or claimed:
+        LOGGER.info(f"GIFT STATE CHECKS | funded: {funded} | claimed: {claimed}")
+    return funded, claimed
 
 
 @shared_task(queue='monitor-gifts')
-def check_unclaimed_gifts():
-    funded_gifts = Gift.objects.filter(date_funded__isnull=False)
-    for gift in funded_gifts:
-        funding_tx = Transaction.objects.filter(
-            address__address=gift.address
-        ).first()
-        if funding_tx:
-            if funding_tx.spent:
-                # Determine which claim succeeded
-                txs = Transaction.objects.filter(txid=funding_tx.spending_txid)
-                for tx in txs:
-                    if tx.wallet:
-                        claim_check = Claim.objects.filter(gift=gift, wallet__wallet_hash=tx.wallet.wallet_hash)
-                        if claim_check.exists():
-                            # Udpate gift fields
-                            gift.date_claimed = tx.tx_timestamp
-                            gift.claim_txid = funding_tx.spending_txid
-                            gift.save()
-
-                            # Mark claim as succeeded
-                            claim = claim_check.latest('date_created')
-                            claim.succeeded = True
-                            claim.save()
+def reconcile_open_gifts():
+    """
+        Catches up on the gifts still open in case a state change was missed, e.g. gifts
+        created after their address received or spent an output
+    """
+    gift_ids = Gift.objects.filter(date_claimed__isnull=True).order_by().values("id")
+    funded, claimed = update_gifts_state(gift_ids)
+    if funded or claimed:
+        LOGGER.info(f"GIFT RECONCILIATION | funded: {funded} | claimed: {claimed}")
+    return funded, claimed
@@ -1,3 +1,177 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import TestCase, tag
+from django.utils import timezone
+
+from main.models import Address, Token, Transaction, Wallet as MainWallet
+from paytacagifts.models import Claim, Gift, Wallet
+from paytacagifts.tasks import claim_gifts, fund_gifts, process_gift_state_checks, reconcile_open_gifts
+
+
+GIFT_ADDRESS = "bchtest:qgiftqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqq"
+CLAIMER_ADDRESS = "bchtest:qclaimerqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqq"
+FUNDING_TXID = "aa" * 32
+CLAIM_TXID = "bb" * 32
+
+
+class GiftStateTestCase(TestCase):
+    def setUp(self):
+        self.bch = Token.objects.create(name="bch", tokenid="")
+        self.claimer_wallet = MainWallet.objects.create(wallet_hash="claimer-hash", wallet_type="bch", version=2)
+        self.gift_address = Address.objects.create(address=GIFT_ADDRESS, address_path="0/0")
+        self.claimer_address = Address.objects.create(
+            address=CLAIMER_ADDRESS,
+            wallet=self.claimer_wallet,
+            address_path="0/0",
+        )
+
+        self.gift = self.create_gift(GIFT_ADDRESS)
+        self.claim = Claim.objects.create(
+            wallet=Wallet.objects.create(wallet_hash="claimer-hash"),
+            gift=self.gift,
+            amount=0.0001,
+        )
+
+    def create_gift(self, address, code="gift"):
+        return Gift.objects.create(
+            gift_code_hash=f"{code}-hash",
+            address=address,
+            amount=0.0001,
+            share="share",
+            wallet=Wallet.objects.create(wallet_hash="creator-hash"),
+        )
+
+    def create_output(self, txid, address, **kwargs):
+        # bulk_create skips the post save signals, the triggers on main_transaction still fire
+        return Transaction.objects.bulk_create([
+            Transaction(
+                txid=txid,
+                index=0,
+                address=address,
+                wallet=address.wallet,
+                token=self.bch,
+                value=10000,
+                source="test",
+                **kwargs,
+            )
+        ])[0]
+
+    def spend_gift_output(self):
+        Transaction.objects.filter(txid=FUNDING_TXID).update(spent=True, spending_txid=CLAIM_TXID)
+
+    def is_flagged(self, gift=None):
+        gift = gift or self.gift
+        return Gift.objects.filter(id=gift.id, pending_state_check=True).exists()
+
+    def clear_flags(self):
+        Gift.objects.update(pending_state_check=False)
+
+    @tag("unit")
+    def test_output_insert_flags_gift(self):
+        other_gift = self.create_gift("bchtest:qother", code="other")
+
+        self.create_output(FUNDING_TXID, self.gift_address)
+        self.assertTrue(self.is_flagged())
+        self.assertFalse(self.is_flagged(other_gift))
+
+    @tag("unit")
+    def test_spend_flags_gift(self):
+        self.create_output(FUNDING_TXID, self.gift_address)
+        self.clear_flags()
+
+        # updates that don't spend an output are ignored
+        Transaction.objects.filter(txid=FUNDING_TXID).update(acknowledged=True)
+        self.assertFalse(self.is_flagged())
+
+        self.spend_gift_output()
+        self.assertTrue(self.is_flagged())
+
+    @tag("unit")
+    def test_spending_tx_outputs_saved_after_spend_flag_gift(self):
+        self.create_output(FUNDING_TXID, self.gift_address)
+        self.spend_gift_output()
+        self.clear_flags()
+
+        self.create_output(CLAIM_TXID, self.claimer_address)
+        self.assertTrue(self.is_flagged())
+
+    @tag("unit")
+    def test_fund_and_claim_gifts(self):
+        funding_output = self.create_output(FUNDING_TXID, self.gift_address)
+        self.assertEqual(claim_gifts([self.gift.id]), 0)
+        self.assertEqual(fund_gifts([self.gift.id]), 1)
+        self.assertEqual(fund_gifts([self.gift.id]), 0)
+
+        self.gift.refresh_from_db()
+        self.assertEqual(self.gift.date_funded, funding_output.date_created)
+
+        self.spend_gift_output()
+        # without a tx timestamp the claim date falls back to when the output was saved
+        claim_output = self.create_output(CLAIM_TXID, self.claimer_address, tx_timestamp=None)
+        self.assertEqual(claim_gifts([self.gift.id]), 1)
+        self.assertEqual(claim_gifts([self.gift.id]), 0)
+
+        self.gift.refresh_from_db()
+        self.claim.refresh_from_db()
+        self.assertEqual(self.gift.date_claimed, claim_output.date_created)
+        self.assertEqual(self.gift.claim_txid, CLAIM_TXID)
+        self.assertTrue(self.claim.succeeded)
+
+    @tag("unit")
+    def test_spend_to_wallet_without_claim_is_not_a_claim(self):
+        other_wallet = MainWallet.objects.create(wallet_hash="other-hash", wallet_type="bch", version=2)
+        other_address = Address.objects.create(address="bchtest:qotherwallet", wallet=other_wallet, address_path="0/0")
+
+        self.create_output(FUNDING_TXID, self.gift_address)
+        fund_gifts([self.gift.id])
+        self.spend_gift_output()
+        self.create_output(CLAIM_TXID, other_address)
+
+        self.assertEqual(claim_gifts([self.gift.id]), 0)
+        self.gift.refresh_from_db()
+        self.assertIsNone(self.gift.date_claimed)
+
+    @tag("unit")
+    def test_process_gift_state_checks(self):
+        self.create_output(FUNDING_TXID, self.gift_address)
+        self.assertEqual(process_gift_state_checks(), (1, 0))
+        self.assertFalse(self.is_flagged())
+
+        tx_timestamp = timezone.now() - timedelta(minutes=5)
+        self.spend_gift_output()
+        self.create_output(CLAIM_TXID, self.claimer_address, tx_timestamp=tx_timestamp)
+        self.assertEqual(process_gift_state_checks(), (0, 1))
+        self.assertEqual(process_gift_state_checks(), (0, 0))
+
+        self.gift.refresh_from_db()
+        self.assertEqual(self.gift.date_claimed, tx_timestamp)
+
+    @tag("unit")
+    def test_reconcile_picks_up_gift_created_after_funding(self):
+        address = Address.objects.create(address="bchtest:qlategift", address_path="0/1")
+        funding_output = self.create_output("cc" * 32, address)
+
+        # the trigger had no gift to flag when the output was saved
+        late_gift = self.create_gift(address.address, code="late")
+        self.assertFalse(self.is_flagged(late_gift))
+        self.assertEqual(process_gift_state_checks(), (0, 0))
+
+        self.assertEqual(reconcile_open_gifts(), (1, 0))
+        late_gift.refresh_from_db()
+        self.assertEqual(late_gift.date_funded, funding_output.date_created)
+
+    @tag("unit")
+    def test_latest_claim_of_wallet_succeeds(self):
+        latest_claim = Claim.objects.create(wallet=self.claim.wallet, gift=self.gift, amount=0.0001)
+        Claim.objects.filter(id=self.claim.id).update(date_created=timezone.now() - timedelta(minutes=5))
+
+        self.create_output(FUNDING_TXID, self.gift_address)
+        fund_gifts([self.gift.id])
+        self.spend_gift_output()
+        self.create_output(CLAIM_TXID, self.claimer_address)
+        self.assertEqual(claim_gifts([self.gift.id]), 1)
+
+        latest_claim.refresh_from_db()
+        self.claim.refresh_from_db()
+        self.assertTrue(latest_claim.succeeded)
+        self.assertFalse(self.claim.succeeded)
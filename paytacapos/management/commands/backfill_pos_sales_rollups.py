@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from paytacapos.utils.sales_rollup import get_pos_history_days, rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily POS sales rollups from wallet histories"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-w", "--wallet-hash", type=str, default=None, help="only rebuild the rollups of this wallet")
+        parser.add_argument("-s", "--since", type=str, default=None, help="only rebuild days from this date, YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = datetime.strptime(options["since"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--since must be a date in YYYY-MM-DD format")
+
+        days = list(get_pos_history_days(wallet_hash=options["wallet_hash"], since=since))
+        self.stdout.write(f"Rebuilding rollups of {len(days)} wallet days")
+
+        for index, (wallet_hash, date) in enumerate(days, start=1):
+            rebuild_sales_rollups(wallet_hash, date)
+            if index % 1000 == 0:
+                self.stdout.write(f"{index}/{len(days)} wallet days rebuilt")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups of {len(days)} wallet days"))
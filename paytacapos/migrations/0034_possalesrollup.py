@@ -0,0 +1,31 @@
+# Generated by Django 3.0.14 on 2026-10-18 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('paytacapos', '0033_auto_20241022_0535'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PosSalesRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wallet_hash', models.CharField(max_length=70)),
+                ('posid', models.IntegerField(blank=True, null=True)),
+                ('date', models.DateField()),
+                ('currency', models.CharField(blank=True, default='', max_length=10)),
+                ('total', models.FloatField(default=0)),
+                ('count', models.IntegerField(default=0)),
+                ('total_market_value', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='possalesrollup',
+            index=models.Index(fields=['wallet_hash', 'posid', 'date'], name='paytacapos__wallet__b4af37_idx'),
+        ),
+    ]
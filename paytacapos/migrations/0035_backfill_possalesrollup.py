@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+# this is manually added
+# past days of the sales summary are read from the rollups only, so they are built for all existing
+# wallet histories here, later ones are kept up to date by the update_sales_rollups task
+def backfill_pos_sales_rollups(apps, schema_editor):
+    from paytacapos.utils.sales_rollup import get_pos_history_days, rebuild_sales_rollups
+
+    for wallet_hash, date in get_pos_history_days():
+        rebuild_sales_rollups(wallet_hash, date)
+
+
+class Migration(migrations.Migration):
+    # each wallet day is rebuilt in its own transaction
+    atomic = False
+
+    dependencies = [
+        ('main', '0104_cashnonfungibletokengenesis'),
+        ('paytacapos', '0034_possalesrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_pos_sales_rollups, migrations.RunPython.noop),
+    ]
@@ -318,3 +318,28 @@ class Branch(models.Model):
             merchant.location = new_location
             merchant.save()
         return new_location
+
+
+class PosSalesRollup(models.Model):
+    """
+        Daily totals of a wallet's incoming BCH payments to its POS devices
+        Rows of a (wallet_hash, date) are rebuilt together, see paytacapos/utils/sales_rollup.py
+        posid is null for the totals across all of the wallet's POS devices.
+        Rows with an empty currency hold the total & count, the other rows hold
+        the total market value in their currency.
+    """
+    wallet_hash = models.CharField(max_length=70)
+    posid = models.IntegerField(null=True, blank=True)
+    date = models.DateField()
+    currency = models.CharField(max_length=10, blank=True, default="")
+
+    total = models.FloatField(default=0)
+    count = models.IntegerField(default=0)
+    total_market_value = models.FloatField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["wallet_hash", "posid", "date"]),
+        ]
@@ -1,7 +1,15 @@
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from main.models import TransactionMetaAttribute, WalletHistory
 from paytacapos.models import Merchant
+from paytacapos.utils.sales_rollup import (
+    is_pos_wallet,
+    mark_sales_rollups_dirty,
+    mark_wallet_histories_dirty,
+    timestamp_day,
+)
 
 from slugify import slugify
 
@@ -11,4 +19,29 @@ def post_create_merchant(sender, instance=None, created=False, **kwargs):
     if created:
         slug = slugify(instance.name)
         instance.slug = f'{slug}-{instance.id}'
-        instance.save()
\ No newline at end of file
+        instance.save()
+
+
+@receiver(post_save, sender=WalletHistory, dispatch_uid='paytacapos.signals.wallet_history_sales_rollup')
+def wallet_history_sales_rollup(sender, instance=None, created=False, **kwargs):
+    if instance.record_type != WalletHistory.INCOMING or not instance.wallet_id:
+        return
+    if not is_pos_wallet(instance.wallet_id):
+        return
+
+    # the day it was counted on before getting a tx_timestamp may differ from its current day
+    wallet_hash = instance.wallet.wallet_hash
+    days = set(
+        timestamp_day(timestamp) for timestamp in (instance.date_created, instance.tx_timestamp)
+        if timestamp
+    )
+    transaction.on_commit(lambda: mark_sales_rollups_dirty(*[(wallet_hash, day) for day in days]))
+
+
+@receiver(post_save, sender=TransactionMetaAttribute, dispatch_uid='paytacapos.signals.vault_payment_sales_rollup')
+def vault_payment_sales_rollup(sender, instance=None, created=False, **kwargs):
+    if not created or not instance.key.startswith('vault_payment_'):
+        return
+
+    histories = WalletHistory.objects.filter(txid=instance.txid, wallet__wallet_hash=instance.wallet_hash)
+    transaction.on_commit(lambda: mark_wallet_histories_dirty(histories))
@@ -0,0 +1,16 @@
+import logging
+
+from celery import shared_task
+
+from paytacapos.utils.sales_rollup import flush_dirty_sales_rollups
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@shared_task(queue='wallet_history_2')
+def update_sales_rollups():
+    rebuilt = flush_dirty_sales_rollups()
+    if rebuilt:
+        LOGGER.info(f"POS SALES ROLLUPS: {rebuilt} days rebuilt")
+    return rebuilt
@@ -0,0 +1 @@
+from .sales_rollup import SalesRollupTestCase
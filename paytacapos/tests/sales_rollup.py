@@ -0,0 +1,160 @@
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.conf import settings
+from django.test import TestCase, override_settings, tag
+from django.utils import timezone
+
+from main.models import Address, Token, TransactionMetaAttribute, Wallet, WalletHistory
+from main.tests.mocker.redis import FakeRedis
+from paytacapos.utils.report import SalesSummary
+from paytacapos.utils.sales_rollup import (
+    DIRTY_KEY,
+    flush_dirty_sales_rollups,
+    get_address_path_posids,
+    get_pos_history_days,
+    mark_sales_rollups_dirty,
+    mark_wallet_histories_dirty,
+    rebuild_sales_rollups,
+)
+
+
+WALLET_HASH = "pos-wallet-hash"
+POS_1_ADDRESS = "bchtest:qpos1qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqq"
+POS_2_ADDRESS = "bchtest:qpos2qqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqq"
+WALLET_ADDRESS = "bchtest:qwalletqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqq"
+SENDER = "bchtest:qsenderqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqqq"
+
+
+def at(date, hour, minute=0):
+    return datetime.combine(date, time(hour, minute)).replace(tzinfo=pytz.UTC)
+
+
+# amounts & prices are exact in binary, so sums don't depend on the order they're added in
+@override_settings(REDISKV=FakeRedis())
+class SalesRollupTestCase(TestCase):
+    def setUp(self):
+        self.bch = Token.objects.create(name="bch", tokenid="")
+        self.wallet = Wallet.objects.create(wallet_hash=WALLET_HASH, wallet_type="bch", version=2)
+        for address, address_path in [(POS_1_ADDRESS, "0/10001"), (POS_2_ADDRESS, "0/10002"), (WALLET_ADDRESS, "0/0")]:
+            Address.objects.create(address=address, address_path=address_path, wallet=self.wallet)
+
+        self.today = timezone.now().astimezone(pytz.UTC).date()
+        self.first_day = self.today - timedelta(days=3)
+        self.second_day = self.today - timedelta(days=2)
+
+        self.create_histories(
+            # sales on either side of a day boundary
+            (at(self.first_day, 23, 30), 0.5, POS_1_ADDRESS),
+            (at(self.second_day, 0, 30), 0.25, POS_2_ADDRESS),
+            (at(self.second_day, 12), 0.125, POS_1_ADDRESS),
+            # not a POS sale
+            (at(self.second_day, 13), 4, WALLET_ADDRESS),
+        )
+        # counted on the day it was saved until it has a tx timestamp
+        self.create_histories((None, 0.0625, POS_2_ADDRESS), date_created=at(self.first_day, 8))
+
+        # a vault payment to POS 2, counted for the POS only
+        self.create_histories((at(self.second_day, 14), 2, WALLET_ADDRESS), txid="vault")
+        TransactionMetaAttribute.objects.create(txid="vault", wallet_hash=WALLET_HASH, key="vault_payment_2", value="1")
+
+        for wallet_hash, date in get_pos_history_days(WALLET_HASH):
+            rebuild_sales_rollups(wallet_hash, date)
+
+    def create_histories(self, *histories, date_created=None, txid=None):
+        # bulk_create skips the post save signals that mark rollups dirty
+        WalletHistory.objects.bulk_create([
+            WalletHistory(
+                wallet=self.wallet,
+                txid=txid or f"{WalletHistory.objects.count() + index:064x}",
+                record_type=WalletHistory.INCOMING,
+                token=self.bch,
+                amount=amount,
+                tx_timestamp=tx_timestamp,
+                date_created=date_created or tx_timestamp,
+                senders=[[SENDER, str(amount)]],
+                recipients=[[recipient, str(amount)]],
+                market_prices={ "PHP": 2, "USD": 0.5 },
+            )
+            for index, (tx_timestamp, amount, recipient) in enumerate(histories)
+        ])
+
+    def live_summary(self, posid=None, summary_range="month", timestamp_from=None, timestamp_to=None, currency=None):
+        """
+            The summary aggregated from WalletHistory alone
+        """
+        response = SalesSummary(wallet_hash=WALLET_HASH, posid=posid)
+        response.range_type = summary_range
+        records = SalesSummary.get_live_records(response, currency, timestamp_from, timestamp_to)
+        return SalesSummary.merge_records(response, currency, records)
+
+    def assertMatchesLive(self, posids=(None, 1, 2), **kwargs):
+        for posid in posids:
+            for summary_range in [SalesSummary.RANGE_DAY, SalesSummary.RANGE_MONTH]:
+                for currency in [None, "PHP"]:
+                    options = dict(posid=posid, summary_range=summary_range, currency=currency, **kwargs)
+                    summary = SalesSummary.get_summary(wallet_hash=WALLET_HASH, **options)
+                    self.assertEqual(summary.data, self.live_summary(**options), options)
+
+    @tag("unit")
+    def test_matches_live_aggregation(self):
+        self.assertMatchesLive()
+
+        summary = SalesSummary.get_summary(wallet_hash=WALLET_HASH, summary_range=SalesSummary.RANGE_DAY)
+        self.assertEqual([record["count"] for record in summary.data], [2, 2])
+
+    @tag("unit")
+    def test_range_starting_or_ending_within_a_day(self):
+        # the partial days are read from WalletHistory, the days in between from the rollups
+        self.assertMatchesLive(timestamp_from=at(self.first_day, 23))
+        self.assertMatchesLive(timestamp_from=at(self.first_day, 0), timestamp_to=at(self.second_day, 12, 30))
+        self.assertMatchesLive(timestamp_from=at(self.second_day, 6))
+        # ranges within a single day
+        self.assertMatchesLive(timestamp_from=at(self.first_day, 23), timestamp_to=at(self.second_day, 12))
+
+    @tag("unit")
+    def test_live_tail_after_last_rolled_up_day(self):
+        self.create_histories((timezone.now() - timedelta(seconds=10), 1, POS_1_ADDRESS))
+        # a rollup of today is never read, as the day isn't over
+        rebuild_sales_rollups(WALLET_HASH, self.today)
+
+        self.assertMatchesLive()
+        summary = SalesSummary.get_summary(wallet_hash=WALLET_HASH, posid=1, summary_range=SalesSummary.RANGE_DAY)
+        self.assertEqual(summary.data[0]["day"], self.today.day)
+        self.assertEqual(summary.data[0]["total"], 1)
+
+    @tag("unit")
+    def test_dirty_day_is_rebuilt(self):
+        self.create_histories((at(self.first_day, 9), 1, POS_2_ADDRESS))
+
+        summary = SalesSummary.get_summary(wallet_hash=WALLET_HASH, posid=2, summary_range=SalesSummary.RANGE_DAY)
+        self.assertNotEqual(summary.data, self.live_summary(posid=2, summary_range=SalesSummary.RANGE_DAY))
+
+        mark_sales_rollups_dirty((WALLET_HASH, self.first_day))
+        self.assertEqual(flush_dirty_sales_rollups(), 1)
+        self.assertEqual(flush_dirty_sales_rollups(), 0)
+        self.assertMatchesLive()
+
+    @tag("unit")
+    def test_posids_match_filter_pos(self):
+        self.assertEqual(get_address_path_posids("0/10001"), {1})
+        self.assertEqual(get_address_path_posids("0/120001"), {1, 2000, 20001})
+        self.assertEqual(get_address_path_posids("0/9999"), set())
+
+        address = Address.objects.create(address="bchtest:qpos120001", address_path="0/120001", wallet=self.wallet)
+        self.create_histories((at(self.first_day, 10), 8, address.address))
+        rebuild_sales_rollups(WALLET_HASH, self.first_day)
+        self.assertMatchesLive(posids=(None, 1, 2000, 20001))
+
+    @tag("unit")
+    def test_only_pos_wallet_days_are_marked_dirty(self):
+        other_wallet = Wallet.objects.create(wallet_hash="other-wallet-hash", wallet_type="bch", version=2)
+        Address.objects.create(address="bchtest:qotherwallet", address_path="0/0", wallet=other_wallet)
+        WalletHistory.objects.filter(txid="vault").update(wallet=other_wallet)
+
+        settings.REDISKV.delete(DIRTY_KEY)
+        mark_wallet_histories_dirty(WalletHistory.objects.all())
+        self.assertEqual(
+            set(member.decode() for member in settings.REDISKV.spop(DIRTY_KEY, 10)),
+            set(f"{WALLET_HASH}|{day.isoformat()}" for day in (self.first_day, self.second_day)),
+        )
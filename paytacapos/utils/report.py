@@ -1,11 +1,13 @@
+from collections import defaultdict
+from datetime import timedelta
+
 from django.contrib.postgres.fields.jsonb import KeyTransform
 from django.db.models import (
     F,
+    Q,
     Sum,
     Count,
-    CharField,
     FloatField,
-    Value,
 )
 from django.db.models.functions import (
     Coalesce,
@@ -13,6 +15,9 @@ from django.db.models.functions import (
     Cast,
 )
 from django.apps import apps
+from django.utils import timezone
+
+from .sales_rollup import day_range
 
 class SalesSummary(object):
     RANGE_MONTH = "month"
@@ -36,28 +41,108 @@ class SalesSummary(object):
         timestamp_to=None,
         currency=None,
     ):
+        """
+            Days that ended before today & are fully within the range are read from
+            their PosSalesRollup rows, the rest of the range is aggregated from WalletHistory
+        """
         response = cls(wallet_hash=wallet_hash)
+        if isinstance(posid, int):
+            response.posid = posid
+        response.timestamp_from = timestamp_from
+        response.timestamp_to = timestamp_to
+        response.range_type = cls.RANGE_DAY if summary_range == cls.RANGE_DAY else cls.RANGE_MONTH
+
+        first_day, last_day = cls.get_rollup_days(timestamp_from, timestamp_to)
+        if first_day is not None and first_day > last_day:
+            records = cls.get_live_records(response, currency, timestamp_from, timestamp_to)
+            response.data = cls.merge_records(response, currency, records)
+            return response
+
+        records = cls.get_rollup_records(response, currency, first_day, last_day)
+        if first_day is not None and timestamp_from < day_range(first_day)[0]:
+            records += cls.get_live_records(response, currency, timestamp_from, day_range(first_day)[0], exclusive_end=True)
+        records += cls.get_live_records(response, currency, day_range(last_day)[1], timestamp_to)
+
+        response.data = cls.merge_records(response, currency, records)
+        return response
+
+    @classmethod
+    def get_rollup_days(cls, timestamp_from=None, timestamp_to=None):
+        """
+            Returns the first & last day fully within the range that ended before today
+            The first day is None if the range has no start.
+        """
+        last_day = timezone.now().astimezone(timezone.utc).date() - timedelta(days=1)
+        if timestamp_to:
+            last_day = min(last_day, timestamp_to.astimezone(timezone.utc).date() - timedelta(days=1))
+
+        first_day = None
+        if timestamp_from:
+            first_day = timestamp_from.astimezone(timezone.utc).date()
+            if timestamp_from > day_range(first_day)[0]:
+                first_day += timedelta(days=1)
+
+        return first_day, last_day
+
+    @classmethod
+    def get_group_fields(cls, response, field):
+        annotate = { "year": Extract(field, "YEAR"), "month": Extract(field, "MONTH") }
+        if response.range_type == cls.RANGE_DAY:
+            annotate["day"] = Extract(field, "DAY")
+        return annotate
+
+    @classmethod
+    def get_rollup_records(cls, response, currency, first_day, last_day):
+        PosSalesRollup = apps.get_model("paytacapos", "PosSalesRollup")
+        queryset = PosSalesRollup.objects.filter(
+            wallet_hash=response.wallet_hash,
+            date__lte=last_day,
+            currency__in=["", currency] if currency else [""],
+        )
+        if response.posid is not None:
+            queryset = queryset.filter(posid=response.posid)
+        else:
+            queryset = queryset.filter(posid__isnull=True)
+
+        if first_day is not None:
+            queryset = queryset.filter(date__gte=first_day)
+
+        fields = dict(
+            total=Sum(F("total"), filter=Q(currency="")),
+            count=Sum(F("count"), filter=Q(currency="")),
+        )
+        if currency:
+            fields["total_market_value"] = Sum(F("total_market_value"), filter=Q(currency=currency))
+
+        annotate = cls.get_group_fields(response, "date")
+        queryset = queryset.annotate(**annotate)
+        queryset = queryset.values(*annotate.keys())
+        queryset = queryset.order_by()
+        queryset = queryset.annotate(**fields)
+        return list(queryset)
+
+    @classmethod
+    def get_live_records(cls, response, currency, timestamp_from=None, timestamp_to=None, exclusive_end=False):
         WalletHistory = apps.get_model("main", "WalletHistory")
         queryset = WalletHistory.objects.filter(
             record_type=WalletHistory.INCOMING,
             token__name="bch",
-            wallet__wallet_hash=wallet_hash,
+            wallet__wallet_hash=response.wallet_hash,
         )
 
-        if isinstance(posid, int):
-            response.posid = posid
-            queryset = queryset.filter_pos(wallet_hash, posid=posid)
+        if response.posid is not None:
+            queryset = queryset.filter_pos(response.wallet_hash, posid=response.posid)
         else:
-            queryset = queryset.filter_pos(wallet_hash)
+            queryset = queryset.filter_pos(response.wallet_hash)
 
         queryset = queryset.annotate(timestamp = Coalesce(F("tx_timestamp"), F("date_created")))
 
         if timestamp_from:
             queryset = queryset.filter(timestamp__gte=timestamp_from)
-            response.timestamp_from = timestamp_from
-        if timestamp_to:
+        if timestamp_to and exclusive_end:
+            queryset = queryset.filter(timestamp__lt=timestamp_to)
+        elif timestamp_to:
             queryset = queryset.filter(timestamp__lte=timestamp_to)
-            response.timestamp_to = timestamp_to
 
         fields = dict(
             total=Sum(F("amount")),
@@ -69,19 +154,37 @@ class SalesSummary(object):
                 value=F("amount") * Cast(KeyTransform(currency, "market_prices"), FloatField()),
             )
             fields["total_market_value"] = Sum(F("value"))
-            fields["currency"] = Value(currency, output_field=CharField())
-
-        annotate = { "year": Extract("timestamp", "YEAR"), "month": Extract("timestamp", "MONTH") }
-        if summary_range == cls.RANGE_DAY:
-            annotate["day"] = Extract("timestamp", "DAY")
-            response.range_type = cls.RANGE_DAY
-        else:
-            response.range_type = cls.RANGE_MONTH
 
+        annotate = cls.get_group_fields(response, "timestamp")
         queryset = queryset.annotate(**annotate)
         queryset = queryset.values(*annotate.keys())
-        queryset = queryset.order_by(*["-" + key for key in annotate.keys()])
+        queryset = queryset.order_by()
         queryset = queryset.annotate(**fields)
+        return list(queryset)
 
-        response.data = queryset.all()
-        return response
+    @classmethod
+    def merge_records(cls, response, currency, records):
+        """
+            Adds up records of the same period, ordered latest period first
+        """
+        keys = list(cls.get_group_fields(response, "date").keys())
+
+        merged = defaultdict(lambda: dict(total=0, count=0, total_market_value=None))
+        for record in records:
+            period = tuple(int(record[key]) for key in keys)
+            data = merged[period]
+            data["total"] += record["total"] or 0
+            data["count"] += record["count"] or 0
+            if record.get("total_market_value") is not None:
+                data["total_market_value"] = (data["total_market_value"] or 0) + record["total_market_value"]
+
+        data = []
+        for period, values in sorted(merged.items(), reverse=True):
+            record = dict(zip(keys, period))
+            record["total"] = values["total"]
+            record["count"] = values["count"]
+            if currency:
+                record["total_market_value"] = values["total_market_value"]
+                record["currency"] = currency
+            data.append(record)
+        return data
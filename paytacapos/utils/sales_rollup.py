@@ -0,0 +1,249 @@
+import logging
+import re
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+import pytz
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.functions import Coalesce, TruncDate
+from django.apps import apps
+
+
+LOGGER = logging.getLogger(__name__)
+
+DIRTY_KEY = "paytacapos:sales-rollup:dirty"
+
+# receiving/change address paths of POS devices, e.g. "0/10001" for the first address of posid 1
+POS_ADDRESS_PATH_REGEX = re.compile(r"^(0|1)/(\d+)$")
+POS_ID_MAX_DIGITS = 4
+
+
+def parse_pos_address_path(address_path):
+    """
+        Returns (posid, is_receiving) of a POS device address path, None if it isn't one
+    """
+    match = POS_ADDRESS_PATH_REGEX.match(address_path or "")
+    if not match:
+        return None
+
+    index = int(match.group(2))
+    if index < 10 ** POS_ID_MAX_DIGITS or index > 2 ** 31 - 1:
+        return None
+    return index % 10 ** POS_ID_MAX_DIGITS, match.group(1) == "0"
+
+
+def get_address_path_posids(address_path):
+    """
+        Returns the posids 'WalletHistoryQuerySet.filter_pos()' matches the address path for:
+        the posid zero padded to POS_ID_MAX_DIGITS, anywhere after at least one other digit,
+        e.g. "0/10001" for posid 1 but also "0/120001" for posids 1, 2000 & 20001
+    """
+    posids = set()
+    for digits in re.findall(r"\d+", address_path or ""):
+        for start in range(1, len(digits) - POS_ID_MAX_DIGITS + 1):
+            for end in range(start + POS_ID_MAX_DIGITS, len(digits) + 1):
+                padded_posid = digits[start:end]
+                # posids longer than the padding have no leading zeros
+                if len(padded_posid) == POS_ID_MAX_DIGITS or padded_posid[0] != "0":
+                    posids.add(int(padded_posid))
+    return posids
+
+
+def timestamp_day(timestamp):
+    return timestamp.astimezone(pytz.UTC).date()
+
+
+def day_range(date):
+    start = datetime.combine(date, time.min).replace(tzinfo=pytz.UTC)
+    return start, start + timedelta(days=1)
+
+
+def pos_wallet_addresses():
+    """
+        Returns the addresses of POS devices, their wallets are the only ones with rollups
+    """
+    Address = apps.get_model("main", "Address")
+    return Address.objects.filter(address_path__regex=r"^(0|1)/\d{5,}$")
+
+
+def is_pos_wallet(wallet_id):
+    return pos_wallet_addresses().filter(wallet_id=wallet_id).exists()
+
+
+def incoming_histories():
+    WalletHistory = apps.get_model("main", "WalletHistory")
+    return WalletHistory.objects.filter(
+        record_type=WalletHistory.INCOMING,
+        token__name="bch",
+    )
+
+
+def mark_sales_rollups_dirty(*entries):
+    """
+        entries: (wallet_hash, date) pairs whose rollups need to be rebuilt
+    """
+    members = set(f"{wallet_hash}|{date.isoformat()}" for wallet_hash, date in entries if wallet_hash and date)
+    if members:
+        settings.REDISKV.sadd(DIRTY_KEY, *members)
+
+
+def mark_wallet_histories_dirty(queryset):
+    """
+        Marks the days of the incoming wallet histories in the queryset, call before & after
+        updating their timestamps or deleting them through the queryset
+        A history counts on the day of its tx_timestamp, or of its date_created until it has one.
+    """
+    WalletHistory = apps.get_model("main", "WalletHistory")
+    rows = queryset \
+        .filter(record_type=WalletHistory.INCOMING, wallet_id__in=pos_wallet_addresses().values("wallet_id")) \
+        .values_list("wallet__wallet_hash", "tx_timestamp", "date_created")
+
+    entries = set()
+    for wallet_hash, tx_timestamp, date_created in rows:
+        entries.add((wallet_hash, timestamp_day(tx_timestamp or date_created)))
+    mark_sales_rollups_dirty(*entries)
+
+
+def flush_dirty_sales_rollups(batch_size=500):
+    """
+        Rebuilds the rollups of the marked days, returns the number of days rebuilt
+    """
+    rebuilt = 0
+    failed = []
+    while True:
+        members = settings.REDISKV.spop(DIRTY_KEY, batch_size)
+        if not members:
+            break
+
+        for member in members:
+            wallet_hash, date = member.decode().split("|")
+            try:
+                rebuild_sales_rollups(wallet_hash, datetime.strptime(date, "%Y-%m-%d").date())
+                rebuilt += 1
+            except Exception as exception:
+                LOGGER.exception(exception)
+                failed.append(member)
+
+    # retried on the next flush
+    if failed:
+        settings.REDISKV.sadd(DIRTY_KEY, *failed)
+    return rebuilt
+
+
+def compute_sales_rollups(wallet_hash, date):
+    """
+        Returns dict of (posid, currency) -> { total, count, total_market_value } of the wallet's
+        incoming BCH payments on the date, with the same matching as 'WalletHistoryQuerySet.filter_pos()':
+        - posid None: payments to the receiving addresses of any POS device
+        - posid N: payments to or from an address of POS device N, or marked as a vault payment to it
+    """
+    Address = apps.get_model("main", "Address")
+    TransactionMetaAttribute = apps.get_model("main", "TransactionMetaAttribute")
+
+    start, end = day_range(date)
+    histories = incoming_histories() \
+        .filter(wallet__wallet_hash=wallet_hash) \
+        .annotate(timestamp=Coalesce("tx_timestamp", "date_created")) \
+        .filter(timestamp__gte=start, timestamp__lt=end) \
+        .values_list("txid", "amount", "market_prices", "senders", "recipients")
+    histories = list(histories)
+    if not histories:
+        return {}
+
+    # address -> (posids, whether it's a receiving address of any POS device)
+    pos_addresses = {}
+    addresses = Address.objects.filter(
+        wallet__wallet_hash=wallet_hash,
+        address_path__regex=r"\d{%d,}" % (POS_ID_MAX_DIGITS + 1),
+    ).values_list("address", "address_path")
+    for address, address_path in addresses:
+        parsed = parse_pos_address_path(address_path)
+        pos_addresses[address] = (get_address_path_posids(address_path), bool(parsed and parsed[1]))
+
+    vault_payments = defaultdict(set)
+    attributes = TransactionMetaAttribute.objects.filter(
+        wallet_hash=wallet_hash,
+        key__startswith="vault_payment_",
+        txid__in=set(txid for txid, *_ in histories),
+    ).values_list("txid", "key")
+    for txid, key in attributes:
+        posid = key[len("vault_payment_"):]
+        # filter_pos() looks the key up with the posid as is, e.g. "vault_payment_1"
+        if posid.isdigit() and str(int(posid)) == posid:
+            vault_payments[txid].add(int(posid))
+
+    rollups = defaultdict(lambda: dict(total=0, count=0, total_market_value=None))
+    for txid, amount, market_prices, senders, recipients in histories:
+        posids = set(vault_payments.get(txid, set()))
+        to_any_pos = False
+        # senders & recipients are [address, amount] pairs
+        for address in set(pair[0] for pair in senders or []) | set(pair[0] for pair in recipients or []):
+            address_posids, is_receiving = pos_addresses.get(address, (set(), False))
+            posids.update(address_posids)
+            to_any_pos = to_any_pos or is_receiving
+
+        if to_any_pos:
+            posids.add(None)
+
+        amount = amount or 0
+        for posid in posids:
+            rollup = rollups[(posid, "")]
+            rollup["total"] += amount
+            rollup["count"] += 1
+
+            for currency, price in (market_prices or {}).items():
+                try:
+                    value = amount * float(price)
+                except (TypeError, ValueError):
+                    continue
+                rollup = rollups[(posid, currency)]
+                rollup["total_market_value"] = (rollup["total_market_value"] or 0) + value
+
+    return dict(rollups)
+
+
+def rebuild_sales_rollups(wallet_hash, date):
+    PosSalesRollup = apps.get_model("paytacapos", "PosSalesRollup")
+
+    with transaction.atomic():
+        # serializes rebuilds of the same wallet, so a rebuild from older data can't overwrite a newer one
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [f"{DIRTY_KEY}:{wallet_hash}"])
+
+        rollups = compute_sales_rollups(wallet_hash, date)
+        PosSalesRollup.objects.filter(wallet_hash=wallet_hash, date=date).delete()
+        PosSalesRollup.objects.bulk_create([
+            PosSalesRollup(
+                wallet_hash=wallet_hash,
+                posid=posid,
+                date=date,
+                currency=currency,
+                total=rollup["total"] if not currency else 0,
+                count=rollup["count"] if not currency else 0,
+                total_market_value=rollup["total_market_value"],
+            )
+            for (posid, currency), rollup in rollups.items()
+        ])
+    return rollups
+
+
+def get_pos_history_days(wallet_hash=None, since=None):
+    """
+        Returns the (wallet_hash, date) pairs of incoming BCH payments of wallets with POS devices
+    """
+    pos_wallets = pos_wallet_addresses()
+    if wallet_hash:
+        pos_wallets = pos_wallets.filter(wallet__wallet_hash=wallet_hash)
+
+    queryset = incoming_histories() \
+        .filter(wallet_id__in=pos_wallets.values("wallet_id")) \
+        .annotate(timestamp=Coalesce("tx_timestamp", "date_created"))
+    if since:
+        queryset = queryset.filter(timestamp__gte=day_range(since)[0])
+
+    return queryset \
+        .annotate(day=TruncDate("timestamp")) \
+        .order_by() \
+        .values_list("wallet__wallet_hash", "day") \
+        .distinct()
@@ -0,0 +1,76 @@
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction as trans
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ramp.models import Shift
+from ramp.tests.mocker.sideshift import FakeSideShiftServer
+from ramp.utils.shift_poller import OPEN_STATUSES, ShiftStatusPoller
+
+
+class Command(BaseCommand):
+    help = "Measure a shift status update run over open shifts against an in-process SideShift stand-in"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-n", "--count", type=int, default=1000, help="number of open shifts")
+        parser.add_argument("--latency", type=float, default=0.05, help="seconds each SideShift response is delayed")
+        parser.add_argument("--changed", type=float, default=0.1, help="fraction of shifts whose status changed")
+        parser.add_argument("-w", "--workers", type=int, default=None, help="poller threads, defaults to the configured WORKERS")
+        parser.add_argument("-l", "--legacy", action="store_true", help="also run the sequential request & save per shift loop")
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        changed = int(count * options["changed"])
+        shifts = {
+            f"benchmark-{index}": { "status": "settled", "settleHash": "00" * 32 } if index < changed else { "status": "waiting" }
+            for index in range(count)
+        }
+        server = FakeSideShiftServer(shifts=shifts, latency=options["latency"]).start()
+        self.stdout.write(f"{count} open shifts, {changed} changed, {options['latency']}s latency")
+
+        try:
+            if options["legacy"]:
+                def poll_legacy():
+                    for shift in Shift.objects.filter(shift_status__in=OPEN_STATUSES):
+                        response = requests.get(f"{server.url}/shifts/{shift.shift_id}")
+                        if response.status_code == 200:
+                            data = response.json()
+                            shift.shift_status = data["status"]
+                            if data["status"] == "settled":
+                                shift.date_shift_completed = timezone.now()
+                                shift.shift_info["txn_details"] = { "txid": data["settleHash"] }
+                            shift.save()
+                self.report("sequential", count, poll_legacy)
+
+            poller = ShiftStatusPoller(url=server.url, workers=options["workers"], batch_size=count)
+            self.report("ShiftStatusPoller", count, poller.poll)
+        finally:
+            server.stop()
+
+    def report(self, name, count, func):
+        # shifts are created for each run and rolled back after
+        with trans.atomic():
+            Shift.objects.bulk_create([
+                Shift(
+                    wallet_hash="benchmark",
+                    bch_address="bitcoincash:benchmark",
+                    ramp_type="on",
+                    shift_id=f"benchmark-{index}",
+                    quote_id=f"benchmark-{index}",
+                    date_shift_created=timezone.now(),
+                )
+                for index in range(count)
+            ])
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                func()
+                duration = time.perf_counter() - start
+            trans.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{name}: {count} shifts | {len(queries.captured_queries)} queries | {round(duration, 3)}s"
+        ))
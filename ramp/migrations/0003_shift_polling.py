@@ -0,0 +1,23 @@
+# Generated by Django 3.0.14 on 2026-10-18 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ramp', '0002_auto_20230316_0831'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shift',
+            name='next_poll_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='shift',
+            name='poll_etag',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
@@ -12,3 +12,7 @@ class Shift(models.Model):
     date_shift_completed = models.DateTimeField(null=True, blank=True)
     shift_info = JSONField(default=dict)
     shift_status = models.CharField(max_length=50, default="waiting")
+    # when the shift is due for its next status check, see ramp.utils.shift_poller
+    next_poll_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # ETag of the last fetched status, sent back so an unchanged shift is a 304
+    poll_etag = models.CharField(max_length=100, blank=True, default='')
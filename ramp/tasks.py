@@ -1,44 +1,31 @@
 import logging
-import requests
-import json
-from datetime import datetime
+import uuid
 
 from celery import shared_task
-from .models import (
-    Shift
-)
+from django.conf import settings
+
+from main.utils.tx_processing import RELEASE_LEASE_SCRIPT
+from .utils.shift_poller import ShiftStatusPoller
 
 
 logger = logging.getLogger(__name__)
 
+_SHIFT_POLLER_LOCK_KEY = 'ramp:shift-poller:lock'
+_SHIFT_POLLER_LOCK_TTL = 5 * 60
+
 @shared_task(bind=True, queue='ramp__shift_expiration')
 def update_shift_status(self):
-
-    logger.info('CHECKING FOR EXPIRED SHIFTS')
-    # get waiting
-    qs = Shift.objects.filter(shift_status__in=['waiting', 'settling'])
-
-    for shift in qs:
-        shift_id = shift.shift_id
-        url = 'https://sideshift.ai/api/v2/shifts/' + shift_id        
-
-        fetched_shift = requests.get(url)        
-
-        if fetched_shift.status_code == 200 or fetched_shift.status_code == 200:
-            data = fetched_shift.json()
-            
-            shift.shift_status = data['status']
-
-            if data['status'] == 'settled':
-                shift.date_shift_completed = datetime.now()                
-                shift.shift_info['txn_details'] = { 
-                    'txid': data['settleHash']
-                }
-
-                logger.info(shift.shift_info)
-
-            shift.save()
-
-
-
-        
\ No newline at end of file
+    # a run that overruns the beat interval makes the next one skip instead of polling the same shifts
+    token = self.request.id or uuid.uuid4().hex
+    if not settings.REDISKV.set(_SHIFT_POLLER_LOCK_KEY, token, ex=_SHIFT_POLLER_LOCK_TTL, nx=True):
+        logger.info('SHIFT STATUS POLLER ALREADY RUNNING')
+        return
+
+    try:
+        logger.info('CHECKING FOR EXPIRED SHIFTS')
+        result = ShiftStatusPoller().poll()
+        logger.info(f'SHIFT STATUS POLLER | {result}')
+        return result
+    finally:
+        # a run outliving the lock's TTL leaves the lock of the run that took it over alone
+        settings.REDISKV.eval(RELEASE_LEASE_SCRIPT, 1, _SHIFT_POLLER_LOCK_KEY, token)
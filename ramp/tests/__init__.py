@@ -0,0 +1 @@
+from .shift_poller import ShiftStatusPollerTestCase, ShiftStatusTaskTestCase
@@ -0,0 +1,87 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Server(ThreadingHTTPServer):
+    # the default backlog of 5 drops connections opened by a concurrent poller all at once
+    request_queue_size = 128
+
+
+class FakeSideShiftServer(object):
+    """
+        Minimal in-process stand-in of SideShift's shift status endpoint for tests & benchmarks
+        Serves GET /api/v2/shifts/<shift_id> from 'shifts', a dict of shift id -> shift data.
+        Responses carry an ETag of the shift's status, a matching If-None-Match gets a 304.
+
+        latency: seconds each response is delayed, to simulate the network
+    """
+
+    def __init__(self, shifts=None, latency=0, host='127.0.0.1', port=0):
+        self.shifts = shifts or {}
+        self.latency = latency
+        self.requests = []
+        self.connections = 0
+        # requests for these shift ids get a 500
+        self.failing = set()
+        self._lock = threading.Lock()
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def do_GET(self):
+                status, body, headers = fake.respond(self.path, self.headers.get('If-None-Match'))
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                payload = json.dumps(body).encode() if body is not None else b''
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = Server((host, port), Handler)
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address
+        self.url = f'http://{self.host}:{self.port}/api/v2'
+
+    def respond(self, path, etag=None):
+        with self._lock:
+            self.requests.append(path)
+
+        prefix = '/api/v2/shifts/'
+        shift_id = path[len(prefix):] if path.startswith(prefix) else None
+        if shift_id in self.failing:
+            return 500, { 'error': { 'message': 'Internal error' } }, {}
+
+        shift = self.shifts.get(shift_id)
+        if shift is None:
+            return 404, { 'error': { 'message': 'Shift not found' } }, {}
+
+        shift_etag = f'"{shift_id}-{shift["status"]}"'
+        if etag == shift_etag:
+            return 304, None, { 'ETag': shift_etag }
+        return 200, { 'id': shift_id, **shift }, { 'ETag': shift_etag }
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,114 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+from django.utils import timezone
+
+from main.tests.mocker.redis import FakeRedis
+from ramp.models import Shift
+from ramp.tasks import _SHIFT_POLLER_LOCK_KEY, update_shift_status
+from ramp.tests.mocker.sideshift import FakeSideShiftServer
+from ramp.utils.shift_poller import ShiftStatusPoller
+
+
+SIDESHIFT_SHIFT_POLLER = {
+    "URL": "http://127.0.0.1:1/api/v2",
+    "WORKERS": 4,
+    "TIMEOUT": 2,
+    "BATCH_SIZE": 100,
+}
+
+
+@override_settings(SIDESHIFT_SHIFT_POLLER=SIDESHIFT_SHIFT_POLLER)
+class ShiftStatusPollerTestCase(TestCase):
+    def setUp(self):
+        self.server = FakeSideShiftServer().start()
+        self.addCleanup(self.server.stop)
+
+    def create_shift(self, shift_id, status="waiting", age=timedelta(minutes=1)):
+        self.server.shifts[shift_id] = { "status": status }
+        return Shift.objects.create(
+            wallet_hash="wallet",
+            bch_address="bitcoincash:qtest",
+            ramp_type="on",
+            shift_id=shift_id,
+            quote_id=f"quote-{shift_id}",
+            date_shift_created=timezone.now() - age,
+        )
+
+    def poller(self):
+        return ShiftStatusPoller(url=self.server.url)
+
+    @tag("unit")
+    def test_poll_updates_changed_shifts(self):
+        for index in range(10):
+            self.create_shift(f"shift-{index}")
+        self.server.shifts["shift-0"] = { "status": "settled", "settleHash": "ab" * 32 }
+        self.server.shifts["shift-1"] = { "status": "settling" }
+        self.server.failing.add("shift-2")
+
+        result = self.poller().poll()
+        self.assertEqual(result, dict(polled=10, changed=2, failed=1))
+
+        settled = Shift.objects.get(shift_id="shift-0")
+        self.assertEqual(settled.shift_status, "settled")
+        self.assertEqual(settled.shift_info["txn_details"]["txid"], "ab" * 32)
+        self.assertIsNotNone(settled.date_shift_completed)
+        self.assertEqual(Shift.objects.get(shift_id="shift-1").shift_status, "settling")
+        # connections are reused across requests
+        self.assertLess(self.server.connections, 10)
+
+    @tag("unit")
+    def test_shifts_are_polled_when_due(self):
+        self.create_shift("new")
+        self.create_shift("old", age=timedelta(days=2))
+        self.poller().poll()
+
+        # nothing is due right after a run
+        self.assertEqual(self.poller().poll()["polled"], 0)
+
+        now = timezone.now()
+        new_shift, old_shift = Shift.objects.get(shift_id="new"), Shift.objects.get(shift_id="old")
+        self.assertLess(new_shift.next_poll_at, old_shift.next_poll_at)
+        self.assertLessEqual(new_shift.next_poll_at, now + timedelta(minutes=1))
+
+    @tag("unit")
+    def test_unchanged_shifts_are_conditional_fetches(self):
+        self.create_shift("shift")
+        self.poller().poll()
+        Shift.objects.update(next_poll_at=None)
+
+        self.server.requests.clear()
+        result = self.poller().poll()
+        self.assertEqual(result, dict(polled=1, changed=0, failed=0))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertTrue(Shift.objects.get(shift_id="shift").poll_etag)
+
+
+@override_settings(REDISKV=FakeRedis())
+class ShiftStatusTaskTestCase(SimpleTestCase):
+    def setUp(self):
+        settings.REDISKV.delete(_SHIFT_POLLER_LOCK_KEY)
+
+    @tag("unit")
+    @mock.patch("ramp.tasks.ShiftStatusPoller")
+    def test_skips_while_locked(self, poller):
+        settings.REDISKV.set(_SHIFT_POLLER_LOCK_KEY, "other-run")
+        self.assertIsNone(update_shift_status())
+        poller.assert_not_called()
+        self.assertEqual(settings.REDISKV.get(_SHIFT_POLLER_LOCK_KEY), b"other-run")
+
+    @tag("unit")
+    @mock.patch("ramp.tasks.ShiftStatusPoller")
+    def test_releases_only_its_own_lock(self, poller):
+        poller.return_value.poll.return_value = dict(polled=0, changed=0, failed=0)
+        update_shift_status()
+        self.assertIsNone(settings.REDISKV.get(_SHIFT_POLLER_LOCK_KEY))
+
+        # the lock expired during the run and was taken over by the next one
+        def poll():
+            settings.REDISKV.set(_SHIFT_POLLER_LOCK_KEY, "next-run")
+        poller.return_value.poll.side_effect = poll
+        update_shift_status()
+        self.assertEqual(settings.REDISKV.get(_SHIFT_POLLER_LOCK_KEY), b"next-run")
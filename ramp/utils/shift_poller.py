@@ -0,0 +1,139 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ramp.models import Shift
+
+
+LOGGER = logging.getLogger(__name__)
+
+OPEN_STATUSES = ['waiting', 'settling']
+
+# (max shift age, seconds between checks), shifts older than all ages use the last interval
+POLL_INTERVALS = [
+    (timedelta(minutes=30), 60),
+    (timedelta(hours=2), 5 * 60),
+    (timedelta(days=1), 30 * 60),
+    (None, 2 * 60 * 60),
+]
+
+
+def get_poll_interval(shift, now):
+    """
+        Seconds until the shift's next status check, growing with the shift's age
+        so long abandoned shifts don't take up most of each run
+    """
+    created = shift.date_shift_created or now
+    for max_age, interval in POLL_INTERVALS:
+        if max_age is None or now - created <= max_age:
+            return interval
+
+
+class ShiftStatusPoller(object):
+    """
+        Updates the status of open SideShift shifts
+        Statuses are fetched concurrently by 'WORKERS' threads sharing a keep-alive session,
+        each request bounded by 'TIMEOUT' seconds. A shift is checked again after an interval
+        growing with its age. The stored ETag is sent back so unchanged shifts are 304s,
+        and the changed shifts are saved with a single bulk update.
+    """
+
+    def __init__(self, url=None, workers=None, timeout=None, batch_size=None, session=None):
+        config = settings.SIDESHIFT_SHIFT_POLLER
+        self.url = (url or config['URL']).rstrip('/')
+        self.workers = workers or config['WORKERS']
+        self.timeout = timeout or config['TIMEOUT']
+        self.batch_size = batch_size or config['BATCH_SIZE']
+        self.session = session or self.create_session()
+
+    def create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def due_shifts(self, now):
+        return Shift.objects.filter(
+            Q(next_poll_at__isnull=True) | Q(next_poll_at__lte=now),
+            shift_status__in=OPEN_STATUSES,
+        ).order_by(F('next_poll_at').asc(nulls_first=True), 'id')[:self.batch_size]
+
+    def fetch(self, shift):
+        """
+            Returns (status_code, data, etag) of the shift, data is None if unchanged or on errors
+        """
+        headers = {}
+        if shift.poll_etag:
+            headers['If-None-Match'] = shift.poll_etag
+
+        try:
+            response = self.session.get(f'{self.url}/shifts/{shift.shift_id}', headers=headers, timeout=self.timeout)
+        except requests.RequestException as exception:
+            LOGGER.warning(f'SHIFT {shift.shift_id}: {exception}')
+            return None, None, None
+
+        if response.status_code != 200:
+            return response.status_code, None, None
+
+        try:
+            return response.status_code, response.json(), response.headers.get('ETag')
+        except ValueError:
+            return response.status_code, None, None
+
+    def apply(self, shift, data):
+        """
+            Returns True if the fetched data changed the shift
+        """
+        if data.get('status') == shift.shift_status:
+            return False
+
+        shift.shift_status = data['status']
+        if data['status'] == 'settled':
+            shift.date_shift_completed = timezone.now()
+            shift.shift_info['txn_details'] = {
+                'txid': data.get('settleHash')
+            }
+            LOGGER.info(shift.shift_info)
+        return True
+
+    def poll(self):
+        """
+            Returns dict of the number of shifts polled, changed, and failed to fetch
+        """
+        now = timezone.now()
+        shifts = list(self.due_shifts(now))
+        if not shifts:
+            return dict(polled=0, changed=0, failed=0)
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(shifts))) as executor:
+            results = list(executor.map(self.fetch, shifts))
+
+        changed = []
+        unchanged = []
+        failed = 0
+        for shift, (status_code, data, etag) in zip(shifts, results):
+            shift.next_poll_at = now + timedelta(seconds=get_poll_interval(shift, now))
+            if status_code is None or status_code >= 400:
+                failed += 1
+
+            if data and 'status' in data:
+                shift.poll_etag = (etag or '')[:100]
+                if self.apply(shift, data):
+                    changed.append(shift)
+                    continue
+            unchanged.append(shift)
+
+        Shift.objects.bulk_update(
+            changed,
+            ['shift_status', 'date_shift_completed', 'shift_info', 'next_poll_at', 'poll_etag'],
+            batch_size=500,
+        )
+        Shift.objects.bulk_update(unchanged, ['next_poll_at', 'poll_etag'], batch_size=500)
+        return dict(polled=len(shifts), changed=len(changed), failed=failed)
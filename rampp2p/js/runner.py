@@ -0,0 +1,47 @@
+import logging
+import requests
+
+from main.utils.js_bridge import JSBridge
+
+# This class gets populated with functions in the javascript after loading this file
+# Refer to code below
+
+LOGGER = logging.getLogger(__name__)
+
+SERVER_URL = 'http://localhost:3030/'
+
+bridge = JSBridge('rampp2p', SERVER_URL, './rampp2p/js/src/main.js')
+
+
+class ScriptFunctionsMeta(type):
+    functions = {}
+
+    def __getattr__(cls, key):
+        if key not in cls.functions:
+            cls.functions[key] = generate_func(key)
+
+        return cls.functions[key]
+
+
+class ScriptFunctions(metaclass=ScriptFunctionsMeta):
+    pass
+
+
+def health_check():
+    """
+        Returns the health response of a script server worker, None if the server is unreachable
+    """
+    try:
+        response = bridge.session.get(f'{SERVER_URL}health', timeout=5)
+        if response.ok:
+            return response.json()
+    except requests.exceptions.RequestException:
+        pass
+    return None
+
+
+def generate_func(func_name):
+    def func(*args):
+        return bridge.call(func_name, *args)
+
+    return func
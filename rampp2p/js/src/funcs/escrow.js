@@ -0,0 +1,94 @@
+import { ElectrumNetworkProvider, Contract } from 'cashscript';
+import { compileFile } from 'cashc';
+import BCHJS from '@psf/bch-js';
+import CryptoJS from 'crypto-js';
+
+const bchjs = new BCHJS({
+    restURL: 'https://bchn.fullstack.cash/v5/',
+    apiToken: process.env.BCHJS_TOKEN
+});
+
+const NETWORK = process.env.ESCROW_NETWORK || 'mainnet';
+const ADDRESS_TYPE = 'p2sh32';
+
+// max number of generated contracts kept in memory
+const CONTRACT_CACHE_SIZE = 1000
+
+let artifact = null
+let provider = null
+const pubkeyHashes = new Map()
+const contracts = new Map()
+
+/**
+ * The escrow contract is compiled once per process, its constructor parameters are what differ
+ */
+export function getArtifact() {
+    if (!artifact) artifact = compileFile(new URL('../escrow.cash', import.meta.url))
+    return artifact
+}
+
+function getProvider() {
+    if (!provider) provider = new ElectrumNetworkProvider(NETWORK)
+    return provider
+}
+
+/**
+ * Arbiter & servicer keys repeat across contracts, so their hashes are cached
+ * @param {String} pubkey
+ */
+function getCachedPubKeyHash(pubkey) {
+    if (!pubkeyHashes.has(pubkey)) pubkeyHashes.set(pubkey, getPubKeyHash(pubkey))
+    return pubkeyHashes.get(pubkey)
+}
+
+/**
+ * @param {String} pubkey
+ */
+function getPubKeyHash(pubkey) {
+    return bchjs.Crypto.hash160(Buffer.from(pubkey, 'hex'))
+}
+
+function calculateSHA256(arbiterPk, buyerPk, sellerPk, servicerPk, timestamp) {
+    const message = arbiterPk + buyerPk + sellerPk + servicerPk + timestamp
+    return CryptoJS.SHA256(message).toString();
+}
+
+/**
+ * @param {String} arbiterPubkey
+ * @param {String} buyerPubkey
+ * @param {String} sellerPubkey
+ * @param {String|Number} timestamp
+ * @param {String|Number} serviceFee
+ * @param {String|Number} arbitrationFee
+ */
+export function generateContract(arbiterPubkey, buyerPubkey, sellerPubkey, timestamp, serviceFee, arbitrationFee) {
+    const servicerPubkey = process.env.SERVICER_PK
+    const cacheKey = [arbiterPubkey, buyerPubkey, sellerPubkey, servicerPubkey, timestamp, serviceFee, arbitrationFee].join(':')
+    if (contracts.has(cacheKey)) return contracts.get(cacheKey)
+
+    const contractHash = calculateSHA256(
+        Buffer.from(arbiterPubkey, 'hex').toString('hex'),
+        Buffer.from(buyerPubkey, 'hex').toString('hex'),
+        Buffer.from(sellerPubkey, 'hex').toString('hex'),
+        Buffer.from(servicerPubkey, 'hex').toString('hex'),
+        timestamp,
+    )
+
+    const contractParams = [
+        getCachedPubKeyHash(arbiterPubkey),
+        getPubKeyHash(buyerPubkey),
+        getPubKeyHash(sellerPubkey),
+        getCachedPubKeyHash(servicerPubkey),
+        BigInt(parseInt(serviceFee)),
+        BigInt(parseInt(arbitrationFee)),
+        contractHash,
+    ]
+
+    // same options escrow.js always passed, so generated addresses stay the same
+    const contract = new Contract(getArtifact(), contractParams, { provider: getProvider(), ADDRESS_TYPE })
+    const result = { success: 'true', contract_address: contract.address }
+
+    if (contracts.size >= CONTRACT_CACHE_SIZE) contracts.delete(contracts.keys().next().value)
+    contracts.set(cacheKey, result)
+    return result
+}
@@ -0,0 +1,9 @@
+import { generateContract } from './escrow.js'
+import { getTransaction } from './transaction.js'
+
+const funcs = {
+    generateContract,
+    getTransaction,
+}
+
+export default funcs
@@ -0,0 +1,51 @@
+import BCHJS from '@psf/bch-js';
+const bchjs = new BCHJS({
+    restURL: 'https://bchn.fullstack.cash/v5/',
+    apiToken: process.env.BCHJS_TOKEN
+});
+
+/**
+ * @param {String} txid
+ */
+export async function getTransaction(txid) {
+    try {
+        const rawTxn = await bchjs.Electrumx.txData(txid)
+        return await parseRawTransaction(rawTxn, txid)
+    } catch (error) {
+        return { error: error.toString() }
+    }
+}
+
+async function parseRawTransaction(txn, txid) {
+    let timestamp = null
+    let confirmations = null
+    if (txn.details.hasOwnProperty('time')) timestamp = txn.details.time
+    if (txn.details.hasOwnProperty('confirmations')) confirmations = txn.details.confirmations
+    const vin = txn.details.vin
+    const vout = txn.details.vout
+
+    // prevout txs are fetched concurrently
+    const prevOutTxs = await Promise.all(vin.map(prevOut => bchjs.Electrumx.txData(prevOut.txid)))
+    const inputs = vin.map((prevOut, i) => {
+        const prevOutput = prevOutTxs[i].details.vout[prevOut.vout]
+        return {
+            "address": prevOutput.scriptPubKey.addresses[0],
+            "value": prevOutput.value
+        }
+    })
+
+    const outputs = vout.map(output => {
+        return {
+            "address": output.scriptPubKey.addresses[0],
+            "value": output.value
+        }
+    })
+
+    return {
+        "txid": txid,
+        "timestamp": timestamp,
+        "confirmations": confirmations,
+        "inputs": inputs,
+        "outputs": outputs
+    }
+}
@@ -0,0 +1,103 @@
+import { runScript } from './main.js';
+import { getArtifact } from './funcs/escrow.js';
+import cluster from 'node:cluster';
+import http from 'http'
+const hostname = '127.0.0.1';
+const port = parseInt(process.env.RAMPP2P_JS_PORT || 3030);
+const workers = parseInt(process.env.RAMPP2P_JS_WORKERS || 2);
+
+/**
+ * @param {http.IncomingMessage} req
+ */
+function readRequestData(req) {
+  return new Promise((resolve, reject) => {
+    let content = undefined
+
+    req.on('data', (chunk) => {
+      if (Buffer.isBuffer(chunk)) {
+        chunk = chunk.toString('utf8');
+      }
+      if (content == undefined) content = ''
+      content += chunk;
+    });
+
+    req.on('end', () => resolve(content))
+  })
+}
+
+/**
+ * @param {Object} request
+ * @param {String} [request.method]
+ * @param {String} [request.url]
+ * @param {Object} [request.data]
+ */
+async function requestHandler(request) {
+  if (request.url === '/batch') {
+    const scriptResponses = await Promise.all((request.data || []).map(runScript))
+    return {
+      status: 200,
+      content: JSON.stringify(scriptResponses.map(scriptResponse => ({
+        success: scriptResponse?.success,
+        result: scriptResponse?.result === undefined ? null : JSON.parse(scriptResponse.result),
+        error: scriptResponse?.error,
+      }))),
+    }
+  }
+
+  if (request.method === 'GET' && request.url === '/health') {
+    return {
+      status: 200,
+      content: JSON.stringify({ status: 'ok', pid: process.pid, uptime: process.uptime() }),
+    }
+  }
+
+  const scriptResponse = await runScript(request.data)
+  return {
+    status: scriptResponse?.success ? 200 : 400,
+    content: scriptResponse?.success ? scriptResponse?.result : scriptResponse?.error,
+  }
+}
+
+function startServer() {
+  // compile the escrow contract before accepting requests
+  getArtifact()
+
+  const server = http.createServer(async (req, res) => {
+    const parsedRequest = {
+      method: req.method,
+      url: req.url,
+      content: await readRequestData(req),
+    }
+
+    try {
+      parsedRequest.data = JSON.parse(parsedRequest.content)
+    } catch {}
+
+    try {
+      const response = await requestHandler(parsedRequest)
+      res.writeHead(response?.status, { 'Content-Type': 'application/json' });
+      res.end(response?.content);
+    } catch(error) {
+      console.error(error)
+      res.writeHead(500, { 'Content-Type': 'text/plain' });
+      res.end('Server Error');
+    }
+  });
+
+  server.keepAliveTimeout = 60 * 1000
+  server.listen(port, hostname, () => {
+    console.log(`Worker ${process.pid} running at http://${hostname}:${port}/`);
+  });
+}
+
+if (cluster.isPrimary && workers > 1) {
+  for (let i = 0; i < workers; i++) cluster.fork()
+
+  // keep the pool full
+  cluster.on('exit', (worker, code, signal) => {
+    console.error(`Worker ${worker.process.pid} exited (${signal || code}), restarting`)
+    cluster.fork()
+  })
+} else {
+  startServer()
+}
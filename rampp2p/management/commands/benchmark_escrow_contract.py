@@ -0,0 +1,73 @@
+import statistics
+import time
+import json
+import secrets
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rampp2p.js.runner import ScriptFunctions, health_check
+
+
+class Command(BaseCommand):
+    help = "Compare escrow contract generation latency of a node process per call against the script server pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-n", "--calls", type=int, default=20, help="number of contracts to generate per mode")
+        parser.add_argument("--service-fee", type=int, default=1000)
+        parser.add_argument("--arbitration-fee", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not health_check():
+            raise CommandError("rampp2p script server is not running, start it with 'node rampp2p/js/src/server.js'")
+
+        # a generated compressed pubkey is enough, the contract is never funded
+        arbiter_pubkey = self.random_pubkey()
+        params_list = [
+            (
+                arbiter_pubkey,
+                self.random_pubkey(),
+                self.random_pubkey(),
+                str(time.time() + index),
+                options["service_fee"],
+                options["arbitration_fee"],
+            )
+            for index in range(options["calls"])
+        ]
+
+        spawn_addresses, spawn_latencies = self.measure(self.spawn, params_list)
+        pool_addresses, pool_latencies = self.measure(self.pool, params_list)
+
+        self.report("spawn per call", spawn_latencies)
+        self.report("script server", pool_latencies)
+
+        if spawn_addresses != pool_addresses:
+            raise CommandError("Spawned processes and the script server generated different contract addresses")
+
+    def random_pubkey(self):
+        return "02" + secrets.token_hex(32)
+
+    def spawn(self, params):
+        command = ["node", "./rampp2p/js/src/escrow.js", *[str(param) for param in params]]
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        return json.loads(process.stdout)["contract_address"]
+
+    def pool(self, params):
+        return ScriptFunctions.generateContract(*params)["contract_address"]
+
+    def measure(self, func, params_list):
+        addresses = []
+        latencies = []
+        for params in params_list:
+            start = time.perf_counter()
+            addresses.append(func(params))
+            latencies.append((time.perf_counter() - start) * 1000)
+        return addresses, latencies
+
+    def report(self, name, latencies):
+        latencies = sorted(latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(self.style.SUCCESS(
+            f"{name}: {len(latencies)} calls | mean {round(statistics.mean(latencies), 1)} ms | "
+            f"p50 {round(statistics.median(latencies), 1)} ms | p95 {round(p95, 1)} ms"
+        ))
@@ -0,0 +1,84 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+ORDER_STATS_CTE = """
+WITH order_stats AS (
+    SELECT
+        o.id AS order_id,
+        o.owner_id AS owner_id,
+        a.id AS ad_id,
+        a.owner_id AS ad_owner_id,
+        EXISTS (
+            SELECT 1 FROM rampp2p_status st WHERE st.order_id = o.id AND st.status = 'RLS'
+        ) AS released,
+        EXISTS (
+            SELECT 1 FROM rampp2p_status st WHERE st.order_id = o.id AND st.status IN ('RLS', 'CNCL', 'RFN')
+        ) AS completed
+    FROM rampp2p_order o
+    JOIN rampp2p_adsnapshot s ON s.id = o.ad_snapshot_id
+    JOIN rampp2p_ad a ON a.id = s.ad_id
+)
+"""
+
+BACKFILL_AD_STATS = ORDER_STATS_CTE + """
+INSERT INTO rampp2p_adtradestats (ad_id, trade_count, released_count, completed_count)
+SELECT
+    ad_id,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE released),
+    COUNT(*) FILTER (WHERE completed)
+FROM order_stats
+GROUP BY ad_id;
+"""
+
+BACKFILL_PEER_STATS = ORDER_STATS_CTE + """
+INSERT INTO rampp2p_peertradestats (peer_id, trade_count, released_count, completed_count)
+SELECT
+    peer_id,
+    COUNT(DISTINCT order_id),
+    COUNT(DISTINCT order_id) FILTER (WHERE released),
+    COUNT(DISTINCT order_id) FILTER (WHERE completed)
+FROM (
+    SELECT owner_id AS peer_id, order_id, released, completed FROM order_stats
+    UNION ALL
+    SELECT ad_owner_id AS peer_id, order_id, released, completed FROM order_stats
+) peer_orders
+GROUP BY peer_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rampp2p', '0229_featurecontrol'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdTradeStats',
+            fields=[
+                ('trade_count', models.IntegerField(default=0)),
+                ('released_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('ad', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trade_stats', serialize=False, to='rampp2p.Ad')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PeerTradeStats',
+            fields=[
+                ('trade_count', models.IntegerField(default=0)),
+                ('released_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('peer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trade_stats', serialize=False, to='rampp2p.Peer')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunSQL(BACKFILL_AD_STATS, reverse_sql=migrations.RunSQL.noop),
+        migrations.RunSQL(BACKFILL_PEER_STATS, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -11,4 +11,6 @@ from .transaction import *
 from .market_rate import *
 from .arbiter import *
 from .models_utils import *
-from .models_slackbot import *
\ No newline at end of file
+from .models_slackbot import *
+from .trade_stats import *
+
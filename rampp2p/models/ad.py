@@ -1,6 +1,9 @@
 from django.db import models
 from django.utils import timezone
 from django.apps import apps
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.fields import ArrayField
+from django.db.models.functions import Cast, Coalesce
 
 from rampp2p.utils import satoshi_to_bch
 from datetime import timedelta
@@ -23,6 +26,66 @@ class PriceType(models.TextChoices):
     FIXED = 'FIXED'
     FLOATING = 'FLOATING'
 
+def completion_rate_expression(released_field, completed_field):
+    return models.Case(
+        models.When(**{ f'{completed_field}__gt': 0 }, then=(
+            Cast(released_field, models.FloatField()) / Cast(completed_field, models.FloatField()) * 100
+        )),
+        default=models.Value(0.0),
+        output_field=models.FloatField()
+    )
+
+class AdQuerySet(models.QuerySet):
+    def annotate_price(self):
+        ''' Annotates the ad's market_rate and price, based on its price type (FIXED vs FLOATING) '''
+        MarketRate = apps.get_model('rampp2p', 'MarketRate')
+        market_rate_subq = MarketRate.objects.filter(currency=models.OuterRef('fiat_currency__symbol')).values('price')[:1]
+        return self.annotate(market_rate=models.Subquery(market_rate_subq)).annotate(
+            price=models.ExpressionWrapper(
+                models.Case(
+                    models.When(price_type=PriceType.FLOATING, then=(models.F('floating_price')/100 * models.F('market_rate'))),
+                    default=models.F('fixed_price'),
+                    output_field=models.DecimalField()
+                ),
+                output_field=models.DecimalField()
+            )
+        )
+
+    def annotate_list_fields(self):
+        '''
+        Annotates everything AdListSerializer shows besides the ad's own fields,
+        so a page of ads is fetched in a single query:
+        - price (see annotate_price)
+        - ad & owner trade counts and completion rates, from their denormalized TradeStats
+        - owner_rating, the average rating of the owner's received feedbacks
+        - payment_type_names, the short names of the ad's payment methods' types
+        '''
+        queryset = self
+        if 'price' not in self.query.annotations:
+            queryset = queryset.annotate_price()
+
+        Feedback = apps.get_model('rampp2p', 'Feedback')
+        rating_subq = Feedback.objects.filter(to_peer=models.OuterRef('owner_id')) \
+            .order_by().values('to_peer').annotate(rating=models.Avg('rating')).values('rating')
+
+        PaymentMethod = apps.get_model('rampp2p', 'PaymentMethod')
+        payment_types_subq = PaymentMethod.objects.filter(ads=models.OuterRef('pk')) \
+            .order_by().values('ads').annotate(names=ArrayAgg('payment_type__short_name', ordering=('id',))).values('names')
+
+        return queryset.select_related('owner', 'fiat_currency', 'crypto_currency').annotate(
+            ad_trade_count=Coalesce('trade_stats__trade_count', 0),
+            ad_released_count=Coalesce('trade_stats__released_count', 0),
+            ad_completed_count=Coalesce('trade_stats__completed_count', 0),
+            owner_trade_count=Coalesce('owner__trade_stats__trade_count', 0),
+            owner_released_count=Coalesce('owner__trade_stats__released_count', 0),
+            owner_completed_count=Coalesce('owner__trade_stats__completed_count', 0),
+        ).annotate(
+            ad_completion_rate=completion_rate_expression('ad_released_count', 'ad_completed_count'),
+            owner_completion_rate=completion_rate_expression('owner_released_count', 'owner_completed_count'),
+            owner_rating=models.Subquery(rating_subq, output_field=models.FloatField()),
+            payment_type_names=models.Subquery(payment_types_subq, output_field=ArrayField(models.CharField())),
+        )
+
 class Ad(models.Model):
     owner = models.ForeignKey(Peer, on_delete=models.PROTECT)
     trade_type = models.CharField(max_length=4, choices=TradeType.choices, db_index=True)
@@ -55,6 +118,8 @@ class Ad(models.Model):
     modified_at = models.DateTimeField(auto_now=True)
     deleted_at = models.DateTimeField(blank=True, null=True)
 
+    objects = AdQuerySet.as_manager()
+
     def __str__(self):
         return str(self.id)
 
@@ -0,0 +1,47 @@
+from django.db import models
+
+from .ad import Ad
+from .peer import Peer
+
+# statuses that end an order, counted once per order
+COMPLETED_STATUSES = ['RLS', 'CNCL', 'RFN']
+RELEASED_STATUS = 'RLS'
+
+class TradeStats(models.Model):
+    '''Denormalized order counters, kept up to date by the Order & Status post_save signals'''
+    trade_count = models.IntegerField(default=0)
+    released_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def completion_rate(self):
+        # completion_rate = released_count / (released_count + canceled_count + refunded_count)
+        if self.completed_count > 0:
+            return self.released_count / self.completed_count * 100
+        return 0
+
+    @classmethod
+    def increment(cls, **kwargs):
+        '''
+        Adds to the counters of the stats row, e.g. increment(ad_id=1, trade_count=1)
+        The row is created on first use, counters are added in SQL so concurrent updates don't overwrite each other.
+        '''
+        key = { name: value for name, value in kwargs.items() if not name.endswith('_count') }
+        counts = { name: value for name, value in kwargs.items() if name.endswith('_count') }
+        cls.objects.get_or_create(**key)
+        cls.objects.filter(**key).update(**{ name: models.F(name) + value for name, value in counts.items() })
+
+class AdTradeStats(TradeStats):
+    ad = models.OneToOneField(Ad, on_delete=models.CASCADE, primary_key=True, related_name='trade_stats')
+
+    def __str__(self):
+        return str(self.ad_id)
+
+class PeerTradeStats(TradeStats):
+    peer = models.OneToOneField(Peer, on_delete=models.CASCADE, primary_key=True, related_name='trade_stats')
+
+    def __str__(self):
+        return str(self.peer_id)
@@ -154,19 +154,28 @@ class AdListSerializer(serializers.ModelSerializer):
         ]
 
     def get_payment_methods(self, obj: models.Ad):
+        if hasattr(obj, 'payment_type_names'):
+            return obj.payment_type_names or []
         return obj.payment_methods.values_list('payment_type__short_name', flat=True)
     
     def get_appeal_cooldown(self, instance: models.Ad):
         return models.CooldownChoices(instance.appeal_cooldown_choice).value
     
     def get_owner(self, obj: models.Ad):
-        trade_count = obj.owner.get_trade_count()
-        completion_rate = obj.owner.get_completion_rate()
+        # ads from Ad.objects.annotate_list_fields() carry the owner's stats
+        if hasattr(obj, 'owner_trade_count'):
+            rating = obj.owner_rating
+            trade_count = obj.owner_trade_count
+            completion_rate = obj.owner_completion_rate
+        else:
+            rating = obj.owner.average_rating()
+            trade_count = obj.owner.get_trade_count()
+            completion_rate = obj.owner.get_completion_rate()
         return {
             'id': obj.owner.id,
             'chat_identity_id': obj.owner.chat_identity_id,
             'name': obj.owner.name,
-            'rating':  obj.owner.average_rating(),
+            'rating':  rating,
             'trade_count': trade_count,
             'completion_rate': completion_rate,
             'is_online': obj.owner.is_online,
@@ -180,6 +189,8 @@ class AdListSerializer(serializers.ModelSerializer):
         return False
     
     def get_price(self, obj: models.Ad):
+        if hasattr(obj, 'price'):
+            return obj.price
         return obj.get_price()
     
     def get_trade_amount(self, obj: models.Ad):
@@ -192,9 +203,13 @@ class AdListSerializer(serializers.ModelSerializer):
         return obj.get_trade_ceiling()
     
     def get_trade_count(self, obj: models.Ad):
+        if hasattr(obj, 'ad_trade_count'):
+            return obj.ad_trade_count
         return obj.get_trade_count()
 
     def get_completion_rate(self, obj: models.Ad):
+        if hasattr(obj, 'ad_completion_rate'):
+            return obj.ad_completion_rate
         return obj.get_completion_rate()
 
 class CashinAdSerializer(AdListSerializer):
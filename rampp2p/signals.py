@@ -23,6 +23,41 @@ def on_order_update(sender, instance:models.Status, created:bool, raw:bool, usin
         if appeal:
             AppealStatusUpdateMessage.send_safe(appeal.id, status=instance)
 
+@receiver(signals.post_save, sender=models.Order)
+def count_order_trade(sender, instance:models.Order, created:bool, raw:bool, **kwargs):
+    if not created or raw:
+        return
+    ad = instance.ad_snapshot.ad
+    models.AdTradeStats.increment(ad_id=ad.id, trade_count=1)
+    for peer_id in set([instance.owner_id, ad.owner_id]):
+        models.PeerTradeStats.increment(peer_id=peer_id, trade_count=1)
+
+@receiver(signals.post_save, sender=models.Status)
+def count_order_completion(sender, instance:models.Status, created:bool, raw:bool, **kwargs):
+    ''' Counts an order as completed/released the first time it gets a completed/released status '''
+    if not created or raw or instance.status not in models.COMPLETED_STATUSES:
+        return
+
+    previous_statuses = set(
+        models.Status.objects.filter(
+            order_id=instance.order_id,
+            status__in=models.COMPLETED_STATUSES
+        ).exclude(id=instance.id).values_list('status', flat=True)
+    )
+    counts = {}
+    if not previous_statuses:
+        counts['completed_count'] = 1
+    if instance.status == models.RELEASED_STATUS and models.RELEASED_STATUS not in previous_statuses:
+        counts['released_count'] = 1
+    if not counts:
+        return
+
+    order = models.Order.objects.select_related('ad_snapshot__ad').get(id=instance.order_id)
+    ad = order.ad_snapshot.ad
+    models.AdTradeStats.increment(ad_id=ad.id, **counts)
+    for peer_id in set([order.owner_id, ad.owner_id]):
+        models.PeerTradeStats.increment(peer_id=peer_id, **counts)
+
 @receiver(signals.post_save, sender=models.Appeal)
 def on_appeal_update(sender, instance:models.Appeal, created:bool, raw:bool, using:str, update_fields:set, **kwargs):
     AppealSummaryMessage.send_safe(instance.id)
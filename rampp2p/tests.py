@@ -1,3 +1,95 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, tag
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
 
-# Create your tests here.
+import rampp2p.models as models
+from rampp2p.views.views_ad import AdViewSet
+
+
+class AdListTestCase(TestCase):
+    def setUp(self):
+        self.fiat_currency = models.FiatCurrency.objects.create(name='Philippine Peso', symbol='PHP')
+        self.crypto_currency = models.CryptoCurrency.objects.create(name='Bitcoin Cash', symbol='BCH')
+        self.payment_type = models.PaymentType.objects.create(full_name='GCash', short_name='GCash')
+        models.MarketRate.objects.create(currency='PHP', price=15000)
+        self.buyer = self.create_peer('buyer')
+
+    def create_peer(self, name):
+        return models.Peer.objects.create(name=name, wallet_hash=name, public_key='', address='')
+
+    def create_ad(self, name):
+        owner = self.create_peer(name)
+        payment_method = models.PaymentMethod.objects.create(payment_type=self.payment_type, owner=owner)
+        ad = models.Ad.objects.create(
+            owner=owner,
+            trade_type=models.TradeType.SELL,
+            price_type=models.PriceType.FLOATING,
+            floating_price=100,
+            fiat_currency=self.fiat_currency,
+            crypto_currency=self.crypto_currency,
+            trade_floor_sats=1000,
+            trade_ceiling_sats=100000,
+            trade_amount_sats=100000,
+        )
+        ad.payment_methods.add(payment_method)
+        return ad
+
+    def create_order(self, ad, status=None):
+        ad_snapshot = models.AdSnapshot.objects.create(
+            ad=ad,
+            trade_type=ad.trade_type,
+            price_type=ad.price_type,
+            fiat_currency=ad.fiat_currency,
+            crypto_currency=ad.crypto_currency,
+            appeal_cooldown_choice=ad.appeal_cooldown_choice,
+        )
+        order = models.Order.objects.create(ad_snapshot=ad_snapshot, owner=self.buyer)
+        if status:
+            models.Status.objects.create(order=order, status=status)
+        return order
+
+    def list_ads(self):
+        request = APIRequestFactory().get('/', { 'currency': 'PHP', 'trade_type': 'SELL', 'limit': 20 })
+        return AdViewSet().fetch_queryset(request=Request(request))
+
+    @tag("unit")
+    def test_query_count_does_not_grow_with_ads(self):
+        for index in range(2):
+            self.create_order(self.create_ad(f'seller-{index}'), status=models.StatusType.RELEASED)
+
+        with CaptureQueriesContext(connection) as few_ads_queries:
+            self.assertEqual(len(self.list_ads()['ads']), 2)
+
+        for index in range(2, 10):
+            self.create_order(self.create_ad(f'seller-{index}'), status=models.StatusType.RELEASED)
+
+        with CaptureQueriesContext(connection) as many_ads_queries:
+            self.assertEqual(len(self.list_ads()['ads']), 10)
+
+        # one count & one page query
+        self.assertEqual(len(many_ads_queries), len(few_ads_queries))
+        self.assertLessEqual(len(many_ads_queries), 2)
+
+    @tag("unit")
+    def test_trade_stats(self):
+        ad = self.create_ad('seller')
+        released_order = self.create_order(ad, status=models.StatusType.RELEASED)
+        models.Status.objects.create(order=released_order, status=models.StatusType.RELEASED)
+        self.create_order(ad, status=models.StatusType.CANCELED)
+        self.create_order(ad)
+        models.Feedback.objects.create(from_peer=self.buyer, to_peer=ad.owner, order=released_order, rating=4)
+
+        data = self.list_ads()['ads'][0]
+        self.assertEqual(data['trade_count'], ad.get_trade_count())
+        self.assertEqual(data['trade_count'], 3)
+        self.assertEqual(data['completion_rate'], 50)
+        self.assertEqual(data['owner']['trade_count'], 3)
+        self.assertEqual(data['owner']['completion_rate'], 50)
+        self.assertEqual(data['owner']['rating'], 4)
+        self.assertEqual(list(data['payment_methods']), ['GCash'])
+        self.assertEqual(data['price'], 15000)
+
+        # counted for the buyer as well
+        self.assertEqual(self.buyer.trade_stats.trade_count, 3)
@@ -1,27 +1,24 @@
-from rampp2p.tasks.contract_tasks import execute_subprocess, contract_handler
+from rampp2p.tasks.contract_tasks import generate_contract, contract_handler
 
 import logging
 logger = logging.getLogger(__name__)
 
 def create_contract(**kwargs):
     '''
-    Executes a subprocess task to generate the contract address
+    Executes a task to generate the contract address
     '''
-    path = './rampp2p/js/src/'
-    command = 'node {}escrow.js {} {} {} {} {} {}'.format(
-        path,        
-        kwargs.get('arbiter_pubkey'), 
-        kwargs.get('buyer_pubkey'), 
-        kwargs.get('seller_pubkey'),
-        kwargs.get('timestamp'),
-        kwargs.get('service_fee'),
-        kwargs.get('arbitration_fee')
-    )
     logger.warning(f'service_fee: {kwargs.get("service_fee")} | arbitration_fee: {kwargs.get("arbitration_fee")}')
-    logger.warning(f'command: {command}')
 
-    return execute_subprocess.apply_async(
-        (command,), 
+    return generate_contract.apply_async(
+        (
+            kwargs.get('arbiter_pubkey'),
+            kwargs.get('buyer_pubkey'),
+            kwargs.get('seller_pubkey'),
+            # formatted the same way it was passed on the command line, it is hashed into the contract
+            str(kwargs.get('timestamp')),
+            kwargs.get('service_fee'),
+            kwargs.get('arbitration_fee'),
+        ),
         link=contract_handler.s(
             order_id=kwargs.get('order_id')
         )
@@ -7,7 +7,7 @@ from django.db.models import Q
 from django.http import Http404
 from django.core.exceptions import ValidationError
 from django.db.models import (
-    Count, F, ExpressionWrapper, DecimalField, Case, Func, When, OuterRef, Subquery, IntegerField
+    Count, F, ExpressionWrapper, DecimalField, Func, IntegerField
 )
 from django.conf import settings
 from django.views import View
@@ -74,20 +74,8 @@ class CashInAdViewSet(viewsets.GenericViewSet):
         if payment_type:
             queryset = queryset.filter(payment_methods__payment_type__id=payment_type).distinct()
 
-        market_rate_subq = rampp2p_models.MarketRate.objects.filter(currency=OuterRef('fiat_currency__symbol')).values('price')[:1]
-        queryset = queryset.annotate(market_rate=Subquery(market_rate_subq))
-
         # Annotate ad price for sorting
-        queryset = queryset.annotate(
-            price=ExpressionWrapper(
-                Case(
-                    When(price_type=rampp2p_models.PriceType.FLOATING, then=(F('floating_price')/100 * F('market_rate'))),
-                    default=F('fixed_price'),
-                    output_field=DecimalField()
-                ),
-                output_field=DecimalField()
-            )
-        )
+        queryset = queryset.annotate_price()
 
         # prioritize online ads
         queryset = queryset.order_by('-last_online_at', 'price')
@@ -111,7 +99,7 @@ class CashInAdViewSet(viewsets.GenericViewSet):
         if payment_type is None:
             queryset = queryset.filter(payment_methods__payment_type__id__in=paymenttypes_ids)
 
-        cashin_ads = queryset[:10]
+        cashin_ads = queryset.annotate_list_fields()[:10]
         serialized_ads = rampp2p_serializers.CashinAdSerializer(cashin_ads, many=True, context = { 'wallet_hash': wallet_hash })
 
         responsedata = {
@@ -196,7 +184,7 @@ class CashInAdViewSet(viewsets.GenericViewSet):
 
             if presets:
                 for index, amount in enumerate(amounts):
-                    ads = queryset.filter(Q(trade_floor_sats__lte=amount) & Q(trade_amount_sats__gte=amount) & Q(trade_ceiling_sats__gte=amount))
+                    ads = queryset.filter(Q(trade_floor_sats__lte=amount) & Q(trade_amount_sats__gte=amount) & Q(trade_ceiling_sats__gte=amount)).annotate_list_fields()
                     serialized_ads = rampp2p_serializers.CashinAdSerializer(ads, many=True)
                     key = presets[index]
                     if key is None:
@@ -226,17 +214,7 @@ class CashInAdViewSet(viewsets.GenericViewSet):
         queryset = self.filter_by_access_control(currency, queryset)
 
         # Annotate price
-        market_rate_subq = rampp2p_models.MarketRate.objects.filter(currency=OuterRef('fiat_currency__symbol')).values('price')[:1]
-        queryset = queryset.annotate(market_rate=Subquery(market_rate_subq)).annotate(
-            price=ExpressionWrapper(
-                Case(
-                    When(price_type=rampp2p_models.PriceType.FLOATING, then=(F('floating_price')/100 * F('market_rate'))),
-                    default=F('fixed_price'),
-                    output_field=DecimalField()
-                ),
-                output_field=DecimalField()
-            )
-        )
+        queryset = queryset.annotate_price()
 
         # Filter recently online ads
         queryset = queryset.annotate(last_online_at=F('owner__last_online_at'))
@@ -327,10 +305,13 @@ class AdViewSet(viewsets.GenericViewSet):
     permission_classes = [RampP2PIsAuthenticated]
     queryset = rampp2p_models.Ad.objects.filter(deleted_at__isnull=True)
 
-    def get_object(self, pk):
+    def get_object(self, pk, annotated=False):
         Ad = rampp2p_models.Ad
         try:
-            ad = Ad.objects.get(pk=pk)
+            queryset = Ad.objects.all()
+            if annotated:
+                queryset = queryset.annotate_list_fields()
+            ad = queryset.get(pk=pk)
             if ad.deleted_at is not None:
                 raise Ad.DoesNotExist
             return ad
@@ -343,7 +324,7 @@ class AdViewSet(viewsets.GenericViewSet):
         
         response_data = None
         if pk:
-            ad = self.get_object(pk)
+            ad = self.get_object(pk, annotated=True)
             wallet_hash = request.user.wallet_hash
             context = { 'wallet_hash': wallet_hash }
             serializer = None
@@ -405,20 +386,8 @@ class AdViewSet(viewsets.GenericViewSet):
                 time_limits = list(map(int, time_limits))
                 queryset = queryset.filter(appeal_cooldown_choice__in=time_limits).distinct()
 
-            market_rate_subq = rampp2p_models.MarketRate.objects.filter(currency=OuterRef('fiat_currency__symbol')).values('price')[:1]
-            queryset = queryset.annotate(market_rate=Subquery(market_rate_subq))
-
             # Annotate to compute ad price based on price type (FIXED vs FLOATING)
-            queryset = queryset.annotate(
-                price=ExpressionWrapper(
-                    Case(
-                        When(price_type=rampp2p_models.PriceType.FLOATING, then=(F('floating_price')/100 * F('market_rate'))),
-                        default=F('fixed_price'),
-                        output_field=DecimalField()
-                    ),
-                    output_field=DecimalField()
-                )
-            )
+            queryset = queryset.annotate_price()
 
             if order_amount and order_amount_currency:
                 if order_amount_currency == 'BCH':
@@ -466,7 +435,8 @@ class AdViewSet(viewsets.GenericViewSet):
                 total_pages = math.ceil(count / limit)
 
             offset = (page - 1) * limit
-            paged_queryset = queryset[offset:offset + limit]
+            # owner stats, ratings & payment types of the page's ads are fetched in the same query
+            paged_queryset = queryset.annotate_list_fields()[offset:offset + limit]
 
             context = { 'wallet_hash': wallet_hash }
             serializer = rampp2p_serializers.AdListSerializer(paged_queryset, many=True, context=context)
@@ -26,6 +26,10 @@ default_settings = {
     "START_BLOCK": None,
     "BLOCK_TO_PRELOAD": None,
     "BLOCKS_PER_TASK": 25,
+    # parse blocks with `smartbch.utils.block.parse_block_range()` instead of a task per block & tx
+    "BATCH_MODE": False,
+    # max JSON-RPC calls sent in one request
+    "RPC_BATCH_SIZE": 50,
     "JSON_RPC_PROVIDER_URL": "https://rpc.smartbch.org"
     # "JSON_RPC_PROVIDER_URL": "https://smartbch.fountainhead.cash/mainnet",
 }
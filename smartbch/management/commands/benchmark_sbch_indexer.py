@@ -0,0 +1,147 @@
+import json
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction as trans
+from django.test.utils import CaptureQueriesContext
+
+from smartbch.utils import block as block_utils
+from smartbch.utils import transaction as transaction_utils
+from smartbch.utils.contract import get_token_decimals
+from smartbch.utils.formatters import format_block_number, hex_to_int
+from smartbch.utils.web3 import JSONRPCBatchClient
+
+
+class FixtureNode:
+    """
+        Serves JSON-RPC calls from a recorded fixture chain
+    """
+
+    def __init__(self, fixture):
+        self.blocks = fixture["blocks"]
+        self.logs = fixture["logs"]
+        self.receipts = fixture["receipts"]
+        self.decimals = fixture["decimals"]
+        self.request_count = 0
+
+    def request(self, method, params):
+        if method == "eth_getBlockByNumber":
+            block = self.blocks.get(str(hex_to_int(params[0])))
+            if block and not params[1]:
+                block = { **block, "transactions": [tx["hash"] for tx in block["transactions"]] }
+            return block
+
+        if method == "eth_getLogs":
+            from_block = hex_to_int(params[0]["fromBlock"])
+            to_block = hex_to_int(params[0]["toBlock"])
+            return [log for log in self.logs if from_block <= hex_to_int(log["blockNumber"]) <= to_block]
+
+        if method == "eth_getTransactionReceipt":
+            return self.receipts.get(params[0])
+
+        raise CommandError(f"Fixture has no responses for {method}({params})")
+
+    def make_request(self, provider, method, params):
+        self.request_count += 1
+        return { "jsonrpc": "2.0", "id": 0, "result": self.request(method, params) }
+
+    def send(self, client, payload):
+        self.request_count += 1
+        return [
+            { "jsonrpc": "2.0", "id": call["id"], "result": self.request(call["method"], call["params"]) }
+            for call in payload
+        ]
+
+
+class Command(BaseCommand):
+    help = "Replay a recorded smartbch fixture chain through the block indexer and report queries, requests and wall time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("fixture", type=str, help="path of the fixture chain JSON file")
+        parser.add_argument("-r", "--record", type=int, nargs=2, default=None, metavar=("START", "END"), help="record blocks START to END into the fixture file")
+        parser.add_argument("-a", "--all-transactions", action="store_true", help="save all transactions, not only those of tracked addresses")
+        parser.add_argument("-l", "--legacy", action="store_true", help="also replay through per-block 'parse_block()' & per-tx 'save_transaction_transfers()'")
+
+    def handle(self, *args, **options):
+        fixture = options["fixture"]
+        if options["record"] is not None:
+            self.record(*options["record"], fixture)
+
+        try:
+            with open(fixture) as fixture_file:
+                fixture = json.load(fixture_file)
+        except (OSError, ValueError) as exception:
+            raise CommandError(f"Unable to load fixture: {exception}")
+
+        node = FixtureNode(fixture)
+        start_block, end_block = fixture["start_block"], fixture["end_block"]
+        save_all_transactions = options["all_transactions"]
+        tx_count = sum(len(block["transactions"]) for block in node.blocks.values())
+        self.stdout.write(f"Blocks {start_block} to {end_block}: {tx_count} txs, {len(node.logs)} transfer logs")
+
+        if options["legacy"]:
+            def parse_legacy():
+                for block_number in range(start_block, end_block+1):
+                    block_obj = block_utils.parse_block(block_number, save_all_transactions=save_all_transactions)
+                    for tx_obj in block_obj.transactions.all():
+                        transaction_utils.save_transaction_transfers(tx_obj.txid, parse_block_timestamp=True)
+            self.report("parse_block", parse_legacy, node)
+
+        self.report(
+            "parse_block_range",
+            lambda: block_utils.parse_block_range(start_block, end_block, save_all_transactions=save_all_transactions),
+            node,
+        )
+
+    def record(self, start_block, end_block, fixture):
+        client = JSONRPCBatchClient()
+        block_numbers = list(range(start_block, end_block+1))
+        results = client.call([
+            *[("eth_getBlockByNumber", [format_block_number(block_number), True]) for block_number in block_numbers],
+            ("eth_getLogs", [{
+                "fromBlock": format_block_number(start_block),
+                "toBlock": format_block_number(end_block),
+                "topics": [transaction_utils.TRANSFER_EVENT_TOPIC],
+            }]),
+        ])
+        blocks = { str(block_number): block for block_number, block in zip(block_numbers, results[:-1]) if block }
+        logs = results[-1] or []
+
+        txids = [tx["hash"] for block in blocks.values() for tx in block["transactions"]]
+        receipts = dict(zip(txids, client.call([("eth_getTransactionReceipt", [txid]) for txid in txids])))
+
+        decimals = {}
+        for log in logs:
+            transfer_log = transaction_utils.decode_transfer_log(log)
+            if transfer_log and transfer_log.token_type == 20 and transfer_log.address not in decimals:
+                decimals[transfer_log.address] = get_token_decimals(transfer_log.address)
+
+        with open(fixture, "w") as fixture_file:
+            json.dump({
+                "start_block": start_block,
+                "end_block": end_block,
+                "blocks": blocks,
+                "logs": logs,
+                "receipts": receipts,
+                "decimals": decimals,
+            }, fixture_file)
+        self.stdout.write(f"Recorded blocks {start_block} to {end_block} into {fixture}")
+
+    def report(self, name, func, node):
+        node.request_count = 0
+        # changes are rolled back and the node is served from the fixture
+        with mock.patch("web3.providers.rpc.HTTPProvider.make_request", autospec=True, side_effect=node.make_request), \
+            mock.patch.object(JSONRPCBatchClient, "send", autospec=True, side_effect=node.send), \
+            mock.patch("smartbch.utils.transaction.get_token_decimals", side_effect=node.decimals.get):
+
+            with trans.atomic():
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    func()
+                    duration = time.perf_counter() - start
+                trans.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{name}: {len(queries.captured_queries)} queries | {node.request_count} rpc requests | {round(duration, 3)}s"
+        ))
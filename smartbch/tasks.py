@@ -136,9 +136,43 @@ def parse_blocks_task():
     )[:block_count]
 
     LOGGER.info(f"Queueing blocks for parsing: {blocks.values_list('block_number', flat=True)}")
+    if app_settings.BATCH_MODE:
+        block_ranges = block_utils.group_block_ranges(blocks.values_list('block_number', flat=True))
+        for start_block, end_block in block_ranges:
+            parse_block_range_task.delay(start_block, end_block, send_notifications=True)
+        return
+
     for block_obj in blocks:
         parse_block_task.delay(block_obj.block_number, send_notifications=True)
-    
+
+
+@shared_task(queue=_QUEUE_BLOCKS_PARSER, time_limit=_TASK_TIME_LIMIT)
+def parse_block_range_task(start_block, end_block, send_notifications=False):
+    LOGGER.info(f"Parsing blocks from {start_block} to {end_block}")
+    block_numbers = [str(block_number) for block_number in range(int(start_block), int(end_block)+1)]
+
+    active_blocks = {i.decode() for i in REDIS_CLIENT.smembers(_REDIS_NAME__BLOCKS_BEING_PARSED)}
+    if active_blocks.intersection(block_numbers):
+        LOGGER.info(f"Blocks from {start_block} to {end_block} are being parsed by another task, will stop task")
+        return f"blocks_are_being_parsed {start_block}-{end_block}: {active_blocks}"
+
+    REDIS_CLIENT.sadd(_REDIS_NAME__BLOCKS_BEING_PARSED, *block_numbers)
+    REDIS_CLIENT.expire(_REDIS_NAME__BLOCKS_BEING_PARSED, _REDIS_KEY_TTL)
+    try:
+        block_objs, tx_objs = block_utils.parse_block_range(start_block, end_block)
+        LOGGER.info(f"Parsed {len(block_objs)} blocks & transfers of {len(tx_objs)} transactions")
+
+        if send_notifications:
+            for tx_obj in tx_objs:
+                send_transaction_notification_task.delay(tx_obj.txid)
+
+        return f"parsed blocks {start_block}-{end_block}: {len(block_objs)} blocks, {len(tx_objs)} transactions"
+    except Exception as e:
+        LOGGER.exception(e)
+        return f"parse_block_range_task({start_block}, {end_block}) error: {str(e)}"
+    finally:
+        REDIS_CLIENT.srem(_REDIS_NAME__BLOCKS_BEING_PARSED, *block_numbers)
+
 
 @shared_task(queue=_QUEUE_BLOCKS_PARSER, time_limit=_TASK_TIME_LIMIT)
 def parse_block_task(block_number, send_notifications=False):
@@ -9,6 +9,16 @@ from smartbch.conf import settings as app_settings
 from smartbch.models import Block
 from smartbch.utils import block as block_utils
 
+class FakeBatchClient:
+    def __init__(self, responses):
+        self.responses = responses
+        self.batches = []
+
+    def call(self, calls):
+        self.batches.append(calls)
+        return [self.responses[method] for method, params in calls]
+
+
 class BlockUtilsTestCase(TestCase):
     @tag("unit")
     def test_preload_block_range(self):
@@ -164,3 +174,50 @@ class BlockUtilsTestCase(TestCase):
                     len(block_patch.return_value.transactions),
                     f"Expected {block_obj} to have {len(block_patch.return_value.transactions)} transactions but got {block_obj.transactions.count()}",
                 )
+
+    @tag("unit")
+    def test_group_block_ranges(self):
+        self.assertEqual(
+            block_utils.group_block_ranges([5, 3, 4, 8, 10, 11]),
+            [(3, 5), (8, 8), (10, 11)],
+        )
+        self.assertEqual(block_utils.group_block_ranges(range(1, 6), max_size=2), [(1, 2), (3, 4), (5, 5)])
+
+    @tag("unit")
+    @mock.patch("smartbch.utils.transaction.get_token_decimals", return_value=0)
+    def test_parse_block_range_with_tracked_addresses(self, mock_get_token_decimals):
+        Address.objects.get_or_create(
+            address=mock_responses.test_block_response.transactions[0]['from'],
+        )
+        block_number = mock_responses.test_block_response.number
+        client = FakeBatchClient({
+            "eth_getBlockByNumber": mock_responses.test_block_response,
+            "eth_getLogs": mock_responses.test_block_logs,
+            "eth_getTransactionReceipt": mock_responses.test_sep20_transfer_tx_receipt,
+        })
+
+        block_objs, tx_objs = block_utils.parse_block_range(block_number, block_number, client=client)
+        self.assertEqual(len(block_objs), 1)
+        self.assertTrue(Block.objects.get(block_number=block_number).processed)
+        self.assertEqual(len(tx_objs), len(mock_responses.test_block_response.transactions))
+        self.assertTrue(tx_objs[0].processed_transfers)
+        self.assertTrue(
+            tx_objs[0].transfers.filter(token_contract__isnull=False).exists(),
+            "Expected transfers to be saved from the block's logs",
+        )
+        # blocks & logs in one batch, receipts in another
+        self.assertEqual(len(client.batches), 2)
+
+    @tag("unit")
+    def test_parse_block_range_without_tracked_addresses(self):
+        block_number = mock_responses.test_block_response.number
+        client = FakeBatchClient({
+            "eth_getBlockByNumber": mock_responses.test_block_response,
+            "eth_getLogs": mock_responses.test_block_logs,
+            "eth_getTransactionReceipt": mock_responses.test_sep20_transfer_tx_receipt,
+        })
+
+        block_objs, tx_objs = block_utils.parse_block_range(block_number, block_number, client=client)
+        self.assertEqual(len(block_objs), 1)
+        self.assertEqual(tx_objs, [])
+        self.assertFalse(Block.objects.get(block_number=block_number).transactions.exists())
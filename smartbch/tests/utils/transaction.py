@@ -43,6 +43,28 @@ class TransactionUtilsTestCase(TestCase):
             f"Expected to have {TokenContract} record with address={token_contract_address}"
         )
 
+    @tag("unit")
+    def test_decode_transfer_log(self):
+        sep20_log = mock_responses.test_sep20_transfer_tx_receipt.logs[0]
+        transfer_log = transaction_utils.decode_transfer_log(sep20_log)
+        self.assertEqual(transfer_log.token_type, 20)
+        self.assertEqual(transfer_log.address, sep20_log.address)
+        self.assertEqual(transfer_log.txid, "0x22fbe3c0b651e09a445f2b3a70f02de7539e98f5f6b73d636a3659c7051777d2")
+        self.assertEqual(transfer_log.value, int(sep20_log.data, 16))
+
+        # raw JSON-RPC logs decode the same
+        raw_log = {
+            "address": sep20_log.address.lower(),
+            "topics": [topic.hex() for topic in sep20_log.topics],
+            "data": sep20_log.data,
+            "transactionHash": sep20_log.transactionHash.hex(),
+            "logIndex": hex(sep20_log.logIndex),
+        }
+        self.assertEqual(transaction_utils.decode_transfer_log(raw_log), transfer_log)
+
+        # events other than Transfer
+        self.assertIsNone(transaction_utils.decode_transfer_log(mock_responses.test_block_logs[1]))
+
     @tag("unit")
     @mock.patch("smartbch.utils.web3.SmartBCHModule.query_transfer_events", return_value=mock_responses.test_sbch_query_transfer_events)
     @mock.patch("smartbch.utils.web3.SmartBCHModule.query_tx_by_addr", return_value=mock_responses.test_sbch_query_tx_by_addr)
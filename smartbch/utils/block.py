@@ -2,21 +2,26 @@ import decimal
 import datetime
 from django.db import models
 from django.utils.timezone import make_aware
-from web3.datastructures import AttributeDict
-from web3.exceptions import (
-    InvalidEventABI,
-    LogTopicError,
-    MismatchedABI,
-)
+from collections import defaultdict
+from django.db import transaction as trans
+from web3 import Web3
 
 from main.models import Address
 
 from smartbch.conf import settings as app_settings
 from smartbch.models import Block, Transaction
 
-from .contract import abi
-from .formatters import format_block_number
-from .web3 import create_web3_client
+from .formatters import (
+    format_block_number,
+    to_hex_string,
+    to_int,
+)
+from .transaction import (
+    TRANSFER_EVENT_TOPIC,
+    decode_transfer_log,
+    save_transaction_transfer_logs,
+)
+from .web3 import create_web3_client, JSONRPCBatchClient
 
 
 def range_with_exclude(*args, to_exclude=[], **kwargs):
@@ -26,6 +31,51 @@ def range_with_exclude(*args, to_exclude=[], **kwargs):
             continue
         yield i
 
+def group_block_ranges(block_numbers, max_size=None):
+    """
+        Groups block numbers into ranges of consecutive block numbers
+
+    Returns
+    ------------
+        ranges: list((start_block, end_block))
+    """
+    ranges = []
+    for block_number in sorted(set(int(block_number) for block_number in block_numbers)):
+        if ranges and ranges[-1][1] == block_number - 1 and \
+            (not max_size or block_number - ranges[-1][0] < max_size):
+            ranges[-1][1] = block_number
+        else:
+            ranges.append([block_number, block_number])
+
+    return [tuple(block_range) for block_range in ranges]
+
+
+def get_tracked_addresses(*address_sets):
+    """
+        Returns the addresses in the address sets that are saved in db, with a single query
+    """
+    addresses = set()
+    for address_set in address_sets:
+        addresses.update(address for address in address_set if address)
+
+    if not addresses:
+        return set()
+
+    return set(Address.objects.filter(address__in=addresses).values_list("address", flat=True))
+
+
+def get_transfer_addresses_map(transfer_logs):
+    """
+        Returns the addresses in decoded Transfer logs, grouped by txid
+    """
+    tx_log_addresses_map = defaultdict(set)
+    for transfer_log in transfer_logs:
+        if not transfer_log:
+            continue
+        tx_log_addresses_map[transfer_log.txid].update([transfer_log["from"], transfer_log.to])
+    return tx_log_addresses_map
+
+
 def preload_block_range(start_block, end_block):
     """
         Preloads block range to database creates blocks within the specified range that are not yet in database
@@ -42,25 +92,21 @@ def preload_block_range(start_block, end_block):
             new blocks created, i.e. blocks within the specified range that have already existed are not included here
     """
     print(f"Pre saving blocks from {start_block} to {end_block}")
-    existing_block_numbers = Block.objects.filter(
-        block_number__gte=start_block, block_number__lte=end_block
-    ).order_by(
-        "block_number",
-    ).values_list(
-        "block_number", flat=True,
+    existing_block_numbers = set(
+        int(block_number) for block_number in Block.objects.filter(
+            block_number__gte=start_block, block_number__lte=end_block
+        ).values_list(
+            "block_number", flat=True,
+        )
     )
 
-    created_blocks = []
-    # blocks_to_create = []
-    for block_number in range(int(start_block), int(end_block)+1):
-        block, created = Block.objects.get_or_create(
-            block_number=decimal.Decimal(block_number),
-        )
-        if created:
-            created_blocks.append(block)
-    
-    # if len(blocks_to_create):
-    #     created_blocks = Block.objects.bulk_create(blocks_to_create)
+    blocks_to_create = [
+        Block(block_number=decimal.Decimal(block_number))
+        for block_number in range_with_exclude(int(start_block), int(end_block)+1, to_exclude=existing_block_numbers)
+    ]
+
+    # blocks created by another process in the meantime are skipped
+    created_blocks = Block.objects.bulk_create(blocks_to_create, batch_size=1000, ignore_conflicts=True)
 
     return (start_block, end_block, created_blocks)
 
@@ -125,57 +171,32 @@ def parse_block(block_number, save_transactions=True, save_all_transactions=Fals
         }
     )
 
-    # ERC20 and ERC721 Transfer event topic, apparenlty share the same topic in hex string
-    event_topic = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
-    block_logs = w3.eth.get_logs({
-        "fromBlock": format_block_number(block_number),
-        "toBlock": format_block_number(block_number),
-        "topics": [event_topic],
-    })
-
     if save_transactions:
-        tx_log_addresses_map = {}
+        tracked_addresses = None
         if not save_all_transactions:
-            erc20 = w3.eth.contract('', abi=abi.get_token_abi(20))
-            erc721 = w3.eth.contract('', abi=abi.get_token_abi(721))
-            # extracting the addresses of the Transfer events in logs
-            for log in block_logs:
-                tx_hex = ""
-                addresses = set()
-                try:
-                    parsed_log = erc20.events.Transfer().processLog(log)
-                    tx_hex = parsed_log.transactionHash.hex()
-                    addresses.add(parsed_log.args['from'])
-                    addresses.add(parsed_log.args.to)
-                except (InvalidEventABI, LogTopicError, MismatchedABI):
-                    pass
-
-                try:
-                    parsed_log = erc721.events.Transfer().processLog(log)
-                    tx_hex = parsed_log.transactionHash.hex()
-                    addresses.add(parsed_log.args['from'])
-                    addresses.add(parsed_log.args.to)
-                except (InvalidEventABI, LogTopicError, MismatchedABI):
-                    pass
-
-                if tx_hex:
-                    tx_log_addresses_map[tx_hex] = addresses
-
-        for transaction in block.transactions:
-            if not save_all_transactions:
-                tx_addresses_list = [
+            block_logs = w3.eth.get_logs({
+                "fromBlock": format_block_number(block_number),
+                "toBlock": format_block_number(block_number),
+                "topics": [TRANSFER_EVENT_TOPIC],
+            })
+            tx_log_addresses_map = get_transfer_addresses_map(
+                decode_transfer_log(log) for log in block_logs
+            )
+            tx_addresses_map = {
+                to_hex_string(transaction.hash): {
                     transaction['from'],
                     transaction.to,
-                ]
-                if isinstance(tx_log_addresses_map.get(transaction.hash.hex(), None), (set, list)):
-                    tx_addresses_list = [
-                        *tx_addresses_list,
-                        *tx_log_addresses_map[transaction.hash.hex()],
-                    ]
+                    *tx_log_addresses_map.get(to_hex_string(transaction.hash), set()),
+                }
+                for transaction in block.transactions
+            }
+            # a single query for the addresses of all the transactions in the block
+            tracked_addresses = get_tracked_addresses(*tx_addresses_map.values())
 
-                tracked_addresses = Address.objects.filter(address__in=tx_addresses_list)
-                if not tracked_addresses.exists():
-                    continue
+        for transaction in block.transactions:
+            if tracked_addresses is not None and \
+                not tx_addresses_map[to_hex_string(transaction.hash)] & tracked_addresses:
+                continue
 
             tx, created = Transaction.objects.get_or_create(
                 txid=transaction.hash.hex(),
@@ -192,3 +213,127 @@ def parse_block(block_number, save_transactions=True, save_all_transactions=Fals
             )
 
     return block_obj
+
+
+def parse_block_range(start_block, end_block, save_all_transactions=False, client=None):
+    """
+        Batch mode of `parse_block()` & `save_transaction_transfers()` for a range of blocks
+        The blocks & their Transfer event logs are fetched in one JSON-RPC batch request, and
+        the receipts of the saved transactions in another. Transfers are saved from the logs
+        already fetched instead of decoding each receipt.
+
+    Parameters
+    ------------
+    save_all_transactions: boolean
+        see `parse_block()`
+
+    client: smartbch.utils.web3.JSONRPCBatchClient
+
+    Returns
+    ------------
+    (blocks, transactions)
+        blocks: list(smartbch.models.Block)
+            blocks parsed, blocks the node doesn't have yet are left unprocessed
+        transactions: list(smartbch.models.Transaction)
+            transactions whose transfers were saved
+    """
+    if client is None:
+        client = JSONRPCBatchClient()
+
+    start_block, end_block = int(start_block), int(end_block)
+    preload_block_range(start_block, end_block)
+
+    block_numbers = list(range(start_block, end_block+1))
+    results = client.call([
+        *[("eth_getBlockByNumber", [format_block_number(block_number), True]) for block_number in block_numbers],
+        ("eth_getLogs", [{
+            "fromBlock": format_block_number(start_block),
+            "toBlock": format_block_number(end_block),
+            "topics": [TRANSFER_EVENT_TOPIC],
+        }]),
+    ])
+    raw_blocks, raw_logs = results[:-1], results[-1] or []
+
+    tx_transfer_logs_map = defaultdict(list)
+    for log in raw_logs:
+        transfer_log = decode_transfer_log(log)
+        if transfer_log:
+            tx_transfer_logs_map[transfer_log.txid].append(transfer_log)
+
+    block_objs = {
+        int(block_obj.block_number): block_obj
+        for block_obj in Block.objects.filter(block_number__gte=start_block, block_number__lte=end_block)
+    }
+
+    parsed_blocks = []
+    transactions_to_save = []
+    for block_number, raw_block in zip(block_numbers, raw_blocks):
+        if not raw_block:
+            continue
+
+        block_obj = block_objs[block_number]
+        block_obj.timestamp = make_aware(datetime.datetime.fromtimestamp(to_int(raw_block["timestamp"])))
+        block_obj.transactions_count = len(raw_block["transactions"])
+        block_obj.processed = True
+        parsed_blocks.append(block_obj)
+
+        tx_addresses_map = {}
+        for raw_tx in raw_block["transactions"]:
+            txid = to_hex_string(raw_tx["hash"])
+            tx_addresses_map[txid] = {
+                Web3.toChecksumAddress(raw_tx["from"]),
+                Web3.toChecksumAddress(raw_tx["to"]) if raw_tx.get("to") else None,
+                *[address for transfer_log in tx_transfer_logs_map.get(txid, []) for address in (transfer_log["from"], transfer_log.to)],
+            }
+
+        tracked_addresses = None
+        if not save_all_transactions:
+            # a single query for the addresses of all the transactions in the block
+            tracked_addresses = get_tracked_addresses(*tx_addresses_map.values())
+
+        for raw_tx in raw_block["transactions"]:
+            txid = to_hex_string(raw_tx["hash"])
+            if tracked_addresses is not None and not tx_addresses_map[txid] & tracked_addresses:
+                continue
+
+            transactions_to_save.append(Transaction(
+                txid=txid,
+                block=block_obj,
+                # contract creations have no recipient
+                to_addr=Web3.toChecksumAddress(raw_tx["to"]) if raw_tx.get("to") else "",
+                from_addr=Web3.toChecksumAddress(raw_tx["from"]),
+                value=Web3.fromWei(to_int(raw_tx["value"]), 'ether'),
+                data=raw_tx["input"],
+                gas=to_int(raw_tx["gas"]),
+                gas_price=to_int(raw_tx["gasPrice"]),
+                is_mined=True,
+            ))
+
+    with trans.atomic():
+        Block.objects.bulk_update(parsed_blocks, ["timestamp", "transactions_count", "processed"], batch_size=500)
+        Transaction.objects.bulk_create(transactions_to_save, batch_size=500, ignore_conflicts=True)
+
+    tx_objs = list(
+        Transaction.objects.filter(
+            txid__in=[tx.txid for tx in transactions_to_save],
+        ).exclude(
+            processed_transfers=True,
+        )
+    )
+    receipts = client.call([("eth_getTransactionReceipt", [tx_obj.txid]) for tx_obj in tx_objs])
+
+    token_contracts = {}
+    saved_transactions = []
+    for tx_obj, receipt in zip(tx_objs, receipts):
+        # left for `handle_transactions_with_unprocessed_transfers_task` to retry
+        if not receipt:
+            continue
+
+        saved_transactions.append(save_transaction_transfer_logs(
+            tx_obj,
+            tx_transfer_logs_map.get(tx_obj.txid, []),
+            receipt,
+            token_contracts=token_contracts,
+        ))
+
+    return parsed_blocks, saved_transactions
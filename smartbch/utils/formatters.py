@@ -34,3 +34,24 @@ def format_block_number(value, exclude_names=False):
 
     if is_hex_string(str(value)):
         return str(value)
+
+
+def to_hex_string(value):
+    """
+        Lowercase 0x-prefixed hex string of a web3 formatted (HexBytes) or raw JSON-RPC (str) value
+    """
+    if isinstance(value, (bytes, bytearray)):
+        value = value.hex()
+    value = str(value).lower()
+    if not value.startswith("0x"):
+        value = "0x" + value
+    return value
+
+
+def to_int(value):
+    """
+        Int of a web3 formatted (int) or raw JSON-RPC (hex str) value
+    """
+    if isinstance(value, str):
+        return hex_to_int(value)
+    return int(value)
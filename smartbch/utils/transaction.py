@@ -1,14 +1,22 @@
 import datetime
 import decimal
-import warnings
+import web3
 from django.utils.timezone import make_aware
 from web3.datastructures import AttributeDict
 from smartbch.models import Block, Transaction, TokenContract
 
-from .contract import abi, get_token_decimals
-from .formatters import format_block_number
+from .contract import get_token_decimals
+from .formatters import (
+    format_block_number,
+    hex_to_int,
+    to_hex_string,
+    to_int,
+)
 from .web3 import create_web3_client
 
+# SEP20 & SEP721 Transfer event topic, apparently share the same topic in hex string
+TRANSFER_EVENT_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+
 def save_transaction(txid):
     w3 = create_web3_client()
     transaction = w3.eth.get_transaction(txid)
@@ -52,70 +60,121 @@ def save_transaction_transfers(txid, parse_block_timestamp=False):
         )
 
     receipt = w3.eth.get_transaction_receipt(instance.txid)
+    transfer_logs = [decode_transfer_log(log) for log in receipt.logs]
+    return save_transaction_transfer_logs(instance, [log for log in transfer_logs if log], receipt)
 
-    erc20 = w3.eth.contract('', abi=abi.get_token_abi(20))
-    erc721 = w3.eth.contract('', abi=abi.get_token_abi(721))
-
-    erc20_transfers = []
-    erc721_transfers = []
 
-    with warnings.catch_warnings(record=True) as w:
-        erc20_transfers = erc20.events.Transfer().processReceipt(receipt)
-        erc721_transfers = erc721.events.Transfer().processReceipt(receipt)
+def topic_to_address(topic):
+    return web3.Web3.toChecksumAddress("0x" + to_hex_string(topic)[-40:])
 
-    # print(f"erc20: {erc20_transfers}")
-    # print(f"erc721: {erc721_transfers}")
-
-    if len(erc20_transfers):
-        for event_log in erc20_transfers:
-            token_contract_instance, _ = TokenContract.objects.get_or_create(
-                address=event_log.address,
-                defaults={
-                    "token_type": 20,
-                }
-            )
 
-            decimals = None
-            if token_contract_instance.decimals is not None:
-                decimals = token_contract_instance.decimals
-            else:
-                decimals = get_token_decimals(token_contract_instance.address)
-                token_contract_instance.decimals = decimals
-                token_contract_instance.save()
+def decode_transfer_log(log):
+    """
+        Decodes a SEP20/SEP721 Transfer event log, works on logs formatted by web3 and on raw JSON-RPC logs
+        SEP20 & SEP721 Transfer events share the same topic, they differ in whether the 3rd parameter is indexed.
 
-            if decimals is None:
-                continue
+    Returns
+    ------------
+        transfer_log: AttributeDict({
+            "token_type": 20 | 721,
+            "address": "0x00",
+            "txid": "0x00",
+            "log_index": 0,
+            "from": "0x00",
+            "to": "0x00",
+            "value": int | None,
+            "token_id": int | None,
+        }) | None
+            None if the log isn't a Transfer event
+    """
+    topics = [to_hex_string(topic) for topic in log["topics"]]
+    if not topics or topics[0] != TRANSFER_EVENT_TOPIC:
+        return None
+
+    data = to_hex_string(log["data"] or "0x")
+    if len(topics) == 3:
+        if len(data) < 66:
+            return None
+        token_type, value, token_id = 20, hex_to_int(data[2:66]), None
+    elif len(topics) == 4:
+        token_type, value, token_id = 721, None, hex_to_int(topics[3])
+    else:
+        return None
+
+    return AttributeDict({
+        "token_type": token_type,
+        "address": web3.Web3.toChecksumAddress(log["address"]),
+        "txid": to_hex_string(log["transactionHash"]),
+        "log_index": to_int(log["logIndex"]),
+        "from": topic_to_address(topics[1]),
+        "to": topic_to_address(topics[2]),
+        "value": value,
+        "token_id": token_id,
+    })
+
+
+def save_transaction_transfer_logs(instance, transfer_logs, receipt, token_contracts=None):
+    """
+        Saves the transfers of a transaction from its decoded Transfer event logs
 
-            instance.transfers.update_or_create(
-                token_contract=token_contract_instance,
-                log_index=event_log.logIndex,
-                defaults = {
-                    "to_addr": event_log.args.to,
-                    "from_addr": event_log.args["from"],
-                    "amount": decimal.Decimal(event_log.args.value) / 10 ** decimals,
-                    "token_id": None,
-                }
-            )
+    Parameters
+    ------------
+        instance: smartbch.models.Transaction
+        transfer_logs: list
+            the transaction's logs decoded with `decode_transfer_log()`
+        receipt: dict
+            the transaction's receipt, web3 formatted or raw
+        token_contracts: dict
+            address -> smartbch.models.TokenContract, shared between calls to look up each contract once
+    """
+    if token_contracts is None:
+        token_contracts = {}
 
-    if len(erc721_transfers):
-        for event_log in erc721_transfers:
+    for event_log in transfer_logs:
+        token_contract_instance = token_contracts.get(event_log.address)
+        if token_contract_instance is None:
             token_contract_instance, _ = TokenContract.objects.get_or_create(
                 address=event_log.address,
                 defaults={
-                    "token_type": 721,
+                    "token_type": event_log.token_type,
                 }
             )
+            token_contracts[event_log.address] = token_contract_instance
 
+        if event_log.token_type == 721:
             instance.transfers.update_or_create(
                 token_contract=token_contract_instance,
-                log_index=event_log.logIndex,
+                log_index=event_log.log_index,
                 defaults = {
-                    "to_addr": event_log.args.to,
-                    "from_addr": event_log.args["from"],
+                    "to_addr": event_log.to,
+                    "from_addr": event_log["from"],
                     "amount": None,
-                    "token_id": event_log.args.tokenId,
+                    "token_id": event_log.token_id,
                 }
             )
+            continue
+
+        decimals = None
+        if token_contract_instance.decimals is not None:
+            decimals = token_contract_instance.decimals
+        else:
+            decimals = get_token_decimals(token_contract_instance.address)
+            token_contract_instance.decimals = decimals
+            token_contract_instance.save()
+
+        if decimals is None:
+            continue
+
+        instance.transfers.update_or_create(
+            token_contract=token_contract_instance,
+            log_index=event_log.log_index,
+            defaults = {
+                "to_addr": event_log.to,
+                "from_addr": event_log["from"],
+                "amount": decimal.Decimal(event_log.value) / 10 ** decimals,
+                "token_id": None,
+            }
+        )
 
     # This part is for checking whether the transaction has transferred some bch
     if instance.value > 0:
@@ -131,8 +190,8 @@ def save_transaction_transfers(txid, parse_block_timestamp=False):
         )
 
     instance.processed_transfers = True
-    instance.status = receipt.status
-    instance.gas_used = receipt.gasUsed
+    instance.status = to_int(receipt["status"])
+    instance.gas_used = to_int(receipt["gasUsed"])
     instance.save()
 
     return instance
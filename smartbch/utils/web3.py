@@ -1,4 +1,5 @@
 import re
+import requests
 import web3
 
 from smartbch.conf import settings as app_settings
@@ -20,6 +21,64 @@ def create_web3_client():
     return w3
 
 
+class JSONRPCError(Exception):
+    pass
+
+
+class JSONRPCBatchClient:
+    """
+        Sends JSON-RPC calls to the smartbch node in batches, a single HTTP request per batch
+        Results are the raw JSON-RPC results, i.e. numbers are hex strings and
+        addresses are lowercase, unlike the values formatted by web3.
+    """
+
+    def __init__(self, url=None, batch_size=None, session=None, timeout=30):
+        self.url = url or app_settings.JSON_RPC_PROVIDER_URL
+        self.batch_size = batch_size or app_settings.RPC_BATCH_SIZE
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.request_count = 0
+
+    def send(self, payload):
+        self.request_count += 1
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def call(self, calls):
+        """
+        Parameters
+        ------------
+        calls: list((method, params))
+
+        Returns
+        ------------
+        results: list
+            results of the calls in the same order
+        """
+        results = []
+        for offset in range(0, len(calls), self.batch_size):
+            batch = calls[offset:offset+self.batch_size]
+            payload = [
+                { "jsonrpc": "2.0", "id": index, "method": method, "params": params }
+                for index, (method, params) in enumerate(batch)
+            ]
+            responses = self.send(payload)
+            if not isinstance(responses, list):
+                raise JSONRPCError(f"Expected a batch response, got: {responses}")
+
+            responses = { response.get("id"): response for response in responses }
+            for index, (method, params) in enumerate(batch):
+                response = responses.get(index)
+                if response is None:
+                    raise JSONRPCError(f"No response for {method}({params})")
+                if response.get("error"):
+                    raise JSONRPCError(f"{method}({params}): {response['error']}")
+                results.append(response.get("result"))
+
+        return results
+
+
 # munger is needed for methods that use params, check web3.method.Method docs
 # mungers preprocess args and kwargs passed in a Method call before they are passed as param to the JSON-RPC request
 # ideally define specific mungers for specific rpc methods
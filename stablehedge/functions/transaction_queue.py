@@ -0,0 +1,333 @@
+import select
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from django.conf import settings
+from django.db import connection, close_old_connections, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from stablehedge import models
+from stablehedge.apps import LOGGER
+from stablehedge.consumer import StablehedgeRpcConsumer
+from stablehedge.utils.blockchain import broadcast_transaction
+from stablehedge.functions.transaction import (
+    RedemptionContractTransactionException,
+    create_inject_liquidity_tx,
+    create_deposit_tx,
+    create_redeem_tx,
+    resolve_failed_redemption_tx,
+    save_redemption_contract_tx_meta,
+)
+from stablehedge.tasks import check_and_short_funds
+
+from main.utils.stats import StatsCounter
+
+
+# notified with the redemption contract id by a trigger on
+# stablehedge_redemptioncontracttransaction, see migration 0009
+NOTIFY_CHANNEL = "stablehedge_redemption_contract_tx"
+
+TX_QUEUE_STATS_KEY = "stablehedge:tx-queue:stats"
+
+_stats = None
+
+
+def get_tx_queue_stats():
+    global _stats
+    if _stats is None:
+        _stats = StatsCounter(TX_QUEUE_STATS_KEY)
+    return _stats
+
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_tx_queue_stats().observe(stage, time.perf_counter() - start)
+
+
+def pending_transactions():
+    return models.RedemptionContractTransaction.objects.filter(
+        status=models.RedemptionContractTransaction.Status.PENDING,
+        redemption_contract__isnull=False,
+    )
+
+
+def get_queue_depth():
+    """
+        Returns the number of pending transactions, the number of contracts they are in,
+        and the age in seconds of the oldest one
+    """
+    depth = pending_transactions().aggregate(
+        pending=Count("id"),
+        contracts=Count("redemption_contract", distinct=True),
+        oldest=Min("created_at"),
+    )
+    oldest = depth.pop("oldest")
+    depth["oldest_age"] = round((timezone.now() - oldest).total_seconds(), 1) if oldest else 0
+    return depth
+
+
+class RedemptionContractTxDispatcher:
+    """
+        Resolves pending redemption contract transactions as soon as they are created
+        The dispatcher LISTENs for the notification sent when a transaction becomes pending,
+        and falls back to scanning for pending transactions every 'POLL_INTERVAL' seconds.
+        Contracts are resolved in parallel by 'WORKERS' threads. A contract's transactions
+        are resolved one at a time in creation order while holding an advisory lock on the
+        contract, so other dispatcher processes skip the contract instead of racing on it.
+        A transaction left pending by an unexpected error is retried on the next notification
+        or scan, instead of right away.
+    """
+
+    def __init__(self, workers=None, poll_interval=None):
+        config = settings.REDEMPTION_CONTRACT_TX_QUEUE
+        self.workers = workers or config["WORKERS"]
+        self.poll_interval = poll_interval or config["POLL_INTERVAL"]
+        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        self.listener = None
+
+        # contracts being resolved by a worker, and those notified again meanwhile
+        self.active = set()
+        self.rerun = set()
+        self._lock = threading.Lock()
+
+    def run(self, log_interval=30):
+        last_log = 0
+        last_scan = 0
+        while True:
+            if last_log + log_interval < time.time():
+                LOGGER.info(f"redemption contract transactions queue running | {get_queue_depth()}")
+                # counts are otherwise only flushed by the next increment, which may not come for a while
+                get_tx_queue_stats().flush()
+                last_log = time.time()
+
+            if last_scan + self.poll_interval < time.time():
+                self.dispatch(self.pending_contract_ids())
+                last_scan = time.time()
+
+            try:
+                contract_ids = self.wait(timeout=max(last_scan + self.poll_interval - time.time(), 0))
+            except psycopg2.Error as exception:
+                LOGGER.exception(exception)
+                self.close_listener()
+                time.sleep(1)
+                # notifications sent while reconnecting are lost, so rescan
+                last_scan = 0
+                continue
+
+            self.dispatch(contract_ids)
+
+    def listen(self):
+        if self.listener is None:
+            listener = psycopg2.connect(**connection.get_connection_params())
+            listener.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with listener.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            self.listener = listener
+        return self.listener
+
+    def close_listener(self):
+        if self.listener is None:
+            return
+        try:
+            self.listener.close()
+        except psycopg2.Error:
+            pass
+        self.listener = None
+
+    def wait(self, timeout):
+        """
+            Returns the ids of the contracts notified within 'timeout' seconds
+        """
+        listener = self.listen()
+        if select.select([listener], [], [], timeout) == ([], [], []):
+            return set()
+
+        listener.poll()
+        contract_ids = set()
+        while listener.notifies:
+            payload = listener.notifies.pop(0).payload
+            if payload.isdigit():
+                contract_ids.add(int(payload))
+        return contract_ids
+
+    def pending_contract_ids(self):
+        return set(
+            pending_transactions()
+                .order_by()
+                .values_list("redemption_contract_id", flat=True)
+                .distinct()
+        )
+
+    def dispatch(self, contract_ids):
+        for contract_id in contract_ids:
+            with self._lock:
+                if contract_id in self.active:
+                    self.rerun.add(contract_id)
+                    continue
+                self.active.add(contract_id)
+            self.executor.submit(self.drain, contract_id)
+
+    def drain(self, contract_id):
+        while True:
+            try:
+                close_old_connections()
+                while self.resolve_next(contract_id):
+                    pass
+            except Exception as exception:
+                LOGGER.exception(exception)
+
+            with self._lock:
+                if contract_id not in self.rerun:
+                    self.active.discard(contract_id)
+                    return
+                self.rerun.discard(contract_id)
+
+    def resolve_next(self, contract_id):
+        """
+            Resolves the contract's oldest pending transaction
+            Returns False if there is none, if another process holds the contract,
+            or if the transaction is still pending after an unexpected error
+        """
+        with contract_lock(contract_id) as locked:
+            if not locked:
+                return False
+
+            pending_tx = pending_transactions() \
+                .filter(redemption_contract_id=contract_id) \
+                .select_related("redemption_contract", "price_oracle_message") \
+                .order_by("created_at", "id") \
+                .first()
+            if not pending_tx:
+                return False
+
+            LOGGER.info(f"RedemptionContractTransaction#{pending_tx.id} | {pending_tx.transaction_type} |  {pending_tx.wallet_hash} | {pending_tx.redemption_contract.address} | {pending_tx.utxo}")
+            get_tx_queue_stats().observe("wait", (timezone.now() - pending_tx.created_at).total_seconds())
+            with timed("total"):
+                resolve_transaction(pending_tx)
+            LOGGER.info(f"RedemptionContractTransaction#{pending_tx.id} | {pending_tx.status} | {pending_tx.txid} | {pending_tx.result_message}")
+            return pending_tx.status != models.RedemptionContractTransaction.Status.PENDING
+
+
+@contextmanager
+def contract_lock(contract_id):
+    """
+        Session level advisory lock on a redemption contract, yields False if another session holds it
+        Unlike a row lock it needs no open transaction, so none is kept open while
+        the transaction is built and broadcasted.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s), %s)", [NOTIFY_CHANNEL, contract_id])
+        locked = cursor.fetchone()[0]
+
+    try:
+        yield locked
+    finally:
+        if locked:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(hashtext(%s), %s)", [NOTIFY_CHANNEL, contract_id])
+
+
+def resolve_transaction(obj: models.RedemptionContractTransaction):
+    if obj.status != models.RedemptionContractTransaction.Status.PENDING:
+        return
+
+    stats = get_tx_queue_stats()
+    try:
+        min_price_message = timezone.now() - timezone.timedelta(seconds=120)
+        if obj.price_oracle_message.message_timestamp < min_price_message:
+            raise RedemptionContractTransactionException("Oracle price message is old")
+
+        with timed("build"):
+            if obj.transaction_type == models.RedemptionContractTransaction.Type.INJECT:
+                result = create_inject_liquidity_tx(obj)
+            elif obj.transaction_type == models.RedemptionContractTransaction.Type.DEPOSIT:
+                result = create_deposit_tx(obj)
+            elif obj.transaction_type == models.RedemptionContractTransaction.Type.REDEEM:
+                result = create_redeem_tx(obj)
+            else:
+                raise RedemptionContractTransactionException(f"Unknown transaction type '{obj.transaction_type}'")
+
+        LOGGER.debug(f"RedemptionContractTransaction#{obj.id} | RESULT | {result}")
+        if not result["success"]:
+            raise RedemptionContractTransactionException(result["error"])
+
+        with timed("broadcast"):
+            success, txid_or_error = broadcast_transaction(result["tx_hex"])
+        if not success:
+            raise RedemptionContractTransactionException(txid_or_error)
+        obj.status = models.RedemptionContractTransaction.Status.SUCCESS
+        obj.txid = txid_or_error
+        obj.resolved_at = timezone.now()
+        # saved on its own as soon as it's broadcasted, so it's never rebuilt after
+        with transaction.atomic():
+            obj.save(update_fields=["status", "txid", "resolved_at"])
+    except RedemptionContractTransactionException as error:
+        obj.status = models.RedemptionContractTransaction.Status.FAILED
+        obj.result_message = str(error)
+        obj.resolved_at = timezone.now()
+        with transaction.atomic():
+            obj.save(update_fields=["status", "result_message", "resolved_at"])
+    except Exception as exception:
+        stats.incr("errors")
+        LOGGER.exception(exception)
+
+    if obj.status == models.RedemptionContractTransaction.Status.PENDING:
+        return
+
+    stats.incr(obj.status)
+
+    def finalize():
+        with timed("finalize"):
+            finalize_transaction(obj)
+    transaction.on_commit(finalize)
+
+
+def finalize_transaction(obj: models.RedemptionContractTransaction):
+    if obj.status == models.RedemptionContractTransaction.Status.FAILED:
+        try:
+            result = resolve_failed_redemption_tx(obj)
+            LOGGER.info(f"RedemptionContractTransaction#{obj.id} | RECOVERY | {result}")
+        except Exception as exception:
+            LOGGER.exception(exception)
+
+    if obj.status == models.RedemptionContractTransaction.Status.SUCCESS:
+        try:
+            save_redemption_contract_tx_meta(obj)
+        except Exception as exception:
+            LOGGER.exception(exception)
+
+    if obj.status == models.RedemptionContractTransaction.Status.SUCCESS or \
+        obj.status == models.RedemptionContractTransaction.Status.FAILED:
+
+        try:
+            StablehedgeRpcConsumer.Events.send_redemption_contract_tx_update(obj)
+        except Exception as exception:
+            LOGGER.exception(exception)
+
+    try:
+        if obj.status == models.RedemptionContractTransaction.Status.SUCCESS and \
+            obj.transaction_type == models.RedemptionContractTransaction.Type.DEPOSIT and \
+            obj.redemption_contract.treasury_contract_address:
+
+            try:
+                min_sats = obj.redemption_contract.treasury_contract.short_position_rule.target_satoshis
+            except models.TreasuryContract.short_position_rule.RelatedObjectDoesNotExist:
+                min_sats = 10 ** 8
+
+            result = check_and_short_funds(
+                obj.redemption_contract.treasury_contract_address,
+                min_sats=min_sats,
+                background_task=True,
+            )
+            LOGGER.info(f"RedemptionContractTransaction#{obj.id} | SHORT PROPOSAL | {result}")
+    except Exception as exception:
+        LOGGER.exception(exception)
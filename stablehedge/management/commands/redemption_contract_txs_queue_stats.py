@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from main.utils.stats import latency_percentile
+from stablehedge.functions.transaction_queue import get_queue_depth, get_tx_queue_stats
+
+
+STAGES = ["wait", "build", "broadcast", "finalize", "total"]
+
+
+class Command(BaseCommand):
+    help = "Show the depth of the redemption contract transactions queue & latency of its stages across all processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-r", "--reset", action="store_true", help="reset the counters after showing them")
+
+    def handle(self, *args, **options):
+        depth = get_queue_depth()
+        self.stdout.write(
+            f"queue: {depth['pending']} pending | {depth['contracts']} contracts | "
+            f"oldest {depth['oldest_age']}s"
+        )
+
+        stats = get_tx_queue_stats()
+        totals = stats.read()
+        self.stdout.write(
+            f"resolved: {totals.get('success', 0)} success | {totals.get('failed', 0)} failed | "
+            f"{totals.get('errors', 0)} errors"
+        )
+
+        for stage in STAGES:
+            counts = {
+                field.split(":", 1)[1]: count
+                for field, count in totals.items()
+                if field.startswith(f"{stage}:")
+            }
+            calls = counts.get("calls", 0)
+            mean = round(counts.get("ms", 0) / calls, 1) if calls else 0
+            self.stdout.write(
+                f"{stage}: {calls} | mean {mean} ms | "
+                f"p50 <= {latency_percentile(counts, 0.5)} ms | "
+                f"p95 <= {latency_percentile(counts, 0.95)} ms"
+            )
+
+        if options["reset"]:
+            stats.reset()
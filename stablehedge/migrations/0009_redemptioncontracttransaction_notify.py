@@ -0,0 +1,37 @@
+# Generated by Django 3.0.14 on 2026-10-18 00:00
+
+from django.db import migrations
+
+
+# Wakes the redemption contract transactions queue, see stablehedge/functions/transaction_queue.py
+# Notifications are delivered on commit, and repeats within a transaction are sent once.
+CREATE_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION stablehedge_redemptioncontracttransaction_notify() RETURNS trigger AS $$
+BEGIN
+    IF NEW.status = 'pending' AND NEW.redemption_contract_id IS NOT NULL THEN
+        PERFORM pg_notify('stablehedge_redemption_contract_tx', NEW.redemption_contract_id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER stablehedge_redemptioncontracttransaction_notify
+AFTER INSERT OR UPDATE OF status ON stablehedge_redemptioncontracttransaction
+FOR EACH ROW EXECUTE PROCEDURE stablehedge_redemptioncontracttransaction_notify();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS stablehedge_redemptioncontracttransaction_notify ON stablehedge_redemptioncontracttransaction;
+DROP FUNCTION IF EXISTS stablehedge_redemptioncontracttransaction_notify();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stablehedge', '0008_auto_20250108_0206'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
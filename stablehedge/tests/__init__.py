@@ -0,0 +1 @@
+from .transaction_queue import RedemptionContractTxDispatcherTestCase
@@ -0,0 +1,167 @@
+from unittest import mock
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from django.db import connection
+from django.test import TransactionTestCase, override_settings, tag
+from django.utils import timezone
+
+from anyhedge.models import PriceOracleMessage
+from stablehedge import models
+from stablehedge.functions.transaction_queue import NOTIFY_CHANNEL, RedemptionContractTxDispatcher
+
+
+REDEMPTION_CONTRACT_TX_QUEUE = {
+    "WORKERS": 2,
+    "POLL_INTERVAL": 10,
+}
+
+Status = models.RedemptionContractTransaction.Status
+
+
+# transactions are committed, as notifications and finalizing only happen on commit
+@override_settings(REDEMPTION_CONTRACT_TX_QUEUE=REDEMPTION_CONTRACT_TX_QUEUE)
+@mock.patch("stablehedge.functions.transaction_queue.get_tx_queue_stats")
+@mock.patch("stablehedge.functions.transaction_queue.finalize_transaction")
+@mock.patch("stablehedge.functions.transaction_queue.broadcast_transaction")
+@mock.patch("stablehedge.functions.transaction_queue.create_redeem_tx")
+class RedemptionContractTxDispatcherTestCase(TransactionTestCase):
+    def setUp(self):
+        fiat_token = models.FiatToken.objects.create(category="ab" * 32, decimals=2, currency="USD")
+        self.contract = self.create_contract(fiat_token, "bitcoincash:pcontract1")
+        self.other_contract = self.create_contract(fiat_token, "bitcoincash:pcontract2")
+        self.price_message = PriceOracleMessage.objects.create(
+            pubkey="02" + "cd" * 32,
+            signature="ef" * 64,
+            message="00" * 16,
+            message_timestamp=timezone.now(),
+            price_value=50000,
+            price_sequence=1,
+            message_sequence=1,
+        )
+
+        self.dispatcher = RedemptionContractTxDispatcher()
+        self.addCleanup(self.dispatcher.executor.shutdown)
+        self.addCleanup(self.dispatcher.close_listener)
+
+    def create_contract(self, fiat_token, address):
+        return models.RedemptionContract.objects.create(
+            address=address,
+            fiat_token=fiat_token,
+            auth_token_id="cd" * 32,
+            price_oracle_pubkey="02" + "cd" * 32,
+        )
+
+    def create_tx(self, contract):
+        return models.RedemptionContractTransaction.objects.create(
+            redemption_contract=contract,
+            price_oracle_message=self.price_message,
+            wallet_hash="wallet",
+            transaction_type=models.RedemptionContractTransaction.Type.REDEEM,
+            utxo={},
+        )
+
+    def lock_contract(self, contract):
+        """
+            Holds the contract's lock from another session, as another dispatcher process would
+        """
+        other = psycopg2.connect(**connection.get_connection_params())
+        other.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        self.addCleanup(other.close)
+        with other.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(hashtext(%s), %s)", [NOTIFY_CHANNEL, contract.id])
+        return other
+
+    @tag("unit")
+    def test_resolves_contract_transactions_in_order(self, create_redeem_tx, broadcast_transaction, finalize_transaction, _):
+        txs = [self.create_tx(self.contract) for _ in range(3)]
+        create_redeem_tx.return_value = { "success": True, "tx_hex": "00" }
+        broadcast_transaction.side_effect = [(True, str(index) * 64) for index in range(3)]
+
+        def check_saved(obj):
+            # side effects only run once the status is saved
+            obj.refresh_from_db()
+            self.assertEqual(obj.status, Status.SUCCESS)
+        finalize_transaction.side_effect = check_saved
+
+        self.dispatcher.drain(self.contract.id)
+
+        self.assertEqual([call[0][0].id for call in create_redeem_tx.call_args_list], [tx.id for tx in txs])
+        for index, tx in enumerate(txs):
+            tx.refresh_from_db()
+            self.assertEqual(tx.status, Status.SUCCESS)
+            self.assertEqual(tx.txid, str(index) * 64)
+        self.assertEqual(finalize_transaction.call_count, 3)
+
+    @tag("unit")
+    def test_skips_contract_locked_by_another_process(self, create_redeem_tx, broadcast_transaction, *_):
+        tx = self.create_tx(self.contract)
+        other_tx = self.create_tx(self.other_contract)
+        create_redeem_tx.return_value = { "success": True, "tx_hex": "00" }
+        broadcast_transaction.return_value = (True, "ab" * 32)
+
+        other = self.lock_contract(self.contract)
+        self.assertFalse(self.dispatcher.resolve_next(self.contract.id))
+        tx.refresh_from_db()
+        self.assertEqual(tx.status, Status.PENDING)
+
+        # other contracts are not held up
+        self.assertTrue(self.dispatcher.resolve_next(self.other_contract.id))
+        other_tx.refresh_from_db()
+        self.assertEqual(other_tx.status, Status.SUCCESS)
+
+        other.close()
+        self.assertTrue(self.dispatcher.resolve_next(self.contract.id))
+        tx.refresh_from_db()
+        self.assertEqual(tx.status, Status.SUCCESS)
+
+    @tag("unit")
+    def test_unexpected_error_is_retried_later(self, create_redeem_tx, broadcast_transaction, finalize_transaction, _):
+        tx = self.create_tx(self.contract)
+        create_redeem_tx.side_effect = ValueError("node unavailable")
+
+        self.dispatcher.active.add(self.contract.id)
+        self.dispatcher.drain(self.contract.id)
+
+        # left pending for the next notification or scan instead of retried right away
+        self.assertEqual(create_redeem_tx.call_count, 1)
+        self.assertFalse(finalize_transaction.called)
+        self.assertEqual(self.dispatcher.active, set())
+        tx.refresh_from_db()
+        self.assertEqual(tx.status, Status.PENDING)
+
+        create_redeem_tx.side_effect = None
+        create_redeem_tx.return_value = { "success": True, "tx_hex": "00" }
+        broadcast_transaction.return_value = (True, "ab" * 32)
+        self.assertTrue(self.dispatcher.resolve_next(self.contract.id))
+        tx.refresh_from_db()
+        self.assertEqual(tx.status, Status.SUCCESS)
+
+    @tag("unit")
+    def test_contract_notified_while_active_is_drained_again(self, *_):
+        self.dispatcher.active.add(self.contract.id)
+        with mock.patch.object(self.dispatcher.executor, "submit") as submit:
+            self.dispatcher.dispatch({self.contract.id})
+        self.assertFalse(submit.called)
+        self.assertEqual(self.dispatcher.rerun, {self.contract.id})
+
+        with mock.patch.object(self.dispatcher, "resolve_next", return_value=False) as resolve_next:
+            self.dispatcher.drain(self.contract.id)
+        self.assertEqual(resolve_next.call_count, 2)
+        self.assertEqual(self.dispatcher.active, set())
+        self.assertEqual(self.dispatcher.rerun, set())
+
+    @tag("unit")
+    def test_pending_transaction_notifies_contract(self, *_):
+        self.dispatcher.listen()
+
+        tx = self.create_tx(self.contract)
+        self.assertEqual(self.dispatcher.wait(timeout=5), {self.contract.id})
+
+        tx.status = Status.FAILED
+        tx.save()
+        self.assertEqual(self.dispatcher.wait(timeout=0.1), set())
+
+        tx.status = Status.PENDING
+        tx.save()
+        self.assertEqual(self.dispatcher.wait(timeout=5), {self.contract.id})